@@ -0,0 +1 @@
+# backend_core/benchmarks/__init__.py
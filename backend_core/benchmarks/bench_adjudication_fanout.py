@@ -0,0 +1,79 @@
+"""
+bench_adjudication_fanout.py
+Compara el drenaje de un lote de adjudicaciones en serie vs pool de
+procesos local (mismos ejecutores que services/adjudication_fanout).
+
+Cada job sintético imita una adjudicación: espera de I/O (drand +
+lecturas/escrituras en Supabase) + CPU (hashing del motor PRO). No toca
+la DB ni Modal.
+
+Para ejecutar:
+    python -m backend_core.benchmarks.bench_adjudication_fanout
+    python -m backend_core.benchmarks.bench_adjudication_fanout --jobs 500 --workers 4 8 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import time
+from typing import Any, Dict, List
+
+from backend_core.services.adjudication_fanout import LocalProcessFanOut, SerialFanOut
+
+DEFAULT_JOBS = 200
+DEFAULT_WORKERS = [2, 4, 8]
+DEFAULT_IO_MS = 20.0
+DEFAULT_CPU_ROUNDS = 20_000
+
+
+def synthetic_adjudication(session_id: str, attempts: int, worker_id: str, io_ms: float, cpu_rounds: int) -> Dict[str, Any]:
+    time.sleep(io_ms / 1000.0)
+    digest = session_id.encode("utf-8")
+    for _ in range(cpu_rounds):
+        digest = hashlib.sha256(digest).digest()
+    return {"session_id": session_id, "outcome": "processed", "error": None, "digest": digest.hex()}
+
+
+def measure(executor: Any, jobs: int, io_ms: float, cpu_rounds: int) -> Dict[str, Any]:
+    items = [(f"session-{i}", 1) for i in range(jobs)]
+    started = time.perf_counter()
+    results = list(
+        executor.map(synthetic_adjudication, items, worker_id="bench", io_ms=io_ms, cpu_rounds=cpu_rounds)
+    )
+    elapsed = time.perf_counter() - started
+    if len(results) != jobs:
+        raise RuntimeError(f"{executor.name}: {len(results)} resultados para {jobs} jobs")
+    return {
+        "executor": executor.name,
+        "workers": getattr(executor, "max_workers", 1),
+        "jobs": jobs,
+        "elapsed_s": round(elapsed, 3),
+        "jobs_per_s": round(jobs / elapsed, 1) if elapsed else None,
+    }
+
+
+def run(jobs: int, workers: List[int], io_ms: float, cpu_rounds: int) -> List[Dict[str, Any]]:
+    rows = [measure(SerialFanOut(), jobs, io_ms, cpu_rounds)]
+    print(json.dumps(rows[0]))
+    for n in workers:
+        row = measure(LocalProcessFanOut(n), jobs, io_ms, cpu_rounds)
+        row["speedup"] = round(rows[0]["elapsed_s"] / row["elapsed_s"], 2) if row["elapsed_s"] else None
+        rows.append(row)
+        print(json.dumps(row))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--jobs", type=int, default=DEFAULT_JOBS)
+    parser.add_argument("--workers", type=int, nargs="+", default=DEFAULT_WORKERS)
+    parser.add_argument("--io-ms", type=float, default=DEFAULT_IO_MS)
+    parser.add_argument("--cpu-rounds", type=int, default=DEFAULT_CPU_ROUNDS)
+    args = parser.parse_args()
+    run(args.jobs, args.workers, args.io_ms, args.cpu_rounds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,423 @@
+"""
+bench_adjudicator_engine.py
+Benchmark por etapas del motor PRO (adjudicator_engine_pro.adjudicate)
+con baseline JSON y umbrales de regresión.
+
+Etapas medidas por separado, en el mismo orden que el motor:
+    expansion   -> _expand_entries / _expand_entries_compact
+    merkle      -> participants_merkle_root
+    manifest    -> manifest v1/v2 + canonicalización + manifest_commit
+    seed        -> seed_hex + selección por módulo
+    ranking     -> ranking auxiliar completo
+    proof_hash  -> proof bundle + canonicalización + SHA-256
+
+Cada caso (distribución × participantes × modo) corre en un proceso limpio:
+- tiempo: mejor de --repeat pasadas, sin tracemalloc (perf_counter)
+- memoria pico: tracemalloc, incremento sobre lo vivo al empezar la etapa
+
+Para ejecutar:
+    python -m backend_core.benchmarks.bench_adjudicator_engine
+    python -m backend_core.benchmarks.bench_adjudicator_engine --output baseline.json
+    python -m backend_core.benchmarks.bench_adjudicator_engine --baseline baseline.json
+        (sale con código 1 si alguna etapa empeora más allá del umbral)
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import platform
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend_core.models.adjudication_models import (
+    SessionSnapshot,
+    ParticipantSnapshot,
+    DeterministicContext,
+)
+from backend_core.engines import adjudicator_engine_pro as engine
+
+BASELINE_SCHEMA_VERSION = "bench.adjudicator_engine.v1"
+
+STAGES = ("expansion", "merkle", "manifest", "seed", "ranking", "proof_hash")
+MODES = ("legacy", "compact", "manifest_v2")
+DISTRIBUTIONS = ("single", "uniform", "skewed", "sparse")
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000]
+DEFAULT_TIME_THRESHOLD = 0.25
+DEFAULT_MEMORY_THRESHOLD = 0.25
+# Por debajo de estos deltas absolutos la variación se considera ruido
+DEFAULT_MIN_TIME_DELTA_S = 0.005
+DEFAULT_MIN_MEMORY_DELTA_MIB = 1.0
+
+FIXED_TS = datetime(2025, 1, 1, tzinfo=timezone.utc)
+ENTROPY = engine.ExternalEntropySnapshot(provider="drand", round=1234, randomness_hex="ab" * 32)
+
+
+# ==========================================================
+# 🔹 DATOS SINTÉTICOS
+# ==========================================================
+
+def _participations(distribution: str, rng: random.Random) -> Optional[int]:
+    if distribution == "single":
+        return 1
+    if distribution == "uniform":
+        return rng.randint(1, 10)
+    if distribution == "skewed":
+        # cola larga: la mayoría 1-2, unos pocos con cientos
+        return min(int(rng.paretovariate(1.2)), 1_000)
+    if distribution == "sparse":
+        # ~30% sin entradas elegibles (0 / None)
+        roll = rng.random()
+        if roll < 0.15:
+            return 0
+        if roll < 0.30:
+            return None
+        return rng.randint(1, 3)
+    raise ValueError(f"Distribución desconocida: {distribution}")
+
+
+def make_session(session_id: str = "bench-session") -> SessionSnapshot:
+    return SessionSnapshot(
+        session_id=session_id,
+        product_id="bench-product",
+        session_created_at=FIXED_TS,
+        session_closed_at=FIXED_TS,
+        capacity=1,
+        rules_version="1.0",
+    )
+
+
+def make_participants(count: int, distribution: str, seed: int = 42) -> List[ParticipantSnapshot]:
+    rng = random.Random(f"{distribution}:{count}:{seed}")
+    return [
+        ParticipantSnapshot(
+            participant_id=f"participant-{i:09d}",
+            user_id=f"user-{i:09d}",
+            participations=_participations(distribution, rng),
+            joined_at=FIXED_TS,
+        )
+        for i in range(count)
+    ]
+
+
+def make_context(mode: str) -> DeterministicContext:
+    return DeterministicContext(
+        engine_version=engine.ENGINE_VERSION_DEFAULT,
+        algorithm_id=engine.ALGORITHM_ID_MANIFEST_V2 if mode == "manifest_v2" else engine.ALGORITHM_ID_DEFAULT,
+        normalization="stable_sort_by_entry_hash",
+    )
+
+
+# ==========================================================
+# 🔹 PIPELINE POR ETAPAS (mismo camino que adjudicate())
+# ==========================================================
+
+def _stage_pipeline(
+    mode: str,
+    session: SessionSnapshot,
+    participants: List[ParticipantSnapshot],
+) -> List[Tuple[str, Callable[[Dict[str, Any]], None]]]:
+    """
+    Etapas como funciones sobre un estado compartido; cada una deja en el
+    estado lo que necesita la siguiente (así se cronometran por separado).
+    """
+    context = make_context(mode)
+    compact = mode in ("compact", "manifest_v2")
+
+    def expansion(st: Dict[str, Any]) -> None:
+        if compact:
+            st["entries"] = engine._expand_entries_compact(participants)
+            st["mapping"] = None
+        else:
+            st["entries"], st["mapping"] = engine._expand_entries(participants)
+
+    def merkle(st: Dict[str, Any]) -> None:
+        if compact:
+            st["root"] = engine._merkle_root_hex_compact(st["entries"])
+        else:
+            st["root"] = engine._merkle_root_hex(st["entries"])
+
+    def manifest(st: Dict[str, Any]) -> None:
+        if mode == "manifest_v2":
+            doc = engine._build_manifest_v2(
+                session=session,
+                participants_merkle_root=st["root"],
+                participants_count=len(st["entries"]),
+                context=context,
+            )
+        else:
+            doc = engine._build_manifest(
+                session=session,
+                entries_sorted=st["entries"],
+                participants_count=len(st["entries"]),
+                context=context,
+            )
+        st["manifest_commit"] = engine._compute_manifest_commit(doc)
+
+    def seed(st: Dict[str, Any]) -> None:
+        st["seed_hex"], st["seed_input"] = engine._compute_seed_hex(
+            session_id=session.session_id,
+            participants_merkle_root=st["root"],
+            participants_count=len(st["entries"]),
+            manifest_commit=st["manifest_commit"],
+            entropy=ENTROPY,
+        )
+        st["awarded"], st["awarded_index"], _ = engine._select_awarded(
+            entries_sorted=st["entries"],
+            entry_to_participant=st["mapping"],
+            seed_hex=st["seed_hex"],
+        )
+
+    def ranking(st: Dict[str, Any]) -> None:
+        st["ranking"] = engine._build_ranking(
+            participants=participants,
+            seed_hex=st["seed_hex"],
+            awarded_participant_id=st["awarded"],
+        )
+
+    def proof_hash(st: Dict[str, Any]) -> None:
+        bundle = engine._build_proof_bundle(
+            session=session,
+            engine_version=context.engine_version,
+            algorithm_id=context.algorithm_id,
+            manifest_commit=st["manifest_commit"],
+            participants_merkle_root=st["root"],
+            entries_count=len(st["entries"]),
+            external_entropy=ENTROPY,
+            seed_input=st["seed_input"],
+            seed_hex=st["seed_hex"],
+            awarded_index=st["awarded_index"],
+            awarded_participant_id=st["awarded"],
+        )
+        st["proof_hash"] = engine._compute_proof_hash(bundle)
+
+    return [
+        ("expansion", expansion),
+        ("merkle", merkle),
+        ("manifest", manifest),
+        ("seed", seed),
+        ("ranking", ranking),
+        ("proof_hash", proof_hash),
+    ]
+
+
+def _run_pipeline(
+    mode: str,
+    session: SessionSnapshot,
+    participants: List[ParticipantSnapshot],
+    trace_memory: bool,
+) -> Tuple[Dict[str, float], Dict[str, Any]]:
+    """
+    Ejecuta las etapas una vez. Devuelve (métrica por etapa, estado final):
+    segundos sin trace_memory, bytes de pico incremental con trace_memory.
+    """
+    state: Dict[str, Any] = {}
+    metrics: Dict[str, float] = {}
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        for name, fn in _stage_pipeline(mode, session, participants):
+            if trace_memory:
+                tracemalloc.reset_peak()
+                before, _ = tracemalloc.get_traced_memory()
+                fn(state)
+                _, peak = tracemalloc.get_traced_memory()
+                metrics[name] = max(0, peak - before)
+            else:
+                t0 = time.perf_counter()
+                fn(state)
+                metrics[name] = time.perf_counter() - t0
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return metrics, state
+
+
+def measure_case(distribution: str, participants_count: int, mode: str, repeat: int = 3) -> Dict[str, Any]:
+    """
+    Mide un caso completo (en el proceso actual). Comprueba además que el
+    pipeline por etapas coincide con adjudicate() (inputs_hash / seed / awarded),
+    para no cronometrar un camino distinto del real.
+    """
+    session = make_session()
+    participants = make_participants(participants_count, distribution)
+
+    best: Dict[str, float] = {}
+    state: Dict[str, Any] = {}
+    for _ in range(max(1, repeat)):
+        timings, state = _run_pipeline(mode, session, participants, trace_memory=False)
+        for stage, elapsed in timings.items():
+            best[stage] = min(elapsed, best.get(stage, elapsed))
+    peaks, _ = _run_pipeline(mode, session, participants, trace_memory=True)
+
+    reference = engine.adjudicate(
+        session=session,
+        participants=participants,
+        context=make_context(mode),
+        external_entropy=ENTROPY,
+        compact=mode != "legacy",
+    )
+    if (
+        reference.inputs_hash != state["manifest_commit"]
+        or reference.seed != state["seed_hex"]
+        or reference.awarded_participant_id != state["awarded"]
+        or reference.ranking["participants"] != state["ranking"]
+    ):
+        raise RuntimeError(f"El pipeline del benchmark diverge de adjudicate() en {distribution}/{mode}.")
+
+    return {
+        "case": case_key(distribution, participants_count, mode),
+        "distribution": distribution,
+        "participants": participants_count,
+        "entries": len(state["entries"]),
+        "mode": mode,
+        "stages": {
+            stage: {
+                "elapsed_s": round(best[stage], 6),
+                "peak_mib": round(peaks[stage] / (1024 * 1024), 3),
+            }
+            for stage in STAGES
+        },
+        "total_elapsed_s": round(sum(best.values()), 6),
+    }
+
+
+def case_key(distribution: str, participants_count: int, mode: str) -> str:
+    return f"{distribution}/{participants_count}/{mode}"
+
+
+def _isolated(distribution: str, participants_count: int, mode: str, repeat: int) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(measure_case, (distribution, participants_count, mode, repeat))
+
+
+def run(
+    sizes: List[int],
+    distributions: List[str],
+    modes: List[str],
+    repeat: int = 3,
+    isolate: bool = True,
+) -> Dict[str, Any]:
+    cases: List[Dict[str, Any]] = []
+    for distribution in distributions:
+        for n in sizes:
+            for mode in modes:
+                row = (_isolated if isolate else measure_case)(distribution, n, mode, repeat)
+                cases.append(row)
+                print(json.dumps({"case": row["case"], "entries": row["entries"], "total_elapsed_s": row["total_elapsed_s"]}))
+    return {
+        "schema_version": BASELINE_SCHEMA_VERSION,
+        "created_at_utc": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "cases": cases,
+    }
+
+
+# ==========================================================
+# 🔹 BASELINE Y REGRESIONES
+# ==========================================================
+
+def compare_to_baseline(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    *,
+    time_threshold: float = DEFAULT_TIME_THRESHOLD,
+    memory_threshold: float = DEFAULT_MEMORY_THRESHOLD,
+    min_time_delta_s: float = DEFAULT_MIN_TIME_DELTA_S,
+    min_memory_delta_mib: float = DEFAULT_MIN_MEMORY_DELTA_MIB,
+) -> List[Dict[str, Any]]:
+    """
+    Etapas que empeoran respecto al baseline:
+    actual > baseline * (1 + umbral) y, además, por encima del delta mínimo
+    (evita falsos positivos en etapas de microsegundos).
+    Los casos que no están en el baseline se ignoran.
+    """
+    base_cases = {c["case"]: c for c in baseline.get("cases", [])}
+    regressions: List[Dict[str, Any]] = []
+
+    for case in current.get("cases", []):
+        base = base_cases.get(case["case"])
+        if base is None:
+            continue
+        for stage, now in case["stages"].items():
+            before = base.get("stages", {}).get(stage)
+            if before is None:
+                continue
+            checks = (
+                ("elapsed_s", time_threshold, min_time_delta_s),
+                ("peak_mib", memory_threshold, min_memory_delta_mib),
+            )
+            for metric, threshold, min_delta in checks:
+                old, new = float(before[metric]), float(now[metric])
+                if new > old * (1 + threshold) and new - old > min_delta:
+                    regressions.append(
+                        {
+                            "case": case["case"],
+                            "stage": stage,
+                            "metric": metric,
+                            "baseline": old,
+                            "current": new,
+                            "ratio": round(new / old, 3) if old else None,
+                        }
+                    )
+    return regressions
+
+
+def _load_json(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    if data.get("schema_version") != BASELINE_SCHEMA_VERSION:
+        raise ValueError(f"Baseline con schema_version no soportado: {data.get('schema_version')}")
+    return data
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="nº de participantes")
+    parser.add_argument("--distributions", nargs="+", default=list(DISTRIBUTIONS), choices=DISTRIBUTIONS)
+    parser.add_argument("--modes", nargs="+", default=list(MODES), choices=MODES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--no-isolate", action="store_true", help="no lanzar un proceso limpio por caso")
+    parser.add_argument("--output", help="escribe el resultado (nuevo baseline) en este fichero")
+    parser.add_argument("--baseline", help="baseline JSON contra el que comparar")
+    parser.add_argument("--time-threshold", type=float, default=DEFAULT_TIME_THRESHOLD)
+    parser.add_argument("--memory-threshold", type=float, default=DEFAULT_MEMORY_THRESHOLD)
+    parser.add_argument("--min-time-delta", type=float, default=DEFAULT_MIN_TIME_DELTA_S)
+    parser.add_argument("--min-memory-delta", type=float, default=DEFAULT_MIN_MEMORY_DELTA_MIB)
+    args = parser.parse_args(argv)
+
+    baseline = _load_json(args.baseline) if args.baseline else None
+    result = run(args.sizes, args.distributions, args.modes, repeat=args.repeat, isolate=not args.no_isolate)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, sort_keys=True)
+            f.write("\n")
+
+    if baseline is None:
+        return 0
+
+    regressions = compare_to_baseline(
+        result,
+        baseline,
+        time_threshold=args.time_threshold,
+        memory_threshold=args.memory_threshold,
+        min_time_delta_s=args.min_time_delta,
+        min_memory_delta_mib=args.min_memory_delta,
+    )
+    for r in regressions:
+        print("REGRESSION " + json.dumps(r), file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
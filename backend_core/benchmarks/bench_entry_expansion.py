@@ -0,0 +1,113 @@
+"""
+bench_entry_expansion.py
+Mide tiempo y memoria pico de la expansión de entradas del motor PRO
+(expansión + merkle + selección), modo legacy vs modo compacto.
+
+Cada medición corre en un proceso limpio:
+- tiempo: sin tracemalloc (perf_counter)
+- memoria pico: tracemalloc (sólo lo asignado durante la etapa)
+
+Para ejecutar:
+    python -m backend_core.benchmarks.bench_entry_expansion
+    python -m backend_core.benchmarks.bench_entry_expansion --sizes 100000 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import multiprocessing
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from backend_core.models.adjudication_models import ParticipantSnapshot
+from backend_core.engines import adjudicator_engine_pro as engine
+
+DEFAULT_SIZES = [100_000, 1_000_000, 10_000_000]
+PARTICIPATIONS_PER_PARTICIPANT = 10
+SEED_HEX = "ab" * 32
+
+
+def _make_participants(entries: int) -> List[ParticipantSnapshot]:
+    joined = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    per = PARTICIPATIONS_PER_PARTICIPANT
+    out: List[ParticipantSnapshot] = []
+    for i in range((entries + per - 1) // per):
+        out.append(
+            ParticipantSnapshot(
+                participant_id=f"participant-{i:09d}",
+                user_id=f"user-{i:09d}",
+                participations=min(per, entries - i * per),
+                joined_at=joined,
+            )
+        )
+    return out
+
+
+def _run_stage(mode: str, participants: List[ParticipantSnapshot]) -> str:
+    if mode == "compact":
+        entries = engine._expand_entries_compact(participants)
+        engine._merkle_root_hex_compact(entries)
+        mapping = None
+    else:
+        entries, mapping = engine._expand_entries(participants)
+        engine._merkle_root_hex(entries)
+    awarded, _, _ = engine._select_awarded(
+        entries_sorted=entries,
+        entry_to_participant=mapping,
+        seed_hex=SEED_HEX,
+    )
+    return awarded
+
+
+def _measure(mode: str, entries: int, trace_memory: bool) -> Dict[str, Any]:
+    participants = _make_participants(entries)
+    if trace_memory:
+        tracemalloc.start()
+        tracemalloc.reset_peak()
+    t0 = time.perf_counter()
+    awarded = _run_stage(mode, participants)
+    elapsed = time.perf_counter() - t0
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return {"elapsed_s": elapsed, "peak_bytes": peak, "awarded": awarded}
+
+
+def _isolated(mode: str, entries: int, trace_memory: bool) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    with ctx.Pool(1) as pool:
+        return pool.apply(_measure, (mode, entries, trace_memory))
+
+
+def run(sizes: List[int], modes: List[str]) -> List[Dict[str, Any]]:
+    rows: List[Dict[str, Any]] = []
+    for n in sizes:
+        for mode in modes:
+            timing = _isolated(mode, n, trace_memory=False)
+            memory = _isolated(mode, n, trace_memory=True)
+            row = {
+                "entries": n,
+                "mode": mode,
+                "elapsed_s": round(timing["elapsed_s"], 3),
+                "peak_mib": round(memory["peak_bytes"] / (1024 * 1024), 1),
+                "awarded": timing["awarded"],
+            }
+            rows.append(row)
+            print(json.dumps(row))
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES)
+    parser.add_argument("--modes", nargs="+", default=["legacy", "compact"], choices=["legacy", "compact"])
+    args = parser.parse_args()
+    run(args.sizes, args.modes)
+
+
+if __name__ == "__main__":
+    main()
@@ -10,3 +10,35 @@ def session_card(session):
     **Importe:** {session.amount} €
     ---
     """)
+
+
+# ---------------------------------------------------------
+#  PAGINACIÓN POR CURSOR (keyset)
+#  Pila de cursores en session_state: "Anterior" vuelve al cursor previo,
+#  "Siguiente" apila el next_cursor de la página actual.
+# ---------------------------------------------------------
+
+def keyset_page_cursor(state_key, filters):
+    """
+    Cursor de la página actual. Si cambian los filtros se vuelve a la primera.
+    """
+    state = st.session_state.setdefault(state_key, {"filters": None, "stack": []})
+    if state["filters"] != filters:
+        state["filters"] = filters
+        state["stack"] = []
+    return state["stack"][-1] if state["stack"] else None
+
+
+def keyset_pager_controls(state_key, next_cursor):
+    state = st.session_state[state_key]
+    col_prev, col_page, col_next = st.columns(3)
+
+    if col_prev.button("⬅ Anterior", key=f"{state_key}_prev", disabled=not state["stack"]):
+        state["stack"].pop()
+        st.experimental_rerun()
+
+    col_page.write(f"Página {len(state['stack']) + 1}")
+
+    if col_next.button("Siguiente ➡", key=f"{state_key}_next", disabled=next_cursor is None):
+        state["stack"].append(next_cursor)
+        st.experimental_rerun()
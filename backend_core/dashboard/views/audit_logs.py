@@ -1,12 +1,33 @@
 # backend_core/dashboard/views/audit_logs.py
 
 import streamlit as st
-from datetime import datetime
+from datetime import datetime, time, timedelta
 
 from backend_core.services.audit_repository import (
-    get_all_logs_for_operator,
     get_log_details,
+    query_audit_logs,
 )
+from backend_core.dashboard.ui.components import (
+    keyset_page_cursor,
+    keyset_pager_controls,
+)
+
+PAGE_SIZES = [25, 50, 100, 200]
+
+# Columnas de la tarjeta; el detalle completo se carga al pulsar el botón
+CARD_COLUMNS = ("event_type", "session_id", "operator_id", "country_code")
+
+# Colores por tipo de evento (sólo presentación: el filtro admite cualquier tipo)
+EVENT_COLORS = {
+    "session_created": "#4A90E2",
+    "session_activated": "#007AFF",
+    "session_finished": "#20B858",
+    "session_expired": "#F5A623",
+    "session_adjudicated": "#8B5CF6",
+    "engine_event": "#50E3C2",
+    "login": "#3A3A3A",
+    "error": "#D0021B",
+}
 
 
 # ======================================================================
@@ -24,30 +45,46 @@ def render_audit_logs():
         return
 
     # ---------------------------------------------------------
-    # Cargar logs del operador (multi-país)
+    # Filtros (se aplican en la consulta, no en memoria)
+    # ---------------------------------------------------------
+    col_type, col_session, col_size = st.columns(3)
+    # Texto libre: los servicios registran muchos más tipos que los coloreados
+    # (session_adjudicated_pro, session_commitment_created, ...)
+    event_filter = col_type.text_input(
+        "Tipo de evento (exacto)",
+        placeholder="Todos",
+        help="Ej.: " + ", ".join(sorted(EVENT_COLORS)),
+    ).strip()
+    session_filter = col_session.text_input("Sesión (ID)").strip()
+    page_size = col_size.selectbox("Por página", PAGE_SIZES, index=1)
+
+    col_from, col_to = st.columns(2)
+    date_from = col_from.date_input("Desde", value=None)
+    date_to = col_to.date_input("Hasta (incluido)", value=None)
+
+    filters = {
+        "event_type": event_filter or None,
+        "session_id": session_filter or None,
+        "operator_id": operator_id,
+        "since": datetime.combine(date_from, time.min).isoformat() if date_from else None,
+        "until": datetime.combine(date_to + timedelta(days=1), time.min).isoformat() if date_to else None,
+    }
+    cursor = keyset_page_cursor("audit_logs_pager", {**filters, "page_size": page_size})
+
+    # ---------------------------------------------------------
+    # Cargar página de logs del operador (multi-país)
     # ---------------------------------------------------------
     try:
-        logs = get_all_logs_for_operator(operator_id)
+        page = query_audit_logs(columns=CARD_COLUMNS, limit=page_size, cursor=cursor, **filters)
     except Exception as e:
         st.error(f"Error cargando logs: {e}")
         return
 
+    logs = page["rows"]
     if not logs:
         st.info("No hay registros de auditoría.")
         return
 
-    # ---------------------------------------------------------
-    # Filtro por tipo de evento
-    # ---------------------------------------------------------
-    event_types = sorted({log["event_type"] for log in logs})
-    selected_event = st.selectbox(
-        "Filtrar por tipo de evento",
-        ["Todos"] + event_types
-    )
-
-    if selected_event != "Todos":
-        logs = [l for l in logs if l["event_type"] == selected_event]
-
     st.markdown("---")
 
     # ---------------------------------------------------------
@@ -56,6 +93,8 @@ def render_audit_logs():
     for log in logs:
         _render_log_card(log, operator_id)
 
+    keyset_pager_controls("audit_logs_pager", page["next_cursor"])
+
 
 # ======================================================================
 # TARJETA INDIVIDUAL DE LOG
@@ -71,19 +110,7 @@ def _render_log_card(log: dict, operator_id: str):
     operator = log.get("operator_id")
     country = log.get("country_code", "N/A")
 
-    # Colores por tipo de evento
-    COLOR = {
-        "session_created": "#4A90E2",
-        "session_activated": "#007AFF",
-        "session_finished": "#20B858",
-        "session_expired": "#F5A623",
-        "session_adjudicated": "#8B5CF6",
-        "engine_event": "#50E3C2",
-        "login": "#3A3A3A",
-        "error": "#D0021B",
-    }
-
-    color = COLOR.get(event_type, "#999999")
+    color = EVENT_COLORS.get(event_type, "#999999")
 
     st.markdown(
         f"""
@@ -122,7 +149,7 @@ def _render_log_details(log_id: str, operator_id: str):
     st.markdown("### 📘 Detalles del Log")
 
     try:
-        details = get_log_details(log_id, operator_id)
+        details = get_log_details(log_id).data
     except Exception as e:
         st.error(f"No se pudieron cargar los detalles: {e}")
         return
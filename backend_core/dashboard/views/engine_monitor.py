@@ -25,7 +25,13 @@ from backend_core.services.adjudicator_engine import (
 from backend_core.services.session_engine import (
     get_next_session_in_series,
 )
-from backend_core.services.audit_repository import list_audit_logs
+from backend_core.services.audit_repository import query_audit_logs
+from backend_core.dashboard.ui.components import (
+    keyset_page_cursor,
+    keyset_pager_controls,
+)
+
+AUDIT_PAGE_SIZE = 50
 
 
 # =========================================================
@@ -124,13 +130,26 @@ def render_engine_monitor():
     with tab5:
         st.subheader("🔴 Audit Logs")
 
-        logs = list_audit_logs() or []
+        col_type, col_session = st.columns(2)
+        event_filter = col_type.text_input("Tipo de evento", key="engine_audit_event").strip()
+        session_filter = col_session.text_input("Sesión (ID)", key="engine_audit_session").strip()
+
+        filters = {"event_type": event_filter or None, "session_id": session_filter or None}
+        cursor = keyset_page_cursor("engine_audit_pager", filters)
+        try:
+            page = query_audit_logs(limit=AUDIT_PAGE_SIZE, cursor=cursor, **filters)
+        except Exception as e:
+            st.error(f"Error cargando logs: {e}")
+            page = {"rows": [], "next_cursor": None}
+
+        logs = page["rows"]
         if not logs:
             st.info("Sin logs registrados.")
         else:
             for log in logs:
-                with st.expander(f"{log['event']} — {log['created_at']}"):
+                with st.expander(f"{log['event_type']} — {log['timestamp']}"):
                     st.json(log)
+            keyset_pager_controls("engine_audit_pager", page["next_cursor"])
 
 
 # =============================================================
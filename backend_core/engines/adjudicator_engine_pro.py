@@ -1,16 +1,25 @@
 from __future__ import annotations
 
 import hashlib
+import heapq
 import json
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
 
 from backend_core.models.adjudication_models import (
     SessionSnapshot,
     ParticipantSnapshot,
     DeterministicContext,
 )
+from backend_core.engines.merkle import (
+    MerkleInclusionProof,
+    MerkleStreamBuilder,
+    merkle_root_hex_stream,
+)
 
 # ==========================================================
 # 🔹 MOTOR DETERMINISTA PRO (alineado con anexos IP)
@@ -19,12 +28,22 @@ from backend_core.models.adjudication_models import (
 # - seed = H(session_id || merkle_root || N || drand_round || drand_randomness || manifest_commit)
 # - idx = int(seed,16) mod N
 # - awarded = entry[idx] -> participant
-# - proof_hash = H(proof_bundle_canónico)
+# - proof_hash = H(proof_bundle_canónico sin created_at_utc)
 # ==========================================================
 
 ENGINE_VERSION_DEFAULT = "3.0.0"
 ALGORITHM_ID_DEFAULT = "deterministic_sha256_mod_with_drand_merkle"
 
+# manifest.v2: el manifest compromete merkle_root + nº de hojas; las hojas
+# ordenadas (32 bytes crudos) viven en un side-car binario fuera del JSON.
+# Convive con v1: el algorithm_id persistido decide cómo se reproduce.
+ALGORITHM_ID_MANIFEST_V2 = "deterministic_sha256_mod_with_drand_merkle_manifest_v2"
+
+SUPPORTED_ALGORITHM_IDS = (ALGORITHM_ID_DEFAULT, ALGORITHM_ID_MANIFEST_V2)
+
+# Tamaño de cada hoja (digest SHA-256 crudo)
+ENTRY_DIGEST_SIZE = 32
+
 
 # ==========================================================
 # 🔹 MODELOS AUXILIARES (no rompen compatibilidad externa)
@@ -54,6 +73,7 @@ class _EngineResult:
     - proof_hash
     - ranking (json-serializable)
     - awarded_participant_id
+    - leaves (sólo manifest.v2): hojas ordenadas para el side-car, no va a DB
     """
     awarded_participant_id: str
     seed: str
@@ -62,6 +82,7 @@ class _EngineResult:
     ranking: Any
     engine_version: str
     algorithm_id: str
+    leaves: Optional["_CompactEntries"] = None
 
 
 # ==========================================================
@@ -118,35 +139,196 @@ def _expand_entries(participants: List[ParticipantSnapshot]) -> Tuple[List[str],
     return entries, entry_to_participant
 
 
+class _CompactEntries:
+    """
+    Entradas en modo compacto (mismo orden canónico que _expand_entries):
+    - digests: buffer contiguo de N * 32 bytes (SHA-256 crudo), ordenado
+    - owners: array paralelo con el índice del participante de cada entrada
+    - participant_ids: tabla índice -> participant_id
+
+    Se comporta como una secuencia de hashes hex (len / [idx]) sin materializar
+    la lista completa: el hex se genera bajo demanda.
+    """
+
+    __slots__ = ("digests", "owners", "participant_ids")
+
+    def __init__(self, digests: bytearray, owners: array, participant_ids: List[str]):
+        self.digests = digests
+        self.owners = owners
+        self.participant_ids = participant_ids
+
+    def __len__(self) -> int:
+        return len(self.owners)
+
+    def __getitem__(self, idx: int) -> str:
+        return self.digest_at(idx).hex()
+
+    def digest_at(self, idx: int) -> bytes:
+        if idx < 0:
+            idx += len(self)
+        if not 0 <= idx < len(self):
+            raise IndexError("entry index fuera de rango")
+        start = idx * ENTRY_DIGEST_SIZE
+        return bytes(self.digests[start:start + ENTRY_DIGEST_SIZE])
+
+    def participant_at(self, idx: int) -> str:
+        return self.participant_ids[self.owners[idx]]
+
+    def find(self, digest: bytes) -> Optional[int]:
+        """
+        Índice de un digest en el orden canónico (búsqueda binaria), o None.
+        """
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.digest_at(mid) < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < len(self) and self.digest_at(lo) == digest:
+            return lo
+        return None
+
+    def iter_digests(self) -> Iterator[memoryview]:
+        view = memoryview(self.digests)
+        size = ENTRY_DIGEST_SIZE
+        for start in range(0, len(self) * size, size):
+            yield view[start:start + size]
+
+    def iter_hex_blocks(self, block_entries: int = 4096) -> Iterator[List[str]]:
+        """
+        Recorre los hashes hex en bloques (un único .hex() por bloque).
+        """
+        view = memoryview(self.digests)
+        n = len(self)
+        hex_len = ENTRY_DIGEST_SIZE * 2
+        for start in range(0, n, block_entries):
+            end = min(start + block_entries, n)
+            block = view[start * ENTRY_DIGEST_SIZE:end * ENTRY_DIGEST_SIZE].hex()
+            yield [block[i:i + hex_len] for i in range(0, len(block), hex_len)]
+
+
+def entry_participant_ids(participants: List[ParticipantSnapshot]) -> List[str]:
+    """
+    Participantes con al menos una entrada, en el orden del snapshot.
+    Es la tabla a la que apuntan los owners del modo compacto.
+    """
+    return [p.participant_id for p in participants if int(p.participations or 1) > 0]
+
+
+def participants_snapshot_digest(participants: List[ParticipantSnapshot]) -> str:
+    """
+    Huella del snapshot de participantes (id, user_id, participations).
+    No entra en el manifest: sirve para comprobar en el reveal que el
+    snapshot es el mismo que se comprometió al cierre.
+    """
+    h = hashlib.sha256()
+    for p in participants:
+        h.update(_canonical_json([p.participant_id, p.user_id, int(p.participations or 1)]).encode("utf-8"))
+        h.update(b"\n")
+    return h.hexdigest()
+
+
+def _expand_entries_compact(participants: List[ParticipantSnapshot]) -> _CompactEntries:
+    """
+    Variante compacta de _expand_entries (mismas entradas, mismo orden).
+
+    En lugar de N strings hex + dict hash->participant_id, cada entrada ocupa
+    32 bytes de digest + 4 bytes de índice de participante.
+
+    Orden: bucket por primer byte del digest (256 buckets de registros
+    digest||owner) y sort por bucket; sólo un bucket vive como objetos Python
+    a la vez. El orden de bytes del digest coincide con el orden del hex en
+    minúsculas, así que el resultado es idéntico a entries.sort().
+    """
+    owner_size = 4
+    record_size = ENTRY_DIGEST_SIZE + owner_size
+    sha256 = hashlib.sha256
+
+    participant_ids: List[str] = []
+    buckets = [bytearray() for _ in range(256)]
+
+    for p in participants:
+        count = int(p.participations or 1)
+        if count <= 0:
+            continue
+        # mismo filtro que entry_participant_ids: owners indexa esa lista
+        owner = len(participant_ids).to_bytes(owner_size, "big")
+        participant_ids.append(p.participant_id)
+        prefix = f"{p.participant_id}:"
+        for i in range(count):
+            digest = sha256(f"{prefix}{i}".encode("utf-8")).digest()
+            buckets[digest[0]] += digest + owner
+
+    digests = bytearray()
+    owners = array("I")
+    for b in range(256):
+        bucket = buckets[b]
+        buckets[b] = None  # libera el bucket en cuanto se vuelca
+        records = sorted(
+            bytes(bucket[i:i + record_size]) for i in range(0, len(bucket), record_size)
+        )
+        del bucket
+        for r in records:
+            digests += r[:ENTRY_DIGEST_SIZE]
+            owners.append(int.from_bytes(r[ENTRY_DIGEST_SIZE:], "big"))
+
+    return _CompactEntries(digests, owners, participant_ids)
+
+
 # ==========================================================
 # 🔹 MERKLE ROOT (SHA-256) SOBRE LISTA DE ENTRADAS
 # ==========================================================
 
-def _merkle_root_hex(leaves_hex_sorted: List[str]) -> str:
+def _merkle_root_hex(leaves_hex_sorted: Sequence[str]) -> str:
     """
     Merkle root determinista:
     - leaves_hex_sorted ya viene ordenado
     - cada leaf se interpreta como bytes de su hex
     - hash interno: SHA256(left || right)
     - si impar: duplica último
+    Se construye en streaming (engines/merkle.py): sólo O(log n) nodos
+    pendientes, nunca un nivel completo en memoria.
     """
-    if not leaves_hex_sorted:
-        return _sha256_hex(b"")
+    return merkle_root_hex_stream(bytes.fromhex(h) for h in leaves_hex_sorted)
+
 
-    # hojas como bytes
-    level = [bytes.fromhex(h) for h in leaves_hex_sorted]
+def _merkle_root_hex_compact(entries: _CompactEntries) -> str:
+    """
+    Misma raíz que _merkle_root_hex, leyendo las hojas directamente del
+    buffer contiguo de digests (sin conversión hex).
+    """
+    return merkle_root_hex_stream(entries.iter_digests())
 
-    while len(level) > 1:
-        nxt: List[bytes] = []
-        i = 0
-        while i < len(level):
-            left = level[i]
-            right = level[i + 1] if i + 1 < len(level) else level[i]  # duplica si impar
-            nxt.append(hashlib.sha256(left + right).digest())
-            i += 2
-        level = nxt
 
-    return level[0].hex()
+def compute_participants_merkle_root(participants: List[ParticipantSnapshot]) -> str:
+    """
+    participants_merkle_root de un snapshot de participantes (misma raíz que
+    adjudicate()), en modo compacto + Merkle en streaming.
+    """
+    return _merkle_root_hex_compact(_expand_entries_compact(participants))
+
+
+def build_inclusion_proof(
+    *,
+    participants: List[ParticipantSnapshot],
+    participant_id: str,
+    ordinal: int = 0,
+) -> MerkleInclusionProof:
+    """
+    Audit path de la entrada (participant_id, ordinal) contra
+    participants_merkle_root. Se verifica con
+    engines.merkle.verify_inclusion_proof en O(log n) hashes, sin manifest.
+    """
+    entries = _expand_entries_compact(participants)
+    entry_hash = hashlib.sha256(f"{participant_id}:{int(ordinal)}".encode("utf-8")).digest()
+    idx = entries.find(entry_hash)
+    if idx is None or entries.participant_at(idx) != participant_id:
+        raise ValueError(f"La entrada {participant_id}:{ordinal} no forma parte de la sesión.")
+
+    builder = MerkleStreamBuilder(track_index=idx)
+    builder.add_many(entries.iter_digests())
+    return builder.inclusion_proof()
 
 
 # ==========================================================
@@ -156,7 +338,7 @@ def _merkle_root_hex(leaves_hex_sorted: List[str]) -> str:
 def _build_manifest(
     *,
     session: SessionSnapshot,
-    entries_sorted: List[str],
+    entries_sorted: Sequence[str],
     participants_count: int,
     context: DeterministicContext,
 ) -> Dict[str, Any]:
@@ -185,11 +367,78 @@ def _build_manifest(
     }
 
 
+def _build_manifest_v2(
+    *,
+    session: SessionSnapshot,
+    participants_merkle_root: str,
+    participants_count: int,
+    context: DeterministicContext,
+) -> Dict[str, Any]:
+    """
+    manifest.v2: mismo contenido que v1 salvo la lista de hojas, que se
+    sustituye por su compromiso (merkle root + nº de hojas). Tamaño O(1).
+    Las hojas se publican aparte en el side-car binario.
+    """
+    return {
+        "schema_version": "manifest.v2",
+        "session_id": session.session_id,
+        "product_id": session.product_id,
+        "session_created_at_utc": _dt_to_iso_z(session.session_created_at),
+        "session_closed_at_utc": _dt_to_iso_z(session.session_closed_at),
+        "capacity": int(session.capacity),
+        "rules_version": str(session.rules_version),
+        "participants_count": int(participants_count),
+        "entries_count": int(participants_count),
+        "entries_merkle_root": participants_merkle_root,
+        "leaves_encoding": "sha256_raw32_sorted_asc",
+        "engine_context": {
+            "engine_version": getattr(context, "engine_version", ENGINE_VERSION_DEFAULT),
+            "algorithm_id": getattr(context, "algorithm_id", ALGORITHM_ID_DEFAULT),
+            "normalization": getattr(context, "normalization", "stable_sort_by_entry_hash"),
+        },
+    }
+
+
 def _compute_manifest_commit(manifest: Dict[str, Any]) -> str:
+    entries = manifest.get("entries_hashes_sorted")
+    if isinstance(entries, _CompactEntries):
+        return _compute_manifest_commit_streaming(manifest, entries)
     canon = _canonical_json(manifest)
     return _sha256_hex(canon.encode("utf-8"))
 
 
+def _compute_manifest_commit_streaming(manifest: Dict[str, Any], entries: _CompactEntries) -> str:
+    """
+    Mismo commit que _canonical_json(manifest) con la lista de hashes completa,
+    pero alimentando SHA-256 por trozos: la lista hex nunca se materializa.
+
+    Reproduce json.dumps(sort_keys=True, separators=(",", ":")) a nivel raíz:
+    claves ordenadas, cada valor canonicalizado por separado.
+    """
+    h = hashlib.sha256()
+    h.update(b"{")
+    first = True
+    for key in sorted(manifest):
+        if not first:
+            h.update(b",")
+        first = False
+        h.update(json.dumps(key, ensure_ascii=False).encode("utf-8"))
+        h.update(b":")
+        if key != "entries_hashes_sorted":
+            h.update(_canonical_json(manifest[key]).encode("utf-8"))
+            continue
+        h.update(b"[")
+        first_block = True
+        for block in entries.iter_hex_blocks():
+            if not first_block:
+                h.update(b",")
+            first_block = False
+            h.update(('"' + '","'.join(block) + '"').encode("ascii"))
+        h.update(b"]")
+    h.update(b"}")
+    return h.hexdigest()
+
+
 # ==========================================================
 # 🔹 CÁLCULO SEED / ÍNDICE / RANKING
 # ==========================================================
@@ -223,22 +472,41 @@ def _compute_seed_hex(
 
 def _select_awarded(
     *,
-    entries_sorted: List[str],
-    entry_to_participant: Dict[str, str],
+    entries_sorted: Sequence[str],
+    entry_to_participant: Optional[Dict[str, str]],
     seed_hex: str,
 ) -> Tuple[str, int, str]:
     """
     idx = int(seed_hex,16) mod N
     awarded_entry = entries_sorted[idx]
     awarded_participant_id = mapping[awarded_entry]
+    (en modo compacto el mapping es el array paralelo de owners)
     """
-    n = len(entries_sorted)
+    def entry_at(idx: int) -> Tuple[str, str]:
+        entry = entries_sorted[idx]
+        if isinstance(entries_sorted, _CompactEntries):
+            return entry, entries_sorted.participant_at(idx)
+        return entry, entry_to_participant[entry]
+
+    return _select_awarded_at(entries_count=len(entries_sorted), entry_at=entry_at, seed_hex=seed_hex)
+
+
+def _select_awarded_at(
+    *,
+    entries_count: int,
+    entry_at: Callable[[int], Tuple[str, str]],
+    seed_hex: str,
+) -> Tuple[str, int, str]:
+    """
+    Igual que _select_awarded, pero resolviendo sólo la entrada idx
+    (entry_at(idx) -> (entry_hash_hex, participant_id)). O(1) si el lookup lo es.
+    """
+    n = int(entries_count)
     if n <= 0:
         raise ValueError("No hay entradas elegibles (entries_count=0).")
 
     idx = int(seed_hex, 16) % n
-    awarded_entry = entries_sorted[idx]
-    awarded_participant_id = entry_to_participant[awarded_entry]
+    awarded_entry, awarded_participant_id = entry_at(idx)
     return awarded_participant_id, idx, awarded_entry
 
 
@@ -253,79 +521,309 @@ def _build_ranking(
     score = SHA256(seed_hex || participant_id)
     Orden por score asc + participant_id (desempate)
     """
+    return build_ranking_page(
+        participants=participants,
+        seed_hex=seed_hex,
+        awarded_participant_id=awarded_participant_id,
+    )
+
+
+def _ranking_keys(participants: List[ParticipantSnapshot], seed_hex: str) -> Iterator[Tuple[str, str, int]]:
+    # (score, participant_id, posición en snapshot): mismo orden que el sort estable
+    for i, p in enumerate(participants):
+        yield _sha256_hex(f"{seed_hex}|{p.participant_id}".encode("utf-8")), p.participant_id, i
+
+
+def build_ranking_page(
+    *,
+    participants: List[ParticipantSnapshot],
+    seed_hex: str,
+    awarded_participant_id: str,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Filas [offset, offset+limit) del ranking completo, calculadas bajo
+    demanda desde seed_hex (idénticas a las del ranking completo).
+    Con limit: selección por heap, O(P log(offset+limit)) sin ordenar todo.
+    """
+    offset = max(0, int(offset))
+    keys = _ranking_keys(participants, seed_hex)
+    if limit is None:
+        ordered = sorted(keys)[offset:]
+    else:
+        ordered = heapq.nsmallest(offset + max(0, int(limit)), keys)[offset:]
+
     rows: List[Dict[str, Any]] = []
-    for p in participants:
-        score = _sha256_hex(f"{seed_hex}|{p.participant_id}".encode("utf-8"))
+    for rank, (score, participant_id, i) in enumerate(ordered, start=offset + 1):
+        p = participants[i]
         rows.append(
             {
-                "participant_id": p.participant_id,
+                "participant_id": participant_id,
                 "user_id": p.user_id,
                 "participations": int(p.participations or 1),
                 "score": score,
-                "is_awarded": (p.participant_id == awarded_participant_id),
+                "is_awarded": (participant_id == awarded_participant_id),
+                "rank": rank,
             }
         )
-
-    rows.sort(key=lambda r: (r["score"], r["participant_id"]))
-    # añade rank
-    for i, r in enumerate(rows, start=1):
-        r["rank"] = i
     return rows
 
 
+def ranking_rank_of(
+    *,
+    participants: List[ParticipantSnapshot],
+    seed_hex: str,
+    participant_id: str,
+) -> Optional[int]:
+    """
+    Posición (1-based) de un participante en el ranking completo, en O(P)
+    y memoria O(1): la clave del objetivo se calcula una vez y se cuentan
+    las menores en una sola pasada, sin materializar la lista de claves.
+    """
+    index = next((i for i, p in enumerate(participants) if p.participant_id == participant_id), None)
+    if index is None:
+        return None
+    target = (_sha256_hex(f"{seed_hex}|{participant_id}".encode("utf-8")), participant_id, index)
+    return 1 + sum(1 for k in _ranking_keys(participants, seed_hex) if k < target)
+
+
+def ranking_top_k_of(ranking: Any) -> Optional[int]:
+    """
+    top_k con el que se generó un ranking persistido (None = ranking completo).
+    Para reproducirlo igual en replay/proof bundle.
+    """
+    if not isinstance(ranking, dict):
+        return None
+    top_k = (ranking.get("meta") or {}).get("ranking_top_k")
+    return int(top_k) if top_k is not None else None
+
+
+def _drand_meta(external_entropy: ExternalEntropySnapshot) -> Dict[str, Any]:
+    return {
+        "provider": external_entropy.provider,
+        "round": int(external_entropy.round),
+        "randomness_hex": external_entropy.randomness_hex,
+        "signature_hex": external_entropy.signature_hex,
+        "public_key_hex": external_entropy.public_key_hex,
+        "round_time_utc": _dt_to_iso_z(external_entropy.round_time_utc)
+        if external_entropy.round_time_utc
+        else None,
+    }
+
+
+def _build_proof_bundle(
+    *,
+    session: SessionSnapshot,
+    engine_version: str,
+    algorithm_id: str,
+    manifest_commit: str,
+    participants_merkle_root: str,
+    entries_count: int,
+    external_entropy: ExternalEntropySnapshot,
+    seed_input: str,
+    seed_hex: str,
+    awarded_index: int,
+    awarded_participant_id: str,
+) -> Dict[str, Any]:
+    return {
+        "schema_version": "proof.v1",
+        "created_at_utc": _dt_to_iso_z(datetime.now(timezone.utc)),
+        "engine_version": engine_version,
+        "algorithm_id": algorithm_id,
+        "session": {
+            "session_id": session.session_id,
+            "product_id": session.product_id,
+            "closed_at_utc": _dt_to_iso_z(session.session_closed_at),
+        },
+        "manifest_commit": manifest_commit,
+        "participants_merkle_root": participants_merkle_root,
+        "entries_count": entries_count,
+        "drand": _drand_meta(external_entropy),
+        "calculation": {
+            "seed_input": seed_input,
+            "seed_hex": seed_hex,
+            "awarded_index": awarded_index,
+        },
+        "result": {
+            "awarded_participant_id": awarded_participant_id,
+        },
+    }
+
+
+# Metadatos del bundle que no entran en proof_hash: created_at_utc es el
+# reloj del cómputo y el replay no puede reproducirlo (no se persiste)
+PROOF_HASH_EXCLUDED_FIELDS = frozenset({"created_at_utc"})
+
+
 def _compute_proof_hash(proof_bundle: Dict[str, Any]) -> str:
-    canon = _canonical_json(proof_bundle)
+    hashed = {k: v for k, v in proof_bundle.items() if k not in PROOF_HASH_EXCLUDED_FIELDS}
+    canon = _canonical_json(hashed)
     return _sha256_hex(canon.encode("utf-8"))
 
 
 # ==========================================================
-# 🔹 API PÚBLICA DEL MOTOR (PURE FUNCTION)
+# 🔹 FASE 1 — COMPROMISO (independiente de drand)
 # ==========================================================
 
-def adjudicate(
+@dataclass(frozen=True)
+class AdjudicationCommitment:
+    """
+    Todo lo que adjudicate() calcula antes de conocer drand:
+    manifest_commit + participants_merkle_root + N.
+    Se persiste al cierre de la sesión (commit-before-reveal).
+    """
+    session_id: str
+    engine_version: str
+    algorithm_id: str
+    manifest_schema_version: str
+    manifest_commit: str
+    participants_merkle_root: str
+    entries_count: int
+    participants_digest: str
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "session_id": self.session_id,
+            "engine_version": self.engine_version,
+            "algorithm_id": self.algorithm_id,
+            "manifest_schema_version": self.manifest_schema_version,
+            "manifest_commit": self.manifest_commit,
+            "participants_merkle_root": self.participants_merkle_root,
+            "entries_count": self.entries_count,
+            "participants_digest": self.participants_digest,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "AdjudicationCommitment":
+        return cls(
+            session_id=str(data["session_id"]),
+            engine_version=str(data["engine_version"]),
+            algorithm_id=str(data["algorithm_id"]),
+            manifest_schema_version=str(data["manifest_schema_version"]),
+            manifest_commit=str(data["manifest_commit"]),
+            participants_merkle_root=str(data["participants_merkle_root"]),
+            entries_count=int(data["entries_count"]),
+            participants_digest=str(data["participants_digest"]),
+        )
+
+
+@dataclass(frozen=True)
+class PreparedAdjudication:
+    """
+    Compromiso + entradas en memoria (para revelar en el mismo proceso
+    o volcar el side-car de hojas/owners).
+    """
+    commitment: AdjudicationCommitment
+    entries_sorted: Sequence[str]
+    entry_to_participant: Optional[Dict[str, str]]
+
+    def entry_at(self, idx: int) -> Tuple[str, str]:
+        entry = self.entries_sorted[idx]
+        if isinstance(self.entries_sorted, _CompactEntries):
+            return entry, self.entries_sorted.participant_at(idx)
+        return entry, self.entry_to_participant[entry]
+
+
+def prepare_adjudication(
     *,
     session: SessionSnapshot,
     participants: List[ParticipantSnapshot],
     context: DeterministicContext,
-    external_entropy: ExternalEntropySnapshot,
-) -> Any:
+    compact: bool = False,
+) -> PreparedAdjudication:
     """
-    Motor determinista PRO alineado con documentación IP.
-    Devuelve un objeto con atributos:
-    - awarded_participant_id
-    - ranking
-    - seed
-    - inputs_hash
-    - proof_hash
-    - engine_version
-    - algorithm_id
-
-    IMPORTANTE:
-    - Terminología: awarded (no winner)
-    - El motor NO hace llamadas externas (drand se obtiene/valida fuera)
+    Fase 1 (al cierre): expansión de entradas, Merkle y manifest_commit.
+    Es la parte pesada (O(N) hashes) y no depende de drand.
     """
-    if external_entropy is None:
-        raise ValueError("external_entropy (drand) es obligatorio en modo PRO (alineación IP).")
-    if external_entropy.provider.lower() != "drand":
-        raise ValueError("Solo se soporta provider='drand' en esta versión PRO.")
-
     engine_version = getattr(context, "engine_version", ENGINE_VERSION_DEFAULT)
     algorithm_id = getattr(context, "algorithm_id", ALGORITHM_ID_DEFAULT)
+    manifest_v2 = algorithm_id == ALGORITHM_ID_MANIFEST_V2
 
     # 1) Entradas deterministas (independientes de orden de llegada)
-    entries_sorted, entry_to_participant = _expand_entries(participants)
-    participants_merkle_root = _merkle_root_hex(entries_sorted)
+    entries_sorted: Sequence[str]
+    entry_to_participant: Optional[Dict[str, str]]
+    if compact or manifest_v2:
+        entries_sorted = _expand_entries_compact(participants)
+        entry_to_participant = None
+        participants_merkle_root = _merkle_root_hex_compact(entries_sorted)
+    else:
+        entries_sorted, entry_to_participant = _expand_entries(participants)
+        participants_merkle_root = _merkle_root_hex(entries_sorted)
     participants_count = len(entries_sorted)
 
     # 2) Manifest + commit (inputs_hash)
-    manifest = _build_manifest(
-        session=session,
+    if manifest_v2:
+        manifest = _build_manifest_v2(
+            session=session,
+            participants_merkle_root=participants_merkle_root,
+            participants_count=participants_count,
+            context=context,
+        )
+    else:
+        manifest = _build_manifest(
+            session=session,
+            entries_sorted=entries_sorted,
+            participants_count=participants_count,
+            context=context,
+        )
+    manifest_commit = _compute_manifest_commit(manifest)
+
+    commitment = AdjudicationCommitment(
+        session_id=session.session_id,
+        engine_version=engine_version,
+        algorithm_id=algorithm_id,
+        manifest_schema_version=manifest["schema_version"],
+        manifest_commit=manifest_commit,
+        participants_merkle_root=participants_merkle_root,
+        entries_count=participants_count,
+        participants_digest=participants_snapshot_digest(participants),
+    )
+    return PreparedAdjudication(
+        commitment=commitment,
         entries_sorted=entries_sorted,
-        participants_count=participants_count,
-        context=context,
+        entry_to_participant=entry_to_participant,
     )
-    manifest_commit = _compute_manifest_commit(manifest)
 
+
+# ==========================================================
+# 🔹 FASE 2 — REVEAL (cuando llega drand)
+# ==========================================================
+
+def reveal_adjudication(
+    *,
+    session: SessionSnapshot,
+    participants: List[ParticipantSnapshot],
+    commitment: AdjudicationCommitment,
+    external_entropy: ExternalEntropySnapshot,
+    entry_at: Callable[[int], Tuple[str, str]],
+    leaves: Optional[_CompactEntries] = None,
+    ranking_top_k: Optional[int] = None,
+) -> Any:
+    """
+    Fase 2: seed + selección + ranking + proof a partir de un compromiso.
+    Coste O(1) (seed, entry_at(idx)) + ranking. Mismo resultado que adjudicate().
+
+    entry_at(idx) -> (entry_hash_hex, participant_id) resuelve sólo la entrada
+    adjudicada (memoria, o side-car mmap de hojas/owners).
+
+    ranking_top_k: sólo las k primeras filas van inline (ranking.topk.v1); el
+    resto se pide por páginas con build_ranking_page (determinista desde seed).
+    """
+    if external_entropy is None:
+        raise ValueError("external_entropy (drand) es obligatorio en modo PRO (alineación IP).")
+    if external_entropy.provider.lower() != "drand":
+        raise ValueError("Solo se soporta provider='drand' en esta versión PRO.")
+    if commitment.session_id != session.session_id:
+        raise ValueError("El compromiso no corresponde a esta sesión.")
+    if commitment.participants_digest != participants_snapshot_digest(participants):
+        raise ValueError("El snapshot de participantes no coincide con el compromiso del cierre.")
+
+    engine_version = commitment.engine_version
+    algorithm_id = commitment.algorithm_id
+    manifest_commit = commitment.manifest_commit
+    participants_merkle_root = commitment.participants_merkle_root
+    participants_count = commitment.entries_count
     # 3) seed (según anexos: combina commit/merkle + drand_round/randomness)
     seed_hex, seed_input = _compute_seed_hex(
         session_id=session.session_id,
@@ -336,18 +834,26 @@ def adjudicate(
     )
 
     # 4) Selección determinista por módulo
-    awarded_participant_id, awarded_index, awarded_entry = _select_awarded(
-        entries_sorted=entries_sorted,
-        entry_to_participant=entry_to_participant,
+    awarded_participant_id, awarded_index, awarded_entry = _select_awarded_at(
+        entries_count=participants_count,
+        entry_at=entry_at,
         seed_hex=seed_hex,
     )
 
     # 5) Ranking auxiliar + meta
-    ranking_rows = _build_ranking(
-        participants=participants,
-        seed_hex=seed_hex,
-        awarded_participant_id=awarded_participant_id,
-    )
+    if ranking_top_k is None:
+        ranking_rows = _build_ranking(
+            participants=participants,
+            seed_hex=seed_hex,
+            awarded_participant_id=awarded_participant_id,
+        )
+    else:
+        ranking_rows = build_ranking_page(
+            participants=participants,
+            seed_hex=seed_hex,
+            awarded_participant_id=awarded_participant_id,
+            limit=ranking_top_k,
+        )
 
     ranking_payload: Dict[str, Any] = {
         "schema_version": "ranking.v1",
@@ -363,54 +869,37 @@ def adjudicate(
             "awarded_entry_hash": awarded_entry,
             "seed_input": seed_input,
             "seed_hex": seed_hex,
-            "drand": {
-                "provider": external_entropy.provider,
-                "round": int(external_entropy.round),
-                "randomness_hex": external_entropy.randomness_hex,
-                "signature_hex": external_entropy.signature_hex,
-                "public_key_hex": external_entropy.public_key_hex,
-                "round_time_utc": _dt_to_iso_z(external_entropy.round_time_utc)
-                if external_entropy.round_time_utc
-                else None,
-            },
+            "drand": _drand_meta(external_entropy),
         },
         "participants": ranking_rows,
     }
+    if algorithm_id == ALGORITHM_ID_MANIFEST_V2:
+        # v1 no lleva esta clave: su ranking persistido debe seguir idéntico
+        ranking_payload["meta"]["manifest_schema_version"] = commitment.manifest_schema_version
+    if ranking_top_k is not None:
+        ranking_payload["schema_version"] = "ranking.topk.v1"
+        ranking_payload["meta"]["ranking_top_k"] = int(ranking_top_k)
+        ranking_payload["meta"]["participants_total"] = len(participants)
+        ranking_payload["meta"]["awarded_rank"] = ranking_rank_of(
+            participants=participants,
+            seed_hex=seed_hex,
+            participant_id=awarded_participant_id,
+        )
 
     # 6) Proof bundle mínimo (auditable)
-    proof_bundle: Dict[str, Any] = {
-        "schema_version": "proof.v1",
-        "created_at_utc": _dt_to_iso_z(datetime.now(timezone.utc)),
-        "engine_version": engine_version,
-        "algorithm_id": algorithm_id,
-        "session": {
-            "session_id": session.session_id,
-            "product_id": session.product_id,
-            "closed_at_utc": _dt_to_iso_z(session.session_closed_at),
-        },
-        "manifest_commit": manifest_commit,
-        "participants_merkle_root": participants_merkle_root,
-        "entries_count": participants_count,
-        "drand": {
-            "provider": external_entropy.provider,
-            "round": int(external_entropy.round),
-            "randomness_hex": external_entropy.randomness_hex,
-            "signature_hex": external_entropy.signature_hex,
-            "public_key_hex": external_entropy.public_key_hex,
-            "round_time_utc": _dt_to_iso_z(external_entropy.round_time_utc)
-            if external_entropy.round_time_utc
-            else None,
-        },
-        "calculation": {
-            "seed_input": seed_input,
-            "seed_hex": seed_hex,
-            "awarded_index": awarded_index,
-        },
-        "result": {
-            "awarded_participant_id": awarded_participant_id,
-        },
-    }
-
+    proof_bundle = _build_proof_bundle(
+        session=session,
+        engine_version=engine_version,
+        algorithm_id=algorithm_id,
+        manifest_commit=manifest_commit,
+        participants_merkle_root=participants_merkle_root,
+        entries_count=participants_count,
+        external_entropy=external_entropy,
+        seed_input=seed_input,
+        seed_hex=seed_hex,
+        awarded_index=awarded_index,
+        awarded_participant_id=awarded_participant_id,
+    )
     proof_hash = _compute_proof_hash(proof_bundle)
 
     # inputs_hash: alineado con tu documentación como “commit” del dataset (manifest_commit)
@@ -425,4 +914,147 @@ def adjudicate(
         ranking=ranking_payload,
         engine_version=engine_version,
         algorithm_id=algorithm_id,
+        leaves=leaves,
     )
+
+
+# ==========================================================
+# 🔹 API PÚBLICA DEL MOTOR (PURE FUNCTION)
+# ==========================================================
+
+def adjudicate(
+    *,
+    session: SessionSnapshot,
+    participants: List[ParticipantSnapshot],
+    context: DeterministicContext,
+    external_entropy: ExternalEntropySnapshot,
+    compact: bool = False,
+    ranking_top_k: Optional[int] = None,
+) -> Any:
+    """
+    Motor determinista PRO alineado con documentación IP.
+    Devuelve un objeto con atributos:
+    - awarded_participant_id
+    - ranking
+    - seed
+    - inputs_hash
+    - proof_hash
+    - engine_version
+    - algorithm_id
+
+    IMPORTANTE:
+    - Terminología: awarded (no winner)
+    - El motor NO hace llamadas externas (drand se obtiene/valida fuera)
+    - compact=True: entradas como buffer de digests de 32 bytes + array de
+      owners (ver _expand_entries_compact). Mismo inputs_hash/proof_hash.
+    - algorithm_id == ALGORITHM_ID_MANIFEST_V2: manifest.v2 (siempre compacto);
+      result.leaves trae las hojas para escribir el side-car.
+    - ranking_top_k: ranking inline limitado a k filas (ver reveal_adjudication).
+    """
+    if external_entropy is None:
+        raise ValueError("external_entropy (drand) es obligatorio en modo PRO (alineación IP).")
+    if external_entropy.provider.lower() != "drand":
+        raise ValueError("Solo se soporta provider='drand' en esta versión PRO.")
+
+    # Fase 1 (compromiso) + fase 2 (reveal) en una sola llamada
+    prepared = prepare_adjudication(
+        session=session,
+        participants=participants,
+        context=context,
+        compact=compact,
+    )
+    leaves = prepared.entries_sorted if prepared.commitment.algorithm_id == ALGORITHM_ID_MANIFEST_V2 else None
+    return reveal_adjudication(
+        session=session,
+        participants=participants,
+        commitment=prepared.commitment,
+        external_entropy=external_entropy,
+        entry_at=prepared.entry_at,
+        leaves=leaves,
+        ranking_top_k=ranking_top_k,
+    )
+
+
+# ==========================================================
+# 🔹 ADJUDICACIÓN EN LOTE (PROCESS POOL)
+# ==========================================================
+
+AdjudicationJob = Tuple[SessionSnapshot, List[ParticipantSnapshot], ExternalEntropySnapshot]
+
+
+def _adjudicate_job(
+    job: AdjudicationJob,
+    context: DeterministicContext,
+    compact: bool,
+    ranking_top_k: Optional[int],
+    return_exceptions: bool,
+) -> Any:
+    session, participants, entropy = job
+    try:
+        return adjudicate(
+            session=session,
+            participants=participants,
+            context=context,
+            external_entropy=entropy,
+            compact=compact,
+            ranking_top_k=ranking_top_k,
+        )
+    except Exception as e:
+        if return_exceptions:
+            return e
+        raise
+
+
+def _run_chunk(
+    jobs: List[AdjudicationJob],
+    context: DeterministicContext,
+    compact: bool,
+    ranking_top_k: Optional[int],
+    return_exceptions: bool,
+) -> List[Any]:
+    return [_adjudicate_job(job, context, compact, ranking_top_k, return_exceptions) for job in jobs]
+
+
+def adjudicate_many(
+    jobs: Sequence[AdjudicationJob],
+    *,
+    context: DeterministicContext,
+    max_workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+    compact: bool = False,
+    ranking_top_k: Optional[int] = None,
+    return_exceptions: bool = False,
+) -> List[Any]:
+    """
+    Adjudica un lote de (SessionSnapshot, participants, entropy) repartiéndolo
+    en un pool de procesos. adjudicate() es pura, así que cada sesión es
+    independiente; el resultado i corresponde siempre a jobs[i].
+
+    - max_workers: procesos (None = os.cpu_count()); <= 1 ejecuta en el proceso actual
+    - chunksize: sesiones por tarea enviada al pool (None = reparto automático)
+    - return_exceptions: si True, el error de una sesión se devuelve en su
+      posición en lugar de abortar el lote
+    """
+    jobs = list(jobs)
+    if not jobs:
+        return []
+
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    workers = max(1, min(int(workers), len(jobs)))
+    if workers == 1:
+        return _run_chunk(jobs, context, compact, ranking_top_k, return_exceptions)
+
+    if chunksize is None:
+        # ~4 tareas por worker: equilibra carga sin disparar el overhead de IPC
+        chunksize = max(1, -(-len(jobs) // (workers * 4)))
+    chunks = [jobs[i:i + chunksize] for i in range(0, len(jobs), chunksize)]
+
+    results: List[Any] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_run_chunk, chunk, context, compact, ranking_top_k, return_exceptions)
+            for chunk in chunks
+        ]
+        for future in futures:
+            results.extend(future.result())
+    return results
@@ -0,0 +1,149 @@
+# backend_core/engines/expiry_scheduler.py
+from __future__ import annotations
+
+import heapq
+import threading
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+# ==============================================================================
+# 🔹 PLANIFICADOR DE EXPIRACIÓN (MIN-HEAP)
+#
+# Antes cada tick recorría todas las sesiones activas comparando
+# created_at + 5 días. Aquí cada sesión activa tiene un deadline en un
+# min-heap: el tick sólo extrae las que ya han vencido, así el coste por
+# tick es O(k log n) con k = sesiones que expiran, no O(n) activas.
+#
+# - Se carga desde ca_sessions (SessionEngine) y se actualiza al activar
+#   una sesión (on_session_activated) y al cerrarla (cancel). El job de
+#   expiración la recarga cada EXPIRY_RELOAD_INTERVAL_S: las activaciones
+#   de otros procesos no pasan por el hook de este.
+# - Borrado perezoso: cancelar/reprogramar sólo toca el dict; las entradas
+#   obsoletas del heap se descartan al extraerlas.
+# - El heap es una pista, no la verdad: la transición a expired sigue
+#   siendo condicional en DB (status = active).
+# ==============================================================================
+
+SESSION_DURATION_DAYS = 5
+
+
+def _as_utc(value: datetime) -> datetime:
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+
+
+def expiry_deadline(created_at: Optional[datetime]) -> Optional[datetime]:
+    if created_at is None:
+        return None
+    return _as_utc(created_at) + timedelta(days=SESSION_DURATION_DAYS)
+
+
+class ExpiryScheduler:
+    """
+    Deadlines de expiración de sesiones activas (thread-safe).
+    """
+
+    def __init__(self) -> None:
+        self._heap: List[Tuple[float, str]] = []
+        self._deadlines: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        # True cuando ya se cargaron las sesiones activas desde DB
+        self.loaded = False
+        # time.monotonic() de la última carga (recarga periódica del engine)
+        self.loaded_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._deadlines)
+
+    def __contains__(self, session_id: object) -> bool:
+        return session_id in self._deadlines
+
+    def schedule(self, session_id: str, deadline: datetime) -> None:
+        """
+        Alta o reprogramación (idempotente si el deadline no cambia).
+        """
+        ts = _as_utc(deadline).timestamp()
+        with self._lock:
+            if self._deadlines.get(session_id) == ts:
+                return
+            self._deadlines[session_id] = ts
+            heapq.heappush(self._heap, (ts, session_id))
+            self._maybe_compact()
+
+    def schedule_session(self, session_id: str, created_at: Optional[datetime]) -> bool:
+        deadline = expiry_deadline(created_at)
+        if deadline is None:
+            return False
+        self.schedule(session_id, deadline)
+        return True
+
+    def cancel(self, session_id: str) -> bool:
+        with self._lock:
+            return self._deadlines.pop(session_id, None) is not None
+
+    def pop_due(self, now: datetime, limit: Optional[int] = None) -> List[str]:
+        """
+        Extrae (y desprograma) las sesiones con deadline <= now, en orden
+        de deadline. Con `limit`, el resto queda para el siguiente tick.
+        """
+        now_ts = _as_utc(now).timestamp()
+        due: List[str] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_ts:
+                if limit is not None and len(due) >= limit:
+                    break
+                ts, session_id = heapq.heappop(self._heap)
+                if self._deadlines.get(session_id) != ts:
+                    continue  # cancelada o reprogramada
+                del self._deadlines[session_id]
+                due.append(session_id)
+        return due
+
+    def next_deadline(self) -> Optional[datetime]:
+        with self._lock:
+            while self._heap and self._deadlines.get(self._heap[0][1]) != self._heap[0][0]:
+                heapq.heappop(self._heap)
+            if not self._heap:
+                return None
+            return datetime.fromtimestamp(self._heap[0][0], tz=timezone.utc)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._heap.clear()
+            self._deadlines.clear()
+            self.loaded = False
+            self.loaded_at = None
+
+    def stats(self) -> Dict[str, Any]:
+        next_dl = self.next_deadline()
+        return {
+            "pending": len(self._deadlines),
+            "heap_entries": len(self._heap),
+            "next_deadline": next_dl.isoformat() if next_dl else None,
+            "loaded": self.loaded,
+        }
+
+    def _maybe_compact(self) -> None:
+        # Demasiadas entradas obsoletas: reconstruir el heap (O(n), raro)
+        if len(self._heap) > 64 and len(self._heap) > 2 * len(self._deadlines):
+            self._heap = [(ts, sid) for sid, ts in self._deadlines.items()]
+            heapq.heapify(self._heap)
+
+
+# Instancia compartida del proceso (engine + hooks de activación)
+expiry_scheduler = ExpiryScheduler()
+
+
+def on_session_activated(session_id: str, created_at: Any = None) -> bool:
+    """
+    Hook de activación: programa la expiración de la sesión en este proceso.
+    Las activaciones hechas por otros procesos las recoge el escaneo del
+    SessionEngine. Sin created_at se toma la hora de activación.
+    """
+    if isinstance(created_at, str):
+        try:
+            created_at = datetime.fromisoformat(created_at.replace("Z", "+00:00"))
+        except ValueError:
+            created_at = None
+    if not isinstance(created_at, datetime):
+        created_at = datetime.now(timezone.utc)
+    return expiry_scheduler.schedule_session(str(session_id), created_at)
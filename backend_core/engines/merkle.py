@@ -0,0 +1,259 @@
+from __future__ import annotations
+
+import hashlib
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# ==========================================================
+# 🔹 MERKLE SHA-256 EN STREAMING (memoria O(log n))
+# - hojas ya ordenadas, consumidas desde un iterador
+# - hash interno: SHA256(left || right)
+# - si un nivel es impar: duplica el último nodo
+# Produce exactamente la misma raíz que el cálculo nivel a nivel
+# (_merkle_root_hex del motor PRO).
+# ==========================================================
+
+EMPTY_ROOT_HEX = hashlib.sha256(b"").hexdigest()
+
+# Posición del hermano respecto al nodo en el audit path
+SIBLING_LEFT = "left"    # parent = SHA256(sibling || node)
+SIBLING_RIGHT = "right"  # parent = SHA256(node || sibling)
+
+
+def _h(left: bytes, right: bytes) -> bytes:
+    return hashlib.sha256(left + right).digest()
+
+
+@dataclass(frozen=True)
+class MerkleInclusionProof:
+    """
+    Audit path de una hoja contra la raíz Merkle:
+    - path: (sibling_hex, posición) desde la hoja hasta la raíz
+    - index / leaves_count: posición de la hoja en el orden canónico
+    """
+    leaf_hex: str
+    index: int
+    leaves_count: int
+    root_hex: str
+    path: Tuple[Tuple[str, str], ...]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "leaf_hex": self.leaf_hex,
+            "index": self.index,
+            "leaves_count": self.leaves_count,
+            "root_hex": self.root_hex,
+            "path": [{"sibling_hex": h, "position": pos} for h, pos in self.path],
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MerkleInclusionProof":
+        return cls(
+            leaf_hex=str(data["leaf_hex"]),
+            index=int(data["index"]),
+            leaves_count=int(data["leaves_count"]),
+            root_hex=str(data["root_hex"]),
+            path=tuple((str(step["sibling_hex"]), str(step["position"])) for step in data["path"]),
+        )
+
+
+class MerkleStreamBuilder:
+    """
+    Constructor incremental de raíz Merkle.
+
+    Sólo guarda un nodo pendiente por nivel (pending[l] existe si el bit l
+    del número de hojas añadido está activo), así que la memoria es
+    O(log n) aunque la sesión tenga millones de entradas.
+
+    Con track_index, además registra el audit path de esa hoja a medida que
+    se combinan los nodos (sigue siendo O(log n)).
+    """
+
+    __slots__ = ("_pending", "_count", "_track_index", "_target_level", "_path", "_leaf")
+
+    def __init__(self, track_index: Optional[int] = None) -> None:
+        self._pending: List[Optional[bytes]] = []
+        self._count = 0
+        self._track_index = track_index
+        # nivel de pending que contiene la hoja seguida (None si no aplica)
+        self._target_level: Optional[int] = None
+        self._path: List[Tuple[bytes, str]] = []
+        self._leaf: Optional[bytes] = None
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def add(self, leaf: bytes) -> None:
+        node = bytes(leaf)
+        has_target = self._count == self._track_index
+        if has_target:
+            self._leaf = node
+        level = 0
+        pending = self._pending
+        while level < len(pending) and pending[level] is not None:
+            left = pending[level]
+            if has_target:
+                self._path.append((left, SIBLING_LEFT))
+            elif self._target_level == level:
+                self._path.append((node, SIBLING_RIGHT))
+                self._target_level = None
+                has_target = True
+            node = _h(left, node)
+            pending[level] = None
+            level += 1
+        if level == len(pending):
+            pending.append(node)
+        else:
+            pending[level] = node
+        if has_target:
+            self._target_level = level
+        self._count += 1
+
+    def add_many(self, leaves: Iterable[bytes]) -> "MerkleStreamBuilder":
+        for leaf in leaves:
+            self.add(leaf)
+        return self
+
+    def _finalize(self) -> Tuple[bytes, List[Tuple[bytes, str]]]:
+        """
+        Cierra el árbol sin modificar el estado (se puede seguir añadiendo).
+
+        Recorre los niveles de abajo arriba con un nodo "carry" que sube:
+        - pending + carry: se combinan (pending queda a la izquierda)
+        - un único nodo sin niveles pendientes por encima: es la raíz
+        - un único nodo con niveles por encima: es el último impar, se duplica
+        """
+        path = list(self._path)
+        if self._count == 0:
+            return bytes.fromhex(EMPTY_ROOT_HEX), path
+
+        pending = self._pending
+        top = max(i for i, node in enumerate(pending) if node is not None)
+        carry: Optional[bytes] = None
+        carry_has_target = False
+        level = 0
+        while True:
+            node = pending[level] if level < len(pending) else None
+            node_has_target = node is not None and self._target_level == level
+            if node is not None and carry is not None:
+                if carry_has_target:
+                    path.append((node, SIBLING_LEFT))
+                elif node_has_target:
+                    path.append((carry, SIBLING_RIGHT))
+                carry = _h(node, carry)
+                carry_has_target = carry_has_target or node_has_target
+            else:
+                single = node if node is not None else carry
+                if single is not None:
+                    single_has_target = node_has_target if node is not None else carry_has_target
+                    if level >= top:
+                        return single, path
+                    if single_has_target:
+                        path.append((single, SIBLING_RIGHT))
+                    carry = _h(single, single)
+                    carry_has_target = single_has_target
+            level += 1
+
+    def root(self) -> bytes:
+        return self._finalize()[0]
+
+    def root_hex(self) -> str:
+        return self.root().hex()
+
+    def inclusion_proof(self) -> MerkleInclusionProof:
+        if self._track_index is None or self._leaf is None:
+            raise ValueError("track_index no indicado o la hoja aún no se ha añadido.")
+        root, path = self._finalize()
+        return MerkleInclusionProof(
+            leaf_hex=self._leaf.hex(),
+            index=int(self._track_index),
+            leaves_count=self._count,
+            root_hex=root.hex(),
+            path=tuple((h.hex(), pos) for h, pos in path),
+        )
+
+
+def merkle_root_hex_stream(leaves: Iterable[bytes]) -> str:
+    """
+    Raíz Merkle (hex) de hojas ordenadas (bytes) consumidas en streaming.
+    """
+    return MerkleStreamBuilder().add_many(leaves).root_hex()
+
+
+# ==========================================================
+# 🔹 VERIFICADOR DE INCLUSIÓN (O(log n) hashes, sin manifest)
+# ==========================================================
+
+def _expected_positions(index: int, leaves_count: int) -> List[Tuple[str, bool]]:
+    """
+    Posiciones que debe tener el audit path de (index, leaves_count):
+    (posición del hermano, es_duplicado)
+    """
+    out: List[Tuple[str, bool]] = []
+    i, m = index, leaves_count
+    while m > 1:
+        if i % 2:
+            out.append((SIBLING_LEFT, False))
+        else:
+            out.append((SIBLING_RIGHT, i + 1 >= m))
+        i //= 2
+        m = (m + 1) // 2
+    return out
+
+
+def verify_merkle_inclusion(
+    *,
+    leaf_hex: str,
+    path: Iterable[Tuple[str, str]],
+    root_hex: str,
+    index: Optional[int] = None,
+    leaves_count: Optional[int] = None,
+) -> bool:
+    """
+    Verifica que leaf_hex pertenece al árbol con raíz root_hex.
+
+    Si se indican index y leaves_count, exige además que el path tenga
+    exactamente la forma de esa posición (no vale "mover" una hoja).
+    """
+    try:
+        node = bytes.fromhex(leaf_hex)
+        siblings = [(bytes.fromhex(h), pos) for h, pos in path]
+    except (TypeError, ValueError):
+        return False
+
+    expected: Optional[List[Tuple[str, bool]]] = None
+    if index is not None and leaves_count is not None:
+        if not 0 <= index < leaves_count:
+            return False
+        expected = _expected_positions(index, leaves_count)
+        if len(expected) != len(siblings):
+            return False
+
+    for step, (sibling, pos) in enumerate(siblings):
+        if expected is not None:
+            exp_pos, exp_dup = expected[step]
+            if pos != exp_pos or (exp_dup and sibling != node):
+                return False
+        if pos == SIBLING_LEFT:
+            node = _h(sibling, node)
+        elif pos == SIBLING_RIGHT:
+            node = _h(node, sibling)
+        else:
+            return False
+
+    return node.hex() == str(root_hex).lower()
+
+
+def verify_inclusion_proof(proof: MerkleInclusionProof, root_hex: Optional[str] = None) -> bool:
+    """
+    Verifica un MerkleInclusionProof contra root_hex (por defecto, el del propio proof;
+    en auditoría se debe pasar participants_merkle_root publicado).
+    """
+    return verify_merkle_inclusion(
+        leaf_hex=proof.leaf_hex,
+        path=proof.path,
+        root_hex=root_hex or proof.root_hex,
+        index=proof.index,
+        leaves_count=proof.leaves_count,
+    )
@@ -0,0 +1,409 @@
+# backend_core/engines/session_closure_feed.py
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import select
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+from backend_core.services.supabase_client import table
+from backend_core.engines.session_engine import (
+    PARTICIPANTS_TABLE,
+    SESSIONS_TABLE,
+    STATUS_ACTIVE,
+    SessionEngine,
+    _parse_dt,
+    _safe_int,
+)
+
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+# ==============================================================================
+# 🔹 CIERRE POR EVENTOS (CHANGE FEED DE PARTICIPANTES)
+#
+# El cierre por aforo era sólo por polling (SessionEngine, closure worker,
+# endpoint Modal): entre el último alta y el cierre pasaba un tick entero.
+# Aquí un consumidor escucha los INSERT de participantes (LISTEN/NOTIFY),
+# mantiene un contador de aforo en memoria por sesión activa y cierra en
+# cuanto se alcanza la capacidad. El polling queda como red de seguridad
+# (notificaciones perdidas, consumidor caído).
+#
+# Trigger Postgres que alimenta el canal:
+#   create function ca_notify_participant_insert() returns trigger as $$
+#   begin
+#     perform pg_notify('ca_participant_inserts', json_build_object(
+#       'table', TG_TABLE_NAME,
+#       'id', NEW.id,
+#       'session_id', NEW.session_id,
+#       'units', coalesce(to_jsonb(NEW)->>'quantity', to_jsonb(NEW)->>'participations', '1')::int,
+#       'created_at', NEW.created_at
+#     )::text);
+#     return NEW;
+#   end $$ language plpgsql;
+#
+#   create trigger ca_session_participants_notify after insert on ca_session_participants
+#     for each row execute function ca_notify_participant_insert();
+#   create trigger ca_participants_notify after insert on ca_participants
+#     for each row execute function ca_notify_participant_insert();
+# ==============================================================================
+
+PARTICIPANT_INSERTS_CHANNEL = os.getenv("PARTICIPANT_INSERTS_CHANNEL", "ca_participant_inserts")
+SUPABASE_DB_URL = os.getenv("SUPABASE_DB_URL")
+
+LEGACY_PARTICIPANTS_TABLE = "ca_participants"
+
+# Sesiones no activas recordadas para no re-consultar ca_sessions (LRU)
+IGNORED_SESSIONS_MAX = 10_000
+
+# Sesiones activas con contador en memoria (LRU): la expulsada se resiembra
+# con el agregado real en su siguiente alta
+TRACKED_SESSIONS_MAX = 10_000
+
+# Columna de unidades por tabla de participantes
+UNITS_COLUMN = {
+    PARTICIPANTS_TABLE: "quantity",
+    LEGACY_PARTICIPANTS_TABLE: "participations",
+}
+
+
+# ==============================================================================
+# MODELOS
+# ==============================================================================
+
+@dataclass(frozen=True)
+class Notification:
+    channel: str
+    payload: str
+
+
+@dataclass(frozen=True)
+class ParticipantInsert:
+    table: str
+    session_id: str
+    units: int
+    participant_id: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+def parse_participant_insert(payload: str) -> ParticipantInsert:
+    data = json.loads(payload)
+    return ParticipantInsert(
+        table=str(data.get("table") or PARTICIPANTS_TABLE),
+        session_id=str(data["session_id"]),
+        units=_safe_int(data.get("units"), 1),
+        participant_id=str(data["id"]) if data.get("id") is not None else None,
+        created_at=_parse_dt(data.get("created_at")),
+    )
+
+
+# ==============================================================================
+# FUENTES (LISTEN / NOTIFY)
+# ==============================================================================
+
+class LocalNotifyQueue:
+    """
+    Stand-in en proceso de LISTEN/NOTIFY (tests, desarrollo local):
+    notify() encola, poll() entrega lo escuchado.
+    """
+
+    def __init__(self) -> None:
+        self._queue: "queue.Queue[Notification]" = queue.Queue()
+        self._channels: set = set()
+
+    def listen(self, channel: str) -> None:
+        self._channels.add(channel)
+
+    def notify(self, channel: str, payload: str) -> None:
+        self._queue.put(Notification(channel, payload))
+
+    def poll(self, timeout: float = 1.0) -> List[Notification]:
+        out: List[Notification] = []
+        try:
+            first = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+        except queue.Empty:
+            return out
+        for n in [first] + self._drain_nowait():
+            if n.channel in self._channels:
+                out.append(n)
+        return out
+
+    def _drain_nowait(self) -> List[Notification]:
+        items: List[Notification] = []
+        while True:
+            try:
+                items.append(self._queue.get_nowait())
+            except queue.Empty:
+                return items
+
+    def close(self) -> None:
+        self._channels.clear()
+
+
+class PostgresNotifyFeed:
+    """
+    LISTEN sobre una conexión directa a Postgres (psycopg2, autocommit).
+    Requiere SUPABASE_DB_URL (cadena de conexión, no la API REST).
+    """
+
+    def __init__(self, dsn: Optional[str] = None) -> None:
+        dsn = dsn or SUPABASE_DB_URL
+        if not dsn:
+            raise RuntimeError("❌ ERROR: SUPABASE_DB_URL no configurada (necesaria para LISTEN/NOTIFY).")
+        import psycopg2  # dependencia sólo de este consumidor
+
+        self._conn = psycopg2.connect(dsn)
+        self._conn.set_session(autocommit=True)
+
+    def listen(self, channel: str) -> None:
+        with self._conn.cursor() as cur:
+            cur.execute(f'LISTEN "{channel}"')
+
+    def poll(self, timeout: float = 1.0) -> List[Notification]:
+        if select.select([self._conn], [], [], timeout) == ([], [], []):
+            return []
+        self._conn.poll()
+        out = [Notification(n.channel, n.payload) for n in self._conn.notifies]
+        self._conn.notifies.clear()
+        return out
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+# ==============================================================================
+# CONSUMIDOR
+# ==============================================================================
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SessionFillTracker:
+    """
+    Contador de aforo en memoria por sesión activa.
+
+    - Primera notificación de una sesión: se siembra con capacity/status
+      de ca_sessions y el SUM real de la tabla (que ya incluye ese alta).
+    - Siguientes: suma incremental de `units`.
+    - Al alcanzar la capacidad se confirma con un agregado real antes de
+      cerrar (evita doble conteo de altas ya incluidas en la siembra); si
+      no cuadra se resiembra con el valor real.
+    - Las sesiones que cierra o expira el polling del mismo engine se
+      sueltan vía add_session_finished_listener; las que termina otro
+      proceso salen por LRU (TRACKED_SESSIONS_MAX).
+    """
+
+    def __init__(
+        self,
+        engine: Optional[SessionEngine] = None,
+        on_closed: Optional[Callable[[str], None]] = None,
+    ) -> None:
+        self._engine = engine if engine is not None else SessionEngine()
+        self._on_closed = on_closed
+        self._lock = threading.Lock()
+        self._filled: Dict[str, int] = {}
+        # orden LRU de las sesiones con contador (mismas claves que _filled)
+        self._capacity: "OrderedDict[str, int]" = OrderedDict()
+        # sesiones no activas (cerradas / expiradas / inexistentes)
+        self._ignored: "OrderedDict[str, None]" = OrderedDict()
+        self._stats: Dict[str, Any] = {
+            "notifications": 0,
+            "seeded": 0,
+            "reseeded": 0,
+            "closed": 0,
+            "ignored": 0,
+            "evicted": 0,
+            "errors": 0,
+            "last_close_latency_ms": None,
+            "max_close_latency_ms": None,
+        }
+        add_listener = getattr(self._engine, "add_session_finished_listener", None)
+        if add_listener is not None:
+            add_listener(self._on_session_finished)
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def handle(self, event: ParticipantInsert) -> bool:
+        """
+        Aplica un alta. Devuelve True si ha cerrado la sesión.
+        """
+        sid = event.session_id
+        with self._lock:
+            self._stats["notifications"] += 1
+            if sid in self._ignored:
+                self._stats["ignored"] += 1
+                return False
+
+            if sid not in self._capacity:
+                if not self._seed(sid, event.table):
+                    return False
+            else:
+                self._filled[sid] += event.units
+                self._capacity.move_to_end(sid)
+
+            if self._filled[sid] < self._capacity[sid]:
+                return False
+
+            # Umbral alcanzado: confirmar con el agregado real
+            real = self._authoritative_fill(sid, event.table)
+            if real < self._capacity[sid]:
+                self._filled[sid] = real
+                self._stats["reseeded"] += 1
+                return False
+
+            self._forget_locked(sid)
+            self._ignore_locked(sid)
+
+        closed = self._engine.close_full_session(sid)
+        if closed:
+            self._record_close(event)
+            if self._on_closed is not None:
+                self._on_closed(sid)
+        return closed
+
+    def forget(self, session_id: str) -> None:
+        with self._lock:
+            self._forget_locked(session_id)
+            self._ignored.pop(session_id, None)
+
+    def record_error(self) -> None:
+        with self._lock:
+            self._stats["errors"] += 1
+
+    def filled(self, session_id: str) -> Optional[int]:
+        return self._filled.get(session_id)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "tracked_sessions": len(self._capacity)}
+
+    # ------------------------------------------------------------------
+    # INTERNOS
+    # ------------------------------------------------------------------
+
+    def _seed(self, sid: str, source_table: str) -> bool:
+        row = (
+            table(SESSIONS_TABLE)
+            .select("id, status, capacity")
+            .eq("id", sid)
+            .limit(1)
+            .execute()
+            .data
+            or []
+        )
+        if not row or row[0].get("status") != STATUS_ACTIVE or _safe_int(row[0].get("capacity")) <= 0:
+            self._ignore_locked(sid)
+            self._stats["ignored"] += 1
+            return False
+        self._capacity[sid] = _safe_int(row[0].get("capacity"))
+        self._filled[sid] = self._authoritative_fill(sid, source_table)
+        self._stats["seeded"] += 1
+        while len(self._capacity) > TRACKED_SESSIONS_MAX:
+            evicted, _ = self._capacity.popitem(last=False)
+            self._filled.pop(evicted, None)
+            self._stats["evicted"] += 1
+        return True
+
+    def _on_session_finished(self, sid: str) -> None:
+        with self._lock:
+            self._forget_locked(sid)
+            self._ignore_locked(sid)
+
+    def _authoritative_fill(self, sid: str, source_table: str) -> int:
+        if source_table == PARTICIPANTS_TABLE:
+            return self._engine._get_filled_units(sid)
+        column = UNITS_COLUMN.get(source_table, "quantity")
+        rows = table(source_table).select(column).eq("session_id", sid).execute().data or []
+        return sum(_safe_int(r.get(column)) for r in rows)
+
+    def _ignore_locked(self, sid: str) -> None:
+        self._ignored[sid] = None
+        self._ignored.move_to_end(sid)
+        if len(self._ignored) > IGNORED_SESSIONS_MAX:
+            self._ignored.popitem(last=False)
+
+    def _forget_locked(self, sid: str) -> None:
+        self._filled.pop(sid, None)
+        self._capacity.pop(sid, None)
+
+    def _record_close(self, event: ParticipantInsert) -> None:
+        with self._lock:
+            self._stats["closed"] += 1
+            if event.created_at is None:
+                return
+            latency_ms = round((_utcnow() - event.created_at).total_seconds() * 1000, 3)
+            self._stats["last_close_latency_ms"] = latency_ms
+            prev = self._stats["max_close_latency_ms"]
+            self._stats["max_close_latency_ms"] = latency_ms if prev is None else max(prev, latency_ms)
+
+
+class SessionClosureConsumer:
+    """
+    Bucle LISTEN -> SessionFillTracker. `feed` es cualquier objeto con
+    listen(channel) / poll(timeout) / close() (PostgresNotifyFeed o
+    LocalNotifyQueue).
+    """
+
+    def __init__(
+        self,
+        feed: Any,
+        tracker: Optional[SessionFillTracker] = None,
+        channel: str = PARTICIPANT_INSERTS_CHANNEL,
+    ) -> None:
+        self.feed = feed
+        self.tracker = tracker if tracker is not None else SessionFillTracker()
+        self.channel = channel
+        self.feed.listen(channel)
+
+    def process_available(self, timeout: float = 0.0) -> int:
+        """
+        Procesa las notificaciones disponibles (espera hasta `timeout`).
+        Devuelve cuántas sesiones se han cerrado.
+        """
+        closed = 0
+        for n in self.feed.poll(timeout):
+            if n.channel != self.channel:
+                continue
+            try:
+                if self.tracker.handle(parse_participant_insert(n.payload)):
+                    closed += 1
+            except Exception:
+                self.tracker.record_error()
+                logger.exception("Participant insert notification failed: %s", n.payload)
+        return closed
+
+    def run(self, stop_event: Optional[threading.Event] = None, poll_timeout: float = 1.0) -> None:
+        stop_event = stop_event or threading.Event()
+        logger.info("Session closure consumer listening on %s", self.channel)
+        try:
+            while not stop_event.is_set():
+                self.process_available(timeout=poll_timeout)
+        finally:
+            self.feed.close()
+
+
+def run_closure_consumer() -> None:
+    """
+    Entrypoint: consumidor contra Postgres (SUPABASE_DB_URL).
+    """
+    while True:
+        try:
+            SessionClosureConsumer(PostgresNotifyFeed()).run()
+        except Exception:
+            # Conexión caída: el polling cubre el hueco mientras se reconecta
+            logger.exception("Closure consumer crashed, reconnecting")
+            time.sleep(5)
+
+
+if __name__ == "__main__":
+    run_closure_consumer()
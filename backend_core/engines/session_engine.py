@@ -1,14 +1,24 @@
 # backend_core/engines/session_engine.py
 from __future__ import annotations
 
+import json
 import logging
+import os
+import time
 from dataclasses import dataclass
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional, Tuple
-
-from backend_core.services.supabase_client import table
+from datetime import datetime, timezone
+from typing import AbstractSet, Any, Callable, Dict, List, Optional, Set, Tuple
+
+from backend_core.engines.expiry_scheduler import (
+    ExpiryScheduler,
+    expiry_scheduler,
+)
+from backend_core.services.supabase_client import table, supabase
+from backend_core.services.worker_shards import ShardLeaseManager, scope_query
 from backend_core.services.audit_repository import log_event
-from backend_core.services.adjudication_service_pro import adjudicate_session_pro
+from backend_core.services.adjudication_service_pro import adjudicate_session_pro, commit_session_pro
+from backend_core.services.adjudication_executor import AsyncAdjudicationExecutor, get_adjudication_executor
+from backend_core.services.drand_round_scheduler import DrandRoundScheduler, get_drand_round_scheduler
 
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
@@ -31,12 +41,60 @@ logger.setLevel(logging.INFO)
 SESSIONS_TABLE = "ca_sessions"
 PARTICIPANTS_TABLE = "ca_session_participants"
 
+SESSION_COLUMNS = (
+    "id, product_id, module_id, status, capacity, created_at, closed_at, "
+    "rules_version, previous_session_id, previous_chain_hash"
+)
+
 STATUS_PARKED = "parked"
 STATUS_ACTIVE = "active"
 STATUS_CLOSED = "closed"
 STATUS_EXPIRED = "expired"
 
-SESSION_DURATION_DAYS = 5
+# Agregado de aforo en lote: RPC Postgres (si existe) que devuelve
+# [{session_id, filled_units}] para un array de sesiones:
+#   create function ca_session_filled_units(session_ids uuid[])
+#   returns table(session_id uuid, filled_units bigint) as $$
+#     select session_id, coalesce(sum(quantity), 0)
+#     from ca_session_participants
+#     where session_id = any(session_ids)
+#     group by session_id
+#   $$ language sql stable;
+# Sin RPC: consultas IN por bloque de FILLED_UNITS_IN_CHUNK sesiones,
+# paginadas por keyset (session_id, id): PostgREST corta cada respuesta en
+# max-rows (1000 por defecto) y el aforo saldría de menos.
+FILLED_UNITS_RPC = "ca_session_filled_units"
+FILLED_UNITS_IN_CHUNK = 200
+FILLED_UNITS_PAGE_SIZE = int(os.getenv("FILLED_UNITS_PAGE_SIZE", "1000"))
+
+# Escaneo de sesiones activas por keyset (created_at, id): cada tick procesa
+# hasta SESSION_SCAN_PAGES_PER_TICK páginas de `limit` sesiones y guarda el
+# cursor; al llegar al final da la vuelta. Toda sesión activa se visita como
+# máximo en ceil(N / (limit * páginas)) + 1 ticks, sea cual sea N.
+SESSION_SCAN_PAGES_PER_TICK = int(os.getenv("SESSION_SCAN_PAGES_PER_TICK", "4"))
+SESSION_SCAN_CURSOR_PATH = os.getenv("SESSION_SCAN_CURSOR_PATH", "data/session_engine_cursor.json")
+
+# Expiración por deadlines (ExpiryScheduler): carga inicial paginada y tope
+# de sesiones expiradas por tick (el resto queda para el siguiente).
+EXPIRY_BOOTSTRAP_PAGE_SIZE = int(os.getenv("EXPIRY_BOOTSTRAP_PAGE_SIZE", "1000"))
+EXPIRY_MAX_PER_TICK = int(os.getenv("EXPIRY_MAX_PER_TICK", "1000"))
+# Sólo expiración (run_expiry_once, sin escaneo que recoja activaciones de
+# otros procesos): recarga de deadlines cada N segundos (0 = nunca)
+EXPIRY_RELOAD_INTERVAL_S = int(os.getenv("EXPIRY_RELOAD_INTERVAL_SECONDS", "300"))
+EXPIRY_UPDATE_CHUNK = 200
+
+# Sólo en procesos de larga vida (run_workers, worker con shards, ver
+# worker_adjudication_backends): al cerrar, encolar la adjudicación en el
+# executor asíncrono (true) o adjudicar en línea bloqueando el tick (false).
+# Un SessionEngine() sin backends inyectados adjudica siempre en línea: un
+# llamante de vida corta no para el executor ni el scheduler drand al salir
+# y las sesiones archivadas en memoria se perderían.
+ADJUDICATION_ASYNC = os.getenv("ADJUDICATION_ASYNC", "true").lower() in ("1", "true", "yes", "on")
+# Con ADJUDICATION_ASYNC: archivar la sesión bajo su round drand y adjudicar
+# en lote cuando se publique (true) o encolar ya en el executor (false)
+ADJUDICATION_DEFER_TO_DRAND_ROUND = os.getenv("ADJUDICATION_DEFER_TO_DRAND_ROUND", "true").lower() in (
+    "1", "true", "yes", "on",
+)
 
 
 # ==============================================================================
@@ -57,6 +115,54 @@ class SessionRow:
     previous_chain_hash: Optional[str]
 
 
+# ==============================================================================
+# CURSOR PERSISTIDO DEL ESCANEO
+# ==============================================================================
+
+class MemoryCursorStore:
+    """
+    Estado del escaneo en memoria (tests / un solo proceso de vida larga).
+    """
+
+    def __init__(self) -> None:
+        self._state: Dict[str, Any] = {}
+
+    def load(self) -> Dict[str, Any]:
+        return dict(self._state)
+
+    def save(self, state: Dict[str, Any]) -> None:
+        self._state = dict(state)
+
+
+class FileCursorStore:
+    """
+    Estado del escaneo en un fichero JSON (escritura atómica): sobrevive a
+    reinicios del worker, así una pasada larga continúa donde se quedó.
+    """
+
+    def __init__(self, path: str = SESSION_SCAN_CURSOR_PATH) -> None:
+        self.path = path
+
+    def load(self) -> Dict[str, Any]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError):
+            logger.warning("Cursor de escaneo ilegible (%s): se empieza desde el principio", self.path)
+            return {}
+
+    def save(self, state: Dict[str, Any]) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+
 # ==============================================================================
 # UTILS
 # ==============================================================================
@@ -92,70 +198,265 @@ def _safe_int(value: Any, default: int = 0) -> int:
 class SessionEngine:
     """
     Engine de ciclo de vida de sesiones:
-    - calcula aforo (SUM quantity)
-    - cierra por aforo exacto
-    - expira por tiempo (created_at + 5 días)
+    - calcula aforo (SUM quantity) en lote: un agregado por tick
+    - cierra por aforo exacto (red de seguridad del cierre por eventos,
+      ver session_closure_feed)
+    - expira por tiempo (created_at + 5 días) vía ExpiryScheduler: sólo
+      se tocan las sesiones cuyo deadline ya pasó
+    - al cerrar, precalcula el compromiso (fase 1, sin drand)
     - dispara adjudicación determinista PRO
     """
 
+    def __init__(
+        self,
+        cursor_store: Optional[Any] = None,
+        scheduler: Optional[ExpiryScheduler] = None,
+        shards: Optional[ShardLeaseManager] = None,
+        adjudication_executor: Optional[AsyncAdjudicationExecutor] = None,
+        round_scheduler: Optional[DrandRoundScheduler] = None,
+    ) -> None:
+        # None = aún no probado; False = la RPC no existe, usar IN
+        self._filled_units_rpc_available: Optional[bool] = None
+        self._round_trips = 0
+        self._cursor_store = cursor_store if cursor_store is not None else FileCursorStore()
+        # Compartido entre instancias del proceso: la carga inicial se hace una vez
+        self._scheduler = scheduler if scheduler is not None else expiry_scheduler
+        # Con varios workers: sólo se procesan sesiones de los shards con lease
+        # (el llamante hace shards.rebalance() antes de cada tick)
+        self._shards = shards
+        self._owned_shards: Optional[frozenset] = None
+        # Sesiones que este tick ya comprobó abiertas (aforo < capacity)
+        self._fill_checked: Set[str] = set()
+        self._adjudication_executor = adjudication_executor
+        self._round_scheduler = round_scheduler
+        # Avisados cuando este engine cierra o expira una sesión (p. ej. el
+        # SessionFillTracker del mismo proceso suelta su contador)
+        self._session_finished_listeners: List[Callable[[str], None]] = []
+
     # ------------------------------------------------------------------
     # API pública
     # ------------------------------------------------------------------
 
-    def run_once(self, limit: int = 500) -> Dict[str, Any]:
-        metrics = {
+    def run_once(self, limit: int = 500, max_pages: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Un tick: recorre páginas de sesiones activas desde el cursor
+        persistido (keyset created_at, id) y aplica cierre / expiración.
+
+        Cobertura (scan_*): sesiones visitadas en la pasada en curso y, al
+        completar una pasada, cuántas sesiones y ticks ha necesitado.
+        """
+        self._round_trips = 0
+        max_pages = max(1, max_pages if max_pages is not None else SESSION_SCAN_PAGES_PER_TICK)
+        metrics: Dict[str, Any] = {
             "active_scanned": 0,
             "closed": 0,
             "expired": 0,
+            "expiry_due": 0,
             "adjudications_triggered": 0,
+            "adjudications_deferred": 0,
+            "commitments_created": 0,
+            "invariant_violations": 0,
+            # consultas propias del engine en este tick (sin commit/adjudicación)
+            "db_round_trips": 0,
+            "scan_pages": 0,
+            "scan_pass_completed": False,
         }
 
-        active = self._fetch_sessions_by_status(STATUS_ACTIVE, limit)
-        metrics["active_scanned"] = len(active)
+        scan = self._cursor_store.load()
+        if not scan.get("pass_started_at"):
+            scan = {"cursor": None, "pass_visited": 0, "pass_ticks": 0, "pass_started_at": _utcnow().isoformat(),
+                    "last_full_pass": scan.get("last_full_pass")}
+        scan["pass_ticks"] = int(scan.get("pass_ticks") or 0) + 1
 
-        # 1) CIERRE POR AFORO
-        for s in active:
-            filled = self._get_filled_units(s.id)
-            self._validate_invariants(s, filled)
+        now = _utcnow()
+        self._ensure_expiry_loaded()
+        self._fill_checked = set()
+
+        for _ in range(max_pages):
+            after = tuple(scan["cursor"]) if scan.get("cursor") else None
+            page = self._fetch_active_page(after=after, limit=limit)
+            metrics["scan_pages"] += 1
+            metrics["active_scanned"] += len(page)
+            scan["pass_visited"] = int(scan.get("pass_visited") or 0) + len(page)
+
+            self._process_page([s for s in page if self._owns(s.id)], now, metrics)
+
+            if len(page) < limit:
+                # Fin de la tabla: pasada completa, la siguiente empieza de cero
+                scan = {
+                    "cursor": None,
+                    "pass_visited": 0,
+                    "pass_ticks": 0,
+                    "pass_started_at": None,
+                    "last_full_pass": {
+                        "visited": scan["pass_visited"],
+                        "ticks": scan["pass_ticks"],
+                        "started_at": scan["pass_started_at"],
+                        "completed_at": _utcnow().isoformat(),
+                    },
+                }
+                metrics["scan_pass_completed"] = True
+                break
+
+            last = page[-1]
+            scan["cursor"] = [last.created_at.isoformat() if last.created_at else None, last.id]
+
+        self._cursor_store.save(scan)
+
+        # Expiración: sólo las sesiones vencidas (O(k log n)); las que este
+        # tick ya vio sin completar no necesitan re-comprobar el aforo
+        self._expire_due_sessions(now, metrics, fill_checked=self._fill_checked)
+
+        metrics["scan_cursor"] = scan.get("cursor")
+        metrics["scan_pass_visited"] = scan.get("pass_visited", 0)
+        metrics["scan_pass_ticks"] = scan.get("pass_ticks", 0)
+        metrics["scan_last_full_pass"] = scan.get("last_full_pass")
+        metrics["expiry_pending"] = len(self._scheduler)
+        next_deadline = self._scheduler.next_deadline()
+        metrics["expiry_next_deadline"] = next_deadline.isoformat() if next_deadline else None
+        metrics["db_round_trips"] = self._round_trips
+        return metrics
 
-            if filled >= s.capacity:
-                changed = self._close_session_if_active(s.id)
-                if changed:
-                    metrics["closed"] += 1
-                    adjudicate_session_pro(s.id)
-                    metrics["adjudications_triggered"] += 1
+    def run_expiry_once(self) -> Dict[str, Any]:
+        """
+        Sólo expiración (sin escaneo de aforo): extrae del scheduler las
+        sesiones vencidas y las expira (o las cierra si se llenaron). Job
+        `session_expiration` del runtime.
+        """
+        self._round_trips = 0
+        metrics: Dict[str, Any] = {"expired": 0, "expiry_due": 0, "closed": 0}
+        self._ensure_expiry_loaded(reload_after_s=EXPIRY_RELOAD_INTERVAL_S)
+        self._expire_due_sessions(_utcnow(), metrics)
+        metrics["expiry_pending"] = len(self._scheduler)
+        metrics["db_round_trips"] = self._round_trips
+        return metrics
 
-        # 2) EXPIRACIÓN
-        now = _utcnow()
-        active = self._fetch_sessions_by_status(STATUS_ACTIVE, limit)
-        for s in active:
-            filled = self._get_filled_units(s.id)
-            self._validate_invariants(s, filled)
+    def add_session_finished_listener(self, listener: Callable[[str], None]) -> None:
+        self._session_finished_listeners.append(listener)
+
+    def close_full_session(self, session_id: str, metrics: Optional[Dict[str, Any]] = None) -> bool:
+        """
+        Cierre por aforo completo + compromiso + adjudicación. Lo usan el
+        escaneo periódico y el consumidor de eventos (session_closure_feed);
+        el UPDATE condicional hace que sólo uno de los dos cierre.
+        """
+        metrics = metrics if metrics is not None else {}
+        closed_at = self._close_session_if_active(session_id)
+        if closed_at is None:
+            return False
+        metrics["closed"] = metrics.get("closed", 0) + 1
+        if self._on_session_closed(session_id):
+            metrics["commitments_created"] = metrics.get("commitments_created", 0) + 1
+        if self._trigger_adjudication(session_id, closed_at):
+            metrics["adjudications_triggered"] = metrics.get("adjudications_triggered", 0) + 1
+        else:
+            metrics["adjudications_deferred"] = metrics.get("adjudications_deferred", 0) + 1
+        return True
+
+    def _trigger_adjudication(self, session_id: str, closed_at: datetime) -> bool:
+        """
+        Difiere o encola la adjudicación (no bloquea el cierre de las demás
+        sesiones). Con DrandRoundScheduler inyectado la sesión espera a su
+        round drand; si no, va al executor inyectado; sin ninguno de los dos
+        se adjudica en línea.
+        False = executor saturado: la sesión queda cerrada y la adjudica el
+        worker de adjudicación en su siguiente pasada.
+        """
+        round_scheduler = self._round_scheduler
+        if round_scheduler is not None:
+            try:
+                round_scheduler.defer(session_id, closed_at)
+                return True
+            except Exception:
+                # Sin chain info de drand: se cae al executor
+                logger.exception("Could not defer session %s to its drand round", session_id)
+
+        executor = self._adjudication_executor
+        if executor is None:
+            adjudicate_session_pro(session_id)
+            return True
+        accepted = executor.submit(session_id)
+        if not accepted:
+            logger.warning("Adjudication queue full, deferring session %s", session_id)
+        return accepted
 
-            if filled < s.capacity and self._is_expired(s, now):
-                changed = self._expire_session_if_active(s.id)
-                if changed:
-                    metrics["expired"] += 1
+    def _process_page(self, active: List[SessionRow], now: datetime, metrics: Dict[str, Any]) -> None:
+        # Aforo de toda la página en un único agregado
+        filled_by_session = self._get_filled_units_batch([s.id for s in active])
 
-        return metrics
+        # Cierre por aforo; el resto queda (re)programado para expirar.
+        # schedule_session es idempotente: recoge activaciones de otros procesos.
+        for s in active:
+            filled = filled_by_session.get(s.id, 0)
+            try:
+                self._validate_invariants(s, filled)
+            except ValueError as e:
+                # Una fila inválida (p.ej. sobreventa) no puede bloquear el
+                # escaneo: se audita y el cursor sigue avanzando
+                metrics["invariant_violations"] = metrics.get("invariant_violations", 0) + 1
+                logger.error("Skipping session %s: %s", s.id, e)
+                log_event(
+                    "session_invariant_violation",
+                    session_id=s.id,
+                    extra={"error": str(e), "capacity": s.capacity, "filled_units": filled},
+                )
+                continue
+
+            if filled >= s.capacity:
+                self.close_full_session(s.id, metrics)
+            else:
+                self._fill_checked.add(s.id)
+                self._scheduler.schedule_session(s.id, s.created_at)
 
     # ------------------------------------------------------------------
     # FETCH
     # ------------------------------------------------------------------
 
+    def _owns(self, session_id: str) -> bool:
+        return self._shards is None or self._shards.owns(session_id)
+
     def _fetch_sessions_by_status(self, status: str, limit: int) -> List[SessionRow]:
         resp = (
             table(SESSIONS_TABLE)
-            .select(
-                "id, product_id, module_id, status, capacity, created_at, closed_at, "
-                "rules_version, previous_session_id, previous_chain_hash"
-            )
+            .select(SESSION_COLUMNS)
             .eq("status", status)
             .limit(limit)
             .execute()
         )
+        self._round_trips += 1
+        return self._to_session_rows(resp.data or [])
+
+    def _fetch_active_page(self, *, after: Optional[Tuple[Optional[str], str]], limit: int) -> List[SessionRow]:
+        """
+        Página de sesiones activas ordenada por (created_at, id), empezando
+        estrictamente después de `after`. Estable aunque otras sesiones
+        cambien de estado entre páginas (no hay OFFSET).
+        """
+        query = scope_query(table(SESSIONS_TABLE).select(SESSION_COLUMNS).eq("status", STATUS_ACTIVE), self._shards)
+        if after is not None:
+            ts, sid = after
+            if ts is None:
+                query = query.is_("created_at", "null").gt("id", sid)
+            else:
+                query = query.or_(
+                    f'created_at.gt."{ts}",and(created_at.eq."{ts}",id.gt."{sid}"),created_at.is.null'
+                )
+        resp = query.order("created_at").order("id").limit(limit).execute()
+        self._round_trips += 1
+        return self._to_session_rows(resp.data or [])
 
-        rows = resp.data or []
+    def _fetch_active_by_ids(self, session_ids: List[str]) -> List[SessionRow]:
+        resp = (
+            table(SESSIONS_TABLE)
+            .select(SESSION_COLUMNS)
+            .in_("id", session_ids)
+            .eq("status", STATUS_ACTIVE)
+            .execute()
+        )
+        self._round_trips += 1
+        return self._to_session_rows(resp.data or [])
+
+    def _to_session_rows(self, rows: List[Dict[str, Any]]) -> List[SessionRow]:
         out: List[SessionRow] = []
 
         for r in rows:
@@ -180,20 +481,50 @@ class SessionEngine:
     # ------------------------------------------------------------------
 
     def _get_filled_units(self, session_id: str) -> int:
-        rows = (
-            table(PARTICIPANTS_TABLE)
-            .select("quantity")
-            .eq("session_id", session_id)
-            .execute()
-            .data
-            or []
-        )
-
-        total = 0
-        for r in rows:
-            total += _safe_int(r.get("quantity"))
-
-        return total
+        return self._get_filled_units_batch([session_id]).get(session_id, 0)
+
+    def _get_filled_units_batch(self, session_ids: List[str]) -> Dict[str, int]:
+        """
+        session_id -> SUM(quantity) para todo el lote.
+        Preferente: RPC agregada (1 round trip). Fallback: IN por bloques,
+        paginado (sólo se descarga id + session_id + quantity, sumado aquí).
+        Las sesiones sin participantes no aparecen (aforo 0).
+        """
+        if not session_ids:
+            return {}
+
+        if self._filled_units_rpc_available is not False:
+            try:
+                self._round_trips += 1
+                rows = supabase.rpc(FILLED_UNITS_RPC, {"session_ids": session_ids}).execute().data or []
+                self._filled_units_rpc_available = True
+                return {str(r["session_id"]): _safe_int(r.get("filled_units")) for r in rows}
+            except Exception:
+                if self._filled_units_rpc_available:
+                    raise
+                # La RPC no existe en este entorno: no se reintenta en este engine
+                self._filled_units_rpc_available = False
+
+        totals: Dict[str, int] = {}
+        page_size = max(1, FILLED_UNITS_PAGE_SIZE)
+        for start in range(0, len(session_ids), FILLED_UNITS_IN_CHUNK):
+            chunk = session_ids[start:start + FILLED_UNITS_IN_CHUNK]
+            after: Optional[Tuple[str, str]] = None
+            while True:
+                query = table(PARTICIPANTS_TABLE).select("id, session_id, quantity").in_("session_id", chunk)
+                if after is not None:
+                    query = query.or_(
+                        f'session_id.gt."{after[0]}",and(session_id.eq."{after[0]}",id.gt."{after[1]}")'
+                    )
+                rows = query.order("session_id").order("id").limit(page_size).execute().data or []
+                self._round_trips += 1
+                for r in rows:
+                    sid = str(r["session_id"])
+                    totals[sid] = totals.get(sid, 0) + _safe_int(r.get("quantity"))
+                if len(rows) < page_size:
+                    break
+                after = (str(rows[-1]["session_id"]), str(rows[-1]["id"]))
+        return totals
 
     # ------------------------------------------------------------------
     # INVARIANTES
@@ -211,17 +542,98 @@ class SessionEngine:
     # EXPIRACIÓN
     # ------------------------------------------------------------------
 
-    def _is_expired(self, s: SessionRow, now: datetime) -> bool:
-        if not s.created_at:
-            return False
-        return now >= s.created_at + timedelta(days=SESSION_DURATION_DAYS)
+    def _ensure_expiry_loaded(self, reload_after_s: int = 0) -> None:
+        if self._shards is not None and self._shards.owned != self._owned_shards:
+            # Cambió el reparto: recargar deadlines sólo de los shards propios
+            self._owned_shards = self._shards.owned
+            self._scheduler.clear()
+        if not self._scheduler.loaded:
+            self._bootstrap_expiry_scheduler()
+        elif (
+            reload_after_s > 0
+            and self._scheduler.loaded_at is not None
+            and time.monotonic() - self._scheduler.loaded_at >= reload_after_s
+        ):
+            # Sin clear: schedule es idempotente y las sesiones ya cerradas o
+            # expiradas que sigan en el heap no pasan el UPDATE condicional
+            self._bootstrap_expiry_scheduler()
+
+    def _bootstrap_expiry_scheduler(self) -> int:
+        """
+        Carga de deadlines: recorre todas las sesiones activas por keyset.
+        Entre cargas el scheduler se mantiene con activaciones, cierres y el
+        escaneo incremental (run_once); run_expiry_once, sin escaneo, la
+        repite cada EXPIRY_RELOAD_INTERVAL_S.
+        """
+        loaded = 0
+        after: Optional[Tuple[Optional[str], str]] = None
+        while True:
+            page = self._fetch_active_page(after=after, limit=EXPIRY_BOOTSTRAP_PAGE_SIZE)
+            for s in page:
+                if self._owns(s.id) and self._scheduler.schedule_session(s.id, s.created_at):
+                    loaded += 1
+            if len(page) < EXPIRY_BOOTSTRAP_PAGE_SIZE:
+                break
+            last = page[-1]
+            after = (last.created_at.isoformat() if last.created_at else None, last.id)
+        self._scheduler.loaded = True
+        self._scheduler.loaded_at = time.monotonic()
+        logger.info("Expiry scheduler loaded: %s active sessions", loaded)
+        return loaded
+
+    def _expire_due_sessions(
+        self,
+        now: datetime,
+        metrics: Dict[str, Any],
+        fill_checked: AbstractSet[str] = frozenset(),
+    ) -> None:
+        # Las de shards que ya no son nuestros se descartan (otro worker las recarga)
+        due = [sid for sid in self._scheduler.pop_due(now, limit=EXPIRY_MAX_PER_TICK) if self._owns(sid)]
+        metrics["expiry_due"] = len(due)
+        for start in range(0, len(due), EXPIRY_UPDATE_CHUNK):
+            try:
+                chunk = self._close_full_due_sessions(due[start:start + EXPIRY_UPDATE_CHUNK], fill_checked, metrics)
+                expired = self._expire_sessions_if_active(chunk)
+            except Exception:
+                # pop_due ya las desprogramó: sin UPDATE aplicado se perderían
+                # hasta la próxima recarga. Vuelven al heap como vencidas (las
+                # que sí se cerraron no se tocan: el UPDATE es condicional)
+                for session_id in due[start:]:
+                    self._scheduler.schedule(session_id, now)
+                raise
+            metrics["expired"] += len(expired)
+
+    def _close_full_due_sessions(
+        self,
+        session_ids: List[str],
+        fill_checked: AbstractSet[str],
+        metrics: Dict[str, Any],
+    ) -> List[str]:
+        """
+        Una sesión vencida que se llenó antes de que el escaneo la visitara
+        se cierra (y adjudica), no se expira. Un agregado de aforo por bloque.
+        Devuelve las que quedan para expirar.
+        """
+        unchecked = [sid for sid in session_ids if sid not in fill_checked]
+        if not unchecked:
+            return session_ids
+        rows = self._fetch_active_by_ids(unchecked)
+        filled_by_session = self._get_filled_units_batch([s.id for s in rows])
+        full = {s.id for s in rows if s.capacity > 0 and filled_by_session.get(s.id, 0) >= s.capacity}
+        for session_id in sorted(full):
+            self.close_full_session(session_id, metrics)
+        return [sid for sid in session_ids if sid not in full]
 
     # ------------------------------------------------------------------
     # TRANSICIONES IDÉMPOTENTES
     # ------------------------------------------------------------------
 
-    def _close_session_if_active(self, session_id: str) -> bool:
-        now = _utcnow().isoformat()
+    def _close_session_if_active(self, session_id: str) -> Optional[datetime]:
+        """
+        Devuelve closed_at si esta llamada cerró la sesión; None si no.
+        """
+        closed_at = _utcnow()
+        now = closed_at.isoformat()
         resp = (
             table(SESSIONS_TABLE)
             .update({"status": STATUS_CLOSED, "closed_at": now})
@@ -229,30 +641,77 @@ class SessionEngine:
             .eq("status", STATUS_ACTIVE)
             .execute()
         )
+        self._round_trips += 1
+        self._scheduler.cancel(session_id)
         if resp.data:
-            log_event("session_closed", session_id, {"closed_at": now})
+            log_event("session_closed", session_id=session_id, extra={"closed_at": now})
             logger.info("Session closed: %s", session_id)
+            self._notify_session_finished(session_id)
+            return closed_at
+        return None
+
+    def _on_session_closed(self, session_id: str) -> bool:
+        """
+        Hook post-cierre: fase 1 de la adjudicación (entradas + Merkle +
+        manifest_commit) fuera de la ventana de drand. Si falla, la
+        adjudicación se hace en una sola fase: no bloquea el cierre.
+        """
+        try:
+            commit_session_pro(session_id)
             return True
-        return False
+        except Exception:
+            logger.exception("Commitment failed for session %s", session_id)
+            return False
 
-    def _expire_session_if_active(self, session_id: str) -> bool:
+    def _expire_sessions_if_active(self, session_ids: List[str]) -> List[str]:
+        """
+        Expiración en lote (un UPDATE ... IN, condicional a status=active):
+        las que ya se cerraron o expiraron no se tocan.
+        """
+        if not session_ids:
+            return []
         resp = (
             table(SESSIONS_TABLE)
             .update({"status": STATUS_EXPIRED})
-            .eq("id", session_id)
+            .in_("id", session_ids)
             .eq("status", STATUS_ACTIVE)
             .execute()
         )
-        if resp.data:
-            log_event("session_expired", session_id, {})
+        self._round_trips += 1
+        expired = [str(r["id"]) for r in (resp.data or []) if r.get("id") is not None]
+        for session_id in expired:
+            log_event("session_expired", session_id=session_id)
             logger.info("Session expired: %s", session_id)
-            return True
-        return False
+            self._notify_session_finished(session_id)
+        return expired
+
+    def _notify_session_finished(self, session_id: str) -> None:
+        for listener in self._session_finished_listeners:
+            try:
+                listener(session_id)
+            except Exception:
+                logger.exception("Session finished listener failed for %s", session_id)
 
 
 # ==============================================================================
 # ENTRYPOINT SIMPLE
 # ==============================================================================
 
-def process_sessions_once(limit: int = 500) -> Dict[str, Any]:
-    return SessionEngine().run_once(limit)
+def worker_adjudication_backends() -> Dict[str, Any]:
+    """
+    Backends de adjudicación asíncrona para un SessionEngine de worker de
+    larga vida, según ADJUDICATION_ASYNC / ADJUDICATION_DEFER_TO_DRAND_ROUND.
+    Sólo para procesos que paran ambos en su apagado ordenado
+    (stop_drand_round_scheduler y executor.stop con drain).
+    """
+    if not ADJUDICATION_ASYNC:
+        return {}
+    backends: Dict[str, Any] = {"adjudication_executor": get_adjudication_executor()}
+    if ADJUDICATION_DEFER_TO_DRAND_ROUND:
+        backends["round_scheduler"] = get_drand_round_scheduler()
+    return backends
+
+
+def process_sessions_once(limit: int = 500, max_pages: Optional[int] = None) -> Dict[str, Any]:
+    # Adjudicación en línea: el llamante puede salir justo después
+    return SessionEngine().run_once(limit, max_pages=max_pages)
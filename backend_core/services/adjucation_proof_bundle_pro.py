@@ -4,15 +4,26 @@ import json
 import hashlib
 from dataclasses import dataclass
 from datetime import datetime, timezone
-from typing import Any, Dict, Optional, List
+from typing import Any, Dict, Optional
 
 from backend_core.services.supabase_client import table
+from backend_core.services.snapshot_loader import (
+    InvariantViolationError,
+    load_session_snapshot,
+    load_participants_snapshot,
+)
 from backend_core.models.adjudication_models import (
-    SessionSnapshot,
     ParticipantSnapshot,
     DeterministicContext,
 )
-from backend_core.engines.adjudicator_engine_pro import adjudicate
+from backend_core.engines.adjudicator_engine_pro import (
+    adjudicate,
+    build_inclusion_proof,
+    compute_participants_merkle_root,
+    ranking_top_k_of,
+)
+from backend_core.engines.merkle import verify_inclusion_proof
+from backend_core.services.leaves_sidecar import open_leaves_sidecar
 
 
 # ==========================================================
@@ -35,12 +46,6 @@ def _now_utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _parse_dt(value) -> datetime:
-    if isinstance(value, datetime):
-        return value
-    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).astimezone(timezone.utc)
-
-
 def _sha256_hex(data: bytes) -> str:
     return hashlib.sha256(data).hexdigest()
 
@@ -80,73 +85,10 @@ class ProofBundleError(RuntimeError):
     pass
 
 
-class InvariantViolationError(ValueError):
-    pass
-
-
 # ==========================================================
-# 🔹 LOAD SNAPSHOTS (DB → MODELOS)
+# 🔹 LOAD ADJUDICACIÓN (DB)
 # ==========================================================
 
-def _load_session_snapshot(session_id: str) -> SessionSnapshot:
-    resp = (
-        table("ca_sessions")
-        .select("id, product_id, created_at, closed_at, capacity, rules_version, status")
-        .eq("id", session_id)
-        .single()
-        .execute()
-    )
-
-    s = resp.data
-    if not s:
-        raise InvariantViolationError("Sesión no encontrada.")
-
-    if s.get("status") not in ("closed", "finished"):
-        raise InvariantViolationError("La sesión no está en estado closed/finished.")
-
-    if not s.get("closed_at"):
-        raise InvariantViolationError("La sesión no tiene closed_at (snapshot no estable).")
-
-    capacity = int(s.get("capacity") or 0)
-    if capacity <= 0:
-        raise InvariantViolationError("La sesión no tiene capacity válido (>0).")
-
-    return SessionSnapshot(
-        session_id=s["id"],
-        product_id=s["product_id"],
-        session_created_at=_parse_dt(s["created_at"]),
-        session_closed_at=_parse_dt(s["closed_at"]),
-        capacity=capacity,
-        rules_version=s.get("rules_version") or "1.0",
-    )
-
-
-def _load_participants_snapshot(session_id: str) -> List[ParticipantSnapshot]:
-    resp = (
-        table("ca_participants")
-        .select("id, user_id, participations, created_at, session_id")
-        .eq("session_id", session_id)
-        .order("id")
-        .execute()
-    )
-
-    rows = resp.data or []
-    if not rows:
-        raise InvariantViolationError("No hay participantes en la sesión.")
-
-    out: List[ParticipantSnapshot] = []
-    for r in rows:
-        out.append(
-            ParticipantSnapshot(
-                participant_id=r["id"],
-                user_id=r["user_id"],
-                participations=int(r.get("participations") or 1),
-                joined_at=_parse_dt(r["created_at"]),
-            )
-        )
-    return out
-
-
 def _load_db_adjudication(session_id: str) -> Optional[Dict[str, Any]]:
     resp = (
         table("ca_adjudications")
@@ -201,8 +143,8 @@ def build_proof_bundle_for_session(
     db_created_at = str(db_row.get("created_at"))
 
     # Snapshots
-    session_snap = _load_session_snapshot(session_id)
-    participant_snaps = _load_participants_snapshot(session_id)
+    session_snap = load_session_snapshot(session_id)
+    participant_snaps = load_participants_snapshot(session_id)
 
     # Invariantes duras
     if len(participant_snaps) != int(session_snap.capacity):
@@ -225,6 +167,7 @@ def build_proof_bundle_for_session(
         session=session_snap,
         participants=participant_snaps,
         context=ctx,
+        ranking_top_k=ranking_top_k_of(db_ranking),
     )
 
     computed_awarded = str(computed.awarded_participant_id)
@@ -252,6 +195,10 @@ def build_proof_bundle_for_session(
         if mismatches:
             raise ProofBundleError("Mismatch DB vs replay: " + ", ".join(mismatches))
 
+    # Raíz Merkle de entradas (streaming, memoria O(log n)): permite verificar
+    # el bundle sin la lista completa de hojas.
+    participants_merkle_root = compute_participants_merkle_root(participant_snaps)
+
     # Snapshot minimal (audit-friendly, sin datos innecesarios)
     participants_min = [_participant_min(p) for p in participant_snaps] if include_participants else None
 
@@ -266,6 +213,7 @@ def build_proof_bundle_for_session(
             "rules_version": getattr(session_snap, "rules_version", "1.0"),
             "session_created_at": session_snap.session_created_at.astimezone(timezone.utc).isoformat(),
             "session_closed_at": session_snap.session_closed_at.astimezone(timezone.utc).isoformat(),
+            "participants_merkle_root": participants_merkle_root,
         },
         "deterministic_context": {
             "engine_version": ENGINE_VERSION,
@@ -309,3 +257,57 @@ def build_proof_bundle_for_session(
         canonical_json=canonical,
         created_at_utc=bundle_dict["created_at_utc"],
     )
+
+
+# ==========================================================
+# 🔹 API PÚBLICA — PRUEBA DE INCLUSIÓN DE UN PARTICIPANTE
+# ==========================================================
+
+def build_participant_inclusion_proof(
+    session_id: str,
+    participant_id: str,
+    *,
+    ordinal: int = 0,
+) -> Dict[str, Any]:
+    """
+    "¿Se contó mi entrada?": audit path de (participant_id, ordinal) contra
+    el participants_merkle_root persistido en ca_adjudications.ranking.meta.
+
+    El resultado (proof) se puede verificar fuera con
+    engines.merkle.verify_inclusion_proof en O(log n) hashes.
+    Si existe side-car de hojas (manifest.v2) se genera desde el fichero
+    (mmap) sin cargar participantes.
+    """
+    db_row = _load_db_adjudication(session_id)
+    if not db_row:
+        raise ProofBundleError("No existe adjudicación persistida para esta sesión (ca_adjudications).")
+
+    ranking = db_row.get("ranking")
+    meta = ranking.get("meta") if isinstance(ranking, dict) else None
+    stored_root = (meta or {}).get("participants_merkle_root")
+    if not stored_root:
+        raise ProofBundleError("La adjudicación no tiene participants_merkle_root (ranking.meta).")
+
+    sidecar = open_leaves_sidecar(session_id)
+    try:
+        if sidecar is not None:
+            entry_digest = hashlib.sha256(f"{participant_id}:{int(ordinal)}".encode("utf-8")).digest()
+            with sidecar:
+                proof = sidecar.inclusion_proof(entry_digest)
+        else:
+            proof = build_inclusion_proof(
+                participants=load_participants_snapshot(session_id),
+                participant_id=str(participant_id),
+                ordinal=ordinal,
+            )
+    except ValueError as e:
+        raise InvariantViolationError(str(e)) from e
+
+    return {
+        "session_id": session_id,
+        "participant_id": str(participant_id),
+        "ordinal": int(ordinal),
+        "participants_merkle_root": stored_root,
+        "verified": verify_inclusion_proof(proof, stored_root),
+        "proof": proof.to_dict(),
+    }
@@ -0,0 +1,296 @@
+# backend_core/services/adjudication_executor.py
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from backend_core.services.audit_repository import log_event
+from backend_core.services.adjudication_service_pro import (
+    AdjudicationInputs,
+    compute_adjudication,
+    fetch_adjudication_entropy,
+    load_adjudication_inputs,
+    persist_adjudication,
+)
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🔹 EXECUTOR ASÍNCRONO DE ADJUDICACIONES
+#
+# El cierre de una sesión ya no adjudica en línea (drand HTTP + snapshots
+# + 3-4 escrituras): encola un job y sigue. Un event loop asyncio en un
+# hilo propio consume la cola con concurrencia limitada:
+# - etapas load -> drand -> compute -> persist, cada una con su timeout
+#   (el trabajo bloqueante corre en un pool de hilos acotado)
+# - cola acotada: submit() devuelve False si está llena (backpressure);
+#   la sesión queda cerrada y la recoge el worker de adjudicación
+# - una sesión no se encola dos veces mientras está pendiente
+#
+# Un timeout libera el hueco pero no puede matar el hilo: si la etapa
+# termina después, la adjudicación sigue siendo idempotente. El hilo
+# abandonado conserva su plaza del pool hasta terminar:
+# - la espera por un hilo libre no cuenta para el timeout de la etapa
+# - con todas las plazas en hilos abandonados submit() devuelve False
+#   (la sesión la recoge el worker de adjudicación)
+# ==========================================================
+
+ADJUDICATION_CONCURRENCY = int(os.getenv("ADJUDICATION_CONCURRENCY", "4"))
+ADJUDICATION_QUEUE_MAX = int(os.getenv("ADJUDICATION_QUEUE_MAX", "1000"))
+
+STAGES = ("load", "drand", "compute", "persist")
+STAGE_TIMEOUTS_S: Dict[str, float] = {
+    "load": float(os.getenv("ADJUDICATION_TIMEOUT_LOAD_S", "30")),
+    "drand": float(os.getenv("ADJUDICATION_TIMEOUT_DRAND_S", "60")),
+    "compute": float(os.getenv("ADJUDICATION_TIMEOUT_COMPUTE_S", "120")),
+    "persist": float(os.getenv("ADJUDICATION_TIMEOUT_PERSIST_S", "30")),
+}
+
+
+class StageTimeoutError(TimeoutError):
+    def __init__(self, stage: str, timeout_s: float) -> None:
+        super().__init__(f"Etapa '{stage}' superó {timeout_s}s")
+        self.stage = stage
+        self.timeout_s = timeout_s
+
+
+@dataclass
+class AdjudicationJob:
+    session_id: str
+    enqueued_at: float = field(default_factory=time.monotonic)
+
+
+class AsyncAdjudicationExecutor:
+    """
+    Cola acotada + N coroutines consumidoras en un event loop propio.
+    API síncrona (submit / stop / stats) para el engine y los workers.
+    """
+
+    def __init__(
+        self,
+        *,
+        concurrency: int = ADJUDICATION_CONCURRENCY,
+        queue_max: int = ADJUDICATION_QUEUE_MAX,
+        stage_timeouts: Optional[Dict[str, float]] = None,
+    ) -> None:
+        self.concurrency = max(1, concurrency)
+        self.queue_max = max(1, queue_max)
+        self.stage_timeouts = {**STAGE_TIMEOUTS_S, **(stage_timeouts or {})}
+        # Hilos para las etapas bloqueantes (holgura para etapas abandonadas por timeout)
+        self.pool_size = self.concurrency * 2
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: list = []
+        self._ready = threading.Event()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        # Plazas del pool (una por hilo) y etapas abandonadas aún en ejecución
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._abandoned = 0
+        self._pending: set = set()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Any] = {
+            "submitted": 0,
+            "rejected": 0,
+            "duplicates": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": {stage: 0 for stage in STAGES},
+            "in_flight": 0,
+            "queue_wait_s_max": 0.0,
+            "run_s_max": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # API (síncrona, thread-safe)
+    # ------------------------------------------------------------------
+
+    def start(self) -> "AsyncAdjudicationExecutor":
+        with self._lock:
+            if self._thread is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix="adjudication")
+                self._ready = threading.Event()
+                self._thread = threading.Thread(target=self._run_loop, name="adjudication-executor", daemon=True)
+                self._thread.start()
+        self._ready.wait()
+        return self
+
+    def submit(self, session_id: str) -> bool:
+        """
+        Encola la adjudicación. False = cola llena o pool agotado por etapas
+        abandonadas (backpressure). Una sesión ya pendiente cuenta como aceptada.
+        """
+        self.start()
+        with self._lock:
+            if session_id in self._pending:
+                self._stats["duplicates"] += 1
+                return True
+            if len(self._pending) >= self.queue_max or self._abandoned >= self.pool_size:
+                self._stats["rejected"] += 1
+                return False
+            self._pending.add(session_id)
+            self._stats["submitted"] += 1
+        self._loop.call_soon_threadsafe(self._queue.put_nowait, AdjudicationJob(session_id))
+        return True
+
+    def join(self, timeout: Optional[float] = None) -> bool:
+        """
+        Espera a que no quede nada pendiente (tests / apagado).
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._pending:
+                    return True
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(0.01)
+
+    def stop(self, drain: bool = True, timeout: Optional[float] = None) -> None:
+        if self._thread is None:
+            return
+        if drain:
+            self.join(timeout)
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout)
+        self._pool.shutdown(wait=False)
+        with self._lock:
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "timeouts": dict(self._stats["timeouts"]),
+                "pending": len(self._pending),
+                "abandoned": self._abandoned,
+                "concurrency": self.concurrency,
+                "queue_max": self.queue_max,
+            }
+
+    # ------------------------------------------------------------------
+    # EVENT LOOP
+    # ------------------------------------------------------------------
+
+    def _run_loop(self) -> None:
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.pool_size)
+        self._workers = [loop.create_task(self._worker()) for _ in range(self.concurrency)]
+        self._ready.set()
+        try:
+            loop.run_forever()
+        finally:
+            loop.close()
+
+    async def _shutdown(self) -> None:
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run_job(job)
+            finally:
+                with self._lock:
+                    self._pending.discard(job.session_id)
+                self._queue.task_done()
+
+    async def _run_job(self, job: AdjudicationJob) -> None:
+        started = time.monotonic()
+        with self._lock:
+            self._stats["in_flight"] += 1
+            self._stats["queue_wait_s_max"] = max(self._stats["queue_wait_s_max"], round(started - job.enqueued_at, 6))
+
+        try:
+            await self._run_stages(job.session_id)
+            outcome = "completed"
+        except StageTimeoutError as e:
+            outcome = "failed"
+            with self._lock:
+                self._stats["timeouts"][e.stage] += 1
+            log_event(
+                event_type="session_adjudication_timeout",
+                session_id=job.session_id,
+                payload={"stage": e.stage, "timeout_s": e.timeout_s},
+            )
+        except Exception as e:
+            outcome = "failed"
+            logger.exception("Adjudication failed for session %s", job.session_id)
+            log_event(
+                event_type="session_adjudication_failed",
+                session_id=job.session_id,
+                payload={"error": str(e)},
+            )
+
+        with self._lock:
+            self._stats["in_flight"] -= 1
+            self._stats[outcome] += 1
+            self._stats["run_s_max"] = max(self._stats["run_s_max"], round(time.monotonic() - started, 6))
+
+    async def _run_stages(self, session_id: str) -> Dict[str, Any]:
+        """
+        Mismas etapas que adjudicate_session_pro, cada una en el pool de
+        hilos con su timeout (el loop nunca se bloquea).
+        """
+        loop = asyncio.get_running_loop()
+
+        async def call(stage: str, fn: Callable, args: tuple) -> Any:
+            timeout = self.stage_timeouts[stage]
+            # Con plaza hay hilo libre: el timeout sólo mide la ejecución
+            await self._slots.acquire()
+            future = loop.run_in_executor(self._pool, fn, *args)
+            future.add_done_callback(lambda _: self._slots.release())
+            try:
+                # shield: el timeout no cancela el future, la plaza se libera al terminar el hilo
+                return await asyncio.wait_for(asyncio.shield(future), timeout)
+            except asyncio.TimeoutError:
+                self._abandon(future)
+                raise StageTimeoutError(stage, timeout) from None
+
+        inputs = await call("load", load_adjudication_inputs, (session_id,))
+        if not isinstance(inputs, AdjudicationInputs):
+            return inputs
+        entropy = await call("drand", fetch_adjudication_entropy, (inputs,))
+        result = await call("compute", compute_adjudication, (inputs, entropy))
+        return await call("persist", persist_adjudication, (inputs, result))
+
+    def _abandon(self, future: "asyncio.Future") -> None:
+        with self._lock:
+            self._abandoned += 1
+
+        def finished(f: "asyncio.Future") -> None:
+            if not f.cancelled():
+                f.exception()  # el job ya se dio por fallido: no registrar "never retrieved"
+            with self._lock:
+                self._abandoned -= 1
+
+        future.add_done_callback(finished)
+
+
+# ==========================================================
+# 🔹 INSTANCIA COMPARTIDA
+# ==========================================================
+
+_default_executor: Optional[AsyncAdjudicationExecutor] = None
+_default_lock = threading.Lock()
+
+
+def get_adjudication_executor() -> AsyncAdjudicationExecutor:
+    global _default_executor
+    with _default_lock:
+        if _default_executor is None:
+            _default_executor = AsyncAdjudicationExecutor()
+        return _default_executor
@@ -0,0 +1,205 @@
+# backend_core/services/adjudication_fanout.py
+from __future__ import annotations
+
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from backend_core.services.adjudication_service_pro import adjudicate_session_pro
+from backend_core.services.adjudication_job_queue import (
+    MAX_ATTEMPTS,
+    claim_adjudication_jobs,
+    complete_adjudication_job,
+    fail_adjudication_job,
+    reschedule_adjudication_job,
+)
+from backend_core.services.drand_provider import DrandRoundNotAvailable
+from backend_core.services.worker_shards import default_worker_id
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🔹 FAN-OUT DE ADJUDICACIONES
+#
+# Un lote reclamado en la cola (services/adjudication_job_queue) se reparte
+# entre ejecutores con la misma ruta de código:
+# - serial: en el proceso actual (worker clásico, tests)
+# - local: pool de procesos (máquina Linux sin Modal, benchmarks)
+# - modal: Function.map de Modal (un contenedor por job)
+#
+# Cada job es autónomo (adjudica + complete/fail con el mismo worker_id
+# del claim), así que el orden de los resultados no importa y un fallo
+# no afecta al resto del lote.
+#
+#   ADJUDICATION_FANOUT=serial|local|modal
+#   ADJUDICATION_FANOUT_WORKERS=8            (pool local)
+#   ADJUDICATION_FANOUT_BATCH=200            (jobs reclamados por lote)
+# ==========================================================
+
+ADJUDICATION_FANOUT = os.getenv("ADJUDICATION_FANOUT", "serial")
+ADJUDICATION_FANOUT_WORKERS = int(os.getenv("ADJUDICATION_FANOUT_WORKERS", str(os.cpu_count() or 4)))
+ADJUDICATION_FANOUT_BATCH = int(os.getenv("ADJUDICATION_FANOUT_BATCH", "200"))
+
+JOB_PROCESSED = "processed"
+JOB_RETRY = "retry"
+JOB_DEAD = "dead"
+JOB_RESCHEDULED = "rescheduled"
+
+
+# ==========================================================
+# 🔹 JOB (función de módulo: serializable para procesos / Modal)
+# ==========================================================
+
+def run_claimed_adjudication(session_id: str, attempts: int, worker_id: str) -> Dict[str, Any]:
+    """
+    Adjudica un job ya reclamado por `worker_id` y registra el resultado
+    en la cola. Nunca lanza: devuelve {"session_id", "outcome", "error"}.
+    """
+    # Intentos anteriores sin resultado (worker caído a mitad): no insistir
+    if attempts > MAX_ATTEMPTS:
+        fail_adjudication_job(session_id, worker_id, attempts, "Intentos agotados sin resultado registrado")
+        return {"session_id": session_id, "outcome": JOB_DEAD, "error": None}
+
+    try:
+        adjudicate_session_pro(session_id)
+    except DrandRoundNotAvailable as e:
+        # Aún no toca: sin intento gastado ni evento de fallo
+        try:
+            reschedule_adjudication_job(session_id, worker_id, attempts, e.round_time_utc)
+        except Exception:
+            logger.exception("No se pudo aplazar %s", session_id)
+        return {"session_id": session_id, "outcome": JOB_RESCHEDULED, "error": None}
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        try:
+            outcome = fail_adjudication_job(session_id, worker_id, attempts, error)
+        except Exception:
+            # El lease caducará y otro worker lo reintentará
+            logger.exception("No se pudo registrar el fallo de %s", session_id)
+            outcome = "retry"
+        return {"session_id": session_id, "outcome": JOB_DEAD if outcome == "dead" else JOB_RETRY, "error": error}
+
+    # Marcar sesión como adjudicada (idempotencia dura) y cerrar el job
+    try:
+        complete_adjudication_job(session_id, worker_id)
+    except Exception as e:
+        # Adjudicada pero sin cerrar el job: el lease caducará y el reintento
+        # será idempotente (ALREADY_ADJUDICATED)
+        logger.exception("No se pudo cerrar el job de %s", session_id)
+        return {"session_id": session_id, "outcome": JOB_RETRY, "error": f"{type(e).__name__}: {e}"}
+    return {"session_id": session_id, "outcome": JOB_PROCESSED, "error": None}
+
+
+# ==========================================================
+# 🔹 EJECUTORES
+#
+# map(fn, items, **kwargs) -> resultados de fn(*item, **kwargs), en
+# cualquier orden. `items` son tuplas de argumentos posicionales.
+# ==========================================================
+
+class SerialFanOut:
+    name = "serial"
+
+    def map(self, fn: Callable[..., Any], items: Iterable[tuple], **kwargs: Any) -> Iterator[Any]:
+        for args in items:
+            yield fn(*args, **kwargs)
+
+
+class LocalProcessFanOut:
+    """
+    Pool de procesos local. `fn` debe ser una función de módulo.
+    """
+
+    name = "local"
+
+    def __init__(self, max_workers: int = ADJUDICATION_FANOUT_WORKERS) -> None:
+        self.max_workers = max(1, max_workers)
+
+    def map(self, fn: Callable[..., Any], items: Iterable[tuple], **kwargs: Any) -> Iterator[Any]:
+        items = list(items)
+        if not items:
+            return iter(())
+        call = partial(_apply, partial(fn, **kwargs))
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(items))) as pool:
+            # chunksize > 1 amortiza el IPC en lotes grandes
+            chunksize = max(1, len(items) // (self.max_workers * 4))
+            return iter(list(pool.map(call, items, chunksize=chunksize)))
+
+
+class ModalFanOut:
+    """
+    Reparte sobre una Function de Modal que envuelve la misma `fn`
+    (ver modal/adjudication_app.adjudicate_job): cada job corre en su
+    propio contenedor.
+    """
+
+    name = "modal"
+
+    def __init__(self, remote_fn: Any) -> None:
+        self.remote_fn = remote_fn
+
+    def map(self, fn: Callable[..., Any], items: Iterable[tuple], **kwargs: Any) -> Iterator[Any]:
+        items = list(items)
+        if not items:
+            return iter(())
+        columns = list(zip(*items))
+        return iter(self.remote_fn.map(*columns, kwargs=kwargs, order_outputs=False))
+
+
+def _apply(fn: Callable[..., Any], args: tuple) -> Any:
+    return fn(*args)
+
+
+def get_fanout_executor(kind: Optional[str] = None, **kwargs: Any) -> Any:
+    kind = kind or ADJUDICATION_FANOUT
+    if kind == "serial":
+        return SerialFanOut()
+    if kind == "local":
+        return LocalProcessFanOut(**kwargs)
+    if kind == "modal":
+        if "remote_fn" not in kwargs:
+            raise ValueError("ADJUDICATION_FANOUT=modal requiere remote_fn (Function de Modal)")
+        return ModalFanOut(**kwargs)
+    raise ValueError(f"ADJUDICATION_FANOUT desconocido: {kind}")
+
+
+# ==========================================================
+# 🔹 LOTE
+# ==========================================================
+
+def run_adjudication_batch(
+    limit: int = ADJUDICATION_FANOUT_BATCH,
+    *,
+    worker_id: Optional[str] = None,
+    executor: Any = None,
+) -> Dict[str, Any]:
+    """
+    Reclama hasta `limit` jobs y los reparte en el ejecutor.
+    """
+    now = datetime.now(timezone.utc).isoformat()
+    worker_id = worker_id or default_worker_id()
+    executor = executor or get_fanout_executor()
+
+    jobs = claim_adjudication_jobs(worker_id, limit)
+    items = [(job["id"], int(job.get("adjudication_attempts") or 0)) for job in jobs]
+
+    results: List[Dict[str, Any]] = list(executor.map(run_claimed_adjudication, items, worker_id=worker_id))
+    by_outcome: Dict[str, List[str]] = {JOB_PROCESSED: [], JOB_RETRY: [], JOB_DEAD: [], JOB_RESCHEDULED: []}
+    for result in results:
+        by_outcome[result["outcome"]].append(result["session_id"])
+
+    return {
+        "timestamp": now,
+        "worker_id": worker_id,
+        "executor": executor.name,
+        "claimed": len(jobs),
+        "processed": by_outcome[JOB_PROCESSED],
+        "retrying": by_outcome[JOB_RETRY],
+        "rescheduled": by_outcome[JOB_RESCHEDULED],
+        "dead_lettered": by_outcome[JOB_DEAD],
+        "errors": [{"session_id": r["session_id"], "error": r["error"]} for r in results if r["error"]],
+        "processed_count": len(by_outcome[JOB_PROCESSED]),
+    }
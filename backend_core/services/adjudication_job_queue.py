@@ -0,0 +1,304 @@
+# backend_core/services/adjudication_job_queue.py
+from __future__ import annotations
+
+import logging
+import os
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+
+from backend_core.services.supabase_client import table, supabase
+from backend_core.services.audit_repository import log_event
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🔹 COLA DE JOBS DE ADJUDICACIÓN (sobre ca_sessions)
+#
+# Cada sesión cerrada sin adjudicated_at es un job. Antes el worker cogía
+# siempre las primeras por closed_at y una sesión que fallaba se
+# reintentaba en cabeza para siempre. Ahora:
+# - claim atómico con lease (claimed_by / claimed_until): varios workers
+#   drenan la cola en paralelo sin pisarse
+# - intentos: se cuentan al reclamar (un worker que muere a mitad también
+#   consume intento)
+# - backoff exponencial entre intentos (next_attempt_at)
+# - dead-letter tras ADJUDICATION_JOB_MAX_ATTEMPTS: sale de la cola y se
+#   audita; requeue_dead_adjudication_job la devuelve a mano
+# - una sesión recién cerrada no es job hasta CLAIM_MIN_AGE_S después del
+#   cierre (Δ drand + un periodo + margen): antes su round no existe y la
+#   adjudica el DrandRoundScheduler del proceso que la cerró. Si aun así el
+#   round no ha salido, reschedule_adjudication_job la aplaza sin gastar
+#   intento
+#
+#   alter table ca_sessions
+#     add column adjudication_job_status text,          -- null/pending | claimed | done | dead
+#     add column adjudication_attempts int not null default 0,
+#     add column adjudication_claimed_by text,
+#     add column adjudication_claimed_until timestamptz,
+#     add column adjudication_next_attempt_at timestamptz,
+#     add column adjudication_last_error text;
+#
+# Claim preferente por RPC (una sentencia, FOR UPDATE SKIP LOCKED):
+#   create function ca_claim_adjudication_jobs(p_worker text, p_limit int, p_lease_seconds int,
+#                                              p_min_age_seconds int)
+#   returns setof ca_sessions as $$
+#     update ca_sessions s set
+#       adjudication_job_status = 'claimed',
+#       adjudication_attempts = s.adjudication_attempts + 1,
+#       adjudication_claimed_by = p_worker,
+#       adjudication_claimed_until = now() + make_interval(secs => p_lease_seconds)
+#     where s.id in (
+#       select id from ca_sessions
+#       where status = 'closed' and adjudicated_at is null
+#         and closed_at <= now() - make_interval(secs => p_min_age_seconds)
+#         and coalesce(adjudication_job_status, 'pending') <> 'dead'
+#         and (adjudication_next_attempt_at is null or adjudication_next_attempt_at <= now())
+#         and (adjudication_claimed_until is null or adjudication_claimed_until < now())
+#       order by adjudication_next_attempt_at nulls first, closed_at
+#       limit p_limit
+#       for update skip locked
+#     )
+#     returning s.*;
+#   $$ language sql volatile;
+# Sin RPC: compare-and-swap por fila vía PostgREST (attempts + lease).
+# ==========================================================
+
+CLAIM_RPC = "ca_claim_adjudication_jobs"
+
+JOB_STATUS_CLAIMED = "claimed"
+JOB_STATUS_DONE = "done"
+JOB_STATUS_DEAD = "dead"
+
+MAX_ATTEMPTS = int(os.getenv("ADJUDICATION_JOB_MAX_ATTEMPTS", "5"))
+BACKOFF_BASE_S = int(os.getenv("ADJUDICATION_JOB_BACKOFF_BASE_SECONDS", "30"))
+BACKOFF_MAX_S = int(os.getenv("ADJUDICATION_JOB_BACKOFF_MAX_SECONDS", "3600"))
+LEASE_S = int(os.getenv("ADJUDICATION_JOB_LEASE_SECONDS", "300"))
+# Edad mínima del cierre para reclamar: DRAND_NOT_BEFORE_DELAY_SECONDS + un
+# periodo drand (30 s si no se fija DRAND_PERIOD_SECONDS) + margen
+CLAIM_MIN_AGE_S = int(os.getenv(
+    "ADJUDICATION_JOB_MIN_AGE_SECONDS",
+    str(int(os.getenv("DRAND_NOT_BEFORE_DELAY_SECONDS", "30")) + int(os.getenv("DRAND_PERIOD_SECONDS") or "30") + 30),
+))
+
+JOB_COLUMNS = (
+    "id, status, closed_at, adjudicated_at, adjudication_job_status, adjudication_attempts, "
+    "adjudication_claimed_by, adjudication_claimed_until, adjudication_next_attempt_at"
+)
+
+# None = aún no probado; False = la RPC no existe en este entorno
+_claim_rpc_available: Optional[bool] = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def backoff_seconds(attempts: int) -> int:
+    """
+    Espera antes del siguiente intento tras `attempts` fallos (1, 2, ...).
+    """
+    return min(BACKOFF_BASE_S * (2 ** max(0, attempts - 1)), BACKOFF_MAX_S)
+
+
+# ==========================================================
+# 🔹 CLAIM
+# ==========================================================
+
+def claim_adjudication_jobs(worker_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Reclama hasta `limit` jobs listos. Cada fila devuelta es propiedad del
+    worker hasta adjudication_claimed_until.
+    """
+    global _claim_rpc_available
+
+    if _claim_rpc_available is not False:
+        try:
+            rows = supabase.rpc(
+                CLAIM_RPC,
+                {
+                    "p_worker": worker_id,
+                    "p_limit": limit,
+                    "p_lease_seconds": LEASE_S,
+                    "p_min_age_seconds": CLAIM_MIN_AGE_S,
+                },
+            ).execute().data or []
+            _claim_rpc_available = True
+            return rows
+        except Exception:
+            if _claim_rpc_available:
+                raise
+            _claim_rpc_available = False
+
+    return _claim_via_cas(worker_id, limit)
+
+
+def _claim_via_cas(worker_id: str, limit: int) -> List[Dict[str, Any]]:
+    now = _now()
+    now_iso = now.isoformat()
+    candidates = (
+        table("ca_sessions")
+        .select(JOB_COLUMNS)
+        .eq("status", "closed")
+        .is_("adjudicated_at", "null")
+        .lte("closed_at", (now - timedelta(seconds=CLAIM_MIN_AGE_S)).isoformat())
+        # listo = (pendiente y fuera de backoff) o (reclamado con lease caducado)
+        .or_(
+            f'and(adjudication_job_status.is.null,or(adjudication_next_attempt_at.is.null,'
+            f'adjudication_next_attempt_at.lte."{now_iso}")),'
+            f'and(adjudication_job_status.eq.{JOB_STATUS_CLAIMED},adjudication_claimed_until.lt."{now_iso}")'
+        )
+        .order("adjudication_next_attempt_at", desc=False, nullsfirst=True)
+        .order("closed_at", desc=False)
+        .limit(limit * 2)
+        .execute()
+        .data
+        or []
+    )
+
+    claimed: List[Dict[str, Any]] = []
+    lease_until = (now + timedelta(seconds=LEASE_S)).isoformat()
+    for row in candidates:
+        if len(claimed) >= limit:
+            break
+        attempts = int(row.get("adjudication_attempts") or 0)
+        # CAS: attempts sólo sube al reclamar, así que dos workers no pueden ganar la misma fila
+        resp = (
+            table("ca_sessions")
+            .update({
+                "adjudication_job_status": JOB_STATUS_CLAIMED,
+                "adjudication_attempts": attempts + 1,
+                "adjudication_claimed_by": worker_id,
+                "adjudication_claimed_until": lease_until,
+            })
+            .eq("id", row["id"])
+            .eq("adjudication_attempts", attempts)
+            .is_("adjudicated_at", "null")
+            .execute()
+        )
+        if resp.data:
+            claimed.append(resp.data[0])
+    return claimed
+
+
+# ==========================================================
+# 🔹 RESULTADO
+# ==========================================================
+
+def complete_adjudication_job(session_id: str, worker_id: str) -> bool:
+    resp = (
+        table("ca_sessions")
+        .update({
+            "adjudicated_at": _now().isoformat(),
+            "adjudication_job_status": JOB_STATUS_DONE,
+            "adjudication_claimed_by": None,
+            "adjudication_claimed_until": None,
+            "adjudication_last_error": None,
+        })
+        .eq("id", session_id)
+        .eq("adjudication_claimed_by", worker_id)
+        .execute()
+    )
+    return bool(resp.data)
+
+
+def mark_session_adjudicated(session_id: str) -> bool:
+    """
+    Saca la sesión de la cola al persistir su adjudicación, la haga quien
+    la haga (executor, scheduler drand, en línea). El lease, si lo hay, lo
+    libera complete_adjudication_job del worker que la reclamó.
+    """
+    resp = (
+        table("ca_sessions")
+        .update({"adjudicated_at": _now().isoformat(), "adjudication_job_status": JOB_STATUS_DONE})
+        .eq("id", session_id)
+        .is_("adjudicated_at", "null")
+        .execute()
+    )
+    return bool(resp.data)
+
+
+def reschedule_adjudication_job(session_id: str, worker_id: str, attempts: int, not_before: datetime) -> bool:
+    """
+    El round drand de la sesión aún no se ha emitido: no es un fallo. Se
+    devuelve el intento consumido al reclamar y se aplaza hasta `not_before`.
+    """
+    resp = (
+        table("ca_sessions")
+        .update({
+            "adjudication_job_status": None,
+            "adjudication_attempts": max(0, attempts - 1),
+            "adjudication_claimed_by": None,
+            "adjudication_claimed_until": None,
+            "adjudication_next_attempt_at": not_before.astimezone(timezone.utc).isoformat(),
+        })
+        .eq("id", session_id)
+        .eq("adjudication_claimed_by", worker_id)
+        .execute()
+    )
+    return bool(resp.data)
+
+
+def fail_adjudication_job(session_id: str, worker_id: str, attempts: int, error: str) -> str:
+    """
+    Registra el fallo del intento `attempts`. Devuelve el nuevo estado:
+    "retry" (con backoff) o "dead" (dead-letter).
+    """
+    now = _now()
+    dead = attempts >= MAX_ATTEMPTS
+    fields: Dict[str, Any] = {
+        "adjudication_claimed_by": None,
+        "adjudication_claimed_until": None,
+        "adjudication_last_error": error[:2000],
+    }
+    if dead:
+        fields["adjudication_job_status"] = JOB_STATUS_DEAD
+        fields["adjudication_next_attempt_at"] = None
+    else:
+        fields["adjudication_job_status"] = None
+        fields["adjudication_next_attempt_at"] = (now + timedelta(seconds=backoff_seconds(attempts))).isoformat()
+
+    table("ca_sessions").update(fields).eq("id", session_id).eq("adjudication_claimed_by", worker_id).execute()
+
+    log_event(
+        "session_adjudication_dead_lettered" if dead else "session_adjudication_failed",
+        session_id=session_id,
+        extra={"attempts": attempts, "error": error, "next_attempt_at": fields["adjudication_next_attempt_at"]},
+    )
+    return "dead" if dead else "retry"
+
+
+# ==========================================================
+# 🔹 DEAD-LETTER
+# ==========================================================
+
+def list_dead_adjudication_jobs(limit: int = 100) -> List[Dict[str, Any]]:
+    return (
+        table("ca_sessions")
+        .select(JOB_COLUMNS + ", adjudication_last_error")
+        .eq("adjudication_job_status", JOB_STATUS_DEAD)
+        .order("closed_at", desc=False)
+        .limit(limit)
+        .execute()
+        .data
+        or []
+    )
+
+
+def requeue_dead_adjudication_job(session_id: str) -> bool:
+    """
+    Devuelve un job dead-letter a la cola con los intentos a cero.
+    """
+    resp = (
+        table("ca_sessions")
+        .update({
+            "adjudication_job_status": None,
+            "adjudication_attempts": 0,
+            "adjudication_next_attempt_at": None,
+        })
+        .eq("id", session_id)
+        .eq("adjudication_job_status", JOB_STATUS_DEAD)
+        .execute()
+    )
+    if resp.data:
+        log_event("session_adjudication_requeued", session_id=session_id)
+    return bool(resp.data)
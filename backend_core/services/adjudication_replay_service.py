@@ -4,6 +4,10 @@ from dataclasses import dataclass
 from typing import Any, Dict, List, Optional, Tuple
 
 from backend_core.services.supabase_client import table
+from backend_core.services.snapshot_loader import (
+    load_session_snapshot,
+    load_participants_snapshot,
+)
 from backend_core.models.adjudication_models import (
     SessionSnapshot,
     ParticipantSnapshot,
@@ -12,17 +16,22 @@ from backend_core.models.adjudication_models import (
 from backend_core.engines.adjudicator_engine_pro import (
     adjudicate,
     ExternalEntropySnapshot,
+    SUPPORTED_ALGORITHM_IDS,
 )
+from backend_core.services.leaves_sidecar import open_leaves_sidecar
 
 # ==========================================================
 # Replay & Verify PRO (alineado con drand)
 # - Lee adjudicación persistida (ca_adjudications)
-# - Recupera snapshots (ca_sessions + ca_participants)
+# - Recupera snapshots (snapshot_loader: caché de sesiones cerradas)
 # - Recupera drand/entropy:
 #    1) ca_external_entropy (preferente)
 #    2) ranking.meta.drand (fallback)
 # - Re-ejecuta el motor con external_entropy y compara:
 #   awarded_participant_id, inputs_hash, proof_hash, ranking.meta (si aplica)
+# - participants_merkle_root se recalcula en streaming (memoria O(log n))
+# - algorithm_id: se reproduce con el persistido (manifest.v1 o v2); en v2
+#   se verifica además el side-car de hojas (mmap) contra la raíz
 # ==========================================================
 
 ENGINE_VERSION = "3.0.0"
@@ -33,7 +42,7 @@ NORMALIZATION = "stable_sort_by_entry_hash"
 @dataclass(frozen=True)
 class ReplayVerifyReport:
     session_id: str
-    status: str  # VERIFIED | MISMATCH | NO_STORED_ADJUDICATION
+    status: str  # VERIFIED | MISMATCH | NO_STORED_ADJUDICATION | ERROR
     matches: bool
     reason: Optional[str]
 
@@ -75,78 +84,6 @@ def _parse_dt_iso(value) -> str:
 # Carga de datos DB
 # -----------------------------
 
-def _load_session_snapshot(session_id: str) -> SessionSnapshot:
-    resp = (
-        table("ca_sessions")
-        .select("id, product_id, created_at, closed_at, capacity, rules_version, status")
-        .eq("id", session_id)
-        .single()
-        .execute()
-    )
-    s = resp.data
-    if not s:
-        raise ValueError("Sesión no encontrada.")
-
-    if s.get("status") not in ("closed", "finished"):
-        raise ValueError("La sesión no está en estado closed/finished (replay requiere snapshot cerrado).")
-
-    if not s.get("closed_at"):
-        raise ValueError("La sesión no tiene closed_at (snapshot no estable).")
-
-    capacity = int(s.get("capacity") or 0)
-    if capacity <= 0:
-        raise ValueError("La sesión no tiene capacity válido (>0).")
-
-    # SessionSnapshot espera datetime; asumimos que tu modelo hace parse,
-    # pero aquí lo pasamos como string ISO y dejamos que lo resuelva tu modelo.
-    # Si tu SessionSnapshot exige datetime, cambia por tu parse utilitario.
-    from datetime import datetime, timezone
-    def _parse_dt(v):
-        if isinstance(v, datetime):
-            return v.astimezone(timezone.utc)
-        return datetime.fromisoformat(str(v).replace("Z", "+00:00")).astimezone(timezone.utc)
-
-    return SessionSnapshot(
-        session_id=str(s["id"]),
-        product_id=str(s["product_id"]),
-        session_created_at=_parse_dt(s["created_at"]),
-        session_closed_at=_parse_dt(s["closed_at"]),
-        capacity=capacity,
-        rules_version=s.get("rules_version") or "1.0",
-    )
-
-
-def _load_participants_snapshot(session_id: str) -> List[ParticipantSnapshot]:
-    resp = (
-        table("ca_participants")
-        .select("id, user_id, participations, created_at, session_id")
-        .eq("session_id", session_id)
-        .order("id")
-        .execute()
-    )
-    rows = resp.data or []
-    if not rows:
-        raise ValueError("No hay participantes en la sesión.")
-
-    from datetime import datetime, timezone
-    def _parse_dt(v):
-        if isinstance(v, datetime):
-            return v.astimezone(timezone.utc)
-        return datetime.fromisoformat(str(v).replace("Z", "+00:00")).astimezone(timezone.utc)
-
-    out: List[ParticipantSnapshot] = []
-    for r in rows:
-        out.append(
-            ParticipantSnapshot(
-                participant_id=str(r["id"]),
-                user_id=str(r["user_id"]),
-                participations=int(r.get("participations") or 1),
-                joined_at=_parse_dt(r["created_at"]),
-            )
-        )
-    return out
-
-
 def _load_stored_adjudication(session_id: str) -> Optional[Dict[str, Any]]:
     resp = (
         table("ca_adjudications")
@@ -217,12 +154,23 @@ def _to_entropy_snapshot(drand_dict: Dict[str, Any]) -> ExternalEntropySnapshot:
 # Comparación
 # -----------------------------
 
-def _compare(stored: Dict[str, Any], computed: Any) -> Tuple[bool, Optional[str]]:
+def _stored_merkle_root(ranking: Any) -> Optional[str]:
+    if not isinstance(ranking, dict):
+        return None
+    return (ranking.get("meta") or {}).get("participants_merkle_root")
+
+
+def _compare(
+    stored: Dict[str, Any],
+    computed: Any,
+    computed_merkle_root: Optional[str] = None,
+) -> Tuple[bool, Optional[str]]:
     """
     Comparación mínima (legal-grade):
     - awarded
     - inputs_hash
     - proof_hash
+    - participants_merkle_root (si ranking.meta lo trae)
     Opcional: puedes endurecer a ranking completo si lo deseas.
     """
     stored_awarded = str(stored.get("winner_participant_id"))  # legacy DB column
@@ -241,6 +189,10 @@ def _compare(stored: Dict[str, Any], computed: Any) -> Tuple[bool, Optional[str]
     if stored_proof != computed_proof:
         mismatches.append("proof_hash")
 
+    stored_root = _stored_merkle_root(stored.get("ranking"))
+    if stored_root and computed_merkle_root and stored_root != computed_merkle_root:
+        mismatches.append("participants_merkle_root")
+
     if mismatches:
         return False, "Mismatch DB vs replay: " + ", ".join(mismatches)
 
@@ -251,46 +203,72 @@ def _compare(stored: Dict[str, Any], computed: Any) -> Tuple[bool, Optional[str]
 # API principal
 # -----------------------------
 
+def unverified_replay_report(session_id: str, status: str, reason: str) -> ReplayVerifyReport:
+    return ReplayVerifyReport(
+        session_id=session_id,
+        status=status,
+        matches=False,
+        reason=reason,
+        stored_awarded_participant_id=None,
+        computed_awarded_participant_id=None,
+        stored_inputs_hash=None,
+        computed_inputs_hash=None,
+        stored_proof_hash=None,
+        computed_proof_hash=None,
+        engine_version=ENGINE_VERSION,
+        algorithm_id=ALGORITHM_ID,
+        entropy_source=None,
+        drand_round=None,
+        drand_randomness_hex=None,
+        drand_signature_hex=None,
+        drand_public_key_hex=None,
+        drand_round_time_utc=None,
+        notes=None,
+    )
+
+
 def replay_verify_session(session_id: str) -> ReplayVerifyReport:
     stored = _load_stored_adjudication(session_id)
     if not stored:
-        return ReplayVerifyReport(
-            session_id=session_id,
-            status="NO_STORED_ADJUDICATION",
-            matches=False,
-            reason="No existe adjudicación persistida en ca_adjudications para esta sesión.",
-            stored_awarded_participant_id=None,
-            computed_awarded_participant_id=None,
-            stored_inputs_hash=None,
-            computed_inputs_hash=None,
-            stored_proof_hash=None,
-            computed_proof_hash=None,
-            engine_version=ENGINE_VERSION,
-            algorithm_id=ALGORITHM_ID,
-            entropy_source=None,
-            drand_round=None,
-            drand_randomness_hex=None,
-            drand_signature_hex=None,
-            drand_public_key_hex=None,
-            drand_round_time_utc=None,
-            notes=None,
+        return unverified_replay_report(
+            session_id,
+            "NO_STORED_ADJUDICATION",
+            "No existe adjudicación persistida en ca_adjudications para esta sesión.",
         )
 
-    # Snapshots
-    session_snap = _load_session_snapshot(session_id)
-    participants_snap = _load_participants_snapshot(session_id)
+    return replay_verify_loaded(
+        session_id=session_id,
+        stored=stored,
+        session_snap=load_session_snapshot(session_id),
+        participants_snap=load_participants_snapshot(session_id),
+        entropy_row=_load_entropy_from_table(session_id),
+    )
+
 
-    # Context congelado
+def replay_verify_loaded(
+    *,
+    session_id: str,
+    stored: Dict[str, Any],
+    session_snap: SessionSnapshot,
+    participants_snap: List[ParticipantSnapshot],
+    entropy_row: Optional[Dict[str, Any]],
+) -> ReplayVerifyReport:
+    """
+    Replay + comparación con los datos ya cargados (sin consultas a DB).
+    Lo usan replay_verify_session y el barrido en lote.
+    """
+    # Context congelado (algoritmo = el persistido, si está soportado)
+    algorithm_id = str(stored.get("algorithm_id") or ALGORITHM_ID)
+    if algorithm_id not in SUPPORTED_ALGORITHM_IDS:
+        algorithm_id = ALGORITHM_ID
     context = DeterministicContext(
         engine_version=ENGINE_VERSION,
-        algorithm_id=ALGORITHM_ID,
+        algorithm_id=algorithm_id,
         normalization=NORMALIZATION,
     )
 
     # Entropía drand: preferente tabla, fallback ranking JSON
     entropy_source = None
-    entropy_row = _load_entropy_from_table(session_id)
-
     drand_dict = None
     if entropy_row:
         entropy_source = "ca_external_entropy"
@@ -323,7 +301,20 @@ def replay_verify_session(session_id: str) -> ReplayVerifyReport:
         external_entropy=entropy_snapshot,
     )
 
-    matches, reason = _compare(stored, computed)
+    # La raíz ya la calculó el motor al recomputar: no recorrer otra vez las entradas
+    merkle_root = computed.ranking["meta"]["participants_merkle_root"]
+    matches, reason = _compare(stored, computed, merkle_root)
+
+    # Side-car de hojas (manifest.v2): debe reproducir la misma raíz
+    sidecar_status = None
+    sidecar = open_leaves_sidecar(session_id)
+    if sidecar is not None:
+        with sidecar:
+            sidecar_ok = sidecar.count == computed.ranking["meta"]["entries_count"] and sidecar.verify(merkle_root)
+        sidecar_status = "VERIFIED" if sidecar_ok else "MISMATCH"
+        if not sidecar_ok:
+            matches = False
+            reason = (reason + ", " if reason else "Mismatch DB vs replay: ") + "leaves_sidecar"
 
     return ReplayVerifyReport(
         session_id=session_id,
@@ -337,7 +328,7 @@ def replay_verify_session(session_id: str) -> ReplayVerifyReport:
         stored_proof_hash=str(stored.get("proof_hash")),
         computed_proof_hash=str(computed.proof_hash),
         engine_version=ENGINE_VERSION,
-        algorithm_id=ALGORITHM_ID,
+        algorithm_id=algorithm_id,
         entropy_source=entropy_source,
         drand_round=int(drand_dict.get("round")) if drand_dict.get("round") is not None else None,
         drand_randomness_hex=drand_dict.get("randomness_hex"),
@@ -345,6 +336,8 @@ def replay_verify_session(session_id: str) -> ReplayVerifyReport:
         drand_public_key_hex=drand_dict.get("public_key_hex"),
         drand_round_time_utc=drand_dict.get("round_time_utc"),
         notes={
+            "participants_merkle_root": merkle_root,
+            "leaves_sidecar": sidecar_status,
             "db_legacy_column": "winner_participant_id",
             "terminology": "awarded_participant_id (core), winner_participant_id (DB legacy)",
         },
@@ -0,0 +1,305 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from backend_core.services.supabase_client import table
+from backend_core.services.snapshot_loader import load_closed_snapshots
+from backend_core.services.adjudication_replay_service import (
+    ReplayVerifyReport,
+    unverified_replay_report,
+    replay_verify_loaded,
+)
+
+# ==========================================================
+# 🔹 BARRIDO MASIVO DE REPLAY-VERIFY (auditoría histórica)
+#
+# replay_verify_session hace ~5 consultas por sesión. El barrido:
+# - recorre ca_adjudications por rango de fechas (keyset created_at, session_id)
+#   o una lista explícita de session_ids, en lotes
+# - carga cada lote con consultas IN (adjudicaciones, sesiones,
+#   participantes, ca_external_entropy)
+# - re-ejecuta el motor en paralelo (pool de procesos)
+# - guarda un checkpoint tras cada lote: si se interrumpe, se reanuda
+#   desde el último lote completado
+# ==========================================================
+
+SWEEP_BATCH_SIZE = int(os.getenv("REPLAY_SWEEP_BATCH_SIZE", "100"))
+SWEEP_MAX_WORKERS = int(os.getenv("REPLAY_SWEEP_MAX_WORKERS", "0")) or None
+SWEEP_CHECKPOINT_DIR = os.getenv("REPLAY_SWEEP_CHECKPOINT_DIR", "data/replay_sweeps")
+
+# Máximo de session_ids por estado que se guardan en el checkpoint/resumen
+SWEEP_MAX_LISTED_IDS = 1000
+
+REPORT_STATUSES = ("VERIFIED", "MISMATCH", "NO_STORED_ADJUDICATION", "ERROR")
+
+
+# ==========================================================
+# 🔹 CARGA EN LOTE (DB)
+# ==========================================================
+
+def _list_adjudications_page(
+    *,
+    from_utc: str,
+    to_utc: str,
+    after: Optional[Tuple[str, str]],
+    limit: int,
+) -> List[Dict[str, Any]]:
+    """
+    Página de ca_adjudications en [from_utc, to_utc) ordenada por
+    (created_at, session_id), empezando estrictamente después de `after`.
+    """
+    query = (
+        table("ca_adjudications")
+        .select("*")
+        .gte("created_at", from_utc)
+        .lt("created_at", to_utc)
+    )
+    if after is not None:
+        ts, sid = after
+        query = query.or_(f'created_at.gt."{ts}",and(created_at.eq."{ts}",session_id.gt."{sid}")')
+    resp = query.order("created_at").order("session_id").limit(limit).execute()
+    return resp.data or []
+
+
+def _load_adjudications_by_ids(session_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    resp = table("ca_adjudications").select("*").in_("session_id", list(session_ids)).execute()
+    return {str(r["session_id"]): r for r in (resp.data or [])}
+
+
+def _load_entropy_rows(session_ids: Sequence[str]) -> Dict[str, Dict[str, Any]]:
+    try:
+        resp = table("ca_external_entropy").select("*").in_("session_id", list(session_ids)).execute()
+        return {str(r["session_id"]): r for r in (resp.data or [])}
+    except Exception:
+        # Tabla no existe o no accesible: cada replay usa ranking.meta.drand
+        return {}
+
+
+# ==========================================================
+# 🔹 REPLAY (WORKER)
+# ==========================================================
+
+def _verify_job(job: Tuple[str, Optional[Dict[str, Any]], Any, Optional[Dict[str, Any]]]) -> ReplayVerifyReport:
+    session_id, stored, snapshot, entropy_row = job
+    if not stored:
+        return unverified_replay_report(
+            session_id,
+            "NO_STORED_ADJUDICATION",
+            "No existe adjudicación persistida en ca_adjudications para esta sesión.",
+        )
+    if isinstance(snapshot, Exception):
+        return unverified_replay_report(session_id, "ERROR", f"Snapshot inválido: {snapshot}")
+    try:
+        return replay_verify_loaded(
+            session_id=session_id,
+            stored=stored,
+            session_snap=snapshot.session,
+            participants_snap=list(snapshot.participants),
+            entropy_row=entropy_row,
+        )
+    except Exception as e:
+        return unverified_replay_report(session_id, "ERROR", f"{type(e).__name__}: {e}")
+
+
+def _sweep_workers(max_workers: Optional[int], batch_size: int) -> int:
+    workers = max_workers if max_workers is not None else (os.cpu_count() or 1)
+    return max(1, min(int(workers), batch_size))
+
+
+def _verify_batch(jobs: List[Any], pool: Optional[ProcessPoolExecutor], workers: int) -> List[ReplayVerifyReport]:
+    """
+    pool: el mismo para todo el barrido (None = en este proceso).
+    """
+    if pool is None or len(jobs) <= 1:
+        return [_verify_job(job) for job in jobs]
+    return list(pool.map(_verify_job, jobs, chunksize=max(1, -(-len(jobs) // (workers * 4)))))
+
+
+# ==========================================================
+# 🔹 CHECKPOINT
+# ==========================================================
+
+def _sweep_params(
+    session_ids: Optional[Sequence[str]],
+    from_utc: Optional[str],
+    to_utc: Optional[str],
+) -> Dict[str, Any]:
+    if session_ids is not None:
+        ids_digest = hashlib.sha256("\n".join(session_ids).encode("utf-8")).hexdigest()
+        return {"mode": "session_ids", "count": len(session_ids), "ids_sha256": ids_digest}
+    return {"mode": "date_range", "from_utc": from_utc, "to_utc": to_utc}
+
+
+def default_checkpoint_path(params: Dict[str, Any]) -> str:
+    key = hashlib.sha256(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(SWEEP_CHECKPOINT_DIR, f"sweep-{key}.json")
+
+
+def _load_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_checkpoint(path: str, state: Dict[str, Any]) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _new_state(params: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "params": params,
+        "cursor": None,
+        "done": False,
+        "processed": 0,
+        "batches": 0,
+        "elapsed_s": 0.0,
+        "counts": {status: 0 for status in REPORT_STATUSES},
+        "mismatched_session_ids": [],
+        "error_session_ids": [],
+        "started_at_utc": datetime.now(timezone.utc).isoformat(),
+        "updated_at_utc": None,
+    }
+
+
+def _record(state: Dict[str, Any], reports: List[ReplayVerifyReport]) -> None:
+    for r in reports:
+        state["counts"][r.status] = state["counts"].get(r.status, 0) + 1
+        if r.status == "MISMATCH" and len(state["mismatched_session_ids"]) < SWEEP_MAX_LISTED_IDS:
+            state["mismatched_session_ids"].append(r.session_id)
+        elif r.status == "ERROR" and len(state["error_session_ids"]) < SWEEP_MAX_LISTED_IDS:
+            state["error_session_ids"].append(r.session_id)
+    state["processed"] += len(reports)
+    state["batches"] += 1
+
+
+# ==========================================================
+# 🔹 API
+# ==========================================================
+
+def sweep_replay_verification(
+    *,
+    session_ids: Optional[Sequence[str]] = None,
+    from_utc: Optional[str] = None,
+    to_utc: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    max_workers: Optional[int] = None,
+    checkpoint_path: Optional[str] = None,
+    resume: bool = True,
+    report_path: Optional[str] = None,
+    max_batches: Optional[int] = None,
+) -> Dict[str, Any]:
+    """
+    Verifica por replay todas las adjudicaciones de un rango [from_utc, to_utc)
+    o de una lista de session_ids.
+
+    - batch_size: sesiones por lote (consultas IN + checkpoint por lote)
+    - max_workers: procesos de replay (None = REPLAY_SWEEP_MAX_WORKERS o cpu_count)
+    - checkpoint_path / resume: progreso persistido; con resume=True se
+      continúa desde el último lote completado del mismo barrido
+    - report_path: añade cada ReplayVerifyReport como línea JSON (JSONL)
+    - max_batches: corta tras N lotes (status PARTIAL; se reanuda luego)
+
+    Devuelve el resumen: conteos por estado, throughput y session_ids con
+    MISMATCH / ERROR.
+    """
+    if (session_ids is None) == (from_utc is None or to_utc is None):
+        raise ValueError("Indica session_ids o bien from_utc + to_utc (no ambos).")
+
+    ids = [str(s) for s in session_ids] if session_ids is not None else None
+    batch_size = max(1, int(batch_size or SWEEP_BATCH_SIZE))
+    max_workers = max_workers if max_workers is not None else SWEEP_MAX_WORKERS
+
+    params = _sweep_params(ids, from_utc, to_utc)
+    checkpoint_path = checkpoint_path or default_checkpoint_path(params)
+
+    state = _load_checkpoint(checkpoint_path) if resume else None
+    resumed = state is not None
+    if state is not None and state.get("params") != params:
+        raise ValueError(f"El checkpoint {checkpoint_path} pertenece a otro barrido.")
+    if state is None:
+        state = _new_state(params)
+
+    # Un pool para todo el barrido: los workers se arrancan (e importan
+    # módulos) una vez, no en cada lote
+    workers = _sweep_workers(max_workers, batch_size)
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 and not state["done"] else None
+    try:
+        batches_run = 0
+        while not state["done"] and (max_batches is None or batches_run < max_batches):
+            t0 = time.perf_counter()
+
+            # 1) Siguiente lote + adjudicaciones persistidas
+            if ids is not None:
+                offset = int(state["cursor"] or 0)
+                batch_ids = ids[offset:offset + batch_size]
+                stored_by_id = _load_adjudications_by_ids(batch_ids) if batch_ids else {}
+                next_cursor: Any = offset + len(batch_ids)
+                exhausted = next_cursor >= len(ids)
+            else:
+                after = tuple(state["cursor"]) if state["cursor"] else None
+                rows = _list_adjudications_page(from_utc=from_utc, to_utc=to_utc, after=after, limit=batch_size)
+                batch_ids = [str(r["session_id"]) for r in rows]
+                stored_by_id = {str(r["session_id"]): r for r in rows}
+                next_cursor = [str(rows[-1]["created_at"]), batch_ids[-1]] if rows else state["cursor"]
+                exhausted = len(rows) < batch_size
+
+            # 2) Snapshots + entropía del lote (consultas IN)
+            if batch_ids:
+                with_adjudication = [sid for sid in batch_ids if sid in stored_by_id]
+                snapshots = load_closed_snapshots(with_adjudication) if with_adjudication else {}
+                entropy_rows = _load_entropy_rows(with_adjudication) if with_adjudication else {}
+
+                jobs = [
+                    (sid, stored_by_id.get(sid), snapshots.get(sid), entropy_rows.get(sid))
+                    for sid in batch_ids
+                ]
+                reports = _verify_batch(jobs, pool, workers)
+
+                if report_path:
+                    with open(report_path, "a", encoding="utf-8") as f:
+                        for r in reports:
+                            f.write(json.dumps(asdict(r), sort_keys=True, default=str) + "\n")
+                _record(state, reports)
+
+            # 3) Checkpoint (tras persistir los reports del lote)
+            state["cursor"] = next_cursor
+            state["done"] = exhausted
+            state["elapsed_s"] = round(state["elapsed_s"] + time.perf_counter() - t0, 6)
+            state["updated_at_utc"] = datetime.now(timezone.utc).isoformat()
+            _save_checkpoint(checkpoint_path, state)
+            batches_run += 1
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    elapsed = state["elapsed_s"]
+    return {
+        "status": "COMPLETED" if state["done"] else "PARTIAL",
+        "params": params,
+        "resumed": resumed,
+        "processed": state["processed"],
+        "batches": state["batches"],
+        "counts": dict(state["counts"]),
+        "elapsed_s": elapsed,
+        "sessions_per_s": round(state["processed"] / elapsed, 3) if elapsed > 0 else None,
+        "mismatched_session_ids": list(state["mismatched_session_ids"]),
+        "error_session_ids": list(state["error_session_ids"]),
+        "checkpoint_path": checkpoint_path,
+        "report_path": report_path,
+    }
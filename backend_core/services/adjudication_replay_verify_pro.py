@@ -5,12 +5,17 @@ from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional, Tuple
 
 from backend_core.services.supabase_client import table
+from backend_core.services.snapshot_loader import (
+    InvariantViolationError,
+    load_session_snapshot,
+    load_participants_snapshot,
+)
 from backend_core.models.adjudication_models import (
     SessionSnapshot,
     ParticipantSnapshot,
     DeterministicContext,
 )
-from backend_core.engines.adjudicator_engine_pro import adjudicate
+from backend_core.engines.adjudicator_engine_pro import adjudicate, ranking_top_k_of
 
 
 # ==========================================================
@@ -61,12 +66,6 @@ def _now_utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _parse_dt(value) -> datetime:
-    if isinstance(value, datetime):
-        return value
-    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).astimezone(timezone.utc)
-
-
 def _normalize_ranking(value: Any) -> List[Any]:
     """
     Normaliza ranking para comparaciones estables.
@@ -104,74 +103,9 @@ def _ranking_diff_count(db_ranking: Any, computed_ranking: Any) -> int:
 # 🔹 CARGA SNAPSHOTS (DB → MODELOS INMUTABLES)
 # ==========================================================
 
-class InvariantViolationError(ValueError):
-    """Violación de invariantes: sesión no cerrada, aforo incompleto, etc."""
-
-
-def _load_session_snapshot(session_id: str) -> SessionSnapshot:
-    resp = (
-        table("ca_sessions")
-        .select("id, product_id, created_at, closed_at, capacity, rules_version, status")
-        .eq("id", session_id)
-        .single()
-        .execute()
-    )
-
-    s = resp.data
-    if not s:
-        raise InvariantViolationError("Sesión no encontrada.")
-
-    if s.get("status") not in ("closed", "finished"):
-        raise InvariantViolationError(
-            "La sesión no está en estado cerrado/terminado (closed/finished)."
-        )
-
-    if not s.get("closed_at"):
-        raise InvariantViolationError("La sesión no tiene closed_at (snapshot no estable).")
-
-    capacity = int(s.get("capacity") or 0)
-    if capacity <= 0:
-        raise InvariantViolationError("La sesión no tiene capacity válido (>0).")
-
-    return SessionSnapshot(
-        session_id=s["id"],
-        product_id=s["product_id"],
-        session_created_at=_parse_dt(s["created_at"]),
-        session_closed_at=_parse_dt(s["closed_at"]),
-        capacity=capacity,
-        rules_version=s.get("rules_version") or "1.0",
-    )
-
-
-def _load_participants_snapshot(session_id: str) -> List[ParticipantSnapshot]:
-    resp = (
-        table("ca_participants")
-        .select("id, user_id, participations, created_at, session_id")
-        .eq("session_id", session_id)
-        .order("id")
-        .execute()
-    )
-
-    rows = resp.data or []
-    if not rows:
-        raise InvariantViolationError("No hay participantes en la sesión.")
-
-    participants: List[ParticipantSnapshot] = []
-    for r in rows:
-        participants.append(
-            ParticipantSnapshot(
-                participant_id=r["id"],
-                user_id=r["user_id"],
-                participations=int(r.get("participations") or 1),
-                joined_at=_parse_dt(r["created_at"]),
-            )
-        )
-    return participants
-
-
 def _load_snapshot_bundle(session_id: str) -> Tuple[SessionSnapshot, List[ParticipantSnapshot]]:
-    session_snapshot = _load_session_snapshot(session_id)
-    participants_snapshot = _load_participants_snapshot(session_id)
+    session_snapshot = load_session_snapshot(session_id)
+    participants_snapshot = load_participants_snapshot(session_id)
 
     if len(participants_snapshot) != int(session_snapshot.capacity):
         raise InvariantViolationError(
@@ -274,6 +208,7 @@ def replay_verify_session(session_id: str) -> ReplayVerifyReport:
         session=session_snapshot,
         participants=participants_snapshot,
         context=ctx,
+        ranking_top_k=ranking_top_k_of(db_ranking),
     )
 
     computed_awarded_participant_id = computed.awarded_participant_id
@@ -3,17 +3,17 @@
 from __future__ import annotations
 
 from datetime import datetime, timezone
-from typing import List
 
 from backend_core.services.supabase_client import table
 from backend_core.services.audit_repository import log_event
 
-from backend_core.models.adjudication_models import (
-    SessionSnapshot,
-    ParticipantSnapshot,
-    DeterministicContext,
+from backend_core.services.snapshot_loader import (
+    load_session_snapshot,
+    load_participants_snapshot,
 )
 
+from backend_core.models.adjudication_models import DeterministicContext
+
 from backend_core.engines.adjudicator_engine_pro import adjudicate
 
 
@@ -26,87 +26,6 @@ ALGORITHM_ID = "deterministic_sha256_minhash"
 NORMALIZATION = "stable_sort_by_participant_id"
 
 
-# ==========================================================
-# 🔹 CARGA DE SNAPSHOTS DESDE DB
-# ==========================================================
-
-def _load_session_snapshot(session_id: str) -> SessionSnapshot:
-    """
-    Carga el estado cerrado de la sesión.
-    La sesión DEBE estar cerrada antes de adjudicar.
-    """
-    resp = (
-        table("ca_sessions")
-        .select(
-            "id, product_id, created_at, closed_at, capacity, rules_version, status"
-        )
-        .eq("id", session_id)
-        .single()
-        .execute()
-    )
-
-    data = resp.data
-    if not data:
-        raise ValueError("Sesión no encontrada.")
-
-    if data.get("status") not in ("closed", "finished"):
-        raise ValueError("La sesión no está cerrada para adjudicación.")
-
-    if not data.get("closed_at"):
-        raise ValueError("La sesión no tiene closed_at persistido.")
-
-    return SessionSnapshot(
-        session_id=data["id"],
-        product_id=data["product_id"],
-        session_created_at=_parse_dt(data["created_at"]),
-        session_closed_at=_parse_dt(data["closed_at"]),
-        capacity=data["capacity"],
-        rules_version=data.get("rules_version", "1.0"),
-    )
-
-
-def _load_participants_snapshot(session_id: str) -> List[ParticipantSnapshot]:
-    """
-    Carga la lista cerrada de participantes de la sesión.
-    """
-    resp = (
-        table("ca_participants")
-        .select(
-            "id, user_id, participations, created_at"
-        )
-        .eq("session_id", session_id)
-        .order("id")
-        .execute()
-    )
-
-    rows = resp.data or []
-    if not rows:
-        raise ValueError("No hay participantes en la sesión.")
-
-    snapshots: List[ParticipantSnapshot] = []
-    for r in rows:
-        snapshots.append(
-            ParticipantSnapshot(
-                participant_id=r["id"],
-                user_id=r["user_id"],
-                participations=r.get("participations", 1),
-                joined_at=_parse_dt(r["created_at"]),
-            )
-        )
-
-    return snapshots
-
-
-# ==========================================================
-# 🔹 UTILIDADES
-# ==========================================================
-
-def _parse_dt(value) -> datetime:
-    if isinstance(value, datetime):
-        return value
-    return datetime.fromisoformat(value.replace("Z", "+00:00")).astimezone(timezone.utc)
-
-
 # ==========================================================
 # 🔹 SERVICIO PRINCIPAL DE ADJUDICACIÓN
 # ==========================================================
@@ -125,8 +44,8 @@ def adjudicate_session(session_id: str) -> dict:
     """
 
     # 1️⃣ Snapshots
-    session_snapshot = _load_session_snapshot(session_id)
-    participants_snapshot = _load_participants_snapshot(session_id)
+    session_snapshot = load_session_snapshot(session_id)
+    participants_snapshot = load_participants_snapshot(session_id)
 
     # 2️⃣ Contexto del motor
     context = DeterministicContext(
@@ -1,12 +1,18 @@
 from __future__ import annotations
 
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 
 import os
 
 from backend_core.services.supabase_client import table, supabase
 from backend_core.services.audit_repository import log_event
+from backend_core.services.adjudication_job_queue import mark_session_adjudicated
+from backend_core.services.snapshot_loader import (
+    load_session_snapshot,
+    load_participants_snapshot,
+)
 
 from backend_core.models.adjudication_models import (
     SessionSnapshot,
@@ -16,12 +22,29 @@ from backend_core.models.adjudication_models import (
 
 from backend_core.engines.adjudicator_engine_pro import (
     adjudicate,
+    adjudicate_many,
+    prepare_adjudication,
+    reveal_adjudication,
+    build_ranking_page,
+    AdjudicationCommitment,
     ExternalEntropySnapshot,
+    ALGORITHM_ID_MANIFEST_V2,
+    SUPPORTED_ALGORITHM_IDS,
+    entry_participant_ids,
+)
+from backend_core.services.leaves_sidecar import (
+    open_leaves_sidecar,
+    open_owners_sidecar,
+    owners_sidecar_path,
+    sidecar_path,
+    write_leaves_sidecar,
+    write_owners_sidecar,
 )
 
 from backend_core.services.drand_provider import (
     DrandConfig,
     HttpDrandProvider,
+    get_drand_provider,
 )
 
 # ==========================================================
@@ -29,9 +52,16 @@ from backend_core.services.drand_provider import (
 # ==========================================================
 
 ENGINE_VERSION = "3.0.0"
-ALGORITHM_ID = "deterministic_sha256_mod_with_drand_merkle"
 NORMALIZATION = "stable_sort_by_entry_hash"
 
+# manifest.v1 (lista de hojas embebida) | manifest.v2 (merkle root + side-car binario)
+MANIFEST_VERSION = os.getenv("ADJUDICATION_MANIFEST_VERSION", "v1").lower()
+ALGORITHM_ID = (
+    ALGORITHM_ID_MANIFEST_V2
+    if MANIFEST_VERSION == "v2"
+    else "deterministic_sha256_mod_with_drand_merkle"
+)
+
 # Política drand: first round with time >= closed_at + Δ
 DRAND_BASE_URL = os.getenv("DRAND_BASE_URL", "https://api.drand.sh")
 DRAND_NOT_BEFORE_DELAY_SECONDS = int(os.getenv("DRAND_NOT_BEFORE_DELAY_SECONDS", "30"))
@@ -39,6 +69,19 @@ DRAND_NOT_BEFORE_DELAY_SECONDS = int(os.getenv("DRAND_NOT_BEFORE_DELAY_SECONDS",
 # En modo IP-grade, drand es obligatorio
 REQUIRE_DRAND = os.getenv("REQUIRE_DRAND", "true").lower() in ("1", "true", "yes", "on")
 
+# Modo compacto del motor (buffer de digests en vez de lista hex + dict).
+# No cambia inputs_hash/proof_hash: sólo memoria/tiempo en sesiones grandes.
+COMPACT_ENTRIES = os.getenv("ADJUDICATION_COMPACT_ENTRIES", "false").lower() in ("1", "true", "yes", "on")
+
+# Ranking inline limitado a top-k filas (0 = ranking completo, comportamiento v1).
+# El resto se sirve por páginas con get_ranking_page_pro.
+RANKING_TOP_K = int(os.getenv("ADJUDICATION_RANKING_TOP_K", "0")) or None
+
+# Adjudicación en lote (adjudicate_sessions_pro): procesos del pool
+# (0 = os.cpu_count()) y sesiones por tarea (0 = reparto automático).
+BATCH_MAX_WORKERS = int(os.getenv("ADJUDICATION_BATCH_MAX_WORKERS", "0")) or None
+BATCH_CHUNKSIZE = int(os.getenv("ADJUDICATION_BATCH_CHUNKSIZE", "0")) or None
+
 # ==========================================================
 # 🔹 UTILIDADES
 # ==========================================================
@@ -47,107 +90,228 @@ def _now_utc_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
-def _parse_dt(value) -> datetime:
-    if isinstance(value, datetime):
-        return value.astimezone(timezone.utc)
-    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).astimezone(timezone.utc)
-
-
 # ==========================================================
-# 🔹 CARGA SNAPSHOTS (DB → MODELOS INMUTABLES)
+# 🔹 IDEMPOTENCIA (NO DUPLICAR ADJUDICACIONES)
 # ==========================================================
 
-def _load_session_snapshot(session_id: str) -> SessionSnapshot:
+def _get_existing_adjudication(session_id: str) -> Optional[Dict[str, Any]]:
     resp = (
-        table("ca_sessions")
-        .select("id, product_id, created_at, closed_at, capacity, rules_version, status")
-        .eq("id", session_id)
-        .single()
+        table("ca_adjudications")
+        .select("*")
+        .eq("session_id", session_id)
+        .maybe_single()
         .execute()
     )
+    return resp.data if resp else None
 
-    s = resp.data
-    if not s:
-        raise ValueError("Sesión no encontrada.")
 
-    # La sesión debe estar cerrada para adjudicar
-    if s.get("status") not in ("closed", "finished"):
-        raise ValueError("La sesión no está en estado cerrado/terminado (closed/finished).")
+# ==========================================================
+# 🔹 COMPROMISO AL CIERRE (commit-before-reveal)
+# ==========================================================
 
-    if not s.get("closed_at"):
-        raise ValueError("La sesión no tiene closed_at (snapshot no estable).")
+def _engine_context(algorithm_id: Optional[str] = None) -> DeterministicContext:
+    return DeterministicContext(
+        engine_version=ENGINE_VERSION,
+        algorithm_id=algorithm_id or ALGORITHM_ID,
+        normalization=NORMALIZATION,
+    )
 
-    capacity = int(s.get("capacity") or 0)
-    if capacity <= 0:
-        raise ValueError("La sesión no tiene capacity válido (>0).")
 
-    return SessionSnapshot(
-        session_id=str(s["id"]),
-        product_id=str(s["product_id"]),
-        session_created_at=_parse_dt(s["created_at"]),
-        session_closed_at=_parse_dt(s["closed_at"]),
-        capacity=capacity,
-        rules_version=s.get("rules_version") or "1.0",
+def _load_commitment(session_id: str) -> Optional[Dict[str, Any]]:
+    """
+    Compromiso persistido al cierre (ca_adjudication_commitments), si existe.
+    """
+    try:
+        resp = (
+            table("ca_adjudication_commitments")
+            .select("*")
+            .eq("session_id", session_id)
+            .maybe_single()
+            .execute()
+        )
+        return resp.data if resp else None
+    except Exception:
+        # Tabla no existe o no accesible: se adjudica en una sola fase
+        return None
+
+
+def _usable_commitment(session_id: str, commitment_row: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    El reveal sigue el algorithm_id registrado en el compromiso: cambiar
+    ADJUDICATION_MANIFEST_VERSION entre cierre y adjudicación no lo invalida.
+    Con otro engine_version o un algoritmo que el motor ya no soporta la
+    fase 1 no es reproducible: se descarta (auditado) y se adjudica en una
+    sola fase en vez de fallar en cada reintento.
+    """
+    if not commitment_row:
+        return None
+    algorithm_id = commitment_row.get("algorithm_id")
+    engine_version = commitment_row.get("engine_version")
+    if algorithm_id in SUPPORTED_ALGORITHM_IDS and engine_version == ENGINE_VERSION:
+        return commitment_row
+
+    log_event(
+        event_type="session_commitment_discarded",
+        session_id=session_id,
+        payload={
+            "manifest_commit": commitment_row.get("manifest_commit"),
+            "commitment_algorithm_id": algorithm_id,
+            "commitment_engine_version": engine_version,
+            "algorithm_id": ALGORITHM_ID,
+            "engine_version": ENGINE_VERSION,
+        },
     )
+    return None
 
 
-def _load_participants_snapshot(session_id: str) -> List[ParticipantSnapshot]:
-    resp = (
-        table("ca_participants")
-        .select("id, user_id, participations, created_at, session_id")
-        .eq("session_id", session_id)
-        .order("id")
-        .execute()
+def commit_session_pro(session_id: str) -> Dict[str, Any]:
+    """
+    Fase 1 de la adjudicación, justo tras el cierre de la sesión:
+    - expansión de entradas + Merkle + manifest_commit (lo pesado, sin drand)
+    - persiste el compromiso (ca_adjudication_commitments) ANTES de que exista
+      el round drand que decidirá la adjudicación
+    - vuelca hojas + owners a side-car para que el reveal sea O(1) + ranking
+    Idempotente.
+    """
+    existing = _load_commitment(session_id)
+    if existing:
+        return {"session_id": session_id, "status": "ALREADY_COMMITTED", "manifest_commit": existing.get("manifest_commit")}
+
+    session_snapshot = load_session_snapshot(session_id)
+    participants_snapshot = load_participants_snapshot(session_id)
+
+    prepared = prepare_adjudication(
+        session=session_snapshot,
+        participants=participants_snapshot,
+        context=_engine_context(),
+        compact=True,
     )
+    commitment = prepared.commitment
+    entries = prepared.entries_sorted
 
-    rows = resp.data or []
-    if not rows:
-        raise ValueError("No hay participantes en la sesión.")
-
-    out: List[ParticipantSnapshot] = []
-    for r in rows:
-        out.append(
-            ParticipantSnapshot(
-                participant_id=str(r["id"]),
-                user_id=str(r["user_id"]),
-                participations=int(r.get("participations") or 1),
-                joined_at=_parse_dt(r["created_at"]),
-            )
-        )
-    return out
+    write_leaves_sidecar(sidecar_path(session_id), entries, commitment.participants_merkle_root)
+    write_owners_sidecar(owners_sidecar_path(session_id), entries.owners)
 
+    committed_at = _now_utc_iso()
+    table("ca_adjudication_commitments").insert(
+        {
+            **commitment.to_dict(),
+            "committed_at": committed_at,
+        }
+    ).execute()
 
-# ==========================================================
-# 🔹 IDEMPOTENCIA (NO DUPLICAR ADJUDICACIONES)
-# ==========================================================
+    log_event(
+        event_type="session_commitment_created",
+        session_id=session_id,
+        payload={
+            "manifest_commit": commitment.manifest_commit,
+            "participants_merkle_root": commitment.participants_merkle_root,
+            "entries_count": commitment.entries_count,
+            "algorithm_id": commitment.algorithm_id,
+            "committed_at": committed_at,
+        },
+    )
 
-def _get_existing_adjudication(session_id: str) -> Optional[Dict[str, Any]]:
-    resp = (
-        table("ca_adjudications")
-        .select("*")
-        .eq("session_id", session_id)
-        .maybe_single()
-        .execute()
+    return {
+        "session_id": session_id,
+        "status": "COMMITTED",
+        "manifest_commit": commitment.manifest_commit,
+        "entries_count": commitment.entries_count,
+        "committed_at": committed_at,
+    }
+
+
+def _adjudicate_from_commitment(
+    *,
+    commitment_row: Dict[str, Any],
+    session_snapshot: SessionSnapshot,
+    participants_snapshot: List[ParticipantSnapshot],
+    entropy: ExternalEntropySnapshot,
+):
+    """
+    Fase 2 (reveal): seed + selección con el compromiso del cierre.
+    - Con side-cars: la entrada adjudicada se lee por mmap (O(1)).
+    - Sin side-cars (otro host): se recalcula la fase 1 y se exige que
+      coincida con lo comprometido.
+    """
+    commitment = AdjudicationCommitment.from_dict(commitment_row)
+    if commitment.algorithm_id not in SUPPORTED_ALGORITHM_IDS or commitment.engine_version != ENGINE_VERSION:
+        raise RuntimeError("El compromiso se generó con otro engine_version/algorithm_id.")
+
+    leaves = open_leaves_sidecar(session_snapshot.session_id)
+    owners = open_owners_sidecar(session_snapshot.session_id)
+    if leaves is not None and owners is not None:
+        with leaves, owners:
+            if leaves.count != commitment.entries_count or owners.count != commitment.entries_count:
+                raise RuntimeError("Side-car de hojas/owners inconsistente con el compromiso.")
+            if leaves.root_hex != commitment.participants_merkle_root:
+                raise RuntimeError("Side-car de hojas con raíz distinta a la comprometida.")
+            participant_ids = entry_participant_ids(participants_snapshot)
+
+            def entry_at(idx: int):
+                return leaves.digest_at(idx).hex(), participant_ids[owners.owner_at(idx)]
+
+            return reveal_adjudication(
+                session=session_snapshot,
+                participants=participants_snapshot,
+                commitment=commitment,
+                external_entropy=entropy,
+                entry_at=entry_at,
+                ranking_top_k=RANKING_TOP_K,
+            )
+
+    for sidecar in (leaves, owners):
+        if sidecar is not None:
+            sidecar.close()
+
+    prepared = prepare_adjudication(
+        session=session_snapshot,
+        participants=participants_snapshot,
+        context=_engine_context(commitment.algorithm_id),
+        compact=True,
+    )
+    if prepared.commitment != commitment:
+        raise RuntimeError("La fase 1 recalculada no coincide con el compromiso del cierre.")
+    return reveal_adjudication(
+        session=session_snapshot,
+        participants=participants_snapshot,
+        commitment=commitment,
+        external_entropy=entropy,
+        entry_at=prepared.entry_at,
+        leaves=prepared.entries_sorted if commitment.algorithm_id == ALGORITHM_ID_MANIFEST_V2 else None,
+        ranking_top_k=RANKING_TOP_K,
     )
-    return resp.data if resp else None
 
 
 # ==========================================================
 # 🔹 DRAND (ENTROPÍA PÚBLICA VERIFICABLE)
 # ==========================================================
 
+def drand_not_before(session_closed_at_utc: datetime) -> datetime:
+    """
+    Instante mínimo del round de una sesión: closed_at + Δ.
+    """
+    return session_closed_at_utc.astimezone(timezone.utc) + timedelta(seconds=DRAND_NOT_BEFORE_DELAY_SECONDS)
+
+
+def get_session_drand_provider() -> HttpDrandProvider:
+    """
+    Provider compartido (caché de rounds común a adjudicación y scheduler).
+    """
+    return get_drand_provider(DrandConfig(base_url=DRAND_BASE_URL, timeout_seconds=10))
+
+
 def _get_drand_entropy(session_closed_at_utc: datetime) -> Optional[ExternalEntropySnapshot]:
     """
     Obtiene el primer round drand cuyo timestamp >= closed_at + Δ.
+    El round se calcula sin red y el provider compartido lo cachea (memoria
+    + disco): las sesiones que caen en el mismo round no repiten la petición.
     La verificación de firma/chain (si la añades) debe vivir en el provider o en un verifier externo.
     """
-    cfg = DrandConfig(base_url=DRAND_BASE_URL, timeout_seconds=10)
-    provider = HttpDrandProvider(cfg)
-
-    not_before = session_closed_at_utc.astimezone(timezone.utc) + timedelta(seconds=DRAND_NOT_BEFORE_DELAY_SECONDS)
+    provider = get_session_drand_provider()
 
     try:
-        return provider.get_round_after(not_before_utc=not_before)
+        return provider.get_round_after(not_before_utc=drand_not_before(session_closed_at_utc))
     except Exception:
         if REQUIRE_DRAND:
             raise
@@ -233,16 +397,22 @@ def _persist_manual(
 # 🔹 SERVICIO PRINCIPAL
 # ==========================================================
 
-def adjudicate_session_pro(session_id: str) -> Dict[str, Any]:
+@dataclass(frozen=True)
+class AdjudicationInputs:
     """
-    Orquestación PRO:
-    - Idempotente
-    - Audit-grade
-    - Alineado con documentación IP: drand + manifest_commit + mod N
-    - Terminología externa: awarded
-      (DB legacy: winner_participant_id)
+    Entradas cargadas de una adjudicación (etapa "load").
     """
+    session_id: str
+    session_snapshot: SessionSnapshot
+    participants_snapshot: List[ParticipantSnapshot]
+    commitment_row: Optional[Dict[str, Any]]
+
 
+def load_adjudication_inputs(session_id: str) -> Union[AdjudicationInputs, Dict[str, Any]]:
+    """
+    Etapa "load": idempotencia + snapshots + compromiso del cierre.
+    Si la sesión ya está adjudicada devuelve directamente la respuesta.
+    """
     # 0) Idempotencia
     existing = _get_existing_adjudication(session_id)
     if existing:
@@ -255,29 +425,92 @@ def adjudicate_session_pro(session_id: str) -> Dict[str, Any]:
         }
 
     # 1) Snapshots
-    session_snapshot = _load_session_snapshot(session_id)
-    participants_snapshot = _load_participants_snapshot(session_id)
-
-    # 2) Contexto motor (congelado)
-    context = DeterministicContext(
-        engine_version=ENGINE_VERSION,
-        algorithm_id=ALGORITHM_ID,
-        normalization=NORMALIZATION,
+    return AdjudicationInputs(
+        session_id=session_id,
+        session_snapshot=load_session_snapshot(session_id),
+        participants_snapshot=load_participants_snapshot(session_id),
+        commitment_row=_usable_commitment(session_id, _load_commitment(session_id)),
     )
 
-    # 3) Drand entropy (obligatorio en modo IP-grade)
-    entropy = _get_drand_entropy(session_snapshot.session_closed_at)
+
+def fetch_adjudication_entropy(inputs: AdjudicationInputs) -> Optional[ExternalEntropySnapshot]:
+    """
+    Etapa "drand": entropía pública (obligatoria en modo IP-grade).
+    """
+    entropy = _get_drand_entropy(inputs.session_snapshot.session_closed_at)
     if REQUIRE_DRAND and entropy is None:
         raise RuntimeError("DRAND requerido pero no disponible.")
+    return entropy
 
-    # 4) Motor PRO (puro)
-    result = adjudicate(
-        session=session_snapshot,
-        participants=participants_snapshot,
-        context=context,
+
+def compute_adjudication(inputs: AdjudicationInputs, entropy: Optional[ExternalEntropySnapshot]):
+    """
+    Etapa "compute": motor PRO (puro); reveal sobre el compromiso del
+    cierre si existe.
+    """
+    if inputs.commitment_row:
+        return _adjudicate_from_commitment(
+            commitment_row=inputs.commitment_row,
+            session_snapshot=inputs.session_snapshot,
+            participants_snapshot=inputs.participants_snapshot,
+            entropy=entropy,
+        )
+    return adjudicate(
+        session=inputs.session_snapshot,
+        participants=inputs.participants_snapshot,
+        context=_engine_context(),  # contexto motor (congelado)
         external_entropy=entropy,  # <-- alineación IP
+        compact=COMPACT_ENTRIES,
+        ranking_top_k=RANKING_TOP_K,
+    )
+
+
+def persist_adjudication(inputs: AdjudicationInputs, result) -> Dict[str, Any]:
+    """
+    Etapa "persist": side-car + DB + auditoría.
+    """
+    return _persist_result(
+        session_id=inputs.session_id,
+        result=result,
+        commitment_mode="PRECOMMITTED" if inputs.commitment_row else "INLINE",
     )
 
+
+def adjudicate_session_pro(session_id: str) -> Dict[str, Any]:
+    """
+    Orquestación PRO:
+    - Idempotente
+    - Audit-grade
+    - Alineado con documentación IP: drand + manifest_commit + mod N
+    - Terminología externa: awarded
+      (DB legacy: winner_participant_id)
+
+    Etapas load -> drand -> compute -> persist (el executor asíncrono las
+    ejecuta por separado, con timeout por etapa).
+    """
+    inputs = load_adjudication_inputs(session_id)
+    if not isinstance(inputs, AdjudicationInputs):
+        return inputs
+
+    entropy = fetch_adjudication_entropy(inputs)
+    result = compute_adjudication(inputs, entropy)
+    return persist_adjudication(inputs, result)
+
+
+def _persist_result(*, session_id: str, result, commitment_mode: str) -> Dict[str, Any]:
+    """
+    Side-car (v2) + persistencia (RPC o manual) + auditoría de un resultado del motor.
+    Compartido por la adjudicación individual y la de lote.
+    """
+    # 4b) manifest.v2: las hojas ordenadas van al side-car (antes de persistir,
+    # para que toda adjudicación v2 en DB tenga sus hojas publicadas)
+    if result.leaves is not None:
+        write_leaves_sidecar(
+            sidecar_path(session_id),
+            result.leaves,
+            result.ranking["meta"]["participants_merkle_root"],
+        )
+
     # 5) Persistencia
     # DB schema legacy: winner_participant_id
     winner_participant_id = str(result.awarded_participant_id)
@@ -305,6 +538,9 @@ def adjudicate_session_pro(session_id: str) -> Dict[str, Any]:
             algorithm_id=result.algorithm_id,
         )
 
+    # Fuera de la cola: si no, el worker de adjudicación la volvería a reclamar
+    mark_session_adjudicated(session_id)
+
     # 6) Auditoría (terminología awarded)
     # drand queda embebido en ranking.meta.drand; lo reflejamos también en log_event.
     drand_meta = None
@@ -335,4 +571,95 @@ def adjudicate_session_pro(session_id: str) -> Dict[str, Any]:
         "algorithm_id": result.algorithm_id,
         "drand": drand_meta,
         "persistence_mode": "RPC" if did_rpc else "MANUAL",
+        "commitment_mode": commitment_mode,
+    }
+
+
+def adjudicate_sessions_pro(
+    session_ids: List[str],
+    *,
+    max_workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Adjudica un lote de sesiones cerradas (backlog, reprocesos).
+
+    - La carga de snapshots, drand y la persistencia son I/O y van en serie.
+    - El motor (CPU) se reparte en un pool de procesos con adjudicate_many.
+    - Sesiones ya adjudicadas o con compromiso al cierre van por
+      adjudicate_session_pro (el reveal ya es O(1), no compensa el pool).
+    - Un fallo en una sesión no aborta el lote: queda como status "ERROR".
+
+    Devuelve un dict por sesión, en el mismo orden que session_ids.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(session_ids)
+    jobs = []
+    job_positions: List[int] = []
+
+    for pos, session_id in enumerate(session_ids):
+        try:
+            if _get_existing_adjudication(session_id) or _load_commitment(session_id):
+                results[pos] = adjudicate_session_pro(session_id)
+                continue
+
+            session_snapshot = load_session_snapshot(session_id)
+            participants_snapshot = load_participants_snapshot(session_id)
+            entropy = _get_drand_entropy(session_snapshot.session_closed_at)
+            if REQUIRE_DRAND and entropy is None:
+                raise RuntimeError("DRAND requerido pero no disponible.")
+
+            jobs.append((session_snapshot, participants_snapshot, entropy))
+            job_positions.append(pos)
+        except Exception as e:
+            results[pos] = {"session_id": session_id, "status": "ERROR", "error": str(e)}
+
+    engine_results = adjudicate_many(
+        jobs,
+        context=_engine_context(),
+        max_workers=max_workers if max_workers is not None else BATCH_MAX_WORKERS,
+        chunksize=chunksize if chunksize is not None else BATCH_CHUNKSIZE,
+        compact=COMPACT_ENTRIES,
+        ranking_top_k=RANKING_TOP_K,
+        return_exceptions=True,
+    )
+
+    for pos, result in zip(job_positions, engine_results):
+        session_id = session_ids[pos]
+        try:
+            if isinstance(result, Exception):
+                raise result
+            results[pos] = _persist_result(session_id=session_id, result=result, commitment_mode="INLINE")
+        except Exception as e:
+            results[pos] = {"session_id": session_id, "status": "ERROR", "error": str(e)}
+
+    return results  # type: ignore[return-value]
+
+
+# ==========================================================
+# 🔹 RANKING PAGINADO (dashboards)
+# ==========================================================
+
+def get_ranking_page_pro(session_id: str, offset: int = 0, limit: int = 50) -> Dict[str, Any]:
+    """
+    Página del ranking completo de una sesión adjudicada, recalculada desde
+    la seed persistida (no depende de que el ranking esté entero en DB).
+    """
+    existing = _get_existing_adjudication(session_id)
+    if not existing:
+        raise ValueError("La sesión no tiene adjudicación persistida.")
+
+    participants_snapshot = load_participants_snapshot(session_id)
+    rows = build_ranking_page(
+        participants=participants_snapshot,
+        seed_hex=str(existing["seed"]),
+        awarded_participant_id=str(existing.get("winner_participant_id")),
+        offset=offset,
+        limit=limit,
+    )
+    return {
+        "session_id": session_id,
+        "offset": int(offset),
+        "limit": int(limit),
+        "total": len(participants_snapshot),
+        "rows": rows,
     }
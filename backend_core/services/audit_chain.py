@@ -0,0 +1,428 @@
+# backend_core/services/audit_chain.py
+from __future__ import annotations
+
+import hashlib
+import hmac
+import json
+import logging
+import os
+import socket
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend_core.services.supabase_client import table
+from backend_core.services.audit_writer import AUDIT_LOG_TABLE
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🔹 CADENA DE HASHES DEL AUDIT LOG (tamper-evident)
+#
+# Cada fila de audit_log lleva en extra.chain:
+#   {stream, seq, prev, ts, hash}
+# donde hash = sha256(canonical_json(fila + stream/seq/prev/ts)) y prev es
+# el hash de la fila anterior del mismo stream. Borrar, reordenar o editar
+# una fila rompe la cadena a partir de ese punto.
+#
+# Stream = un escritor (host:pid:arranque). Un stream global entre procesos
+# exigiría serializar todas las escrituras en la DB; por escritor el orden
+# es local y barato, y un proceso hijo (fork) abre su propio stream.
+#
+# Checkpoints: cada AUDIT_CHAIN_CHECKPOINT_EVERY filas o
+# AUDIT_CHAIN_CHECKPOINT_INTERVAL_S (y al apagar) se escribe un evento
+# audit_chain_checkpoint con {stream, seq, hash} firmado con HMAC-SHA256
+# (AUDIT_CHAIN_KEY, obligatoria: sin clave cualquiera con escritura en
+# audit_log podría rehacer cadena y checkpoints, así que no se encadena y
+# el verificador no da por buenos checkpoints sin firma). El verificador
+# guarda el último checkpoint verificado
+# por stream y sólo re-hashea las filas posteriores: el coste crece con
+# las filas nuevas, no con el histórico.
+#
+# Un hueco en seq también aparece si el evento se descartó al escribirlo
+# (cola/spool llenos, insert fallido): ver `dropped` en sus stats. Las
+# copias exactas (mismo stream, seq y hash) que deja el reenvío del
+# shipper tras un fallo entre insert y commit se cuentan y se ignoran.
+# ==========================================================
+
+AUDIT_CHAIN_KEY = os.getenv("AUDIT_CHAIN_KEY", "")
+AUDIT_CHAIN_KEY_ID = os.getenv("AUDIT_CHAIN_KEY_ID", "default")
+AUDIT_CHAIN_CHECKPOINT_EVERY = int(os.getenv("AUDIT_CHAIN_CHECKPOINT_EVERY", "1000"))
+AUDIT_CHAIN_CHECKPOINT_INTERVAL_S = float(os.getenv("AUDIT_CHAIN_CHECKPOINT_INTERVAL_S", "60"))
+AUDIT_CHAIN_VERIFY_STATE_PATH = os.getenv("AUDIT_CHAIN_VERIFY_STATE_PATH", "data/audit_chain_verified.json")
+AUDIT_CHAIN_VERIFY_PAGE = int(os.getenv("AUDIT_CHAIN_VERIFY_PAGE", "1000"))
+
+CHECKPOINT_EVENT = "audit_chain_checkpoint"
+CHAIN_FIELD = "chain"
+GENESIS_HASH = "0" * 64
+
+
+# ==========================================================
+# 🔹 HASHING
+# ==========================================================
+
+def _canonical_json_bytes(obj: Any) -> bytes:
+    return json.dumps(obj, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str).encode("utf-8")
+
+
+def record_hash(row: Dict[str, Any]) -> str:
+    """
+    Hash de una fila encadenada (extra.chain.hash no entra en el cálculo).
+    """
+    extra = dict(row.get("extra") or {})
+    chain = extra.pop(CHAIN_FIELD, None) or {}
+    body = {
+        "event_type": row.get("event_type"),
+        "operator_id": row.get("operator_id"),
+        "session_id": row.get("session_id"),
+        "extra": extra,
+        "stream": chain.get("stream"),
+        "seq": chain.get("seq"),
+        "prev": chain.get("prev"),
+        "ts": chain.get("ts"),
+    }
+    return hashlib.sha256(_canonical_json_bytes(body)).hexdigest()
+
+
+class AuditChainKeyMissing(ValueError):
+    """AUDIT_CHAIN_KEY no configurada: sin firma la cadena no prueba nada."""
+
+
+def _require_key(key: str) -> str:
+    if not key:
+        raise AuditChainKeyMissing("AUDIT_CHAIN_KEY no configurada: la cadena de auditoría exige una clave HMAC.")
+    return key
+
+
+def checkpoint_signature(checkpoint: Dict[str, Any], key: str) -> str:
+    body = {k: checkpoint.get(k) for k in ("stream", "seq", "hash", "signed_at", "key_id")}
+    return hmac.new(key.encode("utf-8"), _canonical_json_bytes(body), hashlib.sha256).hexdigest()
+
+
+def _same_instant(a: Any, b: Any) -> bool:
+    """
+    La DB puede devolver el timestamp con otro formato (zona, decimales).
+    """
+    if a == b:
+        return True
+    try:
+        da = datetime.fromisoformat(str(a).replace("Z", "+00:00"))
+        db = datetime.fromisoformat(str(b).replace("Z", "+00:00"))
+    except ValueError:
+        return False
+    da = da if da.tzinfo else da.replace(tzinfo=timezone.utc)
+    db = db if db.tzinfo else db.replace(tzinfo=timezone.utc)
+    return da == db
+
+
+def _default_stream_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{int(time.time() * 1000)}"
+
+
+# ==========================================================
+# 🔹 ESCRITOR: SELLADO + CHECKPOINTS
+# ==========================================================
+
+class AuditChain:
+    """
+    Encadena las filas de un escritor (thread-safe).
+
+    - seal(row): copia de la fila con extra.chain
+    - checkpoint_if_due() / checkpoint(): fila audit_chain_checkpoint firmada
+    """
+
+    def __init__(
+        self,
+        *,
+        stream: Optional[str] = None,
+        key: str = AUDIT_CHAIN_KEY,
+        key_id: str = AUDIT_CHAIN_KEY_ID,
+        checkpoint_every: int = AUDIT_CHAIN_CHECKPOINT_EVERY,
+        checkpoint_interval_s: float = AUDIT_CHAIN_CHECKPOINT_INTERVAL_S,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.stream = stream or _default_stream_id()
+        self.pid = os.getpid()
+        self._key = _require_key(key)
+        self._key_id = key_id
+        self._checkpoint_every = max(1, checkpoint_every)
+        self._checkpoint_interval_s = checkpoint_interval_s
+        self._clock = clock
+
+        self._lock = threading.Lock()
+        self._seq = 0
+        self._head = GENESIS_HASH
+        self._checkpointed_seq = 0
+        self._last_checkpoint_at = clock()
+
+    def head(self) -> Tuple[int, str]:
+        with self._lock:
+            return self._seq, self._head
+
+    def seal(self, row: Dict[str, Any]) -> Dict[str, Any]:
+        return self.append(row, lambda sealed: sealed)
+
+    def append(self, row: Dict[str, Any], write: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Sella la fila y la entrega a `write` bajo el lock (orden de seq =
+        orden de escritura). seq/head sólo avanzan si la escritura se
+        aceptó: si `write` lanza o devuelve False (spool / cola llenos) la
+        fila no ocupa número y la cadena sigue sin hueco.
+        """
+        # Round-trip JSON: lo que se hashea es exactamente lo que se guarda
+        extra = json.loads(json.dumps(row.get("extra") or {}, default=str))
+        extra.pop(CHAIN_FIELD, None)
+        with self._lock:
+            chain = {"stream": self.stream, "seq": self._seq + 1, "prev": self._head, "ts": row.get("timestamp")}
+            sealed = {**row, "extra": {**extra, CHAIN_FIELD: chain}}
+            chain["hash"] = record_hash(sealed)
+            result = write(sealed)
+            if result is not False:
+                self._seq = chain["seq"]
+                self._head = chain["hash"]
+        return result
+
+    def checkpoint_if_due(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            pending = self._seq - self._checkpointed_seq
+            due = pending >= self._checkpoint_every or (
+                pending > 0 and self._clock() - self._last_checkpoint_at >= self._checkpoint_interval_s
+            )
+        return self.checkpoint() if due else None
+
+    def checkpoint(self) -> Optional[Dict[str, Any]]:
+        """
+        Fila de checkpoint del head actual (None si no hay filas nuevas).
+        """
+        with self._lock:
+            if self._seq == self._checkpointed_seq:
+                return None
+            self._checkpointed_seq = self._seq
+            self._last_checkpoint_at = self._clock()
+            seq, head = self._seq, self._head
+
+        now = datetime.now(timezone.utc).isoformat()
+        checkpoint = {"stream": self.stream, "seq": seq, "hash": head, "signed_at": now, "key_id": self._key_id}
+        checkpoint["signature"] = checkpoint_signature(checkpoint, self._key)
+        return {
+            "event_type": CHECKPOINT_EVENT,
+            "operator_id": None,
+            "session_id": None,
+            "timestamp": now,
+            "extra": checkpoint,
+        }
+
+
+_default_chain: Optional[AuditChain] = None
+_default_lock = threading.Lock()
+
+
+def get_audit_chain() -> AuditChain:
+    """
+    Cadena del proceso; tras un fork el hijo abre un stream nuevo.
+    """
+    global _default_chain
+    with _default_lock:
+        if _default_chain is None or _default_chain.pid != os.getpid():
+            _default_chain = AuditChain()
+        return _default_chain
+
+
+# ==========================================================
+# 🔹 LECTURA (DB)
+# ==========================================================
+
+def _fetch_stream_records(stream: str, after_seq: int, limit: int) -> List[Dict[str, Any]]:
+    resp = (
+        table(AUDIT_LOG_TABLE)
+        .select("*")
+        .eq(f"extra->{CHAIN_FIELD}->>stream", stream)
+        .gt(f"extra->{CHAIN_FIELD}->seq", after_seq)
+        .order(f"extra->{CHAIN_FIELD}->seq")
+        .limit(limit)
+        .execute()
+    )
+    return resp.data or []
+
+
+def _fetch_checkpoints(stream: str, after_seq: int) -> List[Dict[str, Any]]:
+    resp = (
+        table(AUDIT_LOG_TABLE)
+        .select("extra")
+        .eq("event_type", CHECKPOINT_EVENT)
+        .eq("extra->>stream", stream)
+        .gt("extra->seq", after_seq)
+        .order("extra->seq")
+        .execute()
+    )
+    return [r["extra"] for r in (resp.data or []) if r.get("extra")]
+
+
+def _list_checkpoint_streams(since: Optional[str]) -> Tuple[List[str], Optional[str]]:
+    """
+    Streams con checkpoints escritos desde `since` (y el timestamp máximo visto).
+    """
+    query = table(AUDIT_LOG_TABLE).select("timestamp,extra").eq("event_type", CHECKPOINT_EVENT)
+    if since:
+        query = query.gte("timestamp", since)
+    rows = query.order("timestamp").execute().data or []
+    streams = sorted({(r.get("extra") or {}).get("stream") for r in rows} - {None})
+    return streams, (str(rows[-1]["timestamp"]) if rows else since)
+
+
+# ==========================================================
+# 🔹 VERIFICADOR INCREMENTAL
+# ==========================================================
+
+def _load_state(path: Optional[str]) -> Dict[str, Any]:
+    if not path or not os.path.exists(path):
+        return {"streams": {}, "scanned_until": None}
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _save_state(path: Optional[str], state: Dict[str, Any]) -> None:
+    if not path:
+        return
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(state, f, sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class AuditChainVerifier:
+    """
+    Verifica cada stream desde su último checkpoint verificado hasta el
+    último checkpoint escrito. Estado en `state_path` (None = en memoria).
+
+    Estados por stream: VERIFIED, UP_TO_DATE, BROKEN (un checkpoint sin
+    firma también: no se puede dar por verificado).
+    """
+
+    def __init__(
+        self,
+        *,
+        key: str = AUDIT_CHAIN_KEY,
+        state_path: Optional[str] = AUDIT_CHAIN_VERIFY_STATE_PATH,
+        page_size: int = AUDIT_CHAIN_VERIFY_PAGE,
+        fetch_records: Callable[[str, int, int], List[Dict[str, Any]]] = _fetch_stream_records,
+        fetch_checkpoints: Callable[[str, int], List[Dict[str, Any]]] = _fetch_checkpoints,
+        list_streams: Callable[[Optional[str]], Tuple[List[str], Optional[str]]] = _list_checkpoint_streams,
+    ) -> None:
+        self._key = _require_key(key)
+        self._state_path = state_path
+        self._page_size = max(1, page_size)
+        self._fetch_records = fetch_records
+        self._fetch_checkpoints = fetch_checkpoints
+        self._list_streams = list_streams
+        self.state = _load_state(state_path)
+
+    def verify_all(self) -> Dict[str, Any]:
+        """
+        Verifica los streams con checkpoints nuevos y los que quedaron rotos.
+        """
+        streams, scanned_until = self._list_streams(self.state.get("scanned_until"))
+        broken = [s for s, st in self.state["streams"].items() if st.get("broken")]
+        reports = [self.verify_stream(s) for s in sorted(set(streams) | set(broken))]
+        self.state["scanned_until"] = scanned_until
+        _save_state(self._state_path, self.state)
+        return {
+            "ok": all(r["status"] != "BROKEN" for r in reports),
+            "streams": len(reports),
+            "rehashed": sum(r["rehashed"] for r in reports),
+            "broken": [r for r in reports if r["status"] == "BROKEN"],
+            "reports": reports,
+        }
+
+    def verify_stream(self, stream: str) -> Dict[str, Any]:
+        anchor = self.state["streams"].get(stream) or {"seq": 0, "hash": GENESIS_HASH}
+        report: Dict[str, Any] = {
+            "stream": stream,
+            "status": "UP_TO_DATE",
+            "from_seq": anchor["seq"],
+            "verified_seq": anchor["seq"],
+            "rehashed": 0,
+            "duplicates": 0,
+            "reason": None,
+            "at_seq": None,
+        }
+
+        pending = self._fetch_checkpoints(stream, anchor["seq"])
+        for cp in pending:
+            if not cp.get("signature"):
+                return self._broken(stream, anchor, report, "unsigned_checkpoint", cp.get("seq"))
+            if not hmac.compare_digest(str(cp["signature"]), checkpoint_signature(cp, self._key)):
+                return self._broken(stream, anchor, report, "bad_checkpoint_signature", cp.get("seq"))
+        if not pending:
+            return report
+
+        target = int(pending[-1]["seq"])
+        seq, head = int(anchor["seq"]), anchor["hash"]
+        next_cp = 0
+        while seq < target:
+            rows = self._fetch_records(stream, seq, min(self._page_size, target - seq))
+            if not rows:
+                return self._broken(stream, anchor, report, "missing_records", seq + 1)
+            for row in rows:
+                chain = (row.get("extra") or {}).get(CHAIN_FIELD) or {}
+                if chain.get("seq") == seq and chain.get("hash") == head and record_hash(row) == head:
+                    # Reenvío del shipper (entrega al-menos-una-vez): copia exacta
+                    report["duplicates"] += 1
+                    continue
+                if chain.get("seq") != seq + 1:
+                    return self._broken(stream, anchor, report, "sequence_gap", seq + 1)
+                if chain.get("prev") != head:
+                    return self._broken(stream, anchor, report, "broken_link", seq + 1)
+                if not _same_instant(row.get("timestamp"), chain.get("ts")):
+                    return self._broken(stream, anchor, report, "timestamp_mismatch", seq + 1)
+                digest = record_hash(row)
+                report["rehashed"] += 1
+                if digest != chain.get("hash"):
+                    return self._broken(stream, anchor, report, "hash_mismatch", seq + 1)
+                seq, head = seq + 1, digest
+
+                while next_cp < len(pending) and int(pending[next_cp]["seq"]) <= seq:
+                    cp = pending[next_cp]
+                    next_cp += 1
+                    if int(cp["seq"]) != seq or cp.get("hash") != head:
+                        return self._broken(stream, anchor, report, "checkpoint_mismatch", int(cp["seq"]))
+                    # Avance persistido por checkpoint: una pasada larga se reanuda aquí
+                    anchor = {"seq": seq, "hash": head, "signed_at": cp.get("signed_at")}
+                    self.state["streams"][stream] = anchor
+                    _save_state(self._state_path, self.state)
+                if seq >= target:
+                    break
+
+        report["status"] = "VERIFIED"
+        report["verified_seq"] = anchor["seq"]
+        return report
+
+    def _broken(
+        self,
+        stream: str,
+        anchor: Dict[str, Any],
+        report: Dict[str, Any],
+        reason: str,
+        at_seq: Optional[int],
+    ) -> Dict[str, Any]:
+        self.state["streams"][stream] = {**anchor, "broken": {"reason": reason, "at_seq": at_seq}}
+        _save_state(self._state_path, self.state)
+        logger.error("Audit chain %s broken at seq %s: %s", stream, at_seq, reason)
+        report.update(status="BROKEN", reason=reason, at_seq=at_seq, verified_seq=anchor["seq"])
+        return report
+
+
+def verify_audit_chain(state_path: Optional[str] = AUDIT_CHAIN_VERIFY_STATE_PATH) -> Dict[str, Any]:
+    return AuditChainVerifier(state_path=state_path).verify_all()
+
+
+if __name__ == "__main__":
+    summary = verify_audit_chain()
+    print(json.dumps({k: v for k, v in summary.items() if k != "reports"}, indent=2, default=str))
+    raise SystemExit(0 if summary["ok"] else 1)
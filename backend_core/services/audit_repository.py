@@ -1,5 +1,41 @@
+import atexit
+import base64
+import json
+import logging
+import os
 from datetime import datetime
+from typing import Any, Dict, Iterator, Optional, Sequence, Tuple, Union
 from backend_core.services.supabase_client import table
+from backend_core.services.audit_spool import AUDIT_SPOOL_DIR, get_audit_spool
+from backend_core.services.audit_chain import AUDIT_CHAIN_KEY, get_audit_chain
+from backend_core.services.audit_writer import AUDIT_LOG_TABLE, get_audit_writer
+
+logger = logging.getLogger(__name__)
+
+# Cómo se escribe cada evento:
+# - buffered (por defecto): cola en memoria + inserts en lote
+# - spool: fichero local append-only + shipper en lote (no depende de la
+#   DB). Opt-in y sólo con AUDIT_SPOOL_DIR en un volumen persistente
+# - sync: un insert síncrono por evento (comportamiento original)
+AUDIT_LOG_MODE = os.getenv("AUDIT_LOG_MODE", "buffered").lower()
+if AUDIT_LOG_MODE == "spool" and not AUDIT_SPOOL_DIR:
+    logger.error("AUDIT_LOG_MODE=spool needs AUDIT_SPOOL_DIR on a persistent volume: using buffered mode")
+    AUDIT_LOG_MODE = "buffered"
+
+# Cadena de hashes + checkpoints firmados (ver audit_chain). Sin
+# AUDIT_CHAIN_KEY no se activa: una cadena sin firma no prueba nada.
+AUDIT_LOG_CHAIN = os.getenv("AUDIT_LOG_CHAIN", "1") == "1"
+if AUDIT_LOG_CHAIN and not AUDIT_CHAIN_KEY:
+    logger.error("AUDIT_LOG_CHAIN is on but AUDIT_CHAIN_KEY is not set: audit events are NOT hash-chained")
+    AUDIT_LOG_CHAIN = False
+
+# Consultas paginadas (query_audit_logs)
+AUDIT_LOG_PAGE_MAX = int(os.getenv("AUDIT_LOG_PAGE_MAX", "500"))
+AUDIT_LOG_DEFAULT_COLUMNS = ("id", "event_type", "operator_id", "session_id", "timestamp", "extra")
+
+# Spool no disponible (disco de sólo lectura...): se usa la cola en memoria
+_spool_unavailable = False
+_chain_hook_registered = False
 
 
 # ===========================================================
@@ -10,16 +46,169 @@ def log_event(
     event_type: str,
     operator_id: str = None,
     session_id: str = None,
-    extra: dict = None
+    extra: dict = None,
+    *,
+    payload: dict = None,
+    metadata: dict = None,
 ):
-    payload = {
+    """
+    Registra un evento en audit_log. `payload` y `metadata` son alias de
+    `extra` (los usan muchos módulos); si llegan varios se combinan.
+
+    En modo spool/buffered el evento se guarda localmente y se inserta en
+    lote en segundo plano (ver audit_spool / audit_writer); devuelve True
+    si se aceptó. Para enviarlo ya: audit_writer.flush_audit_log().
+
+    Con AUDIT_LOG_CHAIN la fila lleva extra.chain (cadena de hashes del
+    proceso) y cada cierto número de filas se escribe un checkpoint firmado.
+    """
+    details = {}
+    for part in (metadata, payload, extra):
+        if part:
+            details.update(part)
+
+    row = {
         "event_type": event_type,
         "operator_id": operator_id,
         "session_id": session_id,
         "timestamp": datetime.utcnow().isoformat(),
-        "extra": extra or {},
+        "extra": details,
     }
-    return table("audit_log").insert(payload).execute()
+    if not AUDIT_LOG_CHAIN:
+        return _write_row(row)
+
+    chain = get_audit_chain()
+    # La fila descartada (spool / cola llenos, insert fallido) no consume seq
+    result = chain.append(row, _write_row)
+    checkpoint = chain.checkpoint_if_due()
+    if checkpoint is not None:
+        _write_row(checkpoint)
+    _register_chain_checkpoint_hook()
+    return result
+
+
+def _write_row(row: dict):
+    global _spool_unavailable
+    if AUDIT_LOG_MODE == "spool" and not _spool_unavailable:
+        try:
+            return get_audit_spool().append(row)
+        except OSError:
+            _spool_unavailable = True
+            logger.exception("Audit spool unavailable, falling back to in-memory buffer")
+    if AUDIT_LOG_MODE in ("spool", "buffered"):
+        return get_audit_writer().enqueue(row)
+    return table(AUDIT_LOG_TABLE).insert(row).execute()
+
+
+def checkpoint_audit_chain():
+    """
+    Escribe ya un checkpoint del stream de este proceso (si hay filas nuevas).
+    """
+    checkpoint = get_audit_chain().checkpoint()
+    if checkpoint is not None:
+        _write_row(checkpoint)
+    return checkpoint
+
+
+def _register_chain_checkpoint_hook():
+    # Se registra tras la primera escritura: atexit es LIFO, así el
+    # checkpoint final sale antes de que se cierren el spool / la cola.
+    global _chain_hook_registered
+    if not _chain_hook_registered:
+        _chain_hook_registered = True
+        atexit.register(checkpoint_audit_chain)
+
+
+# ===========================================================
+# 🔹 Consulta paginada por cursor (keyset)
+#
+# Orden (timestamp, id) descendente y la página siguiente empieza
+# estrictamente después de la última fila: sin OFFSET, cada página cuesta
+# lo mismo aunque la tabla tenga millones de filas. Requiere índices
+# (timestamp desc, id desc) y, por filtro, (event_type | session_id |
+# operator_id, timestamp desc, id desc).
+# ===========================================================
+
+def encode_audit_cursor(timestamp: str, log_id: Any) -> str:
+    raw = json.dumps([str(timestamp), str(log_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_audit_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        ts, log_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return str(ts), str(log_id)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Cursor de audit log inválido: {cursor!r}") from e
+
+
+def _iso(value: Union[str, datetime, None]) -> Optional[str]:
+    return value.isoformat() if isinstance(value, datetime) else value
+
+
+def query_audit_logs(
+    *,
+    event_type: Union[str, Sequence[str], None] = None,
+    session_id: Optional[str] = None,
+    operator_id: Optional[str] = None,
+    since: Union[str, datetime, None] = None,
+    until: Union[str, datetime, None] = None,
+    columns: Optional[Sequence[str]] = None,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    Página de audit_log, más recientes primero.
+
+    - filtros: event_type (uno o lista), session_id, operator_id,
+      rango [since, until)
+    - columns: proyección (id y timestamp se añaden siempre: forman el cursor)
+    - cursor: `next_cursor` de la página anterior
+
+    Devuelve {"rows", "next_cursor"}; next_cursor es None en la última página.
+    """
+    limit = max(1, min(int(limit), AUDIT_LOG_PAGE_MAX))
+    wanted = list(columns or AUDIT_LOG_DEFAULT_COLUMNS)
+    select = wanted + [c for c in ("id", "timestamp") if c not in wanted]
+
+    query = table(AUDIT_LOG_TABLE).select(",".join(select))
+    if isinstance(event_type, str):
+        query = query.eq("event_type", event_type)
+    elif event_type:
+        query = query.in_("event_type", list(event_type))
+    if session_id:
+        query = query.eq("session_id", session_id)
+    if operator_id:
+        query = query.eq("operator_id", operator_id)
+    if since:
+        query = query.gte("timestamp", _iso(since))
+    if until:
+        query = query.lt("timestamp", _iso(until))
+    if cursor:
+        ts, log_id = decode_audit_cursor(cursor)
+        query = query.or_(f'timestamp.lt."{ts}",and(timestamp.eq."{ts}",id.lt."{log_id}")')
+
+    # Una fila de más para saber si hay página siguiente
+    resp = query.order("timestamp", desc=True).order("id", desc=True).limit(limit + 1).execute()
+    rows = resp.data or []
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_audit_cursor(rows[-1]["timestamp"], rows[-1]["id"])
+    return {"rows": rows, "next_cursor": next_cursor}
+
+
+def iter_audit_logs(page_size: int = AUDIT_LOG_PAGE_MAX, **filters: Any) -> Iterator[Dict[str, Any]]:
+    """
+    Recorre todas las filas que cumplen los filtros, página a página.
+    """
+    cursor = None
+    while True:
+        page = query_audit_logs(limit=page_size, cursor=cursor, **filters)
+        yield from page["rows"]
+        cursor = page["next_cursor"]
+        if cursor is None:
+            return
 
 
 # ===========================================================
@@ -27,6 +216,9 @@ def log_event(
 # ===========================================================
 
 def get_all_logs_for_operator(operator_id: str):
+    """
+    Legacy: todas las filas del operador. Para paginar: query_audit_logs.
+    """
     return (
         table("audit_log")
         .select("*")
@@ -55,6 +247,9 @@ def get_log_details(log_id: str):
 # ===========================================================
 
 def list_audit_logs(limit: int = 200):
+    """
+    Legacy: últimas `limit` filas. Para paginar: query_audit_logs.
+    """
     return (
         table("audit_log")
         .select("*")
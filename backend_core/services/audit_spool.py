@@ -0,0 +1,684 @@
+# backend_core/services/audit_spool.py
+from __future__ import annotations
+
+import atexit
+import fcntl
+import glob
+import json
+import logging
+import os
+import shutil
+import struct
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from backend_core.services.supabase_client import table
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🔹 SPOOL DE AUDITORÍA EN DISCO (SEGMENTOS APPEND-ONLY)
+#
+# log_event escribe en un fichero local (microsegundos) en vez de depender
+# de la latencia de Supabase; un shipper lo vuelca a audit_log en lotes.
+#
+# - Segmentos <seq>.seg de hasta AUDIT_SPOOL_SEGMENT_BYTES; sólo se añade
+#   al último. Registro = cabecera (magic, longitud, crc32) + JSON.
+# - fsync por grupos: un hilo hace fsync cada AUDIT_SPOOL_FSYNC_INTERVAL_S
+#   si hubo escrituras (ventana de pérdida ante caída de la máquina =
+#   ese intervalo; ante caída del proceso no se pierde nada escrito).
+# - Tras una caída, la cola del último segmento se valida con el CRC y se
+#   trunca en el último registro completo.
+# - El shipper guarda en offset.json (escritura atómica + fsync) hasta
+#   dónde ha enviado: al reiniciar continúa desde ahí. Entrega al menos
+#   una vez (un lote enviado sin offset guardado se reenvía).
+# - Los segmentos ya enviados se borran. Si el spool supera
+#   AUDIT_SPOOL_MAX_BYTES sin enviar, los eventos nuevos se descartan y se
+#   cuentan (métricas de backpressure en stats()).
+#
+# Lote envenenado (la DB rechaza una fila: constraint, tamaño...): tras
+# AUDIT_POISON_AFTER_FAILURES fallos seguidos el lote se envía fila a fila;
+# una fila que falla mientras otra posterior entra va al dead-letter
+# (AUDIT_DEAD_LETTER_PATH, JSONL) y el offset la salta. Si fallan todas es
+# la DB (caída): se sigue reintentando sin descartar nada.
+#
+# Un directorio = un proceso (flock). Si está cogido, el proceso usa
+# <dir>-<pid>; los directorios huérfanos de procesos muertos se envían y
+# se borran al arrancar el shipper.
+# ==========================================================
+
+# Sin valor por defecto: el spool sólo tiene sentido en un volumen que
+# sobreviva al proceso (en un contenedor efímero se perdería al redesplegar)
+AUDIT_SPOOL_DIR = os.getenv("AUDIT_SPOOL_DIR", "")
+AUDIT_SPOOL_SEGMENT_BYTES = int(os.getenv("AUDIT_SPOOL_SEGMENT_BYTES", str(16 * 1024 * 1024)))
+AUDIT_SPOOL_MAX_BYTES = int(os.getenv("AUDIT_SPOOL_MAX_BYTES", str(1024 * 1024 * 1024)))
+AUDIT_SPOOL_FSYNC_INTERVAL_S = float(os.getenv("AUDIT_SPOOL_FSYNC_INTERVAL_S", "0.05"))
+AUDIT_SHIP_BATCH_SIZE = int(os.getenv("AUDIT_SHIP_BATCH_SIZE", "500"))
+AUDIT_SHIP_INTERVAL_S = float(os.getenv("AUDIT_SHIP_INTERVAL_S", "1.0"))
+AUDIT_SHIP_MAX_BACKOFF_S = float(os.getenv("AUDIT_SHIP_MAX_BACKOFF_S", "60"))
+AUDIT_POISON_AFTER_FAILURES = int(os.getenv("AUDIT_POISON_AFTER_FAILURES", "3"))
+AUDIT_DEAD_LETTER_PATH = os.getenv("AUDIT_DEAD_LETTER_PATH", "data/audit_dead_letter.jsonl")
+
+RECORD_MAGIC = b"AUD1"
+RECORD_HEADER = struct.Struct(">4sII")  # magic, longitud, crc32(payload)
+SEGMENT_SUFFIX = ".seg"
+OFFSET_FILE = "offset.json"
+READ_CHUNK_BYTES = 1024 * 1024
+LOCK_FILE = ".lock"
+
+# (segmento, byte dentro del segmento)
+SpoolOffset = Tuple[int, int]
+
+
+def encode_record(row: Dict[str, Any]) -> bytes:
+    payload = json.dumps(row, separators=(",", ":"), default=str).encode("utf-8")
+    return RECORD_HEADER.pack(RECORD_MAGIC, len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_records(data: bytes, start: int = 0, limit: Optional[int] = None) -> Tuple[List[Dict[str, Any]], int]:
+    """
+    Decodifica registros desde `start`. Se para en el primer registro
+    incompleto o corrupto (cola rota tras una caída). Devuelve los
+    registros y la posición tras el último válido.
+    """
+    rows: List[Dict[str, Any]] = []
+    pos = start
+    size = len(data)
+    while limit is None or len(rows) < limit:
+        if pos + RECORD_HEADER.size > size:
+            break
+        magic, length, crc = RECORD_HEADER.unpack_from(data, pos)
+        end = pos + RECORD_HEADER.size + length
+        if magic != RECORD_MAGIC or end > size:
+            break
+        payload = data[pos + RECORD_HEADER.size:end]
+        if zlib.crc32(payload) != crc:
+            break
+        try:
+            rows.append(json.loads(payload.decode("utf-8")))
+        except ValueError:
+            break
+        pos = end
+    return rows, pos
+
+
+def _fsync_dir(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class SpoolLockedError(OSError):
+    pass
+
+
+class AuditSpool:
+    """
+    Spool append-only de un proceso (thread-safe).
+    """
+
+    def __init__(
+        self,
+        directory: str = AUDIT_SPOOL_DIR,
+        *,
+        segment_max_bytes: int = AUDIT_SPOOL_SEGMENT_BYTES,
+        max_bytes: int = AUDIT_SPOOL_MAX_BYTES,
+        fsync_interval_s: float = AUDIT_SPOOL_FSYNC_INTERVAL_S,
+    ) -> None:
+        self.directory = directory
+        self.segment_max_bytes = max(1, segment_max_bytes)
+        self.max_bytes = max_bytes
+        self.fsync_interval_s = fsync_interval_s
+
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._closed = False
+        self._stop = threading.Event()
+        self._fsync_thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, Any] = {
+            "appended": 0,
+            "appended_bytes": 0,
+            "dropped": 0,
+            "fsyncs": 0,
+            "recovered_truncated_bytes": 0,
+            "last_fsync_at": None,
+        }
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fh = open(os.path.join(directory, LOCK_FILE), "a+")
+        try:
+            fcntl.flock(self._lock_fh.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self._lock_fh.close()
+            raise SpoolLockedError(f"Spool en uso por otro proceso: {directory}")
+
+        self._committed: SpoolOffset = self._load_offset()
+        segments = self.segments()
+        self._active_seq = segments[-1] if segments else max(1, self._committed[0])
+        self._recover_tail(self._active_seq)
+        # Tamaño de los segmentos cerrados (para pending_bytes sin tocar disco)
+        self._closed_sizes: Dict[int, int] = {
+            seq: os.path.getsize(self._segment_path(seq)) for seq in segments if seq != self._active_seq
+        }
+        self._fh = open(self._segment_path(self._active_seq), "ab")
+        self._active_size = self._fh.tell()
+
+    # ------------------------------------------------------------------
+    # ESCRITURA
+    # ------------------------------------------------------------------
+
+    def append(self, row: Dict[str, Any]) -> bool:
+        """
+        Añade un registro. False = spool lleno (descartado) o cerrado.
+        """
+        record = encode_record(row)
+        with self._lock:
+            if self._closed or self._pending_bytes_locked() + len(record) > self.max_bytes:
+                self._stats["dropped"] += 1
+                return False
+            if self._active_size and self._active_size + len(record) > self.segment_max_bytes:
+                self._roll_locked()
+            self._fh.write(record)
+            # Al SO ya (visible para el shipper); el fsync va por grupos
+            self._fh.flush()
+            self._active_size += len(record)
+            self._dirty = True
+            self._stats["appended"] += 1
+            self._stats["appended_bytes"] += len(record)
+        self._ensure_fsync_thread()
+        return True
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync_locked()
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._fsync_thread is not None:
+            self._fsync_thread.join(1.0)
+        with self._lock:
+            if self._closed:
+                return
+            self._sync_locked()
+            self._fh.close()
+            self._closed = True
+            fcntl.flock(self._lock_fh.fileno(), fcntl.LOCK_UN)
+            self._lock_fh.close()
+
+    # ------------------------------------------------------------------
+    # LECTURA / OFFSETS (shipper)
+    # ------------------------------------------------------------------
+
+    @property
+    def committed_offset(self) -> SpoolOffset:
+        with self._lock:
+            return self._committed
+
+    def read(self, offset: SpoolOffset, max_records: int) -> Tuple[List[Dict[str, Any]], SpoolOffset]:
+        """
+        Hasta `max_records` registros desde `offset` y el offset siguiente.
+        Lee por bloques desde la posición (no el segmento entero).
+        """
+        rows: List[Dict[str, Any]] = []
+        seq, pos = offset
+        with self._lock:
+            active = self._active_seq
+        for segment in self.segments():
+            if segment < seq:
+                continue
+            if segment > seq:
+                seq, pos = segment, 0
+            with open(self._segment_path(segment), "rb") as f:
+                size = os.fstat(f.fileno()).st_size
+                while len(rows) < max_records and pos < size:
+                    f.seek(pos)
+                    data = f.read(READ_CHUNK_BYTES)
+                    chunk, used = decode_records(data, 0, max_records - len(rows))
+                    if not chunk and len(data) < size - pos:
+                        # Registro mayor que el bloque: leer el resto
+                        data += f.read()
+                        chunk, used = decode_records(data, 0, max_records - len(rows))
+                    if not chunk:
+                        break
+                    rows.extend(chunk)
+                    pos += used
+            if len(rows) >= max_records or segment >= active:
+                break
+            if pos < size:
+                # Registro corrupto en un segmento ya cerrado: no se puede avanzar
+                logger.error("Registro corrupto en el spool %s (segmento %s, byte %s)", self.directory, segment, pos)
+                break
+        return rows, (seq, pos)
+
+    def commit(self, offset: SpoolOffset) -> None:
+        """
+        Guarda el offset enviado y borra los segmentos anteriores.
+        """
+        path = os.path.join(self.directory, OFFSET_FILE)
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"segment": offset[0], "position": offset[1]}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+        _fsync_dir(self.directory)
+
+        with self._lock:
+            self._committed = offset
+            active = self._active_seq
+        for segment in self.segments():
+            if segment < offset[0] and segment != active:
+                os.remove(self._segment_path(segment))
+                with self._lock:
+                    self._closed_sizes.pop(segment, None)
+
+    def segments(self) -> List[int]:
+        names = glob.glob(os.path.join(self.directory, f"*{SEGMENT_SUFFIX}"))
+        return sorted(int(os.path.basename(n)[: -len(SEGMENT_SUFFIX)]) for n in names)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = self._pending_bytes_locked()
+            return {
+                **self._stats,
+                "directory": self.directory,
+                "segments": len(self.segments()),
+                "active_segment": self._active_seq,
+                "committed_offset": list(self._committed),
+                "pending_bytes": pending,
+                "max_bytes": self.max_bytes,
+                "fill_ratio": round(pending / self.max_bytes, 4) if self.max_bytes else None,
+            }
+
+    # ------------------------------------------------------------------
+    # INTERNOS
+    # ------------------------------------------------------------------
+
+    def _segment_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"{seq:016d}{SEGMENT_SUFFIX}")
+
+    def _load_offset(self) -> SpoolOffset:
+        try:
+            with open(os.path.join(self.directory, OFFSET_FILE), "r", encoding="utf-8") as f:
+                data = json.load(f)
+            return int(data["segment"]), int(data["position"])
+        except FileNotFoundError:
+            return 1, 0
+        except (OSError, ValueError, KeyError):
+            logger.warning("offset.json ilegible en %s: se reenvía desde el primer segmento", self.directory)
+            segments = self.segments()
+            return (segments[0] if segments else 1), 0
+
+    def _recover_tail(self, seq: int) -> None:
+        path = self._segment_path(seq)
+        if not os.path.exists(path):
+            return
+        with open(path, "rb") as f:
+            data = f.read()
+        _, end = decode_records(data)
+        if end < len(data):
+            with open(path, "r+b") as f:
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+            self._stats["recovered_truncated_bytes"] += len(data) - end
+            logger.warning("Spool %s: cola rota truncada (%s bytes)", path, len(data) - end)
+
+    def _roll_locked(self) -> None:
+        self._sync_locked()
+        self._fh.close()
+        self._closed_sizes[self._active_seq] = self._active_size
+        self._active_seq += 1
+        self._fh = open(self._segment_path(self._active_seq), "ab")
+        self._active_size = 0
+        _fsync_dir(self.directory)
+
+    def _sync_locked(self) -> None:
+        if not self._dirty or self._closed:
+            return
+        os.fsync(self._fh.fileno())
+        self._dirty = False
+        self._stats["fsyncs"] += 1
+        self._stats["last_fsync_at"] = time.time()
+
+    def _pending_bytes_locked(self) -> int:
+        seq, pos = self._committed
+        total = self._active_size - (pos if seq == self._active_seq else 0)
+        for segment, size in self._closed_sizes.items():
+            if segment >= seq:
+                total += size - (pos if segment == seq else 0)
+        return max(0, total)
+
+    def _ensure_fsync_thread(self) -> None:
+        if self._fsync_thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._fsync_thread is None:
+                self._fsync_thread = threading.Thread(target=self._fsync_loop, name="audit-spool-fsync", daemon=True)
+                self._fsync_thread.start()
+
+    def _fsync_loop(self) -> None:
+        while not self._stop.wait(self.fsync_interval_s):
+            try:
+                self.sync()
+            except OSError:
+                logger.exception("Audit spool fsync failed")
+
+
+# ==========================================================
+# 🔹 SHIPPER (spool -> audit_log)
+# ==========================================================
+
+def _insert_rows(rows: List[Dict[str, Any]]) -> None:
+    table("audit_log").insert(rows).execute()
+
+
+_dead_letter_lock = threading.Lock()
+
+
+def write_audit_dead_letter(row: Dict[str, Any], error: Exception) -> None:
+    """
+    Guarda una fila que audit_log rechaza (una línea JSON, con fsync).
+    Compartido por el shipper y la cola en memoria.
+    """
+    line = json.dumps(
+        {"dead_lettered_at": datetime.utcnow().isoformat(), "error": f"{type(error).__name__}: {error}", "row": row},
+        separators=(",", ":"),
+        default=str,
+    )
+    directory = os.path.dirname(AUDIT_DEAD_LETTER_PATH)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with _dead_letter_lock, open(AUDIT_DEAD_LETTER_PATH, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    logger.error("Audit row dead-lettered (%s): %s", row.get("event_type"), error)
+
+
+def ship_isolating_poison(
+    rows: List[Dict[str, Any]],
+    sink: Callable[[List[Dict[str, Any]]], Any],
+    dead_letter: Callable[[Dict[str, Any], Exception], Any],
+) -> Tuple[int, int, Optional[Exception]]:
+    """
+    Envía `rows` de una en una. Una fila que falla sólo se da por envenenada
+    si una posterior entra (la DB responde): entonces va a `dead_letter`.
+    Devuelve (filas iniciales resueltas, de ellas en dead-letter, último
+    error); las no resueltas se reintentan tal cual.
+    """
+    resolved = dead = 0
+    failed: List[Tuple[Dict[str, Any], Exception]] = []
+    error: Optional[Exception] = None
+    for i, row in enumerate(rows):
+        try:
+            sink([row])
+        except Exception as e:
+            failed.append((row, e))
+            error = e
+            continue
+        for bad, bad_error in failed:
+            dead_letter(bad, bad_error)
+        dead += len(failed)
+        failed = []
+        resolved = i + 1
+    return resolved, dead, error
+
+
+class AuditShipper:
+    """
+    Envía el spool a audit_log en lotes, con backoff ante errores.
+    """
+
+    def __init__(
+        self,
+        spool: AuditSpool,
+        *,
+        sink: Callable[[List[Dict[str, Any]]], Any] = _insert_rows,
+        batch_size: int = AUDIT_SHIP_BATCH_SIZE,
+        interval_s: float = AUDIT_SHIP_INTERVAL_S,
+        max_backoff_s: float = AUDIT_SHIP_MAX_BACKOFF_S,
+        poison_after_failures: int = AUDIT_POISON_AFTER_FAILURES,
+        dead_letter: Callable[[Dict[str, Any], Exception], Any] = write_audit_dead_letter,
+    ) -> None:
+        self.spool = spool
+        self.poison_after_failures = max(1, poison_after_failures)
+        self._dead_letter = dead_letter
+        self.batch_size = max(1, batch_size)
+        self.interval_s = interval_s
+        self.max_backoff_s = max_backoff_s
+        self._sink = sink
+        self._ship_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._consecutive_failures = 0
+        self._stats: Dict[str, Any] = {
+            "shipped": 0,
+            "batches": 0,
+            "failures": 0,
+            "dead_lettered": 0,
+            "last_error": None,
+            "oldest_pending_timestamp": None,
+        }
+
+    def ship_once(self) -> int:
+        """
+        Envía un lote. Devuelve cuántos registros se resolvieron (lanza si el
+        sink falla; el offset no pasa de la primera fila sin resolver).
+        """
+        with self._ship_lock:
+            offset = self.spool.committed_offset
+            rows, next_offset = self.spool.read(offset, self.batch_size)
+            if not rows:
+                self._stats["oldest_pending_timestamp"] = None
+                return 0
+            self._stats["oldest_pending_timestamp"] = rows[0].get("timestamp")
+            if self._consecutive_failures >= self.poison_after_failures:
+                return self._ship_isolated(offset, rows)
+            self._sink(rows)
+            self.spool.commit(next_offset)
+            self._consecutive_failures = 0
+            self._stats["shipped"] += len(rows)
+            self._stats["batches"] += 1
+            return len(rows)
+
+    def _ship_isolated(self, offset: SpoolOffset, rows: List[Dict[str, Any]]) -> int:
+        resolved, dead, error = ship_isolating_poison(rows, self._sink, self._dead_letter)
+        if resolved:
+            # Offset justo tras la última fila resuelta
+            _, resolved_offset = self.spool.read(offset, resolved)
+            self.spool.commit(resolved_offset)
+            self._stats["shipped"] += resolved - dead
+            self._stats["dead_lettered"] += dead
+            self._stats["batches"] += 1
+        if resolved < len(rows):
+            raise error
+        self._consecutive_failures = 0
+        return resolved
+
+    def drain(self, timeout: Optional[float] = None) -> bool:
+        """
+        Envía hasta vaciar el spool (apagado, tests). True si quedó vacío.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while deadline is None or time.monotonic() < deadline:
+            try:
+                if self.ship_once() == 0:
+                    return True
+            except Exception as e:
+                self._record_failure(e)
+                return False
+        return False
+
+    def start(self) -> "AuditShipper":
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="audit-shipper", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, drain_timeout: Optional[float] = 10.0) -> bool:
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(drain_timeout)
+            self._thread = None
+        return self.drain(drain_timeout)
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stats(self) -> Dict[str, Any]:
+        spool = self.spool.stats()
+        oldest = self._stats["oldest_pending_timestamp"]
+        lag_s = None
+        if oldest:
+            try:
+                lag_s = round(max(0.0, (datetime.utcnow() - datetime.fromisoformat(str(oldest))).total_seconds()), 3)
+            except ValueError:
+                lag_s = None
+        return {
+            **self._stats,
+            "consecutive_failures": self._consecutive_failures,
+            "lag_seconds": lag_s,
+            "pending_bytes": spool["pending_bytes"],
+            "fill_ratio": spool["fill_ratio"],
+            "dropped": spool["dropped"],
+            "spool": spool,
+        }
+
+    def _record_failure(self, error: Exception) -> float:
+        self._consecutive_failures += 1
+        self._stats["failures"] += 1
+        self._stats["last_error"] = f"{type(error).__name__}: {error}"
+        backoff = min(self.interval_s * (2 ** self._consecutive_failures), self.max_backoff_s)
+        logger.warning("Audit shipper failed (%s), retrying in %.1fs", error, backoff)
+        return backoff
+
+    def _run(self) -> None:
+        wait = self.interval_s
+        while not self._stop.is_set():
+            self._wake.wait(wait)
+            self._wake.clear()
+            if self._stop.is_set():
+                break
+            try:
+                while self.ship_once() >= self.batch_size and not self._stop.is_set():
+                    pass
+                self._consecutive_failures = 0
+                wait = self.interval_s
+            except Exception as e:
+                wait = self._record_failure(e)
+
+
+def adopt_orphan_spools(base_dir: str, sink: Callable[[List[Dict[str, Any]]], Any] = _insert_rows) -> int:
+    """
+    Envía y borra los spools <base>-<pid> de procesos que ya no existen.
+    """
+    shipped = 0
+    for directory in sorted(glob.glob(f"{base_dir}-*")):
+        try:
+            spool = AuditSpool(directory)
+        except SpoolLockedError:
+            continue  # proceso vivo
+        shipper = AuditShipper(spool, sink=sink)
+        emptied = shipper.drain(timeout=60)
+        shipped += shipper.stats()["shipped"]
+        spool.close()
+        if emptied:
+            shutil.rmtree(directory, ignore_errors=True)
+    return shipped
+
+
+# ==========================================================
+# 🔹 INSTANCIA COMPARTIDA
+# ==========================================================
+
+_default_shipper: Optional[AuditShipper] = None
+_default_lock = threading.Lock()
+_atexit_registered = False
+# Proceso hijo (fork): spool propio en {dir}-{pid}, nunca el del padre
+_forked_child = False
+
+
+def _reset_after_fork() -> None:
+    # El objeto heredado no sirve en el hijo: su _lock pudo quedar tomado
+    # por el hilo de fsync (que no existe aquí), _active_size deja de ser
+    # cierto en cuanto escriben los dos y el padre puede rotar y borrar el
+    # segmento. El hijo abre su propio spool en la siguiente escritura; lo
+    # que no llegue a enviar lo adopta el proceso principal al arrancar.
+    global _default_shipper, _default_lock, _forked_child
+    _default_shipper = None
+    _default_lock = threading.Lock()
+    _forked_child = True
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_audit_spool() -> AuditSpool:
+    """
+    Spool del proceso con su shipper en marcha (se crea en la primera
+    llamada). Lanza OSError si no hay disco utilizable o no se configuró
+    AUDIT_SPOOL_DIR.
+    """
+    global _default_shipper, _atexit_registered
+    with _default_lock:
+        if _default_shipper is None:
+            if not AUDIT_SPOOL_DIR:
+                raise OSError("AUDIT_SPOOL_DIR no configurado")
+            adopt = False
+            if _forked_child:
+                spool = AuditSpool(f"{AUDIT_SPOOL_DIR}-{os.getpid()}")
+            else:
+                try:
+                    spool = AuditSpool(AUDIT_SPOOL_DIR)
+                    adopt = True
+                except SpoolLockedError:
+                    spool = AuditSpool(f"{AUDIT_SPOOL_DIR}-{os.getpid()}")
+            if adopt:
+                try:
+                    adopt_orphan_spools(AUDIT_SPOOL_DIR)
+                except Exception:
+                    logger.exception("No se pudieron enviar los spools huérfanos")
+            _default_shipper = AuditShipper(spool).start()
+            if not _atexit_registered:
+                # Un solo registro: un hijo hereda el del padre, que ya
+                # apaga el shipper del proceso en curso
+                _atexit_registered = True
+                atexit.register(_shutdown_default)
+        return _default_shipper.spool
+
+
+def flush_audit_spool(timeout: Optional[float] = 10.0) -> bool:
+    """
+    Envía ya lo pendiente del spool del proceso (si existe).
+    """
+    with _default_lock:
+        shipper = _default_shipper
+    if shipper is None:
+        return True
+    shipper.spool.sync()
+    return shipper.drain(timeout)
+
+
+def audit_spool_stats() -> Optional[Dict[str, Any]]:
+    with _default_lock:
+        shipper = _default_shipper
+    return shipper.stats() if shipper is not None else None
+
+
+def _shutdown_default() -> None:
+    with _default_lock:
+        shipper = _default_shipper
+    if shipper is None:
+        return
+    shipper.stop(drain_timeout=10.0)
+    shipper.spool.close()
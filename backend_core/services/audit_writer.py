@@ -0,0 +1,273 @@
+# backend_core/services/audit_writer.py
+from __future__ import annotations
+
+import atexit
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from backend_core.services.supabase_client import table
+from backend_core.services.audit_spool import (
+    AUDIT_POISON_AFTER_FAILURES,
+    flush_audit_spool,
+    ship_isolating_poison,
+    write_audit_dead_letter,
+)
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🔹 ESCRITOR DE AUDITORÍA CON BUFFER
+#
+# Modo `buffered` de log_event (y respaldo si el spool en disco no está
+# disponible): encola la fila en memoria y un hilo la vuelca en inserts
+# masivos a audit_log.
+# - flush por tamaño (AUDIT_LOG_BATCH_SIZE) o por tiempo
+#   (AUDIT_LOG_FLUSH_INTERVAL_S), lo que llegue antes
+# - cola acotada (AUDIT_LOG_QUEUE_MAX): si está llena el evento se descarta
+#   y se cuenta en `dropped` (la auditoría nunca bloquea el hot path)
+# - un lote que falla vuelve a la cabeza de la cola (si cabe) y se
+#   reintenta en el siguiente flush; tras AUDIT_POISON_AFTER_FAILURES
+#   fallos seguidos se envía fila a fila y las filas que la DB rechaza van
+#   al dead-letter (ver audit_spool.ship_isolating_poison)
+# - flush() síncrono para apagado y tests; también se llama en atexit
+#
+# Las filas llevan su timestamp de cuando se registró el evento, no del
+# flush.
+# ==========================================================
+
+AUDIT_LOG_TABLE = "audit_log"
+AUDIT_LOG_QUEUE_MAX = int(os.getenv("AUDIT_LOG_QUEUE_MAX", "10000"))
+AUDIT_LOG_BATCH_SIZE = int(os.getenv("AUDIT_LOG_BATCH_SIZE", "200"))
+AUDIT_LOG_FLUSH_INTERVAL_S = float(os.getenv("AUDIT_LOG_FLUSH_INTERVAL_S", "1.0"))
+
+
+def _insert_rows(rows: List[Dict[str, Any]]) -> None:
+    table(AUDIT_LOG_TABLE).insert(rows).execute()
+
+
+class BufferedAuditWriter:
+    """
+    Cola acotada + hilo de volcado en lotes (thread-safe).
+
+    - sink(rows): escritura de un lote (por defecto insert masivo en audit_log)
+    """
+
+    def __init__(
+        self,
+        *,
+        sink: Callable[[List[Dict[str, Any]]], Any] = _insert_rows,
+        queue_max: int = AUDIT_LOG_QUEUE_MAX,
+        batch_size: int = AUDIT_LOG_BATCH_SIZE,
+        flush_interval_s: float = AUDIT_LOG_FLUSH_INTERVAL_S,
+        poison_after_failures: int = AUDIT_POISON_AFTER_FAILURES,
+        dead_letter: Callable[[Dict[str, Any], Exception], Any] = write_audit_dead_letter,
+    ) -> None:
+        self.queue_max = max(1, queue_max)
+        self.poison_after_failures = max(1, poison_after_failures)
+        self._dead_letter = dead_letter
+        self._consecutive_failures = 0
+        self.batch_size = max(1, batch_size)
+        self.flush_interval_s = flush_interval_s
+        self._sink = sink
+
+        self._queue: Deque[Dict[str, Any]] = deque()
+        self._lock = threading.Lock()
+        # Serializa los volcados (hilo de fondo vs flush() síncrono)
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, Any] = {
+            "enqueued": 0,
+            "flushed": 0,
+            "dropped": 0,
+            "batches": 0,
+            "failed_batches": 0,
+            "dead_lettered": 0,
+            "max_batch": 0,
+            "last_error": None,
+        }
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def enqueue(self, row: Dict[str, Any]) -> bool:
+        """
+        Encola un evento. False = cola llena (descartado).
+        """
+        self._ensure_started()
+        with self._lock:
+            if len(self._queue) >= self.queue_max:
+                self._stats["dropped"] += 1
+                dropped = self._stats["dropped"]
+            else:
+                self._queue.append(row)
+                self._stats["enqueued"] += 1
+                dropped = 0
+            batch_ready = len(self._queue) >= self.batch_size
+
+        if self._stop.is_set():
+            # Ya parado (eventos durante el apagado): escritura en línea
+            self.flush()
+        elif batch_ready:
+            self._wake.set()
+        if dropped and (dropped & (dropped - 1)) == 0:
+            # Aviso en 1, 2, 4, 8... descartes: no inunda el log
+            logger.warning("Audit log queue full, %s events dropped so far", dropped)
+        return not dropped
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Vuelca ya todo lo encolado. True si la cola quedó vacía.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                if not self._queue:
+                    return True
+            if not self._flush_batch():
+                return False  # el sink falla: no insistir en bucle
+            if deadline is not None and time.monotonic() >= deadline:
+                with self._lock:
+                    return not self._queue
+
+    def stop(self, timeout: Optional[float] = 10.0) -> bool:
+        self._stop.set()
+        self._wake.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+        return self.flush(timeout)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "queued": len(self._queue),
+                "queue_max": self.queue_max,
+                "batch_size": self.batch_size,
+            }
+
+    # ------------------------------------------------------------------
+    # INTERNOS
+    # ------------------------------------------------------------------
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="audit-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval_s)
+            self._wake.clear()
+            # Por tiempo: lo que haya. Por tamaño: lotes completos hasta vaciar.
+            while self._flush_batch():
+                with self._lock:
+                    if len(self._queue) < self.batch_size:
+                        break
+
+    def _flush_batch(self) -> bool:
+        """
+        Vuelca un lote. False si no había nada o el sink falló.
+        """
+        with self._flush_lock:
+            with self._lock:
+                if not self._queue:
+                    return False
+                batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+
+            dead = 0
+            if self._consecutive_failures >= self.poison_after_failures:
+                # Lote que falla una y otra vez: fila a fila, aparta las rechazadas
+                resolved, dead, error = ship_isolating_poison(batch, self._sink, self._dead_letter)
+            else:
+                try:
+                    self._sink(batch)
+                    resolved, error = len(batch), None
+                except Exception as e:
+                    resolved, error = 0, e
+
+            sent = batch[:resolved]
+            if error is not None and resolved < len(batch):
+                self._consecutive_failures += 1
+                with self._lock:
+                    self._stats["failed_batches"] += 1
+                    self._stats["last_error"] = f"{type(error).__name__}: {error}"
+                    # Lo no resuelto vuelve a la cabeza de la cola (orden intacto) si cabe
+                    retry = batch[resolved:]
+                    room = self.queue_max - len(self._queue)
+                    keep = retry[:max(0, room)]
+                    self._queue.extendleft(reversed(keep))
+                    self._stats["dropped"] += len(retry) - len(keep)
+                    self._stats["dead_lettered"] += dead
+                    self._stats["flushed"] += len(sent) - dead
+                logger.warning("Audit log batch insert failed (%s rows): %s", len(batch), error)
+                return False
+
+            self._consecutive_failures = 0
+            with self._lock:
+                self._stats["flushed"] += len(sent) - dead
+                self._stats["dead_lettered"] += dead
+                self._stats["batches"] += 1
+                self._stats["max_batch"] = max(self._stats["max_batch"], len(batch))
+            return True
+
+
+# ==========================================================
+# 🔹 INSTANCIA COMPARTIDA
+# ==========================================================
+
+_default_writer: Optional[BufferedAuditWriter] = None
+_default_lock = threading.Lock()
+_atexit_registered = False
+
+
+def _reset_after_fork() -> None:
+    # El hijo no hereda el hilo de volcado y la cola heredada es del padre
+    # (se enviaría dos veces): empieza con un escritor nuevo.
+    global _default_writer, _default_lock
+    _default_writer = None
+    _default_lock = threading.Lock()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def get_audit_writer() -> BufferedAuditWriter:
+    global _default_writer, _atexit_registered
+    with _default_lock:
+        if _default_writer is None:
+            _default_writer = BufferedAuditWriter()
+            if not _atexit_registered:
+                _atexit_registered = True
+                atexit.register(_stop_default)
+        return _default_writer
+
+
+def _stop_default() -> None:
+    with _default_lock:
+        writer = _default_writer
+    if writer is not None:
+        writer.stop()
+
+
+def flush_audit_log(timeout: Optional[float] = 10.0) -> bool:
+    """
+    Vuelca los eventos pendientes, del spool en disco y de la cola en
+    memoria (hooks de apagado de workers, tests).
+    """
+    with _default_lock:
+        writer = _default_writer
+    flushed = writer.flush(timeout) if writer is not None else True
+    return flush_audit_spool(timeout) and flushed
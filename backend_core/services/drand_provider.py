@@ -0,0 +1,409 @@
+# backend_core/services/drand_provider.py
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from backend_core.engines.adjudicator_engine_pro import ExternalEntropySnapshot
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🔹 DRAND PROVIDER (ROUNDS CACHEADOS + ARITMÉTICA OFFLINE)
+#
+# Un round drand es inmutable y depende sólo del tiempo:
+#   round(t)      = floor((t - genesis) / period) + 1
+#   round_time(r) = genesis + (r - 1) * period
+# así que el round objetivo de una sesión (primero con time >= not_before)
+# se calcula sin red. Muchas sesiones caen en el mismo round: se piden una
+# vez y se guardan en memoria (LRU) y en disco (un JSON por round), por lo
+# que un reinicio o un replay tampoco tocan la red.
+#
+# Antes de cachear se comprueba randomness == sha256(signature) (vale para
+# todos los esquemas drand). La verificación BLS de la firma queda fuera.
+#
+# Tests: FileDrandBeacon sirve /info y /public/{round} desde un JSON local.
+# ==========================================================
+
+DRAND_BASE_URL = os.getenv("DRAND_BASE_URL", "https://api.drand.sh")
+# "" = chain por defecto del endpoint (League of Entropy mainnet)
+DRAND_CHAIN_HASH = os.getenv("DRAND_CHAIN_HASH", "")
+# Si se conocen, evitan la petición a /info
+DRAND_GENESIS_TIME = os.getenv("DRAND_GENESIS_TIME", "")
+DRAND_PERIOD_SECONDS = os.getenv("DRAND_PERIOD_SECONDS", "")
+DRAND_CACHE_DIR = os.getenv("DRAND_CACHE_DIR", "data/drand_cache")
+DRAND_MEMORY_CACHE_ROUNDS = int(os.getenv("DRAND_MEMORY_CACHE_ROUNDS", "4096"))
+
+
+class DrandError(RuntimeError):
+    pass
+
+
+class DrandRoundNotAvailable(DrandError):
+    """
+    El round todavía no se ha emitido (su hora es futura).
+    """
+
+    def __init__(self, round_number: int, round_time_utc: datetime) -> None:
+        super().__init__(f"Round drand {round_number} aún no disponible (emisión {round_time_utc.isoformat()})")
+        self.round = round_number
+        self.round_time_utc = round_time_utc
+
+
+@dataclass(frozen=True)
+class DrandConfig:
+    base_url: str = DRAND_BASE_URL
+    timeout_seconds: float = 10
+    chain_hash: str = DRAND_CHAIN_HASH
+    genesis_time: Optional[int] = int(DRAND_GENESIS_TIME) if DRAND_GENESIS_TIME else None
+    period_seconds: Optional[int] = int(DRAND_PERIOD_SECONDS) if DRAND_PERIOD_SECONDS else None
+    cache_dir: Optional[str] = DRAND_CACHE_DIR or None
+    memory_cache_rounds: int = DRAND_MEMORY_CACHE_ROUNDS
+
+
+@dataclass(frozen=True)
+class DrandChainInfo:
+    genesis_time: int
+    period_seconds: int
+    public_key_hex: Optional[str] = None
+    chain_hash: Optional[str] = None
+
+    def round_at(self, when_utc: datetime) -> int:
+        """
+        Round vigente en `when_utc` (el último emitido).
+        """
+        elapsed = when_utc.timestamp() - self.genesis_time
+        if elapsed < 0:
+            return 0
+        return int(elapsed // self.period_seconds) + 1
+
+    def first_round_not_before(self, not_before_utc: datetime) -> int:
+        """
+        Primer round cuya hora de emisión es >= not_before_utc.
+        """
+        elapsed = not_before_utc.timestamp() - self.genesis_time
+        if elapsed <= 0:
+            return 1
+        return int(math.ceil(elapsed / self.period_seconds)) + 1
+
+    def round_time(self, round_number: int) -> datetime:
+        return datetime.fromtimestamp(self.genesis_time + (round_number - 1) * self.period_seconds, tz=timezone.utc)
+
+
+def _http_get_json(url: str, timeout: float) -> Dict[str, Any]:
+    import requests  # sólo en la ruta HTTP real
+
+    resp = requests.get(url, timeout=timeout)
+    resp.raise_for_status()
+    return resp.json()
+
+
+class HttpDrandProvider:
+    """
+    Provider drand con caché de rounds.
+
+    - fetch_json(path) es inyectable (FileDrandBeacon en tests)
+    - clock: hora actual UTC (para no pedir rounds futuros)
+    """
+
+    def __init__(
+        self,
+        cfg: Optional[DrandConfig] = None,
+        *,
+        fetch_json: Optional[Callable[[str], Dict[str, Any]]] = None,
+        clock: Callable[[], datetime] = lambda: datetime.now(timezone.utc),
+    ) -> None:
+        self.cfg = cfg or DrandConfig()
+        self._fetch_json = fetch_json or (
+            lambda path: _http_get_json(self.cfg.base_url.rstrip("/") + path, self.cfg.timeout_seconds)
+        )
+        self._clock = clock
+        self._info: Optional[DrandChainInfo] = None
+        self._memory: "OrderedDict[int, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Single-flight: un round en vuelo se pide una sola vez
+        self._inflight: Dict[int, Future] = {}
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "fetches": 0, "info_fetches": 0, "shared_fetches": 0}
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def chain_info(self) -> DrandChainInfo:
+        if self._info is None:
+            self._info = self._load_chain_info()
+        return self._info
+
+    def round_for(self, not_before_utc: datetime) -> int:
+        return self.chain_info().first_round_not_before(not_before_utc.astimezone(timezone.utc))
+
+    def get_round_after(self, not_before_utc: datetime) -> ExternalEntropySnapshot:
+        """
+        Primer round con time >= not_before_utc (calculado sin red).
+        """
+        return self.get_round(self.round_for(not_before_utc))
+
+    def get_round(self, round_number: int) -> ExternalEntropySnapshot:
+        info = self.chain_info()
+        data = self._cached_round(round_number)
+        if data is None:
+            round_time = info.round_time(round_number)
+            if round_time > self._clock():
+                raise DrandRoundNotAvailable(round_number, round_time)
+            data = self._fetch_round_once(round_number)
+
+        return ExternalEntropySnapshot(
+            provider="drand",
+            round=round_number,
+            randomness_hex=data["randomness"],
+            signature_hex=data.get("signature"),
+            public_key_hex=info.public_key_hex,
+            round_time_utc=info.round_time(round_number),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {**self._stats, "memory_rounds": len(self._memory)}
+
+    # ------------------------------------------------------------------
+    # CHAIN INFO
+    # ------------------------------------------------------------------
+
+    def _chain_prefix(self) -> str:
+        return f"/{self.cfg.chain_hash}" if self.cfg.chain_hash else ""
+
+    def _load_chain_info(self) -> DrandChainInfo:
+        cfg = self.cfg
+        cached = self._read_disk("info")
+        if cfg.genesis_time is not None and cfg.period_seconds is not None:
+            return DrandChainInfo(
+                genesis_time=cfg.genesis_time,
+                period_seconds=cfg.period_seconds,
+                public_key_hex=(cached or {}).get("public_key"),
+                chain_hash=cfg.chain_hash or None,
+            )
+
+        if cached is None:
+            with self._lock:
+                self._stats["info_fetches"] += 1
+            cached = self._fetch_json(f"{self._chain_prefix()}/info")
+            self._write_disk("info", cached)
+
+        return DrandChainInfo(
+            genesis_time=int(cached["genesis_time"]),
+            period_seconds=int(cached["period"]),
+            public_key_hex=cached.get("public_key"),
+            chain_hash=cached.get("hash") or cfg.chain_hash or None,
+        )
+
+    # ------------------------------------------------------------------
+    # ROUNDS
+    # ------------------------------------------------------------------
+
+    def _cached_round(self, round_number: int) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            data = self._memory.get(round_number)
+            if data is not None:
+                self._memory.move_to_end(round_number)
+                self._stats["memory_hits"] += 1
+                return data
+
+        data = self._read_disk(str(round_number))
+        if data is not None and self._is_consistent(round_number, data):
+            with self._lock:
+                self._stats["disk_hits"] += 1
+            self._remember(round_number, data)
+            return data
+        return None
+
+    def _fetch_round_once(self, round_number: int) -> Dict[str, Any]:
+        """
+        Single-flight: si otro hilo ya está pidiendo el round, espera su
+        resultado en vez de repetir la petición.
+        """
+        with self._lock:
+            future = self._inflight.get(round_number)
+            owner = future is None
+            if owner:
+                future = self._inflight[round_number] = Future()
+            else:
+                self._stats["shared_fetches"] += 1
+
+        if not owner:
+            return future.result(timeout=self.cfg.timeout_seconds * 2)
+
+        try:
+            data = self._fetch_round(round_number)
+            self._store_round(round_number, data)
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(round_number, None)
+
+    def _fetch_round(self, round_number: int) -> Dict[str, Any]:
+        with self._lock:
+            self._stats["fetches"] += 1
+        raw = self._fetch_json(f"{self._chain_prefix()}/public/{round_number}")
+        data = {"round": int(raw["round"]), "randomness": raw["randomness"], "signature": raw.get("signature")}
+        if not self._is_consistent(round_number, data):
+            raise DrandError(f"Respuesta drand inconsistente para el round {round_number}")
+        return data
+
+    def _store_round(self, round_number: int, data: Dict[str, Any]) -> None:
+        self._remember(round_number, data)
+        self._write_disk(str(round_number), data)
+
+    def _remember(self, round_number: int, data: Dict[str, Any]) -> None:
+        with self._lock:
+            self._memory[round_number] = data
+            self._memory.move_to_end(round_number)
+            while len(self._memory) > self.cfg.memory_cache_rounds:
+                self._memory.popitem(last=False)
+
+    @staticmethod
+    def _is_consistent(round_number: int, data: Dict[str, Any]) -> bool:
+        if int(data.get("round", -1)) != round_number or not data.get("randomness"):
+            return False
+        signature = data.get("signature")
+        if not signature:
+            return True
+        try:
+            return hashlib.sha256(bytes.fromhex(signature)).hexdigest() == data["randomness"]
+        except ValueError:
+            return False
+
+    # ------------------------------------------------------------------
+    # DISCO (un JSON por clave, escritura atómica)
+    # ------------------------------------------------------------------
+
+    def _disk_path(self, key: str) -> Optional[str]:
+        if not self.cfg.cache_dir:
+            return None
+        chain = self.cfg.chain_hash or "default"
+        return os.path.join(self.cfg.cache_dir, chain, f"{key}.json")
+
+    def _read_disk(self, key: str) -> Optional[Dict[str, Any]]:
+        path = self._disk_path(key)
+        if path is None or not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            logger.warning("Caché drand ilegible: %s", path)
+            return None
+
+    def _write_disk(self, key: str, data: Dict[str, Any]) -> None:
+        path = self._disk_path(key)
+        if path is None:
+            return
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, path)
+        except OSError:
+            # La caché en disco es una optimización: nunca bloquea la adjudicación
+            logger.warning("No se pudo escribir la caché drand: %s", path)
+
+
+# ==========================================================
+# 🔹 INSTANCIA COMPARTIDA
+# ==========================================================
+
+_providers: Dict[DrandConfig, HttpDrandProvider] = {}
+_providers_lock = threading.Lock()
+
+
+def get_drand_provider(cfg: Optional[DrandConfig] = None) -> HttpDrandProvider:
+    """
+    Un provider (y su caché en memoria) por configuración y proceso.
+    """
+    cfg = cfg or DrandConfig()
+    with _providers_lock:
+        provider = _providers.get(cfg)
+        if provider is None:
+            provider = _providers[cfg] = HttpDrandProvider(cfg)
+        return provider
+
+
+# ==========================================================
+# 🔹 BEACON FALSO (TESTS / ENTORNOS SIN RED)
+# ==========================================================
+
+class FileDrandBeacon:
+    """
+    Sustituto de la API HTTP: sirve /info y /public/{round} desde un JSON
+    {"info": {...}, "rounds": {"<round>": {...}}}. Los rounds que falten
+    se generan de forma determinista (signature = sha256(seed || round))
+    y se guardan en el fichero.
+
+        beacon = FileDrandBeacon("beacon.json", genesis_time=..., period_seconds=3)
+        provider = HttpDrandProvider(cfg, fetch_json=beacon.fetch_json)
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        genesis_time: int = 1_692_803_367,
+        period_seconds: int = 3,
+        seed: str = "compra-abierta-fake-drand",
+    ) -> None:
+        self.path = path
+        self.seed = seed
+        self.requests: list = []
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._data = json.load(f)
+        else:
+            self._data = {
+                "info": {
+                    "genesis_time": genesis_time,
+                    "period": period_seconds,
+                    "public_key": hashlib.sha256(f"{seed}:pk".encode("utf-8")).hexdigest(),
+                    "hash": "fake",
+                },
+                "rounds": {},
+            }
+            self._save()
+
+    def fetch_json(self, path: str) -> Dict[str, Any]:
+        self.requests.append(path)
+        parts = path.strip("/").split("/")
+        if parts[-1] == "info":
+            return dict(self._data["info"])
+        if len(parts) >= 2 and parts[-2] == "public":
+            return dict(self._round(int(parts[-1])))
+        raise DrandError(f"Ruta no soportada por el beacon falso: {path}")
+
+    def _round(self, round_number: int) -> Dict[str, Any]:
+        key = str(round_number)
+        if key not in self._data["rounds"]:
+            signature = hashlib.sha256(f"{self.seed}:{round_number}".encode("utf-8")).hexdigest()
+            self._data["rounds"][key] = {
+                "round": round_number,
+                "signature": signature,
+                "randomness": hashlib.sha256(bytes.fromhex(signature)).hexdigest(),
+            }
+            self._save()
+        return self._data["rounds"][key]
+
+    def _save(self) -> None:
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self._data, f, indent=2, sort_keys=True)
@@ -0,0 +1,290 @@
+# backend_core/services/drand_round_scheduler.py
+from __future__ import annotations
+
+import heapq
+import logging
+import os
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+from backend_core.services.audit_repository import log_event
+from backend_core.services.adjudication_service_pro import (
+    adjudicate_sessions_pro,
+    drand_not_before,
+    get_session_drand_provider,
+)
+from backend_core.services.drand_provider import HttpDrandProvider
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🔹 ADJUDICACIÓN DIFERIDA POR ROUND DRAND
+#
+# Una sesión cerrada sólo se puede adjudicar cuando existe el primer round
+# con time >= closed_at + DRAND_NOT_BEFORE_DELAY_SECONDS. Antes se llamaba
+# al provider en línea y fallaba si el round aún no había salido. Aquí:
+# - defer() archiva la sesión bajo su round objetivo (aritmética offline)
+# - un hilo duerme hasta la hora de publicación del siguiente round (+ margen)
+# - pide el round una sola vez (single-flight en el provider) y adjudica
+#   todas las sesiones de ese round en un lote (adjudicate_sessions_pro,
+#   que ya encuentra el round en la caché del provider)
+# - si el round aún no está disponible, se reintenta ese round más tarde
+#
+# Es estado en memoria: si el proceso muere, las sesiones siguen cerradas
+# sin adjudicated_at y las recoge la cola de adjudicación.
+# ==========================================================
+
+# Margen tras la hora teórica del round (propagación entre nodos drand)
+DRAND_PUBLISH_GRACE_SECONDS = float(os.getenv("DRAND_PUBLISH_GRACE_SECONDS", "1.0"))
+DRAND_ROUND_RETRY_SECONDS = float(os.getenv("DRAND_ROUND_RETRY_SECONDS", "5"))
+DRAND_ROUND_MAX_RETRY_SECONDS = float(os.getenv("DRAND_ROUND_MAX_RETRY_SECONDS", "300"))
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class DrandRoundScheduler:
+    """
+    Sesiones cerradas agrupadas por round drand objetivo (thread-safe).
+
+    - adjudicate_batch(session_ids) -> lista de resultados por sesión
+    - clock: hora actual UTC (inyectable en tests)
+    """
+
+    def __init__(
+        self,
+        *,
+        provider: Optional[HttpDrandProvider] = None,
+        adjudicate_batch: Callable[[List[str]], List[Dict[str, Any]]] = adjudicate_sessions_pro,
+        clock: Callable[[], datetime] = _utcnow,
+        grace_seconds: float = DRAND_PUBLISH_GRACE_SECONDS,
+    ) -> None:
+        self._provider = provider
+        self._adjudicate_batch = adjudicate_batch
+        self._clock = clock
+        self._grace = timedelta(seconds=grace_seconds)
+
+        # round -> sesiones; heap de (instante de despertar, round)
+        self._waiting: Dict[int, Set[str]] = {}
+        self._wake_at: Dict[int, float] = {}
+        self._failures: Dict[int, int] = {}
+        self._heap: List[Tuple[float, int]] = []
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stats: Dict[str, Any] = {
+            "deferred": 0,
+            "rounds_fetched": 0,
+            "round_retries": 0,
+            "batches": 0,
+            "adjudicated": 0,
+            "errors": 0,
+            "max_batch": 0,
+        }
+
+    @property
+    def provider(self) -> HttpDrandProvider:
+        if self._provider is None:
+            self._provider = get_session_drand_provider()
+        return self._provider
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._waiting.values())
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def defer(self, session_id: str, closed_at: datetime) -> int:
+        """
+        Archiva la sesión bajo su round objetivo. Devuelve el round.
+        """
+        round_number = self.provider.round_for(drand_not_before(closed_at))
+        with self._lock:
+            sessions = self._waiting.setdefault(round_number, set())
+            if session_id in sessions:
+                return round_number
+            sessions.add(session_id)
+            self._stats["deferred"] += 1
+            if round_number not in self._wake_at:
+                self._schedule_locked(round_number, self._publish_at(round_number))
+        self._wake.set()
+        return round_number
+
+    def next_wake_at(self) -> Optional[datetime]:
+        with self._lock:
+            if not self._wake_at:
+                return None
+            return datetime.fromtimestamp(min(self._wake_at.values()), tz=timezone.utc)
+
+    def pending(self) -> Dict[int, List[str]]:
+        with self._lock:
+            return {r: sorted(s) for r, s in sorted(self._waiting.items())}
+
+    def run_due(self) -> Dict[str, Any]:
+        """
+        Procesa los rounds cuya hora de publicación ya pasó: un fetch y un
+        lote de adjudicación por round.
+        """
+        metrics: Dict[str, Any] = {"rounds": [], "adjudicated": 0, "errors": 0, "retried_rounds": []}
+        for round_number in self._pop_due_rounds(self._clock()):
+            self._run_round(round_number, metrics)
+        return metrics
+
+    def start(self) -> "DrandRoundScheduler":
+        with self._lock:
+            if self._thread is None:
+                self._stop.clear()
+                self._thread = threading.Thread(target=self._run_forever, name="drand-round-scheduler", daemon=True)
+                self._thread.start()
+        return self
+
+    def stop(self, drain: bool = False, timeout: Optional[float] = None) -> None:
+        """
+        Para el hilo (con drain, antes espera a que se vacíen los rounds
+        pendientes, hasta `timeout`). Lo que quede en espera lo recoge la
+        cola de adjudicación (siguen cerradas sin adjudicated_at).
+        """
+        if drain and self._thread is not None:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while len(self) and (deadline is None or time.monotonic() < deadline):
+                time.sleep(0.05)
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        with self._lock:
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            waiting = sum(len(s) for s in self._waiting.values())
+            next_wake = min(self._wake_at.values()) if self._wake_at else None
+            return {
+                **self._stats,
+                "waiting_sessions": waiting,
+                "waiting_rounds": len(self._waiting),
+                "next_wake_at": datetime.fromtimestamp(next_wake, tz=timezone.utc).isoformat() if next_wake else None,
+            }
+
+    # ------------------------------------------------------------------
+    # INTERNOS
+    # ------------------------------------------------------------------
+
+    def _publish_at(self, round_number: int) -> datetime:
+        return self.provider.chain_info().round_time(round_number) + self._grace
+
+    def _schedule_locked(self, round_number: int, at: datetime) -> None:
+        ts = at.timestamp()
+        self._wake_at[round_number] = ts
+        heapq.heappush(self._heap, (ts, round_number))
+
+    def _pop_due_rounds(self, now: datetime) -> List[int]:
+        now_ts = now.timestamp()
+        due: List[int] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now_ts:
+                ts, round_number = heapq.heappop(self._heap)
+                if self._wake_at.get(round_number) != ts:
+                    continue  # entrada obsoleta (round reprogramado)
+                del self._wake_at[round_number]
+                due.append(round_number)
+        return due
+
+    def _run_round(self, round_number: int, metrics: Dict[str, Any]) -> None:
+        try:
+            self.provider.get_round(round_number)
+        except Exception as e:
+            self._retry_round(round_number, e)
+            metrics["retried_rounds"].append(round_number)
+            return
+
+        with self._lock:
+            session_ids = sorted(self._waiting.pop(round_number, set()))
+            self._failures.pop(round_number, None)
+            self._stats["rounds_fetched"] += 1
+        if not session_ids:
+            return
+
+        try:
+            results = self._adjudicate_batch(session_ids)
+        except Exception as e:
+            logger.exception("Adjudication batch failed for drand round %s", round_number)
+            results = [{"session_id": sid, "status": "ERROR", "error": str(e)} for sid in session_ids]
+
+        errors = [r for r in results if (r or {}).get("status") == "ERROR"]
+        for r in errors:
+            # La sesión sigue cerrada sin adjudicar: la reintenta la cola de adjudicación
+            log_event(
+                event_type="session_adjudication_failed",
+                session_id=r.get("session_id"),
+                payload={"error": r.get("error"), "drand_round": round_number},
+            )
+
+        with self._lock:
+            self._stats["batches"] += 1
+            self._stats["adjudicated"] += len(results) - len(errors)
+            self._stats["errors"] += len(errors)
+            self._stats["max_batch"] = max(self._stats["max_batch"], len(session_ids))
+        metrics["rounds"].append({"round": round_number, "sessions": len(session_ids), "errors": len(errors)})
+        metrics["adjudicated"] += len(results) - len(errors)
+        metrics["errors"] += len(errors)
+
+    def _retry_round(self, round_number: int, error: Exception) -> None:
+        with self._lock:
+            failures = self._failures.get(round_number, 0) + 1
+            self._failures[round_number] = failures
+            self._stats["round_retries"] += 1
+            delay = min(DRAND_ROUND_RETRY_SECONDS * (2 ** (failures - 1)), DRAND_ROUND_MAX_RETRY_SECONDS)
+            self._schedule_locked(round_number, self._clock() + timedelta(seconds=delay))
+        logger.warning("drand round %s not available (%s), retrying in %.1fs", round_number, error, delay)
+
+    def _seconds_to_next(self) -> float:
+        with self._lock:
+            if not self._wake_at:
+                return 1.0
+            next_ts = min(self._wake_at.values())
+        return max(0.0, min(next_ts - self._clock().timestamp(), 1.0))
+
+    def _run_forever(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.run_due()
+            except Exception:
+                logger.exception("drand round scheduler tick failed")
+            self._wake.wait(self._seconds_to_next())
+            self._wake.clear()
+
+
+# ==========================================================
+# 🔹 INSTANCIA COMPARTIDA
+# ==========================================================
+
+_default_scheduler: Optional[DrandRoundScheduler] = None
+_default_lock = threading.Lock()
+
+
+def get_drand_round_scheduler() -> DrandRoundScheduler:
+    """
+    Scheduler compartido del proceso (arranca su hilo en la primera llamada).
+    """
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = DrandRoundScheduler()
+        return _default_scheduler.start()
+
+
+def stop_drand_round_scheduler(drain: bool = True, timeout: Optional[float] = None) -> None:
+    """
+    Hook de apagado de los workers (no crea el scheduler si no existe).
+    """
+    with _default_lock:
+        scheduler = _default_scheduler
+    if scheduler is not None:
+        scheduler.stop(drain=drain, timeout=timeout)
@@ -0,0 +1,266 @@
+from __future__ import annotations
+
+import mmap
+import os
+import sys
+from array import array
+from typing import Iterator, Optional
+
+from backend_core.engines.merkle import (
+    MerkleInclusionProof,
+    MerkleStreamBuilder,
+    merkle_root_hex_stream,
+)
+
+# ==========================================================
+# 🔹 SIDE-CAR BINARIO DE HOJAS (manifest.v2 / compromiso al cierre)
+#
+# Formato (big-endian):
+#   magic      8 bytes   b"CALEAF01"
+#   count      8 bytes   nº de hojas
+#   root      32 bytes   participants_merkle_root
+#   leaves  count * 32   digests SHA-256 crudos, orden ascendente
+#
+# Se abre con mmap: replay y pruebas de inclusión leen las hojas
+# directamente del fichero, sin cargarlas en memoria.
+# ==========================================================
+
+SIDECAR_MAGIC = b"CALEAF01"
+LEAF_SIZE = 32
+HEADER_SIZE = len(SIDECAR_MAGIC) + 8 + LEAF_SIZE
+
+# Side-car de owners (compromiso al cierre): owner de cada hoja, mismo orden.
+#   magic   8 bytes   b"CAOWNR01"
+#   count   8 bytes
+#   owners  count * 4 (índice en la lista de participantes con entradas)
+OWNERS_MAGIC = b"CAOWNR01"
+OWNER_SIZE = 4
+OWNERS_HEADER_SIZE = len(OWNERS_MAGIC) + 8
+
+LEAVES_DIR = os.getenv("ADJUDICATION_LEAVES_DIR", "data/adjudication_leaves")
+
+
+class SidecarError(ValueError):
+    pass
+
+
+def sidecar_path(session_id: str, base_dir: Optional[str] = None) -> str:
+    return os.path.join(base_dir or LEAVES_DIR, f"{session_id}.leaves")
+
+
+def owners_sidecar_path(session_id: str, base_dir: Optional[str] = None) -> str:
+    return os.path.join(base_dir or LEAVES_DIR, f"{session_id}.owners")
+
+
+# ==========================================================
+# 🔹 ESCRITURA
+# ==========================================================
+
+def write_leaves_sidecar(path: str, leaves, merkle_root_hex: str) -> str:
+    """
+    Escribe el side-car de forma atómica (tmp + fsync + rename).
+    leaves: objeto con .digests (buffer contiguo) y len(), p.ej. result.leaves.
+    """
+    root = bytes.fromhex(merkle_root_hex)
+    if len(root) != LEAF_SIZE:
+        raise SidecarError("merkle_root_hex debe ser un SHA-256 (32 bytes).")
+
+    count = len(leaves)
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(SIDECAR_MAGIC)
+        f.write(count.to_bytes(8, "big"))
+        f.write(root)
+        f.write(memoryview(leaves.digests)[: count * LEAF_SIZE])
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+def write_owners_sidecar(path: str, owners: array) -> str:
+    """
+    Escribe el array de owners (array('I')) en big-endian, de forma atómica.
+    """
+    if owners.itemsize != OWNER_SIZE:
+        raise SidecarError("owners debe ser array('I') de 4 bytes.")
+
+    body = array(owners.typecode, owners)
+    if sys.byteorder == "little":
+        body.byteswap()
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(OWNERS_MAGIC)
+        f.write(len(owners).to_bytes(8, "big"))
+        f.write(body.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return path
+
+
+# ==========================================================
+# 🔹 LECTURA (MMAP)
+# ==========================================================
+
+class LeavesSidecar:
+    """
+    Vista de sólo lectura (mmap) sobre un side-car de hojas.
+    Usar como context manager o llamar a close().
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SidecarError(f"Side-car vacío o inválido: {path}")
+
+        if len(self._mm) < HEADER_SIZE or self._mm[: len(SIDECAR_MAGIC)] != SIDECAR_MAGIC:
+            self.close()
+            raise SidecarError(f"Cabecera de side-car inválida: {path}")
+
+        offset = len(SIDECAR_MAGIC)
+        self.count = int.from_bytes(self._mm[offset:offset + 8], "big")
+        self.root_hex = self._mm[offset + 8:HEADER_SIZE].hex()
+
+        if len(self._mm) != HEADER_SIZE + self.count * LEAF_SIZE:
+            self.close()
+            raise SidecarError(f"Tamaño de side-car inconsistente con count={self.count}: {path}")
+
+    def __enter__(self) -> "LeavesSidecar":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        mm = getattr(self, "_mm", None)
+        if mm is not None and not mm.closed:
+            mm.close()
+        if not self._file.closed:
+            self._file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def digest_at(self, idx: int) -> bytes:
+        if not 0 <= idx < self.count:
+            raise IndexError("leaf index fuera de rango")
+        start = HEADER_SIZE + idx * LEAF_SIZE
+        return self._mm[start:start + LEAF_SIZE]
+
+    def iter_digests(self) -> Iterator[bytes]:
+        mm = self._mm
+        for start in range(HEADER_SIZE, HEADER_SIZE + self.count * LEAF_SIZE, LEAF_SIZE):
+            yield mm[start:start + LEAF_SIZE]
+
+    def find(self, digest: bytes) -> Optional[int]:
+        """
+        Índice de un digest (búsqueda binaria sobre el fichero), o None.
+        """
+        lo, hi = 0, self.count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.digest_at(mid) < digest:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo < self.count and self.digest_at(lo) == digest:
+            return lo
+        return None
+
+    def compute_merkle_root_hex(self) -> str:
+        return merkle_root_hex_stream(self.iter_digests())
+
+    def verify(self, expected_root_hex: Optional[str] = None) -> bool:
+        """
+        Recalcula la raíz desde las hojas y la compara con la cabecera
+        (y con expected_root_hex, p.ej. el participants_merkle_root persistido).
+        """
+        computed = self.compute_merkle_root_hex()
+        if computed != self.root_hex:
+            return False
+        return expected_root_hex is None or computed == str(expected_root_hex).lower()
+
+    def inclusion_proof(self, entry_digest: bytes) -> MerkleInclusionProof:
+        idx = self.find(entry_digest)
+        if idx is None:
+            raise SidecarError("La entrada no está en el side-car.")
+        builder = MerkleStreamBuilder(track_index=idx)
+        builder.add_many(self.iter_digests())
+        return builder.inclusion_proof()
+
+
+def open_leaves_sidecar(session_id: str, base_dir: Optional[str] = None) -> Optional[LeavesSidecar]:
+    """
+    Abre el side-car de una sesión si existe (None si no hay).
+    """
+    path = sidecar_path(session_id, base_dir)
+    if not os.path.exists(path):
+        return None
+    return LeavesSidecar(path)
+
+
+class OwnersSidecar:
+    """
+    Vista mmap del side-car de owners: owner_at(idx) en O(1).
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._file.close()
+            raise SidecarError(f"Side-car de owners vacío o inválido: {path}")
+
+        if len(self._mm) < OWNERS_HEADER_SIZE or self._mm[: len(OWNERS_MAGIC)] != OWNERS_MAGIC:
+            self.close()
+            raise SidecarError(f"Cabecera de owners inválida: {path}")
+
+        self.count = int.from_bytes(self._mm[len(OWNERS_MAGIC):OWNERS_HEADER_SIZE], "big")
+        if len(self._mm) != OWNERS_HEADER_SIZE + self.count * OWNER_SIZE:
+            self.close()
+            raise SidecarError(f"Tamaño de owners inconsistente con count={self.count}: {path}")
+
+    def __enter__(self) -> "OwnersSidecar":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def close(self) -> None:
+        mm = getattr(self, "_mm", None)
+        if mm is not None and not mm.closed:
+            mm.close()
+        if not self._file.closed:
+            self._file.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    def owner_at(self, idx: int) -> int:
+        if not 0 <= idx < self.count:
+            raise IndexError("owner index fuera de rango")
+        start = OWNERS_HEADER_SIZE + idx * OWNER_SIZE
+        return int.from_bytes(self._mm[start:start + OWNER_SIZE], "big")
+
+
+def open_owners_sidecar(session_id: str, base_dir: Optional[str] = None) -> Optional[OwnersSidecar]:
+    path = owners_sidecar_path(session_id, base_dir)
+    if not os.path.exists(path):
+        return None
+    return OwnersSidecar(path)
@@ -1,5 +1,6 @@
 import datetime
 from backend_core.services.supabase_client import table
+from backend_core.engines.expiry_scheduler import on_session_activated
 
 
 # =====================================================================
@@ -114,8 +115,11 @@ def mark_session_finished(session_id: str):
 
 
 def activate_session(session_id: str):
-    """Cambia estado a 'active' (legacy)."""
-    return update_session(session_id, {"status": "active"})
+    """Cambia estado a 'active' (legacy) y programa su expiración."""
+    rows = update_session(session_id, {"status": "active"})
+    row = rows[0] if isinstance(rows, list) and rows else {}
+    on_session_activated(session_id, row.get("created_at") if isinstance(row, dict) else None)
+    return rows
 
 
 # =====================================================================
@@ -0,0 +1,402 @@
+from __future__ import annotations
+
+import json
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from backend_core.services.supabase_client import table
+from backend_core.models.adjudication_models import (
+    SessionSnapshot,
+    ParticipantSnapshot,
+    canonical_json,
+    sha256_hex,
+)
+
+# ==========================================================
+# 🔹 CARGA UNIFICADA DE SNAPSHOTS (DB → MODELOS INMUTABLES)
+#
+# Una sesión closed/finished ya no cambia: su snapshot (sesión +
+# participantes) se cachea de forma permanente.
+#   - memoria: LRU en proceso, por session_id
+#   - disco: almacén direccionado por contenido
+#       <dir>/objects/<digest[:2]>/<digest>.json   snapshot canónico
+#       <dir>/sessions/<session_id>                digest del snapshot
+#     al leer se recalcula el digest: un fichero alterado es un miss.
+#
+# Replays, proof bundles y verificaciones reutilizan así el snapshot
+# en vez de volver a consultar ca_sessions / ca_participants.
+# ==========================================================
+
+SNAPSHOT_CACHE_MAX_ENTRIES = int(os.getenv("SNAPSHOT_CACHE_MAX_ENTRIES", "256"))
+SNAPSHOT_CACHE_DIR = os.getenv("SNAPSHOT_CACHE_DIR", "data/snapshot_cache")
+SNAPSHOT_DISK_CACHE = os.getenv("SNAPSHOT_DISK_CACHE", "true").lower() in ("1", "true", "yes", "on")
+
+# Sesiones por consulta IN en la carga en lote
+SNAPSHOT_BATCH_IN_SIZE = int(os.getenv("SNAPSHOT_BATCH_IN_SIZE", "100"))
+
+# Participantes por página (keyset session_id, id). PostgREST corta cada
+# respuesta en max-rows (1000 por defecto) sin avisar: debe ser <= ese tope,
+# así una página corta significa de verdad "no hay más".
+SNAPSHOT_PARTICIPANTS_PAGE_SIZE = int(os.getenv("SNAPSHOT_PARTICIPANTS_PAGE_SIZE", "1000"))
+
+CLOSED_STATUSES = ("closed", "finished")
+
+
+class InvariantViolationError(ValueError):
+    """Violación de invariantes: sesión no cerrada, sin participantes, etc."""
+
+
+@dataclass(frozen=True)
+class ClosedSessionSnapshot:
+    session: SessionSnapshot
+    participants: Tuple[ParticipantSnapshot, ...]
+    digest: str
+
+
+# ==========================================================
+# 🔹 UTILIDADES
+# ==========================================================
+
+def _parse_dt(value) -> datetime:
+    if isinstance(value, datetime):
+        return value.astimezone(timezone.utc)
+    return datetime.fromisoformat(str(value).replace("Z", "+00:00")).astimezone(timezone.utc)
+
+
+def _canonical_payload(session: SessionSnapshot, participants: Tuple[ParticipantSnapshot, ...]) -> Dict[str, Any]:
+    return {
+        "session": session.canonical_dict(),
+        "participants": [p.canonical_dict() for p in participants],
+    }
+
+
+def snapshot_digest(session: SessionSnapshot, participants) -> str:
+    """
+    SHA-256 del JSON canónico de sesión + participantes (clave del almacén en disco).
+    """
+    return sha256_hex(canonical_json(_canonical_payload(session, tuple(participants))))
+
+
+def _from_payload(payload: Dict[str, Any]) -> Tuple[SessionSnapshot, Tuple[ParticipantSnapshot, ...]]:
+    s = payload["session"]
+    session = SessionSnapshot(
+        session_id=s["session_id"],
+        product_id=s["product_id"],
+        session_created_at=_parse_dt(s["session_created_at"]),
+        session_closed_at=_parse_dt(s["session_closed_at"]),
+        capacity=int(s["capacity"]),
+        rules_version=s["rules_version"],
+    )
+    participants = tuple(
+        ParticipantSnapshot(
+            participant_id=p["participant_id"],
+            user_id=p["user_id"],
+            participations=int(p["participations"]),
+            joined_at=_parse_dt(p["joined_at"]),
+        )
+        for p in payload["participants"]
+    )
+    return session, participants
+
+
+# ==========================================================
+# 🔹 DB
+# ==========================================================
+
+SESSION_COLUMNS = "id, product_id, created_at, closed_at, capacity, rules_version, status"
+PARTICIPANT_COLUMNS = "id, user_id, participations, created_at, session_id"
+
+
+def _fetch_session(session_id: str) -> SessionSnapshot:
+    resp = (
+        table("ca_sessions")
+        .select(SESSION_COLUMNS)
+        .eq("id", session_id)
+        .single()
+        .execute()
+    )
+    return _session_from_row(resp.data)
+
+
+def _session_from_row(s: Optional[Dict[str, Any]]) -> SessionSnapshot:
+    if not s:
+        raise InvariantViolationError("Sesión no encontrada.")
+
+    if s.get("status") not in CLOSED_STATUSES:
+        raise InvariantViolationError("La sesión no está en estado cerrado/terminado (closed/finished).")
+
+    if not s.get("closed_at"):
+        raise InvariantViolationError("La sesión no tiene closed_at (snapshot no estable).")
+
+    capacity = int(s.get("capacity") or 0)
+    if capacity <= 0:
+        raise InvariantViolationError("La sesión no tiene capacity válido (>0).")
+
+    return SessionSnapshot(
+        session_id=str(s["id"]),
+        product_id=str(s["product_id"]),
+        session_created_at=_parse_dt(s["created_at"]),
+        session_closed_at=_parse_dt(s["closed_at"]),
+        capacity=capacity,
+        rules_version=s.get("rules_version") or "1.0",
+    )
+
+
+def _fetch_participants(session_id: str) -> Tuple[ParticipantSnapshot, ...]:
+    return _participants_from_rows(_fetch_participant_rows([session_id]))
+
+
+def _fetch_participant_rows(session_ids: List[str]) -> List[Dict[str, Any]]:
+    """
+    Todos los participantes de las sesiones, ordenados por (session_id, id),
+    leídos por páginas keyset hasta recibir una página corta. Nunca se
+    construye (ni se cachea) un snapshot con una respuesta truncada.
+    """
+    page_size = max(1, SNAPSHOT_PARTICIPANTS_PAGE_SIZE)
+    rows: List[Dict[str, Any]] = []
+    after: Optional[Tuple[str, str]] = None
+    while True:
+        query = table("ca_participants").select(PARTICIPANT_COLUMNS)
+        if len(session_ids) == 1:
+            query = query.eq("session_id", session_ids[0])
+        else:
+            query = query.in_("session_id", session_ids)
+        if after is not None:
+            sid, pid = after
+            query = query.or_(f'session_id.gt."{sid}",and(session_id.eq."{sid}",id.gt."{pid}")')
+        page = query.order("session_id").order("id").limit(page_size).execute().data or []
+        rows.extend(page)
+        if len(page) < page_size:
+            return rows
+        last = page[-1]
+        after = (str(last["session_id"]), str(last["id"]))
+
+
+def _participants_from_rows(rows: List[Dict[str, Any]]) -> Tuple[ParticipantSnapshot, ...]:
+    """
+    rows ya ordenadas por id (orden canónico del snapshot).
+    """
+    if not rows:
+        raise InvariantViolationError("No hay participantes en la sesión.")
+
+    return tuple(
+        ParticipantSnapshot(
+            participant_id=str(r["id"]),
+            user_id=str(r["user_id"]),
+            participations=int(r.get("participations") or 1),
+            joined_at=_parse_dt(r["created_at"]),
+        )
+        for r in rows
+    )
+
+
+# ==========================================================
+# 🔹 CACHÉ (LRU EN MEMORIA + DISCO DIRECCIONADO POR CONTENIDO)
+# ==========================================================
+
+_lock = threading.Lock()
+_memory: "OrderedDict[str, ClosedSessionSnapshot]" = OrderedDict()
+_stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "disk_errors": 0}
+
+
+def _object_path(digest: str, base_dir: str) -> str:
+    return os.path.join(base_dir, "objects", digest[:2], f"{digest}.json")
+
+
+def _index_path(session_id: str, base_dir: str) -> str:
+    return os.path.join(base_dir, "sessions", session_id)
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+def _memory_get(session_id: str) -> Optional[ClosedSessionSnapshot]:
+    with _lock:
+        snap = _memory.get(session_id)
+        if snap is not None:
+            _memory.move_to_end(session_id)
+        return snap
+
+
+def _memory_put(snap: ClosedSessionSnapshot) -> None:
+    with _lock:
+        _memory[snap.session.session_id] = snap
+        _memory.move_to_end(snap.session.session_id)
+        while len(_memory) > max(0, SNAPSHOT_CACHE_MAX_ENTRIES):
+            _memory.popitem(last=False)
+
+
+def _disk_get(session_id: str, base_dir: str) -> Optional[ClosedSessionSnapshot]:
+    index = _index_path(session_id, base_dir)
+    if not os.path.exists(index):
+        return None
+    try:
+        with open(index, "r", encoding="utf-8") as f:
+            digest = f.read().strip()
+        with open(_object_path(digest, base_dir), "rb") as f:
+            raw = f.read()
+        if sha256_hex(raw.decode("utf-8")) != digest:
+            raise ValueError("digest no coincide")
+        session, participants = _from_payload(json.loads(raw))
+        if session.session_id != session_id:
+            raise ValueError("session_id no coincide")
+        return ClosedSessionSnapshot(session=session, participants=participants, digest=digest)
+    except Exception:
+        # Entrada corrupta o incompleta: se descarta y se recarga desde DB
+        _stats["disk_errors"] += 1
+        return None
+
+
+def _disk_put(snap: ClosedSessionSnapshot, base_dir: str) -> None:
+    try:
+        canon = canonical_json(_canonical_payload(snap.session, snap.participants))
+        obj = _object_path(snap.digest, base_dir)
+        if not os.path.exists(obj):
+            _atomic_write(obj, canon.encode("utf-8"))
+        _atomic_write(_index_path(snap.session.session_id, base_dir), snap.digest.encode("ascii"))
+    except OSError:
+        # El disco es una optimización: si falla, seguimos con memoria + DB
+        _stats["disk_errors"] += 1
+
+
+# ==========================================================
+# 🔹 API PÚBLICA
+# ==========================================================
+
+def load_closed_snapshot(session_id: str, *, use_cache: bool = True) -> ClosedSessionSnapshot:
+    """
+    Snapshot inmutable (sesión + participantes ordenados por id) de una
+    sesión closed/finished. Orden de búsqueda: LRU → disco → DB.
+    Lanza InvariantViolationError si la sesión no es adjudicable.
+    """
+    session_id = str(session_id)
+    base_dir = SNAPSHOT_CACHE_DIR
+
+    if use_cache:
+        snap = _memory_get(session_id)
+        if snap is not None:
+            _stats["memory_hits"] += 1
+            return snap
+
+        if SNAPSHOT_DISK_CACHE:
+            snap = _disk_get(session_id, base_dir)
+            if snap is not None:
+                _stats["disk_hits"] += 1
+                _memory_put(snap)
+                return snap
+
+    _stats["misses"] += 1
+    return _build_snapshot(_fetch_session(session_id), _fetch_participants(session_id))
+
+
+def _build_snapshot(session: SessionSnapshot, participants: Tuple[ParticipantSnapshot, ...]) -> ClosedSessionSnapshot:
+    snap = ClosedSessionSnapshot(
+        session=session,
+        participants=participants,
+        digest=snapshot_digest(session, participants),
+    )
+    _memory_put(snap)
+    if SNAPSHOT_DISK_CACHE:
+        _disk_put(snap, SNAPSHOT_CACHE_DIR)
+    return snap
+
+
+def load_closed_snapshots(
+    session_ids: Iterable[str],
+    *,
+    use_cache: bool = True,
+) -> Dict[str, Union[ClosedSessionSnapshot, InvariantViolationError]]:
+    """
+    Carga en lote: caché primero y, para los que faltan, consultas IN por
+    bloque de SNAPSHOT_BATCH_IN_SIZE sesiones (ca_sessions + páginas de
+    ca_participants) en lugar de dos consultas por sesión.
+
+    Devuelve session_id -> snapshot, o el InvariantViolationError de esa
+    sesión (no cerrada, sin participantes...) sin abortar el lote.
+    """
+    out: Dict[str, Union[ClosedSessionSnapshot, InvariantViolationError]] = {}
+    pending: List[str] = []
+
+    for session_id in dict.fromkeys(str(s) for s in session_ids):
+        snap = None
+        if use_cache:
+            snap = _memory_get(session_id)
+            if snap is not None:
+                _stats["memory_hits"] += 1
+            elif SNAPSHOT_DISK_CACHE:
+                snap = _disk_get(session_id, SNAPSHOT_CACHE_DIR)
+                if snap is not None:
+                    _stats["disk_hits"] += 1
+                    _memory_put(snap)
+        if snap is not None:
+            out[session_id] = snap
+        else:
+            pending.append(session_id)
+
+    chunk_size = max(1, SNAPSHOT_BATCH_IN_SIZE)
+    for start in range(0, len(pending), chunk_size):
+        chunk = pending[start:start + chunk_size]
+        _stats["misses"] += len(chunk)
+
+        session_rows = table("ca_sessions").select(SESSION_COLUMNS).in_("id", chunk).execute().data or []
+        sessions_by_id = {str(r["id"]): r for r in session_rows}
+
+        participant_rows = _fetch_participant_rows(chunk)
+        participants_by_session: Dict[str, List[Dict[str, Any]]] = {}
+        for r in participant_rows:
+            participants_by_session.setdefault(str(r["session_id"]), []).append(r)
+
+        for session_id in chunk:
+            try:
+                session = _session_from_row(sessions_by_id.get(session_id))
+                participants = _participants_from_rows(participants_by_session.get(session_id, []))
+                out[session_id] = _build_snapshot(session, participants)
+            except InvariantViolationError as e:
+                out[session_id] = e
+
+    return out
+
+
+def load_session_snapshot(session_id: str) -> SessionSnapshot:
+    return load_closed_snapshot(session_id).session
+
+
+def load_participants_snapshot(session_id: str) -> List[ParticipantSnapshot]:
+    # Copia: el llamador puede modificar la lista sin tocar la caché
+    return list(load_closed_snapshot(session_id).participants)
+
+
+def invalidate_snapshot(session_id: str) -> None:
+    """
+    Elimina el snapshot de la caché (memoria + índice en disco), p.ej. tras
+    una corrección administrativa de datos. El objeto direccionado por
+    contenido se conserva: otro índice podría apuntar a él.
+    """
+    session_id = str(session_id)
+    with _lock:
+        _memory.pop(session_id, None)
+    try:
+        os.remove(_index_path(session_id, SNAPSHOT_CACHE_DIR))
+    except FileNotFoundError:
+        pass
+
+
+def clear_memory_cache() -> None:
+    with _lock:
+        _memory.clear()
+
+
+def snapshot_cache_stats() -> Dict[str, int]:
+    with _lock:
+        return {**_stats, "memory_entries": len(_memory)}
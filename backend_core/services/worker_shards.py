@@ -0,0 +1,274 @@
+# backend_core/services/worker_shards.py
+from __future__ import annotations
+
+import hashlib
+import logging
+import math
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, FrozenSet, Iterable, List, Optional, Set
+
+from backend_core.services.supabase_client import table
+
+logger = logging.getLogger(__name__)
+
+# ==========================================================
+# 🔹 SHARDING DE SESIONES ENTRE WORKERS (LEASES)
+#
+# Cada sesión pertenece a un shard fijo: md5(id)[:8] % WORKER_SHARD_COUNT.
+# Los workers se reparten los shards con leases con caducidad en
+# ca_worker_leases; un shard tiene como mucho un dueño vivo, así que dos
+# workers no procesan la misma sesión. Si un worker muere, sus leases
+# caducan y los demás se los reparten en el siguiente rebalanceo.
+#
+#   create table ca_worker_leases (
+#     shard int primary key,
+#     owner text,
+#     lease_until timestamptz not null
+#   );
+#   create table ca_worker_heartbeats (
+#     worker_id text primary key,
+#     heartbeat_at timestamptz not null
+#   );
+#
+# Opcional (filtro en DB en vez de en el worker):
+#   alter table ca_sessions add column shard int generated always as
+#     ((('x' || substr(md5(id::text), 1, 8))::bit(32)::bigint) % 64) stored;
+#
+# Las transiciones de sesión siguen siendo UPDATE condicionales: el lease
+# reparte el trabajo, la idempotencia la sigue dando la DB.
+# ==========================================================
+
+LEASES_TABLE = "ca_worker_leases"
+HEARTBEATS_TABLE = "ca_worker_heartbeats"
+
+WORKER_SHARD_COUNT = int(os.getenv("WORKER_SHARD_COUNT", "64"))
+# El TTL debe ser varias veces el intervalo de rebalanceo (y >> desfase de reloj)
+WORKER_LEASE_TTL_SECONDS = int(os.getenv("WORKER_LEASE_TTL_SECONDS", "60"))
+# Columna generada `shard` en ca_sessions ("" = filtrar en el worker)
+SESSION_SHARD_COLUMN = os.getenv("SESSION_SHARD_COLUMN", "")
+
+
+def shard_of(session_id: str, shard_count: int = WORKER_SHARD_COUNT) -> int:
+    """
+    Shard estable de una sesión (misma fórmula que la columna generada).
+    """
+    return int(hashlib.md5(str(session_id).encode("utf-8")).hexdigest()[:8], 16) % shard_count
+
+
+def default_worker_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def _parse_dt(value: Any) -> Optional[datetime]:
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
+    try:
+        dt = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+        return dt if dt.tzinfo else dt.replace(tzinfo=timezone.utc)
+    except Exception:
+        return None
+
+
+def scope_query(query: Any, shards: Optional["ShardLeaseManager"]) -> Any:
+    """
+    Restringe una consulta de ca_sessions a los shards del worker si existe
+    la columna generada; si no, el llamante filtra con shards.owns().
+    """
+    if shards is None or not SESSION_SHARD_COLUMN:
+        return query
+    return query.in_(SESSION_SHARD_COLUMN, sorted(shards.owned) or [-1])
+
+
+class ShardLeaseManager:
+    """
+    Leases de shards de un worker.
+
+    rebalance() (llamar en cada tick, antes de procesar):
+    1) heartbeat del worker
+    2) renueva sus leases (los que no se renuevan se han perdido)
+    3) objetivo = ceil(shards / workers vivos)
+    4) libera los sobrantes y reclama shards libres o caducados hasta el
+       objetivo (compare-and-swap sobre owner + lease_until)
+    """
+
+    def __init__(
+        self,
+        worker_id: Optional[str] = None,
+        *,
+        shard_count: int = WORKER_SHARD_COUNT,
+        ttl_seconds: int = WORKER_LEASE_TTL_SECONDS,
+        clock: Callable[[], datetime] = _utcnow,
+    ) -> None:
+        self.worker_id = worker_id or default_worker_id()
+        self.shard_count = shard_count
+        self.ttl = timedelta(seconds=ttl_seconds)
+        self._clock = clock
+        self._owned: Set[int] = set()
+        # Los shards sólo valen mientras el lease no caduque sin renovar
+        self._valid_until: Optional[datetime] = None
+        self._stats: Dict[str, Any] = {"rebalances": 0, "claimed": 0, "released": 0, "lost": 0}
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    @property
+    def owned(self) -> FrozenSet[int]:
+        return frozenset(self._owned)
+
+    def owns(self, session_id: str) -> bool:
+        if self._valid_until is None or self._clock() >= self._valid_until:
+            return False
+        return shard_of(session_id, self.shard_count) in self._owned
+
+    def filter_owned(self, session_ids: Iterable[str]) -> List[str]:
+        return [sid for sid in session_ids if self.owns(sid)]
+
+    def rebalance(self) -> Dict[str, Any]:
+        now = self._clock()
+        lease_until = (now + self.ttl).isoformat()
+        before = set(self._owned)
+
+        self._heartbeat(now)
+        self._renew(lease_until)
+
+        live_workers = self._live_workers(now)
+        target = math.ceil(self.shard_count / max(1, len(live_workers)))
+
+        if len(self._owned) > target:
+            extra = sorted(self._owned, key=self._preference)[target:]
+            self._release(extra, now)
+
+        if len(self._owned) < target:
+            self._claim_free(target - len(self._owned), now, lease_until)
+
+        self._valid_until = now + self.ttl
+        self._stats["rebalances"] += 1
+        return {
+            "worker_id": self.worker_id,
+            "live_workers": len(live_workers),
+            "target": target,
+            "owned": sorted(self._owned),
+            "gained": sorted(self._owned - before),
+            "changed": self._owned != before,
+        }
+
+    def release_all(self) -> None:
+        """
+        Apagado ordenado: libera los shards para que otro worker los tome
+        sin esperar a que caduquen.
+        """
+        now = self._clock()
+        self._release(sorted(self._owned), now)
+        self._valid_until = None
+        try:
+            table(HEARTBEATS_TABLE).delete().eq("worker_id", self.worker_id).execute()
+        except Exception:
+            logger.warning("No se pudo borrar el heartbeat de %s", self.worker_id)
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self._stats, "worker_id": self.worker_id, "owned": len(self._owned)}
+
+    # ------------------------------------------------------------------
+    # INTERNOS
+    # ------------------------------------------------------------------
+
+    def _preference(self, shard: int) -> int:
+        # Orden de preferencia propio del worker: reparte la contención
+        offset = shard_of(self.worker_id, self.shard_count)
+        return (shard - offset) % self.shard_count
+
+    def _heartbeat(self, now: datetime) -> None:
+        table(HEARTBEATS_TABLE).upsert(
+            {"worker_id": self.worker_id, "heartbeat_at": now.isoformat()}
+        ).execute()
+
+    def _live_workers(self, now: datetime) -> Set[str]:
+        since = (now - self.ttl).isoformat()
+        rows = table(HEARTBEATS_TABLE).select("worker_id").gt("heartbeat_at", since).execute().data or []
+        return {str(r["worker_id"]) for r in rows} | {self.worker_id}
+
+    def _renew(self, lease_until: str) -> None:
+        if not self._owned:
+            return
+        rows = (
+            table(LEASES_TABLE)
+            .update({"lease_until": lease_until})
+            .in_("shard", sorted(self._owned))
+            .eq("owner", self.worker_id)
+            .execute()
+            .data
+            or []
+        )
+        renewed = {int(r["shard"]) for r in rows}
+        lost = self._owned - renewed
+        if lost:
+            self._stats["lost"] += len(lost)
+            logger.warning("Worker %s perdió los shards %s", self.worker_id, sorted(lost))
+        self._owned = renewed
+
+    def _release(self, shards: List[int], now: datetime) -> None:
+        if not shards:
+            return
+        (
+            table(LEASES_TABLE)
+            .update({"owner": None, "lease_until": now.isoformat()})
+            .in_("shard", shards)
+            .eq("owner", self.worker_id)
+            .execute()
+        )
+        self._owned -= set(shards)
+        self._stats["released"] += len(shards)
+
+    def _claim_free(self, wanted: int, now: datetime, lease_until: str) -> None:
+        rows = table(LEASES_TABLE).select("shard, owner, lease_until").execute().data or []
+        by_shard = {int(r["shard"]): r for r in rows}
+
+        candidates = []
+        for shard in range(self.shard_count):
+            if shard in self._owned:
+                continue
+            row = by_shard.get(shard)
+            if row is None or not row.get("owner") or (_parse_dt(row.get("lease_until")) or now) <= now:
+                candidates.append(shard)
+        candidates.sort(key=self._preference)
+
+        for shard in candidates:
+            if wanted <= 0:
+                break
+            if self._claim(shard, by_shard.get(shard), lease_until):
+                self._owned.add(shard)
+                self._stats["claimed"] += 1
+                wanted -= 1
+
+    def _claim(self, shard: int, row: Optional[Dict[str, Any]], lease_until: str) -> bool:
+        """
+        Compare-and-swap: sólo gana si la fila sigue como se leyó.
+        """
+        try:
+            if row is None:
+                # PK(shard): si otro worker la insertó antes, falla el insert
+                resp = table(LEASES_TABLE).insert(
+                    {"shard": shard, "owner": self.worker_id, "lease_until": lease_until}
+                ).execute()
+                return bool(resp.data)
+
+            query = (
+                table(LEASES_TABLE)
+                .update({"owner": self.worker_id, "lease_until": lease_until})
+                .eq("shard", shard)
+                .eq("lease_until", row["lease_until"])
+            )
+            query = query.is_("owner", "null") if not row.get("owner") else query.eq("owner", row["owner"])
+            return bool(query.execute().data)
+        except Exception:
+            return False
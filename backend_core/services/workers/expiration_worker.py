@@ -3,65 +3,55 @@ expiration_worker.py
 Worker automático para procesar expiración de sesiones
 en Compra Abierta.
 
-Ejecuta periódicamente:
-    session_engine.process_expired_sessions()
+Ejecuta periódicamente (job `session_expiration` del runtime de workers):
+    SessionEngine.run_expiry_once()
 
-Este worker debe ejecutarse en background:
-    python expiration_worker.py
+Sólo se tocan las sesiones cuyo deadline ya pasó (ExpiryScheduler). Los
+deadlines se recargan cada EXPIRY_RELOAD_INTERVAL_SECONDS para recoger las
+sesiones activadas por otros procesos.
 
-O mediante:
-    pm2, supervisor, systemd, contenedor Docker, etc.
+Este worker puede ejecutarse solo en background:
+    python -m backend_core.services.workers.expiration_worker
+
+O junto al resto de jobs:
+    python -m backend_core.workers.run_workers
 """
 
-import time
-import traceback
-from datetime import datetime
+import os
 
-# Importar motor
-from ..session_engine import session_engine
-from ..audit_repository import log_event
+from backend_core.engines.session_engine import SessionEngine
+from backend_core.services.audit_repository import log_event
+from backend_core.services.audit_writer import flush_audit_log
+from backend_core.workers.worker_runtime import WorkerRuntime
 
 
 # INTERVALO ENTRE EJECUCIONES
 # ================================
 # Recomendado: cada 60 segundos
-INTERVAL_SECONDS = 60
+INTERVAL_SECONDS = int(os.getenv("EXPIRATION_WORKER_INTERVAL_SECONDS", "60"))
 
 
-def run_worker():
+def run_expiration_once() -> dict:
     """
-    Bucle principal del worker.
-    Llama al motor de expiración de sesiones cada X segundos.
+    Una pasada del motor de expiración.
     """
+    return SessionEngine().run_expiry_once()
+
 
+def run_worker():
+    """
+    Arranca el runtime con el job de expiración (backoff ante errores y
+    apagado ordenado con SIGTERM/SIGINT).
+    """
     log_event(
-        action="expiration_worker_started",
-        metadata={"interval_seconds": INTERVAL_SECONDS}
+        "expiration_worker_started",
+        extra={"interval_seconds": INTERVAL_SECONDS},
     )
 
-    print("🔧 Expiration Worker iniciado.")
-    print(f"⏳ Intervalo: {INTERVAL_SECONDS} segundos.")
-
-    while True:
-        try:
-            now = datetime.utcnow().isoformat()
-
-            print(f"[{now}] Ejecutando motor de expiración…")
-            session_engine.process_expired_sessions()
-
-            print(f"[{now}] ✓ Motor de expiración ejecutado correctamente.\n")
-
-        except Exception as e:
-            print("⚠️ Error en el worker de expiración:")
-            traceback.print_exc()
-
-            # Registrar error en auditoría
-            log_event(
-                action="expiration_worker_error",
-                metadata={"error": str(e)}
-            )
-
-        time.sleep(INTERVAL_SECONDS)
+    runtime = WorkerRuntime(max_workers=1)
+    runtime.register("session_expiration", run_expiration_once, INTERVAL_SECONDS, jitter_s=INTERVAL_SECONDS * 0.1)
+    runtime.add_shutdown_hook(flush_audit_log)
+    runtime.run_forever()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,133 @@
+# tests/test_adjudication_executor.py
+
+import threading
+import time
+from unittest.mock import patch
+
+import pytest
+
+from backend_core.services import adjudication_executor as ax
+from backend_core.services.adjudication_service_pro import AdjudicationInputs
+
+
+def _inputs(session_id):
+    return AdjudicationInputs(session_id=session_id, session_snapshot=None, participants_snapshot=[], commitment_row=None)
+
+
+@pytest.fixture
+def stages():
+    state = {"running": 0, "max_running": 0, "persisted": [], "slow_drand": set(), "gate": None}
+    lock = threading.Lock()
+
+    def load(session_id):
+        if session_id == "done":
+            return {"session_id": session_id, "status": "ALREADY_ADJUDICATED"}
+        return _inputs(session_id)
+
+    def drand(inputs):
+        with lock:
+            state["running"] += 1
+            state["max_running"] = max(state["max_running"], state["running"])
+        try:
+            if state["gate"] is not None:
+                state["gate"].wait(2)
+            if inputs.session_id in state["slow_drand"]:
+                time.sleep(0.3)
+            else:
+                time.sleep(0.02)
+        finally:
+            with lock:
+                state["running"] -= 1
+        return None
+
+    def persist(inputs, result):
+        state["persisted"].append(inputs.session_id)
+        return {"session_id": inputs.session_id}
+
+    with patch.object(ax, "load_adjudication_inputs", side_effect=load), \
+            patch.object(ax, "fetch_adjudication_entropy", side_effect=drand), \
+            patch.object(ax, "compute_adjudication", return_value="result"), \
+            patch.object(ax, "persist_adjudication", side_effect=persist), \
+            patch.object(ax, "log_event") as log_event:
+        state["log_event"] = log_event
+        yield state
+
+
+def test_runs_jobs_with_bounded_concurrency(stages):
+    executor = ax.AsyncAdjudicationExecutor(concurrency=2, queue_max=50)
+    try:
+        for i in range(8):
+            assert executor.submit(f"s-{i}")
+        assert executor.submit("done")
+        assert executor.join(5)
+    finally:
+        executor.stop()
+
+    assert sorted(stages["persisted"]) == sorted(f"s-{i}" for i in range(8))
+    assert stages["max_running"] == 2
+    stats = executor.stats()
+    assert stats["completed"] == 9
+    assert stats["failed"] == 0
+
+
+def test_stage_timeout_fails_job_without_blocking_others(stages):
+    stages["slow_drand"].add("slow")
+    executor = ax.AsyncAdjudicationExecutor(concurrency=2, stage_timeouts={"drand": 0.1})
+    try:
+        executor.submit("slow")
+        executor.submit("fast")
+        assert executor.join(5)
+    finally:
+        executor.stop()
+
+    assert stages["persisted"] == ["fast"]
+    stats = executor.stats()
+    assert stats["timeouts"]["drand"] == 1
+    assert stats["failed"] == 1
+    stages["log_event"].assert_called_once()
+    assert stages["log_event"].call_args.kwargs["event_type"] == "session_adjudication_timeout"
+
+
+def test_full_queue_rejects_and_duplicates_are_coalesced(stages):
+    stages["gate"] = threading.Event()
+    executor = ax.AsyncAdjudicationExecutor(concurrency=1, queue_max=2)
+    try:
+        assert executor.submit("a")
+        assert executor.submit("a")          # ya pendiente
+        assert executor.submit("b")
+        assert executor.submit("c") is False  # backpressure
+        stages["gate"].set()
+        assert executor.join(5)
+    finally:
+        executor.stop()
+
+    stats = executor.stats()
+    assert stats["submitted"] == 2
+    assert stats["duplicates"] == 1
+    assert stats["rejected"] == 1
+    assert sorted(stages["persisted"]) == ["a", "b"]
+
+
+def test_abandoned_stages_hold_their_slots_and_waiting_is_not_timed(stages):
+    stages["gate"] = threading.Event()
+    executor = ax.AsyncAdjudicationExecutor(concurrency=1, stage_timeouts={"load": 0.1, "drand": 0.1})
+    try:
+        for session_id in ("hung-1", "hung-2", "c"):
+            assert executor.submit(session_id)
+        deadline = time.monotonic() + 5
+        while executor.stats()["abandoned"] < executor.pool_size and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        # Pool agotado por hilos abandonados: "c" espera plaza sin consumir su timeout
+        time.sleep(0.2)
+        assert executor.submit("d") is False
+        stages["gate"].set()
+        assert executor.join(5)
+    finally:
+        executor.stop()
+
+    stats = executor.stats()
+    assert stages["persisted"] == ["c"]
+    assert stats["timeouts"]["drand"] == 2
+    assert stats["timeouts"]["load"] == 0
+    assert stats["rejected"] == 1
@@ -0,0 +1,63 @@
+# tests/test_adjudication_fanout.py
+
+from unittest.mock import MagicMock, patch
+
+from backend_core.benchmarks import bench_adjudication_fanout as bench
+from backend_core.services import adjudication_fanout as fanout
+
+
+def _items(n):
+    return [(f"s{i}", 1) for i in range(n)]
+
+
+def test_local_pool_matches_serial():
+    kwargs = {"worker_id": "w1", "io_ms": 0, "cpu_rounds": 10}
+
+    serial = list(fanout.SerialFanOut().map(bench.synthetic_adjudication, _items(20), **kwargs))
+    local = list(fanout.LocalProcessFanOut(3).map(bench.synthetic_adjudication, _items(20), **kwargs))
+
+    assert sorted(local, key=lambda r: r["session_id"]) == sorted(serial, key=lambda r: r["session_id"])
+
+
+def test_modal_fanout_maps_columns_with_shared_kwargs():
+    remote = MagicMock()
+    remote.map.return_value = iter([{"session_id": "s0"}, {"session_id": "s1"}])
+
+    results = list(fanout.ModalFanOut(remote).map(fanout.run_claimed_adjudication, _items(2), worker_id="w1"))
+
+    remote.map.assert_called_once_with(("s0", "s1"), (1, 1), kwargs={"worker_id": "w1"}, order_outputs=False)
+    assert len(results) == 2
+    assert list(fanout.ModalFanOut(remote).map(fanout.run_claimed_adjudication, [])) == []
+
+
+def test_batch_reports_outcomes_per_session():
+    jobs = [{"id": "ok", "adjudication_attempts": 1}, {"id": "bad", "adjudication_attempts": 1},
+            {"id": "stale", "adjudication_attempts": 9}]
+
+    def adjudicate(session_id):
+        if session_id == "bad":
+            raise ValueError("boom")
+
+    with patch.object(fanout, "claim_adjudication_jobs", return_value=jobs) as claim, \
+         patch.object(fanout, "adjudicate_session_pro", side_effect=adjudicate), \
+         patch.object(fanout, "complete_adjudication_job") as complete, \
+         patch.object(fanout, "fail_adjudication_job", side_effect=["retry", "dead"]), \
+         patch.object(fanout, "MAX_ATTEMPTS", 5):
+        result = fanout.run_adjudication_batch(50, worker_id="w1", executor=fanout.SerialFanOut())
+
+    claim.assert_called_once_with("w1", 50)
+    complete.assert_called_once_with("ok", "w1")
+    assert result["processed"] == ["ok"]
+    assert result["retrying"] == ["bad"]
+    assert result["dead_lettered"] == ["stale"]
+    assert result["errors"] == [{"session_id": "bad", "error": "ValueError: boom"}]
+
+
+def test_failed_completion_is_reported_as_retry_not_raised():
+    with patch.object(fanout, "adjudicate_session_pro"), \
+         patch.object(fanout, "complete_adjudication_job", side_effect=ConnectionError("reset")), \
+         patch.object(fanout, "fail_adjudication_job") as fail:
+        result = fanout.run_claimed_adjudication("s1", 1, "w1")
+
+    assert result == {"session_id": "s1", "outcome": fanout.JOB_RETRY, "error": "ConnectionError: reset"}
+    fail.assert_not_called()
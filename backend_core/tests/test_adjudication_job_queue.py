@@ -0,0 +1,205 @@
+# tests/test_adjudication_job_queue.py
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend_core.services import adjudication_job_queue as q
+from backend_core.services import adjudication_fanout as fanout
+from backend_core.services.drand_provider import DrandRoundNotAvailable
+from backend_core.workers import session_adjudication_worker as worker
+
+
+class FakeSessionsDB:
+    """
+    ca_sessions en memoria: filtros AND de PostgREST y el or_ de
+    "job listo" que usa el claim por CAS.
+    """
+
+    def __init__(self, sessions):
+        self.rows = {s["id"]: dict(s) for s in sessions}
+        self.updates = []
+
+    def table(self, name):
+        assert name == "ca_sessions"
+        query = MagicMock()
+        state = {"filters": [], "op": "select", "values": None, "limit": None}
+
+        def add_filter(fn):
+            state["filters"].append(fn)
+            return query
+
+        def ready(r):
+            now = datetime.now(timezone.utc).isoformat()
+            if r.get("adjudication_job_status") is None:
+                return r.get("adjudication_next_attempt_at") is None or r["adjudication_next_attempt_at"] <= now
+            if r.get("adjudication_job_status") == q.JOB_STATUS_CLAIMED:
+                return r["adjudication_claimed_until"] < now
+            return False
+
+        def update(values):
+            state["op"], state["values"] = "update", values
+            return query
+
+        def limit(n):
+            state["limit"] = n
+            return query
+
+        def execute():
+            matched = [r for r in self.rows.values() if all(f(r) for f in state["filters"])]
+            if state["op"] == "update":
+                for r in matched:
+                    r.update(state["values"])
+                self.updates.append(dict(state["values"]))
+            elif state["limit"] is not None:
+                matched = matched[: state["limit"]]
+            return MagicMock(data=[dict(r) for r in matched])
+
+        query.select.side_effect = lambda *a: query
+        query.update.side_effect = update
+        query.eq.side_effect = lambda c, v: add_filter(lambda r: r.get(c) == v)
+        query.is_.side_effect = lambda c, v: add_filter(lambda r: r.get(c) is None)
+        query.lte.side_effect = lambda c, v: add_filter(lambda r: r.get(c) is not None and r[c] <= v)
+        query.or_.side_effect = lambda expr: add_filter(ready)
+        query.order.side_effect = lambda *a, **kw: query
+        query.limit.side_effect = limit
+        query.execute.side_effect = execute
+        return query
+
+
+def _closed(sid):
+    return {
+        "id": sid,
+        "status": "closed",
+        "closed_at": f"2025-01-01T00:00:0{sid[-1]}+00:00",
+        "adjudicated_at": None,
+        "adjudication_job_status": None,
+        "adjudication_attempts": 0,
+        "adjudication_claimed_by": None,
+        "adjudication_claimed_until": None,
+        "adjudication_next_attempt_at": None,
+    }
+
+
+@pytest.fixture
+def db():
+    fake = FakeSessionsDB([_closed("s1"), _closed("s2")])
+    rpc = MagicMock()
+    rpc.rpc.side_effect = Exception("function ca_claim_adjudication_jobs does not exist")
+    with patch.object(q, "table", fake.table), \
+         patch.object(q, "supabase", rpc), \
+         patch.object(q, "log_event") as log, \
+         patch.object(q, "_claim_rpc_available", None):
+        fake.log = log
+        yield fake
+
+
+def test_claim_falls_back_to_cas_and_never_double_claims(db):
+    first = q.claim_adjudication_jobs("w1", limit=10)
+    second = q.claim_adjudication_jobs("w2", limit=10)
+
+    assert {r["id"] for r in first} == {"s1", "s2"}
+    assert second == []
+    assert all(r["adjudication_attempts"] == 1 for r in first)
+    assert q._claim_rpc_available is False
+
+
+def test_lost_cas_is_skipped(db):
+    real_table = db.table
+
+    def racing_table(name):
+        query = real_table(name)
+        original_update = query.update.side_effect
+
+        def update(values):
+            # Otro worker reclama s1 justo antes de nuestro CAS
+            if db.rows["s1"]["adjudication_attempts"] == 0:
+                db.rows["s1"].update(adjudication_attempts=1, adjudication_job_status="claimed")
+            return original_update(values)
+
+        query.update.side_effect = update
+        return query
+
+    with patch.object(q, "table", racing_table):
+        claimed = q.claim_adjudication_jobs("w1", limit=10)
+
+    assert [r["id"] for r in claimed] == ["s2"]
+
+
+def test_backoff_grows_and_is_capped():
+    with patch.object(q, "BACKOFF_BASE_S", 30), patch.object(q, "BACKOFF_MAX_S", 200):
+        assert [q.backoff_seconds(n) for n in (1, 2, 3, 4)] == [30, 60, 120, 200]
+
+
+def test_poison_session_is_dead_lettered_without_starving_healthy_ones(db):
+    adjudicated = []
+
+    def adjudicate(session_id):
+        if session_id == "s1":
+            raise RuntimeError("snapshot corrupto")
+        adjudicated.append(session_id)
+
+    with patch.object(fanout, "adjudicate_session_pro", side_effect=adjudicate), \
+         patch.object(q, "BACKOFF_BASE_S", 0), \
+         patch.object(fanout, "MAX_ATTEMPTS", 3), \
+         patch.object(q, "MAX_ATTEMPTS", 3):
+        results = [worker.run_session_adjudication_worker(limit=10, worker_id="w1") for _ in range(5)]
+
+    assert adjudicated == ["s2"]
+    assert db.rows["s2"]["adjudicated_at"] is not None
+    assert db.rows["s2"]["adjudication_job_status"] == q.JOB_STATUS_DONE
+
+    assert [r["retrying"] for r in results[:2]] == [["s1"], ["s1"]]
+    assert results[2]["dead_lettered"] == ["s1"]
+    assert results[3]["claimed"] == 0 and results[4]["claimed"] == 0
+    assert db.rows["s1"]["adjudication_job_status"] == q.JOB_STATUS_DEAD
+    assert db.rows["s1"]["adjudication_last_error"] == "RuntimeError: snapshot corrupto"
+
+    events = [c.args[0] for c in db.log.call_args_list]
+    assert events.count("session_adjudication_failed") == 2
+    assert events.count("session_adjudication_dead_lettered") == 1
+
+    assert q.requeue_dead_adjudication_job("s1") is True
+    assert db.rows["s1"]["adjudication_attempts"] == 0
+    assert [r["id"] for r in q.claim_adjudication_jobs("w1")] == ["s1"]
+
+
+def test_session_adjudicated_outside_the_queue_is_not_claimed(db):
+    # Adjudicación PRO desde el executor / scheduler drand (sin claim)
+    assert q.mark_session_adjudicated("s1") is True
+    assert q.mark_session_adjudicated("s1") is False
+
+    assert [r["id"] for r in q.claim_adjudication_jobs("w1")] == ["s2"]
+    assert db.rows["s1"]["adjudication_job_status"] == q.JOB_STATUS_DONE
+
+
+def test_queue_runs_the_pro_adjudication(db):
+    with patch.object(fanout, "adjudicate_session_pro") as adjudicate:
+        result = worker.run_session_adjudication_worker(limit=10, worker_id="w1")
+
+    assert sorted(c.args[0] for c in adjudicate.call_args_list) == ["s1", "s2"]
+    assert sorted(result["processed"]) == ["s1", "s2"]
+
+
+def test_recently_closed_session_waits_for_its_drand_round(db):
+    db.rows["s2"]["closed_at"] = datetime.now(timezone.utc).isoformat()
+
+    with patch.object(q, "CLAIM_MIN_AGE_S", 90):
+        assert [r["id"] for r in q.claim_adjudication_jobs("w1")] == ["s1"]
+
+
+def test_unpublished_round_reschedules_without_spending_an_attempt(db):
+    round_time = datetime.now(timezone.utc) + timedelta(seconds=20)
+
+    with patch.object(fanout, "adjudicate_session_pro", side_effect=DrandRoundNotAvailable(7, round_time)):
+        result = worker.run_session_adjudication_worker(limit=10, worker_id="w1")
+
+    assert sorted(result["rescheduled"]) == ["s1", "s2"]
+    assert result["retrying"] == [] and result["errors"] == []
+    row = db.rows["s1"]
+    assert row["adjudication_attempts"] == 0
+    assert row["adjudication_job_status"] is None and row["adjudication_claimed_by"] is None
+    assert row["adjudication_next_attempt_at"] == round_time.isoformat()
+    assert q.claim_adjudication_jobs("w1") == []
+    db.log.assert_not_called()
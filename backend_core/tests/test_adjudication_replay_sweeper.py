@@ -0,0 +1,172 @@
+# tests/test_adjudication_replay_sweeper.py
+
+import copy
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from backend_core.engines import adjudicator_engine_pro as engine
+from backend_core.models.adjudication_models import ParticipantSnapshot, SessionSnapshot
+from backend_core.services import adjudication_replay_service as replay
+from backend_core.services import adjudication_replay_sweeper as sweeper
+from backend_core.services.adjudication_replay_service import unverified_replay_report
+from backend_core.services.snapshot_loader import ClosedSessionSnapshot, InvariantViolationError
+
+
+SESSION_IDS = [f"sess-{i}" for i in range(7)]
+
+
+def _snapshot(session_id):
+    return ClosedSessionSnapshot(session=None, participants=(), digest=session_id)
+
+
+def _fake_replay(*, session_id, stored, session_snap, participants_snap, entropy_row):
+    status = "MISMATCH" if session_id == "sess-3" else "VERIFIED"
+    return unverified_replay_report(session_id, status, None)
+
+
+@pytest.fixture
+def fake_db():
+    loaded_batches = []
+
+    def load_adjudications(ids):
+        loaded_batches.append(list(ids))
+        return {sid: {"session_id": sid} for sid in ids if sid != "sess-5"}
+
+    def load_snapshots(ids):
+        return {sid: InvariantViolationError("abierta") if sid == "sess-6" else _snapshot(sid) for sid in ids}
+
+    with patch.object(sweeper, "_load_adjudications_by_ids", side_effect=load_adjudications), \
+            patch.object(sweeper, "load_closed_snapshots", side_effect=load_snapshots), \
+            patch.object(sweeper, "_load_entropy_rows", return_value={}), \
+            patch.object(sweeper, "replay_verify_loaded", side_effect=_fake_replay):
+        yield loaded_batches
+
+
+def test_sweep_batches_and_summarises(fake_db, tmp_path):
+    report_path = tmp_path / "reports.jsonl"
+
+    summary = sweeper.sweep_replay_verification(
+        session_ids=SESSION_IDS,
+        batch_size=3,
+        max_workers=1,
+        checkpoint_path=str(tmp_path / "cp.json"),
+        report_path=str(report_path),
+    )
+
+    assert fake_db == [SESSION_IDS[0:3], SESSION_IDS[3:6], SESSION_IDS[6:7]]
+    assert summary["status"] == "COMPLETED"
+    assert summary["processed"] == 7
+    assert summary["counts"] == {"VERIFIED": 4, "MISMATCH": 1, "NO_STORED_ADJUDICATION": 1, "ERROR": 1}
+    assert summary["mismatched_session_ids"] == ["sess-3"]
+    assert summary["error_session_ids"] == ["sess-6"]
+    assert [json.loads(line)["session_id"] for line in report_path.read_text().splitlines()] == SESSION_IDS
+
+
+def test_sweep_resumes_from_checkpoint(fake_db, tmp_path):
+    checkpoint = str(tmp_path / "cp.json")
+    kwargs = dict(session_ids=SESSION_IDS, batch_size=3, max_workers=1, checkpoint_path=checkpoint)
+
+    partial = sweeper.sweep_replay_verification(max_batches=1, **kwargs)
+    assert partial["status"] == "PARTIAL"
+    assert partial["processed"] == 3
+
+    final = sweeper.sweep_replay_verification(**kwargs)
+    assert final["resumed"] is True
+    assert final["status"] == "COMPLETED"
+    assert final["processed"] == 7
+    # el lote ya verificado no se vuelve a cargar
+    assert fake_db.count(SESSION_IDS[0:3]) == 1
+
+
+def test_checkpoint_of_another_sweep_is_rejected(fake_db, tmp_path):
+    checkpoint = str(tmp_path / "cp.json")
+    sweeper.sweep_replay_verification(session_ids=SESSION_IDS[:2], max_workers=1, checkpoint_path=checkpoint)
+
+    with pytest.raises(ValueError):
+        sweeper.sweep_replay_verification(session_ids=SESSION_IDS, max_workers=1, checkpoint_path=checkpoint)
+
+
+def test_sweep_requires_ids_or_range():
+    with pytest.raises(ValueError):
+        sweeper.sweep_replay_verification(from_utc="2025-01-01T00:00:00Z")
+
+
+def test_sweep_reuses_one_process_pool(fake_db, tmp_path):
+    pools = []
+
+    class FakePool:
+        def __init__(self, max_workers):
+            pools.append(self)
+            self.shutdown_called = False
+
+        def map(self, fn, jobs, chunksize=1):
+            return map(fn, jobs)
+
+        def shutdown(self):
+            self.shutdown_called = True
+
+    with patch.object(sweeper, "ProcessPoolExecutor", FakePool):
+        summary = sweeper.sweep_replay_verification(
+            session_ids=SESSION_IDS, batch_size=3, max_workers=2, checkpoint_path=str(tmp_path / "cp.json"),
+        )
+
+    assert summary["batches"] == 3
+    assert len(pools) == 1 and pools[0].shutdown_called
+
+
+class _AdjudicatedAt(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def test_replay_compares_the_engine_merkle_root():
+    now = _AdjudicatedAt.now()
+    session = SessionSnapshot(
+        session_id="sess-1", product_id="prod-1", session_created_at=now,
+        session_closed_at=now, capacity=10, rules_version="1.0",
+    )
+    participants = [
+        ParticipantSnapshot(participant_id=f"p-{i}", user_id=f"u-{i}", participations=1 + i % 3, joined_at=now)
+        for i in range(12)
+    ]
+    entropy_row = {"provider": "drand", "round": 1234, "randomness_hex": "ab" * 32}
+
+    # La fila persistida se calculó en otro instante que el replay (reloj real)
+    with patch.object(engine, "datetime", _AdjudicatedAt):
+        result = engine.adjudicate(
+            session=session,
+            participants=participants,
+            context=replay.DeterministicContext(
+                engine_version=replay.ENGINE_VERSION,
+                algorithm_id=engine.ALGORITHM_ID_DEFAULT,
+                normalization=replay.NORMALIZATION,
+            ),
+            external_entropy=replay._to_entropy_snapshot(entropy_row),
+        )
+    stored = {
+        "winner_participant_id": result.awarded_participant_id,
+        "inputs_hash": result.inputs_hash,
+        "proof_hash": result.proof_hash,
+        "algorithm_id": result.algorithm_id,
+        "ranking": result.ranking,
+        "created_at": now.isoformat(),
+    }
+    tampered = copy.deepcopy(stored)
+    tampered["ranking"]["meta"]["participants_merkle_root"] = "00" * 32
+
+    def verify(row):
+        return replay.replay_verify_loaded(
+            session_id="sess-1", stored=row, session_snap=session,
+            participants_snap=participants, entropy_row=entropy_row,
+        )
+
+    with patch.object(replay, "open_leaves_sidecar", return_value=None):
+        ok, bad = verify(stored), verify(tampered)
+
+    assert ok.status == "VERIFIED"
+    assert ok.notes["participants_merkle_root"] == result.ranking["meta"]["participants_merkle_root"]
+    assert bad.status == "MISMATCH" and "participants_merkle_root" in bad.reason
@@ -0,0 +1,100 @@
+# tests/test_adjudication_service_pro.py
+
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import pytest
+
+from backend_core.engines import adjudicator_engine_pro as engine
+from backend_core.models.adjudication_models import ParticipantSnapshot, SessionSnapshot
+from backend_core.services import adjudication_service_pro as svc
+
+
+FIXED_NOW = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+class _FixedDatetime(datetime):
+    @classmethod
+    def now(cls, tz=None):
+        return FIXED_NOW
+
+
+def _session():
+    return SessionSnapshot(
+        session_id="sess-1",
+        product_id="prod-1",
+        session_created_at=FIXED_NOW,
+        session_closed_at=FIXED_NOW,
+        capacity=10,
+        rules_version="1.0",
+    )
+
+
+def _participants(n=20):
+    return [
+        ParticipantSnapshot(participant_id=f"p-{i}", user_id=f"u-{i}", participations=1 + i % 3, joined_at=FIXED_NOW)
+        for i in range(n)
+    ]
+
+
+def _entropy():
+    return engine.ExternalEntropySnapshot(provider="drand", round=1234, randomness_hex="ab" * 32)
+
+
+@pytest.fixture(autouse=True)
+def fixed_clock():
+    with patch.object(engine, "datetime", _FixedDatetime):
+        yield
+
+
+def _v1_commitment_row(participants):
+    prepared = engine.prepare_adjudication(
+        session=_session(),
+        participants=participants,
+        context=svc._engine_context(engine.ALGORITHM_ID_DEFAULT),
+        compact=True,
+    )
+    return prepared.commitment.to_dict()
+
+
+def test_reveal_uses_the_algorithm_recorded_at_close():
+    participants = _participants()
+    commitment_row = _v1_commitment_row(participants)
+    inputs = svc.AdjudicationInputs(
+        session_id="sess-1",
+        session_snapshot=_session(),
+        participants_snapshot=participants,
+        commitment_row=commitment_row,
+    )
+
+    # ADJUDICATION_MANIFEST_VERSION cambió a v2 entre el cierre y la adjudicación
+    with patch.object(svc, "ALGORITHM_ID", engine.ALGORITHM_ID_MANIFEST_V2), \
+         patch.object(svc, "open_leaves_sidecar", return_value=None), \
+         patch.object(svc, "open_owners_sidecar", return_value=None):
+        result = svc.compute_adjudication(inputs, _entropy())
+
+    one_shot = engine.adjudicate(
+        session=_session(),
+        participants=participants,
+        context=svc._engine_context(engine.ALGORITHM_ID_DEFAULT),
+        external_entropy=_entropy(),
+    )
+    assert result.algorithm_id == engine.ALGORITHM_ID_DEFAULT
+    assert result.proof_hash == one_shot.proof_hash
+
+
+def test_commitment_from_another_engine_version_is_discarded_and_audited():
+    participants = _participants()
+    commitment_row = {**_v1_commitment_row(participants), "engine_version": "2.0.0"}
+
+    with patch.object(svc, "_get_existing_adjudication", return_value=None), \
+         patch.object(svc, "_load_commitment", return_value=commitment_row), \
+         patch.object(svc, "load_session_snapshot", return_value=_session()), \
+         patch.object(svc, "load_participants_snapshot", return_value=participants), \
+         patch.object(svc, "log_event") as log:
+        inputs = svc.load_adjudication_inputs("sess-1")
+
+    assert inputs.commitment_row is None
+    log.assert_called_once()
+    assert log.call_args.kwargs["event_type"] == "session_commitment_discarded"
+    assert log.call_args.kwargs["payload"]["commitment_engine_version"] == "2.0.0"
@@ -0,0 +1,364 @@
+# tests/test_adjudicator_engine_pro.py
+
+import hashlib
+from datetime import datetime, timezone
+
+import pytest
+
+from backend_core.models.adjudication_models import (
+    SessionSnapshot,
+    ParticipantSnapshot,
+    DeterministicContext,
+)
+from backend_core.engines import adjudicator_engine_pro as engine
+from backend_core.engines.merkle import (
+    MerkleInclusionProof,
+    MerkleStreamBuilder,
+    merkle_root_hex_stream,
+    verify_inclusion_proof,
+)
+from backend_core.engines.adjudicator_engine_pro import (
+    adjudicate,
+    ExternalEntropySnapshot,
+)
+
+
+FIXED_NOW = datetime(2025, 1, 1, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _session(session_id="sess-1"):
+    return SessionSnapshot(
+        session_id=session_id,
+        product_id="prod-1",
+        session_created_at=FIXED_NOW,
+        session_closed_at=FIXED_NOW,
+        capacity=10,
+        rules_version="1.0",
+    )
+
+
+def _participants(n, participations=(1, 2, 3, 0, None)):
+    return [
+        ParticipantSnapshot(
+            participant_id=f"p-{i}",
+            user_id=f"u-{i}",
+            participations=participations[i % len(participations)],
+            joined_at=FIXED_NOW,
+        )
+        for i in range(n)
+    ]
+
+
+def _context():
+    return DeterministicContext(
+        engine_version="3.0.0",
+        algorithm_id="deterministic_sha256_mod_with_drand_merkle",
+        normalization="stable_sort_by_entry_hash",
+    )
+
+
+def _entropy():
+    return ExternalEntropySnapshot(provider="drand", round=1234, randomness_hex="ab" * 32)
+
+
+# -----------------------------------------------------------
+# MODO COMPACTO
+# -----------------------------------------------------------
+
+@pytest.mark.parametrize("n", [1, 2, 3, 7, 64, 257])
+def test_compact_entries_match_legacy_order_and_mapping(n):
+    participants = _participants(n)
+
+    entries, mapping = engine._expand_entries(participants)
+    compact = engine._expand_entries_compact(participants)
+
+    assert len(compact) == len(entries)
+    assert [compact[i] for i in range(len(compact))] == entries
+    assert [compact.participant_at(i) for i in range(len(compact))] == [mapping[e] for e in entries]
+    assert engine._merkle_root_hex_compact(compact) == engine._merkle_root_hex(entries)
+
+
+@pytest.mark.parametrize("n", [1, 5, 100])
+def test_compact_adjudication_is_byte_identical(n):
+    participants = _participants(n)
+
+    legacy = adjudicate(
+        session=_session(),
+        participants=participants,
+        context=_context(),
+        external_entropy=_entropy(),
+    )
+    compact = adjudicate(
+        session=_session(),
+        participants=participants,
+        context=_context(),
+        external_entropy=_entropy(),
+        compact=True,
+    )
+
+    assert compact.inputs_hash == legacy.inputs_hash
+    assert compact.proof_hash == legacy.proof_hash
+    assert compact.awarded_participant_id == legacy.awarded_participant_id
+    assert compact.ranking == legacy.ranking
+
+
+# -----------------------------------------------------------
+# MERKLE EN STREAMING
+# -----------------------------------------------------------
+
+def _merkle_root_levels(leaves):
+    # Referencia nivel a nivel (duplica el último si impar)
+    if not leaves:
+        return hashlib.sha256(b"").hexdigest()
+    level = list(leaves)
+    while len(level) > 1:
+        level = [
+            hashlib.sha256(level[i] + (level[i + 1] if i + 1 < len(level) else level[i])).digest()
+            for i in range(0, len(level), 2)
+        ]
+    return level[0].hex()
+
+
+@pytest.mark.parametrize("n", list(range(0, 20)) + [31, 32, 33, 100, 1025])
+def test_streaming_merkle_matches_level_by_level(n):
+    leaves = [hashlib.sha256(str(i).encode()).digest() for i in range(n)]
+
+    assert merkle_root_hex_stream(iter(leaves)) == _merkle_root_levels(leaves)
+
+
+def test_streaming_merkle_keeps_logarithmic_pending_nodes():
+    builder = MerkleStreamBuilder()
+    for i in range(4096):
+        builder.add(hashlib.sha256(str(i).encode()).digest())
+
+    assert builder.count == 4096
+    assert len(builder._pending) <= 13
+
+
+# -----------------------------------------------------------
+# PRUEBAS DE INCLUSIÓN
+# -----------------------------------------------------------
+
+@pytest.mark.parametrize("n", [1, 2, 3, 5, 6, 13])
+def test_inclusion_proof_for_every_leaf(n):
+    leaves = [hashlib.sha256(str(i).encode()).digest() for i in range(n)]
+    root = _merkle_root_levels(leaves)
+
+    for idx in range(n):
+        proof = MerkleStreamBuilder(track_index=idx).add_many(leaves).inclusion_proof()
+        assert proof.root_hex == root
+        assert verify_inclusion_proof(proof, root)
+        assert verify_inclusion_proof(MerkleInclusionProof.from_dict(proof.to_dict()), root)
+
+
+def test_participant_inclusion_proof_against_adjudication_root():
+    participants = _participants(40)
+    result = adjudicate(
+        session=_session(),
+        participants=participants,
+        context=_context(),
+        external_entropy=_entropy(),
+    )
+    root = result.ranking["meta"]["participants_merkle_root"]
+
+    proof = engine.build_inclusion_proof(participants=participants, participant_id="p-2", ordinal=2)
+
+    assert verify_inclusion_proof(proof, root)
+    assert not verify_inclusion_proof(proof, "00" * 32)
+
+
+def test_inclusion_proof_rejects_tampered_path():
+    leaves = [hashlib.sha256(str(i).encode()).digest() for i in range(9)]
+    proof = MerkleStreamBuilder(track_index=4).add_many(leaves).inclusion_proof()
+    tampered = MerkleInclusionProof(
+        leaf_hex=proof.leaf_hex,
+        index=5,
+        leaves_count=proof.leaves_count,
+        root_hex=proof.root_hex,
+        path=proof.path,
+    )
+
+    assert not verify_inclusion_proof(tampered)
+
+
+def test_inclusion_proof_unknown_entry_raises():
+    with pytest.raises(ValueError):
+        engine.build_inclusion_proof(participants=_participants(3), participant_id="p-0", ordinal=7)
+
+
+# -----------------------------------------------------------
+# MANIFEST V2
+# -----------------------------------------------------------
+
+def test_manifest_v2_commits_to_root_and_keeps_v1_untouched():
+    participants = _participants(30)
+    v2_context = DeterministicContext(
+        engine_version="3.0.0",
+        algorithm_id=engine.ALGORITHM_ID_MANIFEST_V2,
+        normalization="stable_sort_by_entry_hash",
+    )
+
+    v1 = adjudicate(session=_session(), participants=participants, context=_context(), external_entropy=_entropy())
+    v2 = adjudicate(session=_session(), participants=participants, context=v2_context, external_entropy=_entropy())
+    v2_again = adjudicate(session=_session(), participants=participants, context=v2_context, external_entropy=_entropy())
+
+    assert v1.leaves is None
+    assert "manifest_schema_version" not in v1.ranking["meta"]
+    assert v2.ranking["meta"]["manifest_schema_version"] == "manifest.v2"
+    assert v2.ranking["meta"]["participants_merkle_root"] == v1.ranking["meta"]["participants_merkle_root"]
+    assert v2.inputs_hash != v1.inputs_hash
+    assert v2.inputs_hash == v2_again.inputs_hash
+    assert len(v2.leaves) == v1.ranking["meta"]["entries_count"]
+
+
+# -----------------------------------------------------------
+# DOS FASES: COMPROMISO + REVEAL
+# -----------------------------------------------------------
+
+def test_commit_then_reveal_matches_one_shot_adjudication():
+    participants = _participants(50)
+    one_shot = adjudicate(
+        session=_session(),
+        participants=participants,
+        context=_context(),
+        external_entropy=_entropy(),
+    )
+
+    prepared = engine.prepare_adjudication(
+        session=_session(),
+        participants=participants,
+        context=_context(),
+        compact=True,
+    )
+    commitment = engine.AdjudicationCommitment.from_dict(prepared.commitment.to_dict())
+    ids = engine.entry_participant_ids(participants)
+    entries = prepared.entries_sorted
+    lookups = []
+
+    def entry_at(idx):
+        lookups.append(idx)
+        return entries[idx], ids[entries.owners[idx]]
+
+    revealed = engine.reveal_adjudication(
+        session=_session(),
+        participants=participants,
+        commitment=commitment,
+        external_entropy=_entropy(),
+        entry_at=entry_at,
+    )
+
+    assert commitment.manifest_commit == one_shot.inputs_hash
+    assert revealed.proof_hash == one_shot.proof_hash
+    assert revealed.ranking == one_shot.ranking
+    assert len(lookups) == 1
+
+
+def test_reveal_rejects_snapshot_different_from_commitment():
+    participants = _participants(10)
+    prepared = engine.prepare_adjudication(session=_session(), participants=participants, context=_context())
+
+    with pytest.raises(ValueError):
+        engine.reveal_adjudication(
+            session=_session(),
+            participants=participants[:-1],
+            commitment=prepared.commitment,
+            external_entropy=_entropy(),
+            entry_at=prepared.entry_at,
+        )
+
+
+# -----------------------------------------------------------
+# RANKING TOP-K / PAGINADO
+# -----------------------------------------------------------
+
+def test_top_k_ranking_is_prefix_of_full_ranking():
+    participants = _participants(60)
+    full = adjudicate(session=_session(), participants=participants, context=_context(), external_entropy=_entropy())
+    top = adjudicate(
+        session=_session(),
+        participants=participants,
+        context=_context(),
+        external_entropy=_entropy(),
+        ranking_top_k=5,
+    )
+
+    full_rows = full.ranking["participants"]
+    assert top.proof_hash == full.proof_hash
+    assert top.ranking["participants"] == full_rows[:5]
+    assert top.ranking["meta"]["participants_total"] == len(participants)
+    awarded_rank = next(r["rank"] for r in full_rows if r["is_awarded"])
+    assert top.ranking["meta"]["awarded_rank"] == awarded_rank
+    assert engine.ranking_top_k_of(top.ranking) == 5
+    assert engine.ranking_top_k_of(full.ranking) is None
+
+
+def test_ranking_pages_rebuild_full_ranking():
+    participants = _participants(23)
+    full = adjudicate(session=_session(), participants=participants, context=_context(), external_entropy=_entropy())
+    seed = full.seed
+
+    pages = []
+    for offset in range(0, 23, 7):
+        pages.extend(
+            engine.build_ranking_page(
+                participants=participants,
+                seed_hex=seed,
+                awarded_participant_id=full.awarded_participant_id,
+                offset=offset,
+                limit=7,
+            )
+        )
+
+    assert pages == full.ranking["participants"]
+
+
+# -----------------------------------------------------------
+# LOTE (PROCESS POOL)
+# -----------------------------------------------------------
+
+def _batch(n):
+    return [(_session(f"sess-{i}"), _participants(3 + i), _entropy()) for i in range(n)]
+
+
+@pytest.mark.parametrize("max_workers,chunksize", [(1, None), (2, None), (2, 1), (3, 4)])
+def test_adjudicate_many_preserves_input_order(max_workers, chunksize):
+    batch = _batch(7)
+    expected = [
+        adjudicate(session=s, participants=p, context=_context(), external_entropy=e)
+        for s, p, e in batch
+    ]
+
+    results = engine.adjudicate_many(batch, context=_context(), max_workers=max_workers, chunksize=chunksize)
+
+    # proof_hash depende del reloj del proceso hijo: comparamos lo determinista
+    assert [r.inputs_hash for r in results] == [r.inputs_hash for r in expected]
+    assert [r.seed for r in results] == [r.seed for r in expected]
+    assert [r.awarded_participant_id for r in results] == [r.awarded_participant_id for r in expected]
+
+
+def test_adjudicate_many_return_exceptions_keeps_position():
+    batch = _batch(3)
+    batch[1] = (_session("sess-empty"), [], _entropy())
+
+    with pytest.raises(ValueError):
+        engine.adjudicate_many(batch, context=_context(), max_workers=1)
+
+    results = engine.adjudicate_many(batch, context=_context(), max_workers=2, return_exceptions=True)
+    assert isinstance(results[1], ValueError)
+    assert results[0].awarded_participant_id and results[2].awarded_participant_id
+
+
+def test_adjudicate_many_empty_batch():
+    assert engine.adjudicate_many([], context=_context()) == []
+
+
+def test_ranking_rank_of_matches_full_ranking():
+    participants = _participants(40)
+    seed_hex = "cd" * 32
+    full = engine.build_ranking_page(participants=participants, seed_hex=seed_hex, awarded_participant_id="p-0")
+
+    for row in full:
+        assert engine.ranking_rank_of(
+            participants=participants, seed_hex=seed_hex, participant_id=row["participant_id"],
+        ) == row["rank"]
+    assert engine.ranking_rank_of(participants=participants, seed_hex=seed_hex, participant_id="nadie") is None
@@ -0,0 +1,193 @@
+# tests/test_audit_chain.py
+
+import copy
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend_core.services import audit_chain as ac
+from backend_core.services import audit_repository
+
+KEY = "test-key"
+
+# Referencia real (conftest parchea audit_repository.log_event)
+real_log_event = audit_repository.log_event
+
+
+class FakeAuditLog:
+    """
+    audit_log en memoria con los mismos accesos que el verificador.
+    """
+
+    def __init__(self):
+        self.rows = []
+        self.fetched = 0
+
+    def write(self, row):
+        self.rows.append(copy.deepcopy(row))
+
+    def records(self, stream, after_seq, limit):
+        out = [
+            r for r in self.rows
+            if r["extra"].get("chain", {}).get("stream") == stream and r["extra"]["chain"]["seq"] > after_seq
+        ]
+        out = sorted(out, key=lambda r: r["extra"]["chain"]["seq"])[:limit]
+        self.fetched += len(out)
+        return copy.deepcopy(out)
+
+    def checkpoints(self, stream, after_seq):
+        return [
+            dict(r["extra"]) for r in self.rows
+            if r["event_type"] == ac.CHECKPOINT_EVENT and r["extra"]["stream"] == stream and r["extra"]["seq"] > after_seq
+        ]
+
+    def streams(self, since):
+        cps = [r for r in self.rows if r["event_type"] == ac.CHECKPOINT_EVENT]
+        return sorted({r["extra"]["stream"] for r in cps}), (cps[-1]["timestamp"] if cps else since)
+
+
+def _log(chain, log, n):
+    for i in range(n):
+        log.write(chain.seal({
+            "event_type": "e",
+            "operator_id": None,
+            "session_id": f"s{i}",
+            "timestamp": f"2025-01-01T00:00:{i % 60:02d}",
+            "extra": {"i": i},
+        }))
+        cp = chain.checkpoint_if_due()
+        if cp:
+            log.write(cp)
+
+
+def _verifier(log, tmp_path, key=KEY, page_size=2):
+    return ac.AuditChainVerifier(
+        key=key,
+        state_path=str(tmp_path / "verified.json"),
+        page_size=page_size,
+        fetch_records=log.records,
+        fetch_checkpoints=log.checkpoints,
+        list_streams=log.streams,
+    )
+
+
+def test_rows_are_linked_and_checkpoints_signed():
+    chain = ac.AuditChain(stream="w1", key=KEY, checkpoint_every=3)
+    log = FakeAuditLog()
+    _log(chain, log, 4)
+
+    records = [r for r in log.rows if r["event_type"] == "e"]
+    assert records[0]["extra"]["chain"]["prev"] == ac.GENESIS_HASH
+    for prev, row in zip(records, records[1:]):
+        assert row["extra"]["chain"]["prev"] == prev["extra"]["chain"]["hash"]
+    assert all(ac.record_hash(r) == r["extra"]["chain"]["hash"] for r in records)
+
+    [cp] = [r["extra"] for r in log.rows if r["event_type"] == ac.CHECKPOINT_EVENT]
+    assert cp["seq"] == 3 and cp["hash"] == records[2]["extra"]["chain"]["hash"]
+    assert cp["signature"] == ac.checkpoint_signature(cp, KEY)
+    assert chain.checkpoint()["extra"]["seq"] == 4
+    assert chain.checkpoint() is None
+
+
+def test_verifier_only_rehashes_records_after_last_checkpoint(tmp_path):
+    chain = ac.AuditChain(stream="w1", key=KEY, checkpoint_every=3)
+    log = FakeAuditLog()
+    _log(chain, log, 7)
+
+    first = _verifier(log, tmp_path).verify_all()
+    assert first["ok"] and first["rehashed"] == 6
+    assert first["reports"][0]["verified_seq"] == 6
+
+    _log(chain, log, 3)
+    log.fetched = 0
+    second = _verifier(log, tmp_path).verify_all()  # estado releído del fichero
+    assert second["ok"] and second["reports"][0]["verified_seq"] == 9
+    assert second["rehashed"] == 3 and log.fetched == 3
+
+
+def test_edited_deleted_or_forged_records_break_the_chain(tmp_path):
+    chain = ac.AuditChain(stream="w1", key=KEY, checkpoint_every=4)
+    log = FakeAuditLog()
+    _log(chain, log, 8)
+
+    edited = copy.deepcopy(log)
+    edited.rows[1]["extra"]["i"] = 99
+    report = _verifier(edited, tmp_path / "a").verify_stream("w1")
+    assert (report["status"], report["reason"], report["at_seq"]) == ("BROKEN", "hash_mismatch", 2)
+
+    deleted = copy.deepcopy(log)
+    del deleted.rows[5]  # seq 5 (el checkpoint de seq 4 va en la posición 4)
+    report = _verifier(deleted, tmp_path / "b").verify_stream("w1")
+    assert (report["reason"], report["verified_seq"]) == ("sequence_gap", 4)
+
+    report = _verifier(log, tmp_path / "c", key="other-key").verify_stream("w1")
+    assert report["reason"] == "bad_checkpoint_signature"
+
+    assert _verifier(log, tmp_path / "d").verify_stream("w1")["status"] == "VERIFIED"
+
+
+def test_redelivered_duplicate_rows_do_not_break_the_chain(tmp_path):
+    chain = ac.AuditChain(stream="w1", key=KEY, checkpoint_every=3)
+    log = FakeAuditLog()
+    _log(chain, log, 3)
+    log.rows.insert(2, copy.deepcopy(log.rows[1]))  # el shipper reenvió la fila 2
+
+    report = _verifier(log, tmp_path, page_size=10).verify_stream("w1")
+
+    assert (report["status"], report["verified_seq"], report["duplicates"]) == ("VERIFIED", 3, 1)
+
+
+def test_chain_requires_a_key_and_unsigned_checkpoints_are_not_verified(tmp_path):
+    with pytest.raises(ac.AuditChainKeyMissing):
+        ac.AuditChain(key="")
+    with pytest.raises(ac.AuditChainKeyMissing):
+        ac.AuditChainVerifier(key="", state_path=None)
+
+    chain = ac.AuditChain(stream="w1", key=KEY, checkpoint_every=2)
+    log = FakeAuditLog()
+    _log(chain, log, 2)
+    log.rows[-1]["extra"]["signature"] = None  # checkpoint reescrito sin firma
+
+    report = _verifier(log, tmp_path).verify_stream("w1")
+    assert (report["status"], report["reason"]) == ("BROKEN", "unsigned_checkpoint")
+
+
+def test_log_event_seals_rows_when_the_chain_is_on():
+    writer = MagicMock()
+    chain = ac.AuditChain(stream="w1", key=KEY)
+    with patch.object(audit_repository, "AUDIT_LOG_MODE", "buffered"), \
+         patch.object(audit_repository, "AUDIT_LOG_CHAIN", True), \
+         patch.object(audit_repository, "get_audit_chain", return_value=chain), \
+         patch.object(audit_repository, "_register_chain_checkpoint_hook"), \
+         patch.object(audit_repository, "get_audit_writer", return_value=writer):
+        real_log_event("e", session_id="s1")
+
+    row = writer.enqueue.call_args.args[0]
+    assert row["extra"]["chain"]["seq"] == 1 and row["extra"]["chain"]["hash"] == ac.record_hash(row)
+
+
+def test_rows_dropped_by_backpressure_do_not_leave_a_sequence_gap(tmp_path):
+    chain = ac.AuditChain(stream="w1", key=KEY, checkpoint_every=100)
+    log = FakeAuditLog()
+    calls = []
+
+    def enqueue(row):
+        calls.append(row)
+        if len(calls) == 3:
+            return False  # cola llena: la fila se descarta
+        log.write(row)
+        return True
+
+    writer = MagicMock()
+    writer.enqueue.side_effect = enqueue
+    with patch.object(audit_repository, "AUDIT_LOG_MODE", "buffered"), \
+         patch.object(audit_repository, "AUDIT_LOG_CHAIN", True), \
+         patch.object(audit_repository, "get_audit_chain", return_value=chain), \
+         patch.object(audit_repository, "_register_chain_checkpoint_hook"), \
+         patch.object(audit_repository, "get_audit_writer", return_value=writer):
+        results = [real_log_event("e", session_id=f"s{i}") for i in range(6)]
+    log.write(chain.checkpoint())
+
+    assert results == [True, True, False, True, True, True]
+    report = _verifier(log, tmp_path, page_size=10).verify_stream("w1")
+    assert (report["status"], report["verified_seq"]) == ("VERIFIED", 5)
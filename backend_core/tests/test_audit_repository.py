@@ -0,0 +1,110 @@
+# tests/test_audit_repository.py
+
+import re
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend_core.services import audit_repository as ar
+
+
+class FakeAuditLog:
+    """
+    audit_log en memoria: aplica los filtros y el keyset que recibe la query.
+    """
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.queries = []
+
+    def table(self, name):
+        state = {"eq": {}, "in": {}, "gte": {}, "lt": {}, "after": None, "limit": None, "select": None}
+        self.queries.append(state)
+        query = MagicMock()
+
+        def setter(key):
+            def _set(*args):
+                if len(args) == 2:
+                    state[key][args[0]] = args[1]
+                else:
+                    state[key] = args[0]
+                return query
+            return _set
+
+        def or_(expr):
+            ts, log_id = re.match(r'timestamp\.lt\."([^"]+)",and\(timestamp\.eq\."[^"]+",id\.lt\."([^"]+)"\)', expr).groups()
+            state["after"] = (ts, log_id)
+            return query
+
+        def execute():
+            rows = sorted(self.rows, key=lambda r: (r["timestamp"], r["id"]), reverse=True)
+            rows = [
+                r for r in rows
+                if all(r[c] == v for c, v in state["eq"].items())
+                and all(r[c] in v for c, v in state["in"].items())
+                and all(r[c] >= v for c, v in state["gte"].items())
+                and all(r[c] < v for c, v in state["lt"].items())
+                and (state["after"] is None or (r["timestamp"], r["id"]) < state["after"])
+            ]
+            return MagicMock(data=[dict(r) for r in rows[: state["limit"]]])
+
+        query.select.side_effect = setter("select")
+        query.eq.side_effect = setter("eq")
+        query.in_.side_effect = setter("in")
+        query.gte.side_effect = setter("gte")
+        query.lt.side_effect = setter("lt")
+        query.limit.side_effect = setter("limit")
+        query.order.side_effect = lambda *a, **k: query
+        query.or_.side_effect = or_
+        query.execute.side_effect = execute
+        return query
+
+
+def _rows():
+    # Timestamps repetidos: el desempate por id es lo que evita saltos/duplicados
+    return [
+        {"id": f"id{i:02d}", "timestamp": f"2025-01-0{1 + i // 3}T00:00:00", "event_type": "a" if i % 2 else "b",
+         "session_id": f"s{i % 3}", "operator_id": "op1", "extra": {"i": i}}
+        for i in range(8)
+    ]
+
+
+def test_pages_cover_every_row_once_in_keyset_order():
+    db = FakeAuditLog(_rows())
+    seen, cursor, pages = [], None, 0
+    with patch.object(ar, "table", db.table):
+        while True:
+            page = ar.query_audit_logs(limit=3, cursor=cursor)
+            seen += [r["id"] for r in page["rows"]]
+            pages += 1
+            cursor = page["next_cursor"]
+            if cursor is None:
+                break
+
+    expected = [r["id"] for r in sorted(_rows(), key=lambda r: (r["timestamp"], r["id"]), reverse=True)]
+    assert seen == expected and pages == 3
+    assert all(q["limit"] == 4 for q in db.queries)
+
+
+def test_filters_and_projection_run_server_side():
+    db = FakeAuditLog(_rows())
+    with patch.object(ar, "table", db.table):
+        page = ar.query_audit_logs(
+            event_type=["a"],
+            operator_id="op1",
+            since="2025-01-02",
+            until="2025-01-03",
+            columns=["event_type"],
+        )
+        all_rows = list(ar.iter_audit_logs(page_size=2, session_id="s0"))
+
+    assert [r["id"] for r in page["rows"]] == ["id05", "id03"] and page["next_cursor"] is None
+    assert db.queries[0]["select"] == "event_type,id,timestamp"
+    assert db.queries[0]["in"] == {"event_type": ["a"]}
+    assert [r["extra"]["i"] for r in all_rows] == [6, 3, 0]
+
+
+def test_invalid_cursor_is_rejected():
+    with pytest.raises(ValueError):
+        ar.decode_audit_cursor("not-a-cursor")
+    assert ar.decode_audit_cursor(ar.encode_audit_cursor("2025-01-01T00:00:00", 7)) == ("2025-01-01T00:00:00", "7")
@@ -0,0 +1,168 @@
+# tests/test_audit_spool.py
+
+import json
+import os
+from unittest.mock import MagicMock
+
+import pytest
+
+from backend_core.services import audit_spool as sp
+
+
+def _row(n):
+    return {"event_type": "e", "session_id": f"s{n}", "timestamp": "2025-01-01T00:00:00", "extra": {"n": n}}
+
+
+def test_records_roll_across_segments_and_shipped_segments_are_deleted(tmp_path):
+    spool = sp.AuditSpool(str(tmp_path), segment_max_bytes=300, fsync_interval_s=60)
+    for n in range(10):
+        assert spool.append(_row(n))
+    assert len(spool.segments()) > 2
+
+    rows, offset = spool.read(spool.committed_offset, 100)
+    assert [r["extra"]["n"] for r in rows] == list(range(10))
+
+    spool.commit(offset)
+    assert spool.segments() == [offset[0]]
+    assert spool.stats()["pending_bytes"] == 0
+    assert spool.read(offset, 100) == ([], offset)
+    spool.close()
+
+
+def test_torn_tail_is_truncated_on_reopen(tmp_path):
+    spool = sp.AuditSpool(str(tmp_path), fsync_interval_s=60)
+    for n in range(3):
+        spool.append(_row(n))
+    spool.close()
+
+    segment = os.path.join(str(tmp_path), sorted(f for f in os.listdir(tmp_path) if f.endswith(".seg"))[-1])
+    with open(segment, "ab") as f:
+        f.write(sp.encode_record(_row(99))[:-5])  # escritura cortada por la caída
+
+    reopened = sp.AuditSpool(str(tmp_path), fsync_interval_s=60)
+    assert reopened.stats()["recovered_truncated_bytes"] > 0
+    reopened.append(_row(3))
+
+    rows, _ = reopened.read(reopened.committed_offset, 100)
+    assert [r["extra"]["n"] for r in rows] == [0, 1, 2, 3]
+    reopened.close()
+
+
+def test_shipper_resumes_from_stored_offset_after_restart(tmp_path):
+    shipped = []
+    spool = sp.AuditSpool(str(tmp_path), fsync_interval_s=60)
+    for n in range(5):
+        spool.append(_row(n))
+
+    assert sp.AuditShipper(spool, sink=shipped.append, batch_size=2).ship_once() == 2
+    spool.close()  # "caída" tras guardar el offset del primer lote
+
+    restarted = sp.AuditSpool(str(tmp_path), fsync_interval_s=60)
+    shipper = sp.AuditShipper(restarted, sink=shipped.append, batch_size=2)
+    assert shipper.drain(timeout=5) is True
+
+    assert [[r["extra"]["n"] for r in batch] for batch in shipped] == [[0, 1], [2, 3], [4]]
+    assert shipper.stats()["pending_bytes"] == 0
+    restarted.close()
+
+
+def test_failed_ship_keeps_offset_and_full_spool_drops(tmp_path):
+    spool = sp.AuditSpool(str(tmp_path), max_bytes=len(sp.encode_record(_row(0))) * 2, fsync_interval_s=60)
+    assert [spool.append(_row(n)) for n in range(3)] == [True, True, False]
+
+    shipper = sp.AuditShipper(spool, sink=MagicMock(side_effect=RuntimeError("db down")))
+    assert shipper.drain(timeout=1) is False
+    stats = shipper.stats()
+    assert stats["failures"] == 1 and stats["dropped"] == 1 and stats["fill_ratio"] == 1.0
+    assert spool.committed_offset == (1, 0)
+
+    with pytest.raises(sp.SpoolLockedError):
+        sp.AuditSpool(str(tmp_path))
+    spool.close()
+
+
+def test_forked_child_opens_its_own_spool(tmp_path, monkeypatch):
+    base = str(tmp_path / "spool")
+    monkeypatch.setattr(sp, "AUDIT_SPOOL_DIR", base)
+    monkeypatch.setattr(sp, "_default_shipper", None)
+    monkeypatch.setattr(sp, "_forked_child", False)
+    monkeypatch.setattr(sp, "_atexit_registered", True)
+    monkeypatch.setattr(sp.AuditShipper, "start", lambda self: self)  # sin hilo de envío
+    parent = sp.get_audit_spool()
+    assert parent.append(_row(0))
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            child = sp.get_audit_spool()
+            ok = child is not parent and child.append(_row(1))
+            child.close()
+            os.write(write_fd, f"{ok}|{child.directory}".encode())
+        finally:
+            os._exit(0)
+    os.close(write_fd)
+    ok, directory = os.read(read_fd, 4096).decode().split("|")
+    os.waitpid(pid, 0)
+
+    assert ok == "True" and directory == f"{base}-{pid}"
+    rows, _ = parent.read(parent.committed_offset, 10)
+    assert [r["extra"]["n"] for r in rows] == [0]  # el hijo no escribió en el spool del padre
+    parent.close()
+
+
+def test_rejected_row_is_dead_lettered_after_repeated_failures(tmp_path):
+    spool = sp.AuditSpool(str(tmp_path / "spool"), fsync_interval_s=60)
+    for n in range(5):
+        spool.append(_row(n))
+    shipped, dead = [], []
+    db_up = {"value": True}
+
+    def sink(rows):
+        if not db_up["value"] or any(r["extra"]["n"] == 2 for r in rows):
+            raise ValueError("violates check constraint")
+        shipped.extend(r["extra"]["n"] for r in rows)
+
+    shipper = sp.AuditShipper(
+        spool, sink=sink, batch_size=10, poison_after_failures=2,
+        dead_letter=lambda row, error: dead.append(row["extra"]["n"]),
+    )
+    assert shipper.drain(timeout=1) is False
+    # DB caída en el modo fila a fila: no se descarta nada
+    db_up["value"] = False
+    assert shipper.drain(timeout=1) is False and shipper.drain(timeout=1) is False
+    assert dead == [] and spool.committed_offset == (1, 0)
+
+    db_up["value"] = True
+    assert shipper.drain(timeout=1) is True
+
+    assert shipped == [0, 1, 3, 4] and dead == [2]
+    assert shipper.stats()["dead_lettered"] == 1 and shipper.stats()["pending_bytes"] == 0
+    spool.close()
+
+
+def test_dead_letter_file_keeps_the_row_and_error(tmp_path, monkeypatch):
+    path = tmp_path / "dead" / "audit.jsonl"
+    monkeypatch.setattr(sp, "AUDIT_DEAD_LETTER_PATH", str(path))
+
+    sp.write_audit_dead_letter(_row(7), ValueError("too big"))
+
+    line = json.loads(path.read_text().strip())
+    assert line["row"] == _row(7) and line["error"] == "ValueError: too big"
+
+
+def test_spool_mode_without_a_configured_dir_falls_back_to_the_buffer(monkeypatch):
+    from backend_core.services import audit_repository
+
+    monkeypatch.setattr(sp, "AUDIT_SPOOL_DIR", "")
+    monkeypatch.setattr(sp, "_default_shipper", None)
+    with pytest.raises(OSError):
+        sp.get_audit_spool()
+
+    writer = MagicMock()
+    monkeypatch.setattr(audit_repository, "AUDIT_LOG_MODE", "spool")
+    monkeypatch.setattr(audit_repository, "_spool_unavailable", False)
+    monkeypatch.setattr(audit_repository, "get_audit_writer", lambda: writer)
+    audit_repository._write_row(_row(0))
+
+    writer.enqueue.assert_called_once_with(_row(0))
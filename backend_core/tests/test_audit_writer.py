@@ -0,0 +1,110 @@
+# tests/test_audit_writer.py
+
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+from backend_core.services import audit_repository
+from backend_core.services import audit_writer as aw
+
+# Referencia real (conftest parchea audit_repository.log_event)
+real_log_event = audit_repository.log_event
+
+
+def _wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return predicate()
+
+
+def test_flushes_full_batches_in_background_and_rest_on_demand():
+    batches = []
+    writer = aw.BufferedAuditWriter(sink=batches.append, batch_size=3, flush_interval_s=60)
+
+    for i in range(7):
+        assert writer.enqueue({"n": i})
+
+    assert _wait_for(lambda: writer.stats()["flushed"] == 6)
+    assert writer.flush() is True
+    writer.stop()
+
+    assert [[r["n"] for r in b] for b in batches] == [[0, 1, 2], [3, 4, 5], [6]]
+    assert writer.stats()["batches"] == 3 and writer.stats()["queued"] == 0
+
+
+def test_full_queue_drops_and_counts():
+    gate = threading.Event()
+    writer = aw.BufferedAuditWriter(sink=lambda rows: gate.wait(2), queue_max=2, batch_size=10, flush_interval_s=60)
+
+    results = [writer.enqueue({"n": i}) for i in range(3)]
+    gate.set()
+
+    assert results == [True, True, False]
+    assert writer.stats()["dropped"] == 1
+    writer.stop()
+    assert writer.stats()["flushed"] == 2
+
+
+def test_failed_batch_is_retried_in_order():
+    sink = MagicMock(side_effect=[RuntimeError("db down"), None])
+    writer = aw.BufferedAuditWriter(sink=sink, batch_size=10, flush_interval_s=60)
+    writer.enqueue({"n": 1})
+    writer.enqueue({"n": 2})
+
+    assert writer.flush() is False
+    assert writer.stats()["failed_batches"] == 1 and writer.stats()["queued"] == 2
+
+    assert writer.flush() is True
+    assert sink.call_args.args[0] == [{"n": 1}, {"n": 2}]
+    writer.stop()
+
+
+def test_rejected_row_is_dead_lettered_and_the_rest_flushed():
+    flushed, dead = [], []
+
+    def sink(rows):
+        if any(r["n"] == 1 for r in rows):
+            raise ValueError("value too long")
+        flushed.extend(r["n"] for r in rows)
+
+    writer = aw.BufferedAuditWriter(
+        sink=sink, batch_size=10, flush_interval_s=60, poison_after_failures=2,
+        dead_letter=lambda row, error: dead.append(row["n"]),
+    )
+    for i in range(3):
+        writer.enqueue({"n": i})
+
+    assert writer.flush() is False and writer.flush() is False
+    assert writer.flush() is True
+
+    assert flushed == [0, 2] and dead == [1]
+    stats = writer.stats()
+    assert stats["dead_lettered"] == 1 and stats["flushed"] == 2 and stats["queued"] == 0
+    writer.stop()
+
+
+def test_log_event_merges_aliases_and_buffers():
+    writer = MagicMock()
+    with patch.object(audit_repository, "AUDIT_LOG_MODE", "buffered"), \
+         patch.object(audit_repository, "AUDIT_LOG_CHAIN", False), \
+         patch.object(audit_repository, "get_audit_writer", return_value=writer):
+        real_log_event("payment_state_updated", session_id="s1", payload={"a": 1}, metadata={"b": 2})
+
+    row = writer.enqueue.call_args.args[0]
+    assert row["event_type"] == "payment_state_updated"
+    assert row["session_id"] == "s1" and row["operator_id"] is None
+    assert row["extra"] == {"a": 1, "b": 2}
+
+
+def test_fork_reset_drops_the_inherited_writer(monkeypatch):
+    inherited = aw.BufferedAuditWriter(sink=lambda rows: None)
+    inherited.enqueue({"n": 1})
+    monkeypatch.setattr(aw, "_default_writer", inherited)
+    monkeypatch.setattr(aw, "_atexit_registered", True)
+
+    aw._reset_after_fork()  # lo que corre en el hijo tras os.fork()
+    fresh = aw.get_audit_writer()
+
+    assert fresh is not inherited and fresh.stats()["queued"] == 0
+    inherited.stop()
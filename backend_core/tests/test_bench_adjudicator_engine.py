@@ -0,0 +1,49 @@
+# tests/test_bench_adjudicator_engine.py
+
+import pytest
+
+from backend_core.benchmarks import bench_adjudicator_engine as bench
+
+
+def _result(elapsed_s, peak_mib, case="uniform/1000/compact"):
+    return {
+        "schema_version": bench.BASELINE_SCHEMA_VERSION,
+        "cases": [
+            {
+                "case": case,
+                "stages": {"merkle": {"elapsed_s": elapsed_s, "peak_mib": peak_mib}},
+            }
+        ],
+    }
+
+
+@pytest.mark.parametrize("mode", bench.MODES)
+@pytest.mark.parametrize("distribution", bench.DISTRIBUTIONS)
+def test_stage_pipeline_matches_adjudicate(distribution, mode):
+    # measure_case lanza RuntimeError si las etapas divergen de adjudicate()
+    row = bench.measure_case(distribution, 50, mode, repeat=1)
+
+    assert row["case"] == bench.case_key(distribution, 50, mode)
+    assert set(row["stages"]) == set(bench.STAGES)
+
+
+def test_synthetic_participants_are_deterministic():
+    assert bench.make_participants(200, "skewed") == bench.make_participants(200, "skewed")
+    assert any(p.participations in (0, None) for p in bench.make_participants(200, "sparse"))
+
+
+def test_compare_flags_time_and_memory_regressions():
+    baseline = _result(elapsed_s=0.100, peak_mib=10.0)
+
+    assert bench.compare_to_baseline(_result(0.110, 11.0), baseline) == []
+
+    regressions = bench.compare_to_baseline(_result(0.200, 20.0), baseline)
+    assert {(r["stage"], r["metric"]) for r in regressions} == {("merkle", "elapsed_s"), ("merkle", "peak_mib")}
+
+
+def test_compare_ignores_noise_and_unknown_cases():
+    baseline = _result(elapsed_s=0.0001, peak_mib=0.01)
+
+    # x10 pero por debajo de los deltas mínimos absolutos
+    assert bench.compare_to_baseline(_result(0.001, 0.1), baseline) == []
+    assert bench.compare_to_baseline(_result(9.0, 900.0, case="skewed/1/legacy"), baseline) == []
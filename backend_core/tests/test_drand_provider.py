@@ -0,0 +1,95 @@
+# tests/test_drand_provider.py
+
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from backend_core.services import drand_provider as dp
+
+
+GENESIS = 1_700_000_000
+PERIOD = 3
+NOW = datetime.fromtimestamp(GENESIS + 3_000, tz=timezone.utc)
+
+
+def _provider(tmp_path, beacon=None, **cfg):
+    beacon = beacon or dp.FileDrandBeacon(str(tmp_path / "beacon.json"), genesis_time=GENESIS, period_seconds=PERIOD)
+    config = dp.DrandConfig(base_url="http://beacon.test", cache_dir=str(tmp_path / "cache"), **cfg)
+    return dp.HttpDrandProvider(config, fetch_json=beacon.fetch_json, clock=lambda: NOW), beacon
+
+
+def test_round_arithmetic_matches_drand_schedule():
+    info = dp.DrandChainInfo(genesis_time=GENESIS, period_seconds=PERIOD)
+    at = lambda s: datetime.fromtimestamp(GENESIS + s, tz=timezone.utc)  # noqa: E731
+
+    assert info.first_round_not_before(at(-10)) == 1
+    assert info.first_round_not_before(at(0)) == 1
+    assert info.first_round_not_before(at(1)) == 2
+    assert info.first_round_not_before(at(3)) == 2
+    assert info.round_time(2) == at(3)
+    assert info.round_at(at(5)) == 2
+
+
+def test_sessions_in_same_round_hit_the_network_once(tmp_path):
+    provider, beacon = _provider(tmp_path)
+    base = datetime.fromtimestamp(GENESIS + 1_000, tz=timezone.utc)
+
+    snapshots = [provider.get_round_after(base + timedelta(milliseconds=ms)) for ms in (1, 500, 1_500, 2_000)]
+
+    assert {s.round for s in snapshots} == {335}
+    assert beacon.requests == ["/info", "/public/335"]
+    assert snapshots[0].round_time_utc >= base
+    assert provider.stats()["memory_hits"] == 3
+
+    # Otro proceso con el mismo directorio de caché no toca la red
+    restarted, restarted_beacon = _provider(tmp_path, beacon=dp.FileDrandBeacon(str(tmp_path / "beacon.json")))
+    assert restarted.get_round(335) == snapshots[0]
+    assert restarted_beacon.requests == []
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def test_future_round_is_not_requested(tmp_path):
+    provider, beacon = _provider(tmp_path, genesis_time=GENESIS, period_seconds=PERIOD)
+
+    with pytest.raises(dp.DrandRoundNotAvailable) as exc:
+        provider.get_round_after(NOW + timedelta(seconds=30))
+
+    assert exc.value.round == 1_011
+    assert beacon.requests == []
+
+
+def test_inconsistent_round_is_rejected_and_not_cached(tmp_path):
+    provider, beacon = _provider(tmp_path)
+    beacon.fetch_json("/public/7")
+    beacon._data["rounds"]["7"]["randomness"] = "00" * 32
+
+    with pytest.raises(dp.DrandError):
+        provider.get_round(7)
+
+    assert not (tmp_path / "cache" / "default" / "7.json").exists()
+
+
+def test_concurrent_lookups_share_a_single_fetch(tmp_path):
+    provider, beacon = _provider(tmp_path, genesis_time=GENESIS, period_seconds=PERIOD)
+    release = threading.Event()
+    fetch = beacon.fetch_json
+
+    def slow_fetch(path):
+        release.wait(5)
+        return fetch(path)
+
+    provider._fetch_json = slow_fetch
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(provider.get_round(42))) for _ in range(8)]
+    for t in threads:
+        t.start()
+    while provider.stats()["shared_fetches"] < 7:
+        time.sleep(0.001)
+    release.set()
+    for t in threads:
+        t.join(5)
+
+    assert len(results) == 8 and len(set(results)) == 1
+    assert beacon.requests == ["/public/42"]
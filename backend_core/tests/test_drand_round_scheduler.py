@@ -0,0 +1,102 @@
+# tests/test_drand_round_scheduler.py
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import patch
+
+import pytest
+
+from backend_core.services import drand_provider as dp
+from backend_core.services import drand_round_scheduler as drs
+
+
+GENESIS = 1_700_000_000
+PERIOD = 3
+CLOSED_AT = datetime.fromtimestamp(GENESIS + 1_000, tz=timezone.utc)
+
+
+class Clock:
+    def __init__(self, now):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def env(tmp_path):
+    clock = Clock(CLOSED_AT)
+    beacon = dp.FileDrandBeacon(str(tmp_path / "beacon.json"), genesis_time=GENESIS, period_seconds=PERIOD)
+    provider = dp.HttpDrandProvider(
+        dp.DrandConfig(cache_dir=None, genesis_time=GENESIS, period_seconds=PERIOD),
+        fetch_json=beacon.fetch_json,
+        clock=clock,
+    )
+    batches = []
+
+    def adjudicate_batch(session_ids):
+        batches.append(list(session_ids))
+        return [{"session_id": sid, "status": "ADJUDICATED"} for sid in session_ids]
+
+    scheduler = drs.DrandRoundScheduler(
+        provider=provider, adjudicate_batch=adjudicate_batch, clock=clock, grace_seconds=1.0,
+    )
+    with patch("backend_core.services.adjudication_service_pro.DRAND_NOT_BEFORE_DELAY_SECONDS", 30), \
+         patch.object(drs, "log_event"):
+        yield scheduler, clock, beacon, batches
+
+
+def test_sessions_sharing_a_round_are_adjudicated_in_one_batch_after_one_fetch(env):
+    scheduler, clock, beacon, batches = env
+
+    rounds = {scheduler.defer(sid, CLOSED_AT + timedelta(milliseconds=ms))
+              for sid, ms in (("a", 0), ("b", 900), ("c", 1_900))}
+    late = scheduler.defer("d", CLOSED_AT + timedelta(seconds=5))
+
+    assert rounds == {345} and late == 346
+    assert scheduler.next_wake_at() == datetime.fromtimestamp(GENESIS + 344 * PERIOD + 1, tz=timezone.utc)
+
+    # Antes de la publicación no se pide nada
+    clock.now = CLOSED_AT + timedelta(seconds=31)
+    assert scheduler.run_due()["rounds"] == []
+    assert beacon.requests == []
+
+    clock.now = CLOSED_AT + timedelta(seconds=33)
+    metrics = scheduler.run_due()
+
+    assert metrics["rounds"] == [{"round": 345, "sessions": 3, "errors": 0}]
+    assert batches == [["a", "b", "c"]]
+    assert beacon.requests == ["/public/345"]
+    assert scheduler.pending() == {346: ["d"]}
+
+
+def test_unpublished_round_is_retried_with_backoff_and_keeps_its_sessions(env):
+    scheduler, clock, beacon, batches = env
+    round_number = scheduler.defer("a", CLOSED_AT)
+    publish_at = scheduler.next_wake_at()
+
+    # El beacon va con retraso: el round aún no se puede pedir
+    clock.now = publish_at
+    with patch.object(scheduler.provider, "get_round", side_effect=dp.DrandError("503")):
+        metrics = scheduler.run_due()
+
+    assert metrics["retried_rounds"] == [round_number]
+    assert scheduler.pending() == {round_number: ["a"]}
+    assert scheduler.next_wake_at() == publish_at + timedelta(seconds=drs.DRAND_ROUND_RETRY_SECONDS)
+
+    clock.now = scheduler.next_wake_at()
+    scheduler.run_due()
+    assert batches == [["a"]]
+    assert len(scheduler) == 0
+
+
+def test_failed_sessions_are_left_for_the_job_queue(env):
+    scheduler, clock, _, _ = env
+    scheduler._adjudicate_batch = lambda ids: [{"session_id": sid, "status": "ERROR", "error": "boom"} for sid in ids]
+    scheduler.defer("a", CLOSED_AT)
+
+    clock.now = scheduler.next_wake_at()
+    metrics = scheduler.run_due()
+
+    assert metrics["errors"] == 1
+    drs.log_event.assert_called_once()
+    assert scheduler.stats()["errors"] == 1
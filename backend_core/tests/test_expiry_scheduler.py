@@ -0,0 +1,48 @@
+# tests/test_expiry_scheduler.py
+
+from datetime import datetime, timedelta, timezone
+
+from backend_core.engines.expiry_scheduler import SESSION_DURATION_DAYS, ExpiryScheduler
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def test_pop_due_returns_only_expired_in_deadline_order():
+    sched = ExpiryScheduler()
+    sched.schedule("late", T0 + timedelta(hours=3))
+    sched.schedule("early", T0 + timedelta(hours=1))
+    sched.schedule("future", T0 + timedelta(days=1))
+
+    assert sched.pop_due(T0) == []
+    assert sched.pop_due(T0 + timedelta(hours=5)) == ["early", "late"]
+    assert len(sched) == 1
+    assert sched.next_deadline() == T0 + timedelta(days=1)
+
+
+def test_cancel_and_reschedule_discard_stale_entries():
+    sched = ExpiryScheduler()
+    sched.schedule("a", T0)
+    sched.schedule("b", T0)
+    sched.cancel("a")
+    sched.schedule("b", T0 + timedelta(hours=2))
+
+    assert sched.pop_due(T0 + timedelta(hours=1)) == []
+    assert sched.pop_due(T0 + timedelta(hours=2)) == ["b"]
+    assert len(sched) == 0
+
+
+def test_pop_due_limit_leaves_rest_for_next_tick():
+    sched = ExpiryScheduler()
+    for i in range(5):
+        sched.schedule(f"s-{i}", T0 + timedelta(minutes=i))
+
+    assert sched.pop_due(T0 + timedelta(hours=1), limit=2) == ["s-0", "s-1"]
+    assert sched.pop_due(T0 + timedelta(hours=1)) == ["s-2", "s-3", "s-4"]
+
+
+def test_schedule_session_uses_session_duration():
+    sched = ExpiryScheduler()
+    assert sched.schedule_session("s", T0.replace(tzinfo=None)) is True
+    assert sched.schedule_session("no-date", None) is False
+    assert sched.next_deadline() == T0 + timedelta(days=SESSION_DURATION_DAYS)
@@ -0,0 +1,83 @@
+# tests/test_leaves_sidecar.py
+
+import hashlib
+from array import array
+
+import pytest
+
+from backend_core.engines.merkle import merkle_root_hex_stream, verify_inclusion_proof
+from backend_core.services.leaves_sidecar import (
+    LeavesSidecar,
+    SidecarError,
+    open_leaves_sidecar,
+    open_owners_sidecar,
+    owners_sidecar_path,
+    sidecar_path,
+    write_leaves_sidecar,
+    write_owners_sidecar,
+)
+
+
+class _Leaves:
+    def __init__(self, digests):
+        self.digests = bytearray(b"".join(digests))
+        self._n = len(digests)
+
+    def __len__(self):
+        return self._n
+
+
+def _sorted_leaves(n):
+    return sorted(hashlib.sha256(f"p-{i}:0".encode()).digest() for i in range(n))
+
+
+@pytest.mark.parametrize("n", [0, 1, 7, 64])
+def test_sidecar_roundtrip_and_root(tmp_path, n):
+    leaves = _sorted_leaves(n)
+    root = merkle_root_hex_stream(leaves)
+    path = write_leaves_sidecar(sidecar_path("sess-1", str(tmp_path)), _Leaves(leaves), root)
+
+    with LeavesSidecar(path) as sidecar:
+        assert len(sidecar) == n
+        assert sidecar.root_hex == root
+        assert list(sidecar.iter_digests()) == leaves
+        assert sidecar.verify(root)
+
+
+def test_sidecar_inclusion_proof_is_verifiable(tmp_path):
+    leaves = _sorted_leaves(25)
+    root = merkle_root_hex_stream(leaves)
+    write_leaves_sidecar(sidecar_path("sess-2", str(tmp_path)), _Leaves(leaves), root)
+
+    with open_leaves_sidecar("sess-2", str(tmp_path)) as sidecar:
+        proof = sidecar.inclusion_proof(hashlib.sha256(b"p-3:0").digest())
+        with pytest.raises(SidecarError):
+            sidecar.inclusion_proof(hashlib.sha256(b"nobody:0").digest())
+
+    assert verify_inclusion_proof(proof, root)
+
+
+def test_sidecar_detects_corruption(tmp_path):
+    leaves = _sorted_leaves(10)
+    root = merkle_root_hex_stream(leaves)
+    path = write_leaves_sidecar(sidecar_path("sess-3", str(tmp_path)), _Leaves(leaves), root)
+
+    with open(path, "r+b") as f:
+        f.seek(-1, 2)
+        f.write(b"\x00" if leaves[-1][-1] != 0 else b"\x01")
+
+    with LeavesSidecar(path) as sidecar:
+        assert not sidecar.verify(root)
+
+    assert open_leaves_sidecar("missing", str(tmp_path)) is None
+
+
+def test_owners_sidecar_roundtrip(tmp_path):
+    owners = array("I", [3, 0, 70000, 2 ** 32 - 1, 1])
+    write_owners_sidecar(owners_sidecar_path("sess-4", str(tmp_path)), owners)
+
+    with open_owners_sidecar("sess-4", str(tmp_path)) as sidecar:
+        assert len(sidecar) == len(owners)
+        assert [sidecar.owner_at(i) for i in range(len(owners))] == list(owners)
+        with pytest.raises(IndexError):
+            sidecar.owner_at(len(owners))
@@ -0,0 +1,155 @@
+# tests/test_session_closure_feed.py
+
+import json
+from datetime import datetime, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend_core.engines import session_closure_feed as feed
+
+
+SESSIONS = {
+    "s-1": {"id": "s-1", "status": "active", "capacity": 3},
+    "s-closed": {"id": "s-closed", "status": "closed", "capacity": 3},
+}
+
+
+@pytest.fixture
+def env():
+    real_fill = {"s-1": 1}
+    session_queries = []
+
+    def table(name):
+        query = MagicMock()
+        state = {}
+        query.select.return_value = query
+        query.limit.return_value = query
+
+        def eq(column, value):
+            state["id"] = value
+            return query
+
+        def execute():
+            session_queries.append(state["id"])
+            row = SESSIONS.get(state["id"])
+            return MagicMock(data=[row] if row else [])
+
+        query.eq.side_effect = eq
+        query.execute.side_effect = execute
+        return query
+
+    engine = MagicMock()
+    engine._get_filled_units.side_effect = lambda sid: real_fill.get(sid, 0)
+    engine.close_full_session.return_value = True
+
+    with patch.object(feed, "table", table):
+        bus = feed.LocalNotifyQueue()
+        consumer = feed.SessionClosureConsumer(bus, feed.SessionFillTracker(engine=engine))
+        yield bus, consumer, engine, real_fill, session_queries
+
+
+def _insert(bus, session_id, units=1, created_at=None):
+    bus.notify(
+        feed.PARTICIPANT_INSERTS_CHANNEL,
+        json.dumps({"table": "ca_session_participants", "session_id": session_id, "units": units,
+                    "created_at": created_at}),
+    )
+
+
+def test_closes_as_soon_as_capacity_is_reached(env):
+    bus, consumer, engine, real_fill, session_queries = env
+
+    _insert(bus, "s-1")                      # siembra: SUM real = 1
+    assert consumer.process_available() == 0
+    assert consumer.tracker.filled("s-1") == 1
+
+    real_fill["s-1"] = 3
+    _insert(bus, "s-1", units=2, created_at=datetime.now(timezone.utc).isoformat())
+    assert consumer.process_available() == 1
+
+    engine.close_full_session.assert_called_once_with("s-1")
+    stats = consumer.tracker.stats()
+    assert stats["closed"] == 1
+    assert stats["tracked_sessions"] == 0
+    assert stats["last_close_latency_ms"] is not None
+    assert session_queries == ["s-1"]
+
+
+def test_double_counted_threshold_is_reseeded_not_closed(env):
+    bus, consumer, engine, real_fill, _ = env
+
+    _insert(bus, "s-1")
+    real_fill["s-1"] = 2                     # este alta ya estaba en la siembra
+    _insert(bus, "s-1", units=2)
+    assert consumer.process_available() == 0
+
+    engine.close_full_session.assert_not_called()
+    assert consumer.tracker.filled("s-1") == 2
+    assert consumer.tracker.stats()["reseeded"] == 1
+
+
+def test_inactive_sessions_are_ignored_and_cached(env):
+    bus, consumer, engine, _, session_queries = env
+
+    for _ in range(3):
+        _insert(bus, "s-closed")
+    _insert(bus, "s-missing")
+    bus.notify("other_channel", "{}")
+    consumer.process_available()
+
+    engine.close_full_session.assert_not_called()
+    assert session_queries == ["s-closed", "s-missing"]
+    assert consumer.tracker.stats()["ignored"] == 4
+
+
+def test_bad_payload_counts_error_and_keeps_consuming(env):
+    bus, consumer, _, _, _ = env
+
+    bus.notify(feed.PARTICIPANT_INSERTS_CHANNEL, "not json")
+    _insert(bus, "s-1")
+    consumer.process_available()
+
+    assert consumer.tracker.stats()["errors"] == 1
+    assert consumer.tracker.filled("s-1") == 1
+
+
+def test_sessions_expired_by_the_poller_release_their_counter(env):
+    bus, _, _, _, session_queries = env
+    from backend_core.engines import session_engine as se
+
+    engine = se.SessionEngine(cursor_store=MagicMock(), scheduler=MagicMock())
+    consumer = feed.SessionClosureConsumer(bus, feed.SessionFillTracker(engine=engine))
+    engine._get_filled_units = lambda sid: 1
+    _insert(bus, "s-1")
+    consumer.process_available()
+    assert consumer.tracker.stats()["tracked_sessions"] == 1
+
+    expire_query = MagicMock()
+    expire_query.update.return_value = expire_query
+    expire_query.in_.return_value = expire_query
+    expire_query.eq.return_value = expire_query
+    expire_query.execute.return_value = MagicMock(data=[{"id": "s-1"}])
+    with patch.object(se, "table", return_value=expire_query), patch.object(se, "log_event"):
+        assert engine._expire_sessions_if_active(["s-1"]) == ["s-1"]
+
+    assert consumer.tracker.stats()["tracked_sessions"] == 0
+    _insert(bus, "s-1")                      # alta tardía: no se resiembra
+    consumer.process_available()
+    assert session_queries == ["s-1"]
+
+
+def test_tracked_sessions_are_bounded_by_lru(env, monkeypatch):
+    bus, consumer, _, _, _ = env
+    monkeypatch.setitem(SESSIONS, "s-2", {"id": "s-2", "status": "active", "capacity": 3})
+    monkeypatch.setattr(feed, "TRACKED_SESSIONS_MAX", 1)
+
+    _insert(bus, "s-1")
+    _insert(bus, "s-2")
+    consumer.process_available()
+
+    stats = consumer.tracker.stats()
+    assert stats["tracked_sessions"] == 1
+    assert stats["evicted"] == 1
+    assert consumer.tracker.filled("s-1") is None
+    assert consumer.tracker.filled("s-2") == 0
@@ -0,0 +1,389 @@
+# tests/test_session_engine.py
+
+import re
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend_core.engines import session_engine as se
+from backend_core.engines.expiry_scheduler import ExpiryScheduler
+
+
+NOW = datetime(2025, 1, 10, 12, 0, 0, tzinfo=timezone.utc)
+
+
+def _row(session_id, capacity=10, created_days_ago=1):
+    return {
+        "id": session_id,
+        "product_id": "prod-1",
+        "module_id": None,
+        "status": se.STATUS_ACTIVE,
+        "capacity": capacity,
+        "created_at": (NOW - timedelta(days=created_days_ago)).isoformat(),
+        "closed_at": None,
+        "rules_version": "1.0",
+        "previous_session_id": None,
+        "previous_chain_hash": None,
+    }
+
+
+class FakeDB:
+    """
+    Stand-in mínimo de table()/supabase.rpc(): registra cada round trip.
+    """
+
+    def __init__(self, sessions, participants, rpc_rows=None):
+        self.sessions = sessions
+        self.participants = participants
+        self.rpc_rows = rpc_rows
+        self.calls = []
+
+    def _query(self, name, data_fn):
+        query = MagicMock()
+        state = {"filters": {}}
+
+        def chain(*args, **kwargs):
+            return query
+
+        def in_(column, values):
+            state["filters"][column] = set(values)
+            return query
+
+        def or_(expr):
+            # keyset: <col>.gt."<v>",and(<col>.eq."<v>",id.gt."<id>"),...
+            col, value, rid = re.match(r'(\w+)\.gt\."([^"]+)",and\(\w+\.eq\."[^"]+",id\.gt\."([^"]+)"\)', expr).groups()
+            state["filters"]["after" if col == "created_at" else "after_participant"] = (value, rid)
+            return query
+
+        def limit(n):
+            state["filters"]["limit"] = n
+            return query
+
+        def update(values):
+            state["filters"]["update"] = values
+            return query
+
+        def execute():
+            self.calls.append(name)
+            return MagicMock(data=data_fn(state["filters"]))
+
+        for method in ("select", "eq", "order"):
+            getattr(query, method).side_effect = chain
+        query.in_.side_effect = in_
+        query.or_.side_effect = or_
+        query.limit.side_effect = limit
+        query.update.side_effect = update
+        query.execute.side_effect = execute
+        return query
+
+    def _active_page(self, filters):
+        if "update" in filters:
+            ids = filters.get("id")
+            return [{"id": i} for i in sorted(ids)] if ids else [{"id": "updated"}]
+        rows = sorted(
+            (r for r in self.sessions if r["status"] == se.STATUS_ACTIVE),
+            key=lambda r: (datetime.fromisoformat(r["created_at"]), r["id"]),
+        )
+        if "id" in filters:
+            rows = [r for r in rows if r["id"] in filters["id"]]
+        if "after" in filters:
+            ts, sid = datetime.fromisoformat(filters["after"][0]), filters["after"][1]
+            rows = [r for r in rows if (datetime.fromisoformat(r["created_at"]), r["id"]) > (ts, sid)]
+        return rows[: filters.get("limit", len(rows))]
+
+    def table(self, name):
+        if name == se.SESSIONS_TABLE:
+            return self._query(name, self._active_page)
+        return self._query(name, self._participants_page)
+
+    def _participants_page(self, filters):
+        rows = sorted(
+            (r for r in self.participants if r["session_id"] in filters.get("session_id", set())),
+            key=lambda r: (r["session_id"], r.get("id", "")),
+        )
+        if "after_participant" in filters:
+            rows = [r for r in rows if (r["session_id"], r.get("id", "")) > filters["after_participant"]]
+        return rows[: filters.get("limit", len(rows))]
+
+    def rpc(self, fn, params):
+        if self.rpc_rows is None:
+            raise RuntimeError("function does not exist")
+        return self._query(f"rpc:{fn}", lambda f: self.rpc_rows)
+
+
+def _engine(**kwargs):
+    return se.SessionEngine(cursor_store=se.MemoryCursorStore(), scheduler=ExpiryScheduler(), **kwargs)
+
+
+@pytest.fixture
+def engine_env():
+    def make(db):
+        patches = [
+            patch.object(se, "table", db.table),
+            patch.object(se, "supabase", MagicMock(rpc=db.rpc)),
+            patch.object(se, "_utcnow", return_value=NOW),
+            patch.object(se, "log_event"),
+            patch.object(se, "adjudicate_session_pro"),
+            patch.object(se, "commit_session_pro"),
+        ]
+        for p in patches:
+            p.start()
+        return patches
+
+    started = []
+    yield lambda db: started.extend(make(db))
+    for p in started:
+        p.stop()
+
+
+def test_run_once_uses_single_grouped_aggregate(engine_env):
+    sessions = [_row("full", capacity=3), _row("open"), _row("old", created_days_ago=6)]
+    participants = [
+        {"session_id": "full", "quantity": 2},
+        {"session_id": "full", "quantity": 1},
+        {"session_id": "open", "quantity": 4},
+    ]
+    db = FakeDB(sessions, participants)
+    engine_env(db)
+
+    metrics = _engine().run_once()
+
+    assert metrics["closed"] == 1
+    assert metrics["expired"] == 1
+    assert metrics["adjudications_triggered"] == 1
+    # carga del scheduler + página + RPC fallida + IN agregado + update cierre + update expiración
+    assert db.calls.count(se.PARTICIPANTS_TABLE) == 1
+    assert metrics["db_round_trips"] == 6
+
+
+def test_fallback_aggregate_pages_past_the_row_cap(engine_env):
+    sessions = [_row("a", capacity=5), _row("b", capacity=5)]
+    participants = [{"id": f"p{i}", "session_id": sid, "quantity": 1} for sid in ("a", "b") for i in range(5)]
+    db = FakeDB(sessions, participants)
+    engine_env(db)
+
+    with patch.object(se, "FILLED_UNITS_PAGE_SIZE", 3):
+        filled = _engine()._get_filled_units_batch(["a", "b"])
+
+    assert filled == {"a": 5, "b": 5}
+    assert db.calls.count(se.PARTICIPANTS_TABLE) == 4  # 10 filas en páginas de 3
+
+
+def test_run_once_prefers_rpc_aggregate(engine_env):
+    sessions = [_row(f"s-{i}") for i in range(50)]
+    db = FakeDB(sessions, participants=[], rpc_rows=[{"session_id": "s-0", "filled_units": 10}])
+    engine_env(db)
+
+    metrics = _engine().run_once()
+
+    assert metrics["closed"] == 1
+    assert se.PARTICIPANTS_TABLE not in db.calls
+    # sin sesiones vencidas no hay update de expiración
+    assert metrics["db_round_trips"] == 4
+
+
+def test_keyset_scan_covers_every_session_across_ticks(engine_env, tmp_path):
+    # mismo created_at para varias sesiones: el desempate es el id
+    sessions = [_row(f"s-{i:03d}", created_days_ago=1 + (i % 3)) for i in range(23)]
+    db = FakeDB(sessions, participants=[])
+    engine_env(db)
+    store = se.FileCursorStore(str(tmp_path / "cursor.json"))
+
+    visited = []
+    real_process = se.SessionEngine._process_page
+
+    def spy(self, page, now, metrics):
+        visited.extend(s.id for s in page)
+        return real_process(self, page, now, metrics)
+
+    with patch.object(se.SessionEngine, "_process_page", spy):
+        ticks = []
+        for _ in range(3):
+            # engine nuevo por tick: el cursor viene del fichero
+            ticks.append(se.SessionEngine(cursor_store=store, scheduler=ExpiryScheduler()).run_once(limit=5, max_pages=2))
+
+    assert [t["scan_pass_completed"] for t in ticks] == [False, False, True]
+    assert sorted(visited) == sorted(r["id"] for r in sessions)
+    assert len(visited) == len(set(visited))
+    assert ticks[-1]["scan_last_full_pass"]["visited"] == 23
+    assert ticks[-1]["scan_last_full_pass"]["ticks"] == 3
+    assert ticks[-1]["scan_cursor"] is None
+
+
+def test_expiry_only_touches_due_sessions(engine_env):
+    sessions = [_row(f"s-{i}", created_days_ago=i) for i in range(1, 5)]
+    db = FakeDB(sessions, participants=[], rpc_rows=[])
+    engine_env(db)
+    engine = _engine()
+
+    first = engine.run_once()
+    assert first["expiry_due"] == 0
+    assert first["expiry_pending"] == 4
+
+    # +1 día y 1 segundo: vence sólo s-4 (creada hace 4 días)
+    later = NOW + timedelta(days=1, seconds=1)
+    with patch.object(se, "_utcnow", return_value=later):
+        second = engine.run_once()
+
+    assert second["expiry_due"] == 1
+    assert second["expired"] == 1
+    assert second["expiry_pending"] == 3
+    assert second["expiry_next_deadline"] == (NOW + timedelta(days=2)).isoformat()
+
+
+def test_due_session_that_filled_up_is_closed_not_expired(engine_env):
+    # Vencidas sin pasar por el escaneo (job de expiración): "full" se llenó
+    sessions = [_row("full", capacity=2, created_days_ago=6), _row("open", created_days_ago=6)]
+    db = FakeDB(sessions, participants=[], rpc_rows=[{"session_id": "full", "filled_units": 2}])
+    engine_env(db)
+
+    metrics = _engine().run_expiry_once()
+
+    assert metrics["expiry_due"] == 2
+    assert metrics["closed"] == 1 and metrics["expired"] == 1
+    se.adjudicate_session_pro.assert_called_once_with("full")
+    expired_events = [c for c in se.log_event.call_args_list if c.args[0] == "session_expired"]
+    assert [c.kwargs["session_id"] for c in expired_events] == ["open"]
+
+
+def test_expiry_job_reloads_sessions_activated_elsewhere(engine_env):
+    db = FakeDB([_row("old", created_days_ago=6)], participants=[], rpc_rows=[])
+    engine_env(db)
+    scheduler = ExpiryScheduler()
+
+    def expiry_tick(monotonic):
+        # engine nuevo por tick, como run_expiration_once; scheduler compartido
+        engine = se.SessionEngine(cursor_store=se.MemoryCursorStore(), scheduler=scheduler)
+        with patch.object(se.time, "monotonic", return_value=monotonic), \
+                patch.object(se, "EXPIRY_RELOAD_INTERVAL_S", 300):
+            return engine.run_expiry_once()
+
+    assert expiry_tick(1000.0)["expired"] == 1
+    # Activada por otro proceso: este no la ve hasta la recarga
+    db.sessions = [_row("new", created_days_ago=6)]
+    assert expiry_tick(1200.0)["expiry_due"] == 0
+    reloaded = expiry_tick(1300.0)
+
+    assert reloaded["expiry_due"] == 1 and reloaded["expired"] == 1
+
+
+
+def test_failed_expiry_chunk_keeps_its_sessions_scheduled(engine_env):
+    db = FakeDB([_row("a", created_days_ago=6), _row("b", created_days_ago=7)], participants=[], rpc_rows=[])
+    engine_env(db)
+    engine = _engine()
+    real_expire = engine._expire_sessions_if_active
+    calls = []
+
+    def flaky_expire(session_ids):
+        calls.append(list(session_ids))
+        if len(calls) == 2:
+            raise RuntimeError("db down")
+        return real_expire(session_ids)
+
+    with patch.object(se, "EXPIRY_UPDATE_CHUNK", 1), \
+            patch.object(se, "EXPIRY_RELOAD_INTERVAL_S", 10_000), \
+            patch.object(engine, "_expire_sessions_if_active", side_effect=flaky_expire):
+        with pytest.raises(RuntimeError):
+            engine.run_expiry_once()
+        # "b" (primer bloque) ya se expiró; "a" no llegó a aplicarse
+        assert "b" not in engine._scheduler and "a" in engine._scheduler
+
+        retry = engine.run_expiry_once()
+
+    assert calls == [["b"], ["a"], ["a"]]
+    assert retry["expiry_due"] == 1 and retry["expired"] == 1
+
+
+def test_invalid_session_in_the_middle_of_a_page_does_not_stall_the_scan(engine_env):
+    sessions = [_row(f"s-{i}", capacity=2, created_days_ago=1 + i / 100) for i in range(5)]
+    db = FakeDB(sessions, participants=[], rpc_rows=[{"session_id": "s-3", "filled_units": 5},  # sobreventa
+                                                     {"session_id": "s-2", "filled_units": 2}])
+    engine_env(db)
+    store = se.MemoryCursorStore()
+    engine = se.SessionEngine(cursor_store=store, scheduler=ExpiryScheduler())
+
+    first = engine.run_once(limit=3, max_pages=1)
+    second = engine.run_once(limit=3, max_pages=1)
+
+    assert first["invariant_violations"] == 1 and first["closed"] == 1
+    assert store.load()["cursor"] is None and second["scan_pass_completed"]
+    events = [c for c in se.log_event.call_args_list if c.args[0] == "session_invariant_violation"]
+    assert [c.kwargs["session_id"] for c in events] == ["s-3"]
+
+
+def test_sharded_engine_only_processes_owned_sessions(engine_env):
+    sessions = [_row(f"s-{i}", capacity=1) for i in range(6)]
+    db = FakeDB(sessions, participants=[], rpc_rows=[{"session_id": f"s-{i}", "filled_units": 1} for i in range(6)])
+    engine_env(db)
+    mine = {"s-0", "s-2", "s-4"}
+    shards = MagicMock(owned=frozenset({1}), owns=lambda sid: sid in mine)
+
+    metrics = _engine(shards=shards).run_once()
+
+    assert metrics["closed"] == 3
+    assert sorted(c.args[0] for c in se.adjudicate_session_pro.call_args_list) == sorted(mine)
+
+
+def test_closure_enqueues_adjudication_and_reports_backpressure(engine_env):
+    sessions = [_row("a", capacity=1), _row("b", capacity=1)]
+    db = FakeDB(sessions, participants=[], rpc_rows=[{"session_id": "a", "filled_units": 1},
+                                                     {"session_id": "b", "filled_units": 1}])
+    engine_env(db)
+    executor = MagicMock()
+    executor.submit.side_effect = [True, False]
+
+    metrics = _engine(adjudication_executor=executor).run_once()
+
+    assert metrics["closed"] == 2
+    assert metrics["adjudications_triggered"] == 1
+    assert metrics["adjudications_deferred"] == 1
+    se.adjudicate_session_pro.assert_not_called()
+
+
+def test_plain_engine_adjudicates_inline_even_with_async_enabled(engine_env):
+    sessions = [_row("a", capacity=1)]
+    db = FakeDB(sessions, participants=[], rpc_rows=[{"session_id": "a", "filled_units": 1}])
+    engine_env(db)
+
+    with patch.object(se, "ADJUDICATION_ASYNC", True), \
+            patch.object(se, "ADJUDICATION_DEFER_TO_DRAND_ROUND", True), \
+            patch.object(se, "get_drand_round_scheduler") as get_scheduler, \
+            patch.object(se, "get_adjudication_executor") as get_executor:
+        metrics = _engine().run_once()
+
+    assert metrics["adjudications_triggered"] == 1
+    se.adjudicate_session_pro.assert_called_once_with("a")
+    get_scheduler.assert_not_called()
+    get_executor.assert_not_called()
+
+
+def test_worker_backends_follow_the_async_flags():
+    with patch.object(se, "get_drand_round_scheduler") as get_scheduler, \
+            patch.object(se, "get_adjudication_executor") as get_executor:
+        with patch.object(se, "ADJUDICATION_ASYNC", False):
+            assert se.worker_adjudication_backends() == {}
+        with patch.object(se, "ADJUDICATION_ASYNC", True), \
+                patch.object(se, "ADJUDICATION_DEFER_TO_DRAND_ROUND", False):
+            assert se.worker_adjudication_backends() == {"adjudication_executor": get_executor.return_value}
+        with patch.object(se, "ADJUDICATION_ASYNC", True), \
+                patch.object(se, "ADJUDICATION_DEFER_TO_DRAND_ROUND", True):
+            assert se.worker_adjudication_backends() == {
+                "adjudication_executor": get_executor.return_value,
+                "round_scheduler": get_scheduler.return_value,
+            }
+
+
+def test_closure_defers_adjudication_to_its_drand_round(engine_env):
+    sessions = [_row("a", capacity=1)]
+    db = FakeDB(sessions, participants=[], rpc_rows=[{"session_id": "a", "filled_units": 1}])
+    engine_env(db)
+    round_scheduler, executor = MagicMock(), MagicMock()
+    round_scheduler.defer.return_value = 1234
+
+    metrics = _engine(round_scheduler=round_scheduler, adjudication_executor=executor).run_once()
+
+    assert metrics["adjudications_triggered"] == 1
+    round_scheduler.defer.assert_called_once_with("a", NOW)
+    executor.submit.assert_not_called()
@@ -0,0 +1,174 @@
+# tests/test_snapshot_loader.py
+
+import os
+import re
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend_core.services import snapshot_loader as loader
+
+
+SESSION_ROW = {
+    "id": "sess-1",
+    "product_id": "prod-1",
+    "created_at": "2025-01-01T10:00:00Z",
+    "closed_at": "2025-01-01T12:00:00Z",
+    "capacity": 3,
+    "rules_version": "1.0",
+    "status": "closed",
+}
+
+PARTICIPANT_ROWS = [
+    {"id": f"p-{i}", "user_id": f"u-{i}", "participations": i or None, "created_at": "2025-01-01T11:00:00Z"}
+    for i in range(3)
+]
+
+
+def _fake_table(session_row=SESSION_ROW, participant_rows=PARTICIPANT_ROWS):
+    calls = []
+
+    def table(name):
+        calls.append(name)
+        query = MagicMock()
+        for method in ("select", "eq", "in_", "order", "single", "limit"):
+            getattr(query, method).return_value = query
+        data = session_row if name == "ca_sessions" else participant_rows
+        query.execute.return_value = MagicMock(data=data)
+        return query
+
+    return table, calls
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    loader.clear_memory_cache()
+    with patch.object(loader, "SNAPSHOT_CACHE_DIR", str(tmp_path)), patch.object(loader, "SNAPSHOT_DISK_CACHE", True):
+        yield tmp_path
+    loader.clear_memory_cache()
+
+
+def test_closed_snapshot_is_loaded_once_and_cached(cache_dir):
+    table, calls = _fake_table()
+    with patch.object(loader, "table", table):
+        first = loader.load_closed_snapshot("sess-1")
+        again = loader.load_closed_snapshot("sess-1")
+
+    assert calls == ["ca_sessions", "ca_participants"]
+    assert again is first
+    assert first.session.capacity == 3
+    assert [p.participations for p in first.participants] == [1, 1, 2]
+    assert first.digest == loader.snapshot_digest(first.session, first.participants)
+
+
+def test_disk_cache_survives_memory_eviction(cache_dir):
+    table, calls = _fake_table()
+    with patch.object(loader, "table", table):
+        original = loader.load_closed_snapshot("sess-1")
+    loader.clear_memory_cache()
+
+    with patch.object(loader, "table", side_effect=AssertionError("no debe consultar DB")):
+        restored = loader.load_closed_snapshot("sess-1")
+
+    assert restored == original
+    assert os.path.exists(os.path.join(cache_dir, "objects", original.digest[:2], f"{original.digest}.json"))
+
+
+def test_tampered_disk_object_falls_back_to_db(cache_dir):
+    table, calls = _fake_table()
+    with patch.object(loader, "table", table):
+        original = loader.load_closed_snapshot("sess-1")
+        loader.clear_memory_cache()
+
+        obj = os.path.join(cache_dir, "objects", original.digest[:2], f"{original.digest}.json")
+        with open(obj, "r+", encoding="utf-8") as f:
+            raw = f.read().replace("u-1", "u-9")
+            f.seek(0)
+            f.write(raw)
+
+        restored = loader.load_closed_snapshot("sess-1")
+
+    assert restored == original
+    assert calls.count("ca_sessions") == 2
+
+
+def test_open_session_is_rejected_and_not_cached(cache_dir):
+    table, calls = _fake_table(session_row={**SESSION_ROW, "status": "open"})
+    with patch.object(loader, "table", table):
+        with pytest.raises(loader.InvariantViolationError):
+            loader.load_closed_snapshot("sess-1")
+
+    assert loader.snapshot_cache_stats()["memory_entries"] == 0
+
+
+def test_participants_list_is_a_copy(cache_dir):
+    table, _ = _fake_table()
+    with patch.object(loader, "table", table):
+        participants = loader.load_participants_snapshot("sess-1")
+        participants.pop()
+
+        assert len(loader.load_participants_snapshot("sess-1")) == 3
+
+
+def test_batch_load_uses_in_queries_and_reports_invalid_sessions(cache_dir):
+    sessions = [SESSION_ROW, {**SESSION_ROW, "id": "sess-2", "status": "open"}]
+    participants = [{**r, "session_id": "sess-1"} for r in PARTICIPANT_ROWS]
+    table, calls = _fake_table(session_row=sessions, participant_rows=participants)
+
+    with patch.object(loader, "table", table):
+        out = loader.load_closed_snapshots(["sess-1", "sess-2", "sess-3"])
+        again = loader.load_closed_snapshots(["sess-1"])
+
+    assert calls == ["ca_sessions", "ca_participants"]
+    assert len(out["sess-1"].participants) == 3
+    assert again["sess-1"] is out["sess-1"]
+    assert isinstance(out["sess-2"], loader.InvariantViolationError)
+    assert isinstance(out["sess-3"], loader.InvariantViolationError)
+
+
+def test_batch_load_pages_past_the_server_row_cap(cache_dir):
+    cap = 4
+    sessions = [{**SESSION_ROW, "id": f"sess-{n}"} for n in range(3)]
+    participants = [
+        {**r, "id": f"p-{n}-{i}", "session_id": f"sess-{n}"}
+        for n in range(3) for i, r in enumerate(PARTICIPANT_ROWS * 2)
+    ]
+    calls = []
+
+    def table(name):
+        # Como PostgREST: filtros + keyset, y nunca más de `cap` filas por respuesta
+        state = {"ids": None, "after": None, "limit": cap, "single": False}
+        query = MagicMock()
+        for method in ("select", "order"):
+            getattr(query, method).return_value = query
+        query.eq.side_effect = lambda col, v: state.update(ids={v}) or query
+        query.in_.side_effect = lambda col, vs: state.update(ids=set(vs)) or query
+        query.limit.side_effect = lambda n: state.update(limit=n) or query
+        query.single.side_effect = lambda: state.update(single=True) or query
+
+        def or_(expr):
+            sid, pid = re.match(r'session_id\.gt\."([^"]+)",and\(session_id\.eq\."[^"]+",id\.gt\."([^"]+)"\)', expr).groups()
+            state["after"] = (sid, pid)
+            return query
+
+        def execute():
+            calls.append(name)
+            rows = sessions if name == "ca_sessions" else participants
+            rows = [r for r in rows if (r["id"] if name == "ca_sessions" else r["session_id"]) in state["ids"]]
+            if name == "ca_participants":
+                rows = sorted(rows, key=lambda r: (r["session_id"], r["id"]))
+                rows = [r for r in rows if state["after"] is None or (r["session_id"], r["id"]) > state["after"]]
+            rows = rows[:min(state["limit"], cap)]
+            return MagicMock(data=rows[0] if state["single"] else rows)
+
+        query.or_.side_effect = or_
+        query.execute.side_effect = execute
+        return query
+
+    with patch.object(loader, "table", table), patch.object(loader, "SNAPSHOT_PARTICIPANTS_PAGE_SIZE", cap):
+        out = loader.load_closed_snapshots([f"sess-{n}" for n in range(3)])
+        single = loader.load_closed_snapshot("sess-1", use_cache=False)
+
+    assert [len(out[f"sess-{n}"].participants) for n in range(3)] == [6, 6, 6]
+    assert calls.count("ca_participants") == 5 + 2  # 18 filas / 4 por página + sesión suelta (6 / 4)
+    assert single.digest == out["sess-1"].digest
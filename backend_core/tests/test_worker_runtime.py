@@ -0,0 +1,121 @@
+# tests/test_worker_runtime.py
+
+import random
+import threading
+import time
+
+import pytest
+
+from backend_core.workers.worker_runtime import WorkerRuntime
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+def test_fixed_rate_schedule_and_lag(clock):
+    runs = []
+    runtime = WorkerRuntime(max_workers=0, clock=clock)
+    runtime.register("tick", lambda: runs.append(clock.now), interval_s=10)
+
+    assert runtime.run_pending() == 1
+    clock.now += 5
+    assert runtime.run_pending() == 0
+    clock.now += 7                           # programado a +10, arranca a +12
+    assert runtime.run_pending() == 1
+
+    stats = runtime.stats()["tick"]
+    assert runs == [1000.0, 1012.0]
+    assert stats["runs"] == 2
+    assert stats["last_lag_s"] == 2.0
+    assert stats["next_run_in_s"] == 8.0     # ritmo fijo: 1020, no 1022
+
+
+def test_errors_back_off_exponentially_and_reset(clock):
+    outcomes = iter([ValueError("a"), ValueError("b"), None, None])
+
+    def job():
+        err = next(outcomes)
+        if err:
+            raise err
+
+    runtime = WorkerRuntime(max_workers=0, clock=clock)
+    runtime.register("flaky", job, interval_s=10, max_backoff_s=30)
+
+    runtime.run_pending()
+    assert runtime.stats()["flaky"]["next_run_in_s"] == 20
+    clock.now += 20
+    runtime.run_pending()
+    assert runtime.stats()["flaky"]["next_run_in_s"] == 30   # 40 con tope 30
+    clock.now += 30
+    runtime.run_pending()
+
+    stats = runtime.stats()["flaky"]
+    assert stats["failures"] == 2
+    assert stats["consecutive_failures"] == 0
+    assert stats["last_error"] == "ValueError: b"
+    assert stats["next_run_in_s"] == 10
+
+
+def test_jitter_stays_within_bounds(clock):
+    runtime = WorkerRuntime(max_workers=0, clock=clock, rng=random.Random(7))
+    for i in range(20):
+        runtime.register(f"job-{i}", lambda: None, interval_s=10, jitter_s=2, run_at_start=False)
+
+    delays = [s["next_run_in_s"] for s in runtime.stats().values()]
+    assert all(10 <= d <= 12 for d in delays)
+    assert len(set(delays)) > 1
+
+
+def test_graceful_shutdown_waits_for_running_jobs_and_runs_hooks():
+    started, release = threading.Event(), threading.Event()
+    events = []
+
+    def slow_job():
+        started.set()
+        release.wait(2)
+        events.append("job_done")
+
+    runtime = WorkerRuntime(max_workers=2, shutdown_timeout_s=5)
+    runtime.register("slow", slow_job, interval_s=60)
+    runtime.add_shutdown_hook(lambda: events.append("hook"))
+
+    thread = threading.Thread(target=runtime.run_forever, kwargs={"install_signal_handlers": False})
+    thread.start()
+    assert started.wait(2)
+    runtime.stop()
+    time.sleep(0.05)
+    release.set()
+    thread.join(5)
+
+    assert not thread.is_alive()
+    assert events == ["job_done", "hook"]
+    assert runtime.stats()["slow"]["runs"] == 1
+
+
+
+def test_engine_jobs_share_one_engine_per_process():
+    from unittest.mock import MagicMock, patch
+
+    from backend_core.workers import run_workers
+
+    engine = MagicMock()
+    with patch.object(run_workers, "SessionEngine", return_value=engine) as engine_cls, \
+            patch.object(run_workers, "worker_adjudication_backends", return_value={}):
+        runtime = run_workers.build_runtime()
+        for _ in range(2):
+            runtime._jobs["session_engine"].spec.fn()
+            runtime._jobs["session_expiration"].spec.fn()
+
+    engine_cls.assert_called_once_with()
+    assert engine.run_once.call_count == 2
+    assert engine.run_expiry_once.call_count == 2
@@ -0,0 +1,136 @@
+# tests/test_worker_shards.py
+
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backend_core.services import worker_shards as ws
+
+
+T0 = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+class FakeLeaseDB:
+    """
+    ca_worker_leases / ca_worker_heartbeats en memoria con la semántica
+    mínima de PostgREST que usa el manager (filtros AND, PK en insert).
+    """
+
+    def __init__(self):
+        self.rows = {ws.LEASES_TABLE: {}, ws.HEARTBEATS_TABLE: {}}
+
+    def table(self, name):
+        key = "shard" if name == ws.LEASES_TABLE else "worker_id"
+        rows = self.rows[name]
+        query = MagicMock()
+        state = {"filters": [], "op": "select", "values": None}
+
+        def add_filter(fn):
+            state["filters"].append(fn)
+            return query
+
+        def op(kind):
+            def set_op(values=None, *args):
+                state["op"], state["values"] = kind, values
+                return query
+            return set_op
+
+        def execute():
+            matched = [r for r in rows.values() if all(f(r) for f in state["filters"])]
+            if state["op"] == "insert":
+                if state["values"][key] in rows:
+                    raise RuntimeError("duplicate key")
+                rows[state["values"][key]] = dict(state["values"])
+                return MagicMock(data=[dict(state["values"])])
+            if state["op"] == "upsert":
+                rows[state["values"][key]] = dict(state["values"])
+                return MagicMock(data=[dict(state["values"])])
+            if state["op"] == "update":
+                for r in matched:
+                    r.update(state["values"])
+            if state["op"] == "delete":
+                for r in matched:
+                    del rows[r[key]]
+            return MagicMock(data=[dict(r) for r in matched])
+
+        query.select.side_effect = lambda *a: query
+        query.insert.side_effect = op("insert")
+        query.upsert.side_effect = op("upsert")
+        query.update.side_effect = op("update")
+        query.delete.side_effect = op("delete")
+        query.eq.side_effect = lambda c, v: add_filter(lambda r: r.get(c) == v)
+        query.is_.side_effect = lambda c, v: add_filter(lambda r: r.get(c) is None)
+        query.in_.side_effect = lambda c, vs: add_filter(lambda r: r.get(c) in set(vs))
+        query.gt.side_effect = lambda c, v: add_filter(lambda r: r.get(c) > v)
+        query.execute.side_effect = execute
+        return query
+
+
+@pytest.fixture
+def db():
+    fake = FakeLeaseDB()
+    with patch.object(ws, "table", fake.table):
+        yield fake
+
+
+class Clock:
+    def __init__(self):
+        self.now = T0
+
+    def __call__(self):
+        return self.now
+
+
+def _manager(worker_id, clock):
+    return ws.ShardLeaseManager(worker_id, shard_count=8, ttl_seconds=30, clock=clock)
+
+
+def test_shard_of_is_stable_and_in_range():
+    assert ws.shard_of("sess-1", 64) == ws.shard_of("sess-1", 64)
+    assert {ws.shard_of(f"s-{i}", 8) for i in range(200)} == set(range(8))
+
+
+def test_two_workers_split_shards_disjointly(db):
+    clock = Clock()
+    a, b = _manager("a", clock), _manager("b", clock)
+
+    a.rebalance()
+    assert len(a.owned) == 8
+
+    b.rebalance()                            # b ve 2 vivos pero aún no hay libres
+    a.rebalance()                            # a libera hasta su objetivo (4)
+    b.rebalance()                            # b reclama los liberados
+
+    assert len(a.owned) == len(b.owned) == 4
+    assert not a.owned & b.owned
+    sessions = [f"s-{i}" for i in range(50)]
+    assert all(a.owns(s) != b.owns(s) for s in sessions)
+
+
+def test_dead_worker_shards_are_taken_over_after_ttl(db):
+    clock = Clock()
+    a, b = _manager("a", clock), _manager("b", clock)
+    a.rebalance(); b.rebalance(); a.rebalance(); b.rebalance()
+
+    # a deja de latir; antes del TTL b no puede quitarle nada
+    clock.now = T0 + timedelta(seconds=10)
+    b.rebalance()
+    assert len(b.owned) == 4
+
+    clock.now = T0 + timedelta(seconds=45)
+    # el lease de a ya no es válido ni localmente
+    assert all(not a.owns(f"s-{i}") for i in range(20))
+    b.rebalance()
+    assert len(b.owned) == 8
+
+
+def test_release_all_hands_over_immediately(db):
+    clock = Clock()
+    a, b = _manager("a", clock), _manager("b", clock)
+    a.rebalance()
+    a.release_all()
+
+    b.rebalance()
+    assert len(b.owned) == 8
+    assert a.owned == frozenset()
@@ -0,0 +1,94 @@
+# backend_core/workers/run_workers.py
+
+import logging
+import os
+import threading
+from typing import Callable, Optional
+
+from backend_core.engines.session_engine import SessionEngine, worker_adjudication_backends
+from backend_core.services.adjudication_executor import get_adjudication_executor
+from backend_core.services.audit_writer import flush_audit_log
+from backend_core.services.drand_round_scheduler import stop_drand_round_scheduler
+from backend_core.workers.session_adjudication_worker import run_session_adjudication_worker
+from backend_core.workers.session_closure_worker import run_session_closure_worker
+from backend_core.workers.worker_runtime import WorkerRuntime
+
+
+# ==========================================================
+# 🔹 ENTRYPOINT ÚNICO DE WORKERS
+#
+#   python -m backend_core.workers.run_workers
+#
+# Registra todos los jobs periódicos en un solo WorkerRuntime.
+# Intervalo 0 en la variable de entorno = job desactivado.
+# ==========================================================
+
+JOB_INTERVALS_S = {
+    "session_engine": int(os.getenv("SESSION_ENGINE_INTERVAL_SECONDS", "10")),
+    "session_closure": int(os.getenv("SESSION_CLOSURE_INTERVAL_SECONDS", "30")),
+    "session_adjudication": int(os.getenv("SESSION_ADJUDICATION_INTERVAL_SECONDS", "30")),
+    "session_expiration": int(os.getenv("EXPIRATION_WORKER_INTERVAL_SECONDS", "60")),
+}
+
+# Jitter: fracción del intervalo (evita que varias réplicas vayan en fase)
+JOB_JITTER_FRACTION = float(os.getenv("WORKER_JOB_JITTER_FRACTION", "0.1"))
+JOB_MAX_BACKOFF_S = float(os.getenv("WORKER_JOB_MAX_BACKOFF_SECONDS", "300"))
+
+
+def _engine_job(engine: SessionEngine, lock: threading.Lock, tick: str) -> Callable[[], dict]:
+    # Los jobs corren en un pool de hilos: los ticks del engine compartido
+    # (estado por tick: _fill_checked, _round_trips) se serializan
+    def run() -> dict:
+        with lock:
+            return getattr(engine, tick)()
+    return run
+
+
+# Ticks sobre el SessionEngine único del proceso (ver build_runtime)
+ENGINE_JOBS = {
+    "session_engine": "run_once",
+    "session_expiration": "run_expiry_once",
+}
+
+JOBS = {
+    "session_closure": run_session_closure_worker,
+    "session_adjudication": run_session_adjudication_worker,
+}
+
+
+def build_runtime(intervals=None, engine: Optional[SessionEngine] = None) -> WorkerRuntime:
+    intervals = {**JOB_INTERVALS_S, **(intervals or {})}
+    # Un engine por proceso: conserva entre ticks lo aprendido (RPC de aforo
+    # disponible, shards). Executor / scheduler drand del proceso: los paran
+    # los shutdown hooks de abajo, así que aquí sí se puede adjudicar en diferido
+    engine = engine if engine is not None else SessionEngine(**worker_adjudication_backends())
+    engine_lock = threading.Lock()
+    jobs = {name: _engine_job(engine, engine_lock, tick) for name, tick in ENGINE_JOBS.items()}
+    jobs.update(JOBS)
+
+    runtime = WorkerRuntime()
+    for name, fn in jobs.items():
+        interval = intervals.get(name) or 0
+        if interval <= 0:
+            continue
+        runtime.register(
+            name,
+            fn,
+            interval,
+            jitter_s=interval * JOB_JITTER_FRACTION,
+            max_backoff_s=JOB_MAX_BACKOFF_S,
+        )
+    # Adjudicaciones del cierre (esperando round drand o encoladas): terminarlas antes de salir
+    runtime.add_shutdown_hook(lambda: stop_drand_round_scheduler(drain=True, timeout=60))
+    runtime.add_shutdown_hook(lambda: get_adjudication_executor().stop(drain=True, timeout=60))
+    runtime.add_shutdown_hook(flush_audit_log)
+    return runtime
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    build_runtime().run_forever()
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,8 @@ from datetime import datetime, timezone
 
 from backend_core.services.supabase_client import table
 from backend_core.services.audit_repository import log_event
+from backend_core.services.adjudication_service_pro import commit_session_pro
+from backend_core.services.worker_shards import scope_query
 
 
 # ==========================================================
@@ -36,23 +38,29 @@ def _session_is_full(session_id: str, capacity: int) -> bool:
 # 🔹 WORKER PRINCIPAL
 # ==========================================================
 
-def run_session_closure_worker(limit: int = 20) -> dict:
+def run_session_closure_worker(limit: int = 20, shards=None) -> dict:
     """
     Cierra automáticamente sesiones que han alcanzado el 100% de aforo.
+    Con `shards` (ShardLeaseManager) sólo toca las sesiones de sus shards.
     """
 
     now = _now_utc()
 
-    resp = (
+    query = (
         table("ca_sessions")
         .select("id, capacity, status, closed_at")
         .eq("status", "active")
+    )
+    resp = (
+        scope_query(query, shards)
         .order("created_at", desc=False)
         .limit(limit)
         .execute()
     )
 
     sessions = resp.data or []
+    if shards is not None:
+        sessions = [s for s in sessions if shards.owns(s["id"])]
 
     closed = []
     skipped = []
@@ -76,15 +84,20 @@ def run_session_closure_worker(limit: int = 20) -> dict:
             skipped.append(session_id)
             continue
 
-        # 👉 CIERRE DEFINITIVO
-        table("ca_sessions") \
+        # 👉 CIERRE DEFINITIVO (condicional: otro worker puede haberla cerrado)
+        updated = table("ca_sessions") \
             .update({
                 "status": "closed",
                 "closed_at": now,
             }) \
             .eq("id", session_id) \
+            .eq("status", "active") \
             .execute()
 
+        if not updated.data:
+            skipped.append(session_id)
+            continue
+
         log_event(
             event_type="session_closed",
             session_id=session_id,
@@ -96,6 +109,16 @@ def run_session_closure_worker(limit: int = 20) -> dict:
 
         closed.append(session_id)
 
+        # Fase 1 de la adjudicación (compromiso) en cuanto la sesión cierra
+        try:
+            commit_session_pro(session_id)
+        except Exception as e:
+            log_event(
+                event_type="session_commitment_failed",
+                session_id=session_id,
+                payload={"error": str(e)},
+            )
+
     return {
         "timestamp": now,
         "closed_sessions": closed,
@@ -0,0 +1,86 @@
+# backend_core/workers/sharded_session_worker.py
+
+import os
+from typing import Optional
+
+from backend_core.engines.expiry_scheduler import ExpiryScheduler
+from backend_core.engines.session_engine import FileCursorStore, SessionEngine, worker_adjudication_backends
+from backend_core.services.audit_repository import log_event
+from backend_core.services.adjudication_executor import get_adjudication_executor
+from backend_core.services.audit_writer import flush_audit_log
+from backend_core.services.drand_round_scheduler import stop_drand_round_scheduler
+from backend_core.services.worker_shards import ShardLeaseManager
+from backend_core.workers.session_adjudication_worker import run_session_adjudication_worker
+from backend_core.workers.worker_runtime import WorkerRuntime
+
+
+# ==========================================================
+# 🔹 WORKER DE SESIONES CON SHARDS
+#
+# Varias instancias (procesos / nodos) se reparten las sesiones por
+# shards con lease (ver services/worker_shards). Cada tick:
+#   1) rebalancea leases (heartbeat, renovación, reclamo de caducados)
+#   2) SessionEngine sobre sus shards (cierre + expiración)
+#   3) drena la cola de adjudicación (claim atómico, compartida por todos)
+# ==========================================================
+
+INTERVAL_SECONDS = int(os.getenv("SHARDED_WORKER_INTERVAL_SECONDS", "10"))
+CURSOR_DIR = os.getenv("SHARDED_WORKER_CURSOR_DIR", "data/worker_cursors")
+
+
+def build_sharded_engine(shards: ShardLeaseManager) -> SessionEngine:
+    """
+    Engine con cursor y scheduler propios del worker (no compartidos con
+    otras instancias del mismo nodo). Adjudicación diferida: run_worker
+    para el executor y el scheduler drand en su apagado.
+    """
+    return SessionEngine(
+        cursor_store=FileCursorStore(os.path.join(CURSOR_DIR, f"{shards.worker_id}.json")),
+        scheduler=ExpiryScheduler(),
+        shards=shards,
+        **worker_adjudication_backends(),
+    )
+
+
+def run_sharded_tick(shards: ShardLeaseManager, engine: SessionEngine) -> dict:
+    lease = shards.rebalance()
+    if lease["changed"]:
+        log_event(
+            event_type="worker_shards_rebalanced",
+            session_id=None,
+            payload={k: lease[k] for k in ("worker_id", "live_workers", "target", "owned")},
+        )
+
+    if not shards.owned:
+        return {"lease": lease, "engine": None, "adjudication": None}
+
+    return {
+        "lease": lease,
+        "engine": engine.run_once(),
+        "adjudication": run_session_adjudication_worker(worker_id=shards.worker_id),
+    }
+
+
+def run_worker(worker_id: Optional[str] = None) -> None:
+    shards = ShardLeaseManager(worker_id)
+    engine = build_sharded_engine(shards)
+
+    print(f"🔧 Sharded session worker {shards.worker_id} iniciado.")
+    runtime = WorkerRuntime(max_workers=1)
+    runtime.register(
+        "sharded_session_tick",
+        lambda: run_sharded_tick(shards, engine),
+        INTERVAL_SECONDS,
+        jitter_s=INTERVAL_SECONDS * 0.1,
+    )
+    # Apagado ordenado: terminar las adjudicaciones encoladas y ceder los
+    # shards a otro worker sin esperar al TTL
+    runtime.add_shutdown_hook(lambda: stop_drand_round_scheduler(drain=True, timeout=60))
+    runtime.add_shutdown_hook(lambda: get_adjudication_executor().stop(drain=True, timeout=60))
+    runtime.add_shutdown_hook(flush_audit_log)
+    runtime.add_shutdown_hook(shards.release_all)
+    runtime.run_forever()
+
+
+if __name__ == "__main__":
+    run_worker(os.getenv("WORKER_ID") or None)
@@ -0,0 +1,288 @@
+# backend_core/workers/worker_runtime.py
+
+from __future__ import annotations
+
+import heapq
+import logging
+import random
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+# ==========================================================
+# 🔹 RUNTIME ÚNICO DE WORKERS
+#
+# Sustituye los bucles `while True: ...; sleep(N)` de cada worker:
+# - cada job se registra con intervalo + jitter
+# - se ejecutan en un pool de hilos (un job nunca se solapa consigo mismo)
+# - planificación a ritmo fijo: el siguiente run es el programado +
+#   intervalo; si ya pasó, se corre en cuanto se pueda (lag)
+# - error -> backoff exponencial (intervalo * 2^fallos, con tope)
+# - SIGTERM/SIGINT -> no se lanza nada nuevo, se esperan los jobs en curso
+#   y se ejecutan los hooks de apagado
+# - stats(): runs, fallos, duraciones y lag por job
+# ==========================================================
+
+
+@dataclass
+class JobSpec:
+    name: str
+    fn: Callable[[], Any]
+    interval_s: float
+    jitter_s: float = 0.0
+    max_backoff_s: float = 300.0
+    run_at_start: bool = True
+
+
+@dataclass
+class JobStats:
+    runs: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    running: bool = False
+    last_duration_s: Optional[float] = None
+    max_duration_s: float = 0.0
+    total_duration_s: float = 0.0
+    last_lag_s: Optional[float] = None
+    max_lag_s: float = 0.0
+    last_error: Optional[str] = None
+    last_result: Any = None
+
+
+@dataclass
+class _JobState:
+    spec: JobSpec
+    stats: JobStats = field(default_factory=JobStats)
+    # instante programado (reloj del runtime) del próximo run
+    scheduled_at: Optional[float] = None
+
+
+class WorkerRuntime:
+    """
+    Planificador de jobs periódicos.
+
+    - max_workers: hilos del pool (0 = ejecutar en línea, útil en tests)
+    - clock: reloj monotónico (inyectable en tests)
+    """
+
+    def __init__(
+        self,
+        *,
+        max_workers: Optional[int] = None,
+        clock: Callable[[], float] = time.monotonic,
+        rng: Optional[random.Random] = None,
+        shutdown_timeout_s: float = 30.0,
+    ) -> None:
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._shutdown_timeout_s = shutdown_timeout_s
+        self._max_workers = max_workers
+        self._pool: Optional[ThreadPoolExecutor] = None
+
+        self._jobs: Dict[str, _JobState] = {}
+        self._heap: List[tuple] = []
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._in_flight: Dict[str, Any] = {}
+        self._shutdown_hooks: List[Callable[[], Any]] = []
+
+    # ------------------------------------------------------------------
+    # REGISTRO
+    # ------------------------------------------------------------------
+
+    def register(
+        self,
+        name: str,
+        fn: Callable[[], Any],
+        interval_s: float,
+        *,
+        jitter_s: float = 0.0,
+        max_backoff_s: float = 300.0,
+        run_at_start: bool = True,
+    ) -> "WorkerRuntime":
+        if name in self._jobs:
+            raise ValueError(f"Job duplicado: {name}")
+        if interval_s <= 0:
+            raise ValueError("interval_s debe ser > 0")
+
+        spec = JobSpec(name, fn, interval_s, jitter_s, max_backoff_s, run_at_start)
+        state = _JobState(spec)
+        first = self._clock() + (0.0 if run_at_start else interval_s) + self._jitter(spec)
+        with self._lock:
+            self._jobs[name] = state
+            self._schedule_locked(state, first)
+        return self
+
+    def add_shutdown_hook(self, fn: Callable[[], Any]) -> None:
+        self._shutdown_hooks.append(fn)
+
+    # ------------------------------------------------------------------
+    # EJECUCIÓN
+    # ------------------------------------------------------------------
+
+    def run_pending(self) -> int:
+        """
+        Lanza los jobs vencidos. Devuelve cuántos se han lanzado.
+        """
+        now = self._clock()
+        due: List[tuple] = []
+        with self._lock:
+            while self._heap and self._heap[0][0] <= now and not self._stop.is_set():
+                at, name = heapq.heappop(self._heap)
+                state = self._jobs[name]
+                if state.scheduled_at != at or state.stats.running:
+                    continue  # entrada obsoleta
+                state.stats.running = True
+                state.scheduled_at = None
+                due.append((state, at))
+
+        for state, at in due:
+            if self._max_workers == 0:
+                self._run_job(state, at)
+            else:
+                future = self._get_pool().submit(self._run_job, state, at)
+                with self._lock:
+                    self._in_flight[state.spec.name] = future
+        return len(due)
+
+    def run_forever(self, *, install_signal_handlers: bool = True) -> None:
+        if install_signal_handlers and threading.current_thread() is threading.main_thread():
+            for sig in (signal.SIGTERM, signal.SIGINT):
+                signal.signal(sig, lambda *_: self.stop())
+
+        logger.info("Worker runtime started: %s", ", ".join(self._jobs))
+        try:
+            while not self._stop.is_set():
+                self.run_pending()
+                self._wake.wait(self._seconds_to_next())
+                self._wake.clear()
+        finally:
+            self._shutdown()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop.is_set()
+
+    # ------------------------------------------------------------------
+    # MÉTRICAS
+    # ------------------------------------------------------------------
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        now = self._clock()
+        out: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            for name, state in self._jobs.items():
+                s = state.stats
+                out[name] = {
+                    "runs": s.runs,
+                    "failures": s.failures,
+                    "consecutive_failures": s.consecutive_failures,
+                    "running": s.running,
+                    "interval_s": state.spec.interval_s,
+                    "last_duration_s": s.last_duration_s,
+                    "avg_duration_s": round(s.total_duration_s / s.runs, 6) if s.runs else None,
+                    "max_duration_s": s.max_duration_s,
+                    "last_lag_s": s.last_lag_s,
+                    "max_lag_s": s.max_lag_s,
+                    "last_error": s.last_error,
+                    "next_run_in_s": round(state.scheduled_at - now, 6) if state.scheduled_at is not None else None,
+                }
+        return out
+
+    # ------------------------------------------------------------------
+    # INTERNOS
+    # ------------------------------------------------------------------
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            workers = self._max_workers or max(1, len(self._jobs))
+            self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="worker-job")
+        return self._pool
+
+    def _jitter(self, spec: JobSpec) -> float:
+        return self._rng.uniform(0.0, spec.jitter_s) if spec.jitter_s > 0 else 0.0
+
+    def _schedule_locked(self, state: _JobState, at: float) -> None:
+        state.scheduled_at = at
+        heapq.heappush(self._heap, (at, state.spec.name))
+
+    def _seconds_to_next(self) -> float:
+        with self._lock:
+            pending = [at for at, name in self._heap if self._jobs[name].scheduled_at == at]
+        if not pending:
+            return 1.0
+        return max(0.0, min(min(pending) - self._clock(), 1.0))
+
+    def _run_job(self, state: _JobState, scheduled_at: float) -> None:
+        spec = state.spec
+        started = self._clock()
+        error: Optional[BaseException] = None
+        result: Any = None
+        try:
+            result = spec.fn()
+        except Exception as e:  # un job que falla no tumba el runtime
+            error = e
+            logger.exception("Worker job %s failed", spec.name)
+        finished = self._clock()
+
+        with self._lock:
+            s = state.stats
+            duration = finished - started
+            lag = max(0.0, started - scheduled_at)
+            s.runs += 1
+            s.running = False
+            s.last_duration_s = round(duration, 6)
+            s.total_duration_s += duration
+            s.max_duration_s = max(s.max_duration_s, round(duration, 6))
+            s.last_lag_s = round(lag, 6)
+            s.max_lag_s = max(s.max_lag_s, round(lag, 6))
+
+            if error is None:
+                s.consecutive_failures = 0
+                s.last_result = result
+                # Ritmo fijo: anclado al instante programado, no al de fin
+                next_at = scheduled_at + spec.interval_s
+                if next_at < finished:
+                    next_at = finished
+            else:
+                s.failures += 1
+                s.consecutive_failures += 1
+                s.last_error = f"{type(error).__name__}: {error}"
+                backoff = min(spec.interval_s * (2 ** s.consecutive_failures), spec.max_backoff_s)
+                next_at = finished + backoff
+
+            self._in_flight.pop(spec.name, None)
+            if not self._stop.is_set():
+                self._schedule_locked(state, next_at + self._jitter(spec))
+        self._wake.set()
+
+    def _shutdown(self) -> None:
+        logger.info("Worker runtime stopping: waiting for in-flight jobs")
+        with self._lock:
+            in_flight = list(self._in_flight.values())
+        deadline = self._clock() + self._shutdown_timeout_s
+        for future in in_flight:
+            try:
+                future.result(timeout=max(0.0, deadline - self._clock()))
+            except Exception:
+                logger.warning("Job still running at shutdown timeout")
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
+
+        for hook in self._shutdown_hooks:
+            try:
+                hook()
+            except Exception:
+                logger.exception("Shutdown hook failed")
+        logger.info("Worker runtime stopped")
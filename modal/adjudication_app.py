@@ -1,8 +1,9 @@
 # modal/adjudication_app.py
 
+import os
 import modal
 from datetime import datetime, timezone
-from typing import Dict, Any
+from typing import Any, Dict, Optional
 
 # ==========================================================
 # Modal App
@@ -32,82 +33,75 @@ secrets = [
 ]
 
 # ==========================================================
-# HTTP ENDPOINT
+# JOB REMOTO (un contenedor por sesión reclamada)
 # ==========================================================
 @app.function(
     image=image,
     secrets=secrets,
     timeout=300,
 )
+def adjudicate_job(session_id: str, attempts: int, worker_id: str) -> Dict[str, Any]:
+    """
+    Envoltorio remoto de run_claimed_adjudication (misma ruta de código
+    que el pool local y el worker en serie).
+    """
+    from backend_core.services.adjudication_fanout import run_claimed_adjudication
+    from backend_core.services.audit_writer import flush_audit_log
+
+    try:
+        return run_claimed_adjudication(session_id, attempts, worker_id)
+    finally:
+        # El contenedor puede congelarse al terminar: no dejar auditoría en buffer
+        flush_audit_log()
+
+
+# ==========================================================
+# HTTP ENDPOINT
+# ==========================================================
+@app.function(
+    image=image,
+    secrets=secrets,
+    timeout=900,
+)
 @modal.web_endpoint(method="POST")
-def adjudicate(limit: int = 10) -> Dict[str, Any]:
+def adjudicate(limit: Optional[int] = None) -> Dict[str, Any]:
     """
     Endpoint HTTP para adjudicación determinista PRO.
 
+    Reclama un lote de la cola de adjudicación y lo reparte con
+    adjudicate_job.map (ADJUDICATION_FANOUT=local -> pool de procesos
+    dentro de este contenedor).
+
     Payload opcional:
     {
-        "limit": 10
+        "limit": 200
     }
     """
 
     # ⚠️ Imports internos (Modal best practice)
-    from backend_core.services.supabase_client import table
-    from backend_core.services.adjudication_service import adjudicate_session
-    from backend_core.services.audit_repository import log_event
-
-    now = datetime.now(timezone.utc).isoformat()
-
-    # Buscar sesiones cerradas pendientes de adjudicar
-    resp = (
-        table("ca_sessions")
-        .select("id, status, closed_at, adjudicated_at")
-        .eq("status", "closed")
-        .order("closed_at", desc=False)
-        .limit(limit)
-        .execute()
+    from backend_core.services.adjudication_fanout import (
+        ADJUDICATION_FANOUT_BATCH,
+        get_fanout_executor,
+        run_adjudication_batch,
+    )
+    from backend_core.services.audit_writer import flush_audit_log
+
+    # En Modal el ejecutor por defecto es Function.map
+    kind = os.getenv("ADJUDICATION_FANOUT", "modal")
+    if kind == "modal":
+        executor = get_fanout_executor(kind, remote_fn=adjudicate_job)
+    else:
+        executor = get_fanout_executor(kind)
+
+    result = run_adjudication_batch(
+        limit or ADJUDICATION_FANOUT_BATCH,
+        worker_id=f"modal-{datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%S%f')}",
+        executor=executor,
     )
 
-    sessions = resp.data or []
-
-    processed = []
-    skipped = []
-    errors = []
-
-    for session in sessions:
-        session_id = session["id"]
-
-        # Idempotencia dura
-        if session.get("adjudicated_at") is not None:
-            skipped.append(session_id)
-            continue
-
-        try:
-            adjudicate_session(session_id)
-
-            table("ca_sessions") \
-                .update({"adjudicated_at": now}) \
-                .eq("id", session_id) \
-                .execute()
-
-            processed.append(session_id)
-
-        except Exception as e:
-            errors.append({
-                "session_id": session_id,
-                "error": str(e),
-            })
-
-            log_event(
-                event_type="session_adjudication_failed",
-                session_id=session_id,
-                payload={"error": str(e)},
-            )
+    flush_audit_log()
 
     return {
         "engine": "deterministic_adjudicator_pro",
-        "timestamp": now,
-        "processed_count": len(processed),
-        "processed": processed,
-        "skipped": skipped,
-        "errors": errors,
+        **result,
     }
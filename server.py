@@ -7,6 +7,7 @@ from fastapi.middleware.cors import CORSMiddleware
 # Routers API
 from backend_core.api import fintech_routes
 from backend_core.api import internal_routes
+from backend_core.services.audit_writer import flush_audit_log
 
 
 app = FastAPI(
@@ -34,6 +35,14 @@ async def healthcheck():
     return {"status": "ok"}
 
 
+# -----------------------------
+# Apagado: volcar auditoría en buffer
+# -----------------------------
+@app.on_event("shutdown")
+def flush_audit_on_shutdown():
+    flush_audit_log(timeout=10)
+
+
 # -----------------------------
 # Routers
 # -----------------------------